@@ -1,7 +1,17 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+import os
+import threading
+import time
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from api.routers import listings, whatsapp
+from api import profiling, tracing
+from api.responses import CachedJSON, CompressionMiddleware, ORJSONResponse
+from api.routers import export, listings, whatsapp
+from storage import change_feed
+
+log = tracing.setup_logging()
+tracing.instrument_clients()
 
 # --- API METADATA ORGANIZATION ---
 tags_metadata = [
@@ -27,7 +37,8 @@ app = FastAPI(
     title="Asta Insights API",
     version="4.2",
     description="The AI Backend for the Ghanaian Real Estate Market.",
-    openapi_tags=tags_metadata
+    openapi_tags=tags_metadata,
+    default_response_class=ORJSONResponse
 )
 
 # --- 2. CORS MIDDLEWARE (The Fix) ---
@@ -41,11 +52,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],              # Allow GET, POST, PUT, DELETE, etc.
     allow_headers=["*"],              # Allow all headers (Auth, Content-Type)
+    expose_headers=["X-Next-Cursor", "X-Total-Estimate", "Link", "x-trace-id"],  # readable by the dashboard
 )
 
+# --- PROFILING & TRACING (tracing outermost, so CORS preflights are timed too) ---
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
+
 # --- REGISTER ROUTERS ---
 app.include_router(listings.router, prefix="/listings", tags=["Phase 1: Listings"])
 app.include_router(whatsapp.router, prefix="/whatsapp", tags=["Phase 3: WhatsApp Bridge"])
+app.include_router(export.router)
 
 # --- THE LANDING PAGE (HTML) ---
 @app.get("/", response_class=HTMLResponse, tags=["System"])
@@ -107,16 +125,18 @@ def developer_hub():
     """
 
 # --- DIRECT ENDPOINTS (Phase 2 & Diagnostics) ---
+_pulse_cache = CachedJSON("pulse", ttl=300)
+
 @app.get("/forecast/pulse", tags=["Phase 2: Intelligence"])
-def pulse_check():
+def pulse_check(request: Request):
     """Returns the current AI-generated market hotspots."""
-    return {
+    return _pulse_cache.respond(request, lambda: {
         "market_status": "Active", 
         "top_hotspots": [
             {"location": "Oyibi", "growth": "+26%", "reason": "Infrastructure"},
             {"location": "Cantonments", "growth": "+12%", "reason": "High Demand"}
         ]
-    }
+    })
 
 @app.get("/debug/models", tags=["System"])
 def list_google_models():
@@ -129,19 +149,103 @@ def list_google_models():
     except Exception as e:
         return {"error": str(e)}
 
+def _require_profile_token(token: Optional[str]):
+    if not profiling.authorized(token):
+        raise HTTPException(status_code=403, detail="Profiling is disabled or the x-asta-profile token is wrong")
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["System"])
+def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape target: per-route latency histograms and dependency span metrics (bearer ASTA_METRICS_TOKEN)."""
+    if not tracing.metrics_authorized(authorization):
+        raise HTTPException(status_code=403, detail="Metrics are disabled or the bearer token is wrong")
+    return PlainTextResponse(tracing.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/debug/changes", tags=["System"])
+def change_feed_status():
+    """Change feed source, whether it is connected, event counts and the last commit-to-delivery lag."""
+    return change_feed.bus.status()
+
+@app.get("/debug/slow", tags=["System"])
+def slow_requests(limit: int = 20, min_ms: float = 0.0, x_asta_profile: Optional[str] = Header(None)):
+    """The slowest recent requests, each with its span breakdown (Supabase, Gemini, Twilio, ...)."""
+    _require_profile_token(x_asta_profile)
+    return {"window": tracing.TRACE_WINDOW, "requests": tracing.slowest(limit, min_ms)}
+
+@app.get("/debug/profile", tags=["System"])
+def profile_process(seconds: float = 5.0, x_asta_profile: Optional[str] = Header(None)):
+    """Samples every thread for `seconds` (max 60) and returns a speedscope profile."""
+    _require_profile_token(x_asta_profile)
+    return profiling.profile_process(app, seconds)
+
+@app.get("/debug/profile/rolling", tags=["System"])
+def rolling_profile(route: Optional[str] = None, x_asta_profile: Optional[str] = Header(None)):
+    """The continuous low-rate profile (ASTA_PROFILE_HZ) of the last window, optionally one route."""
+    _require_profile_token(x_asta_profile)
+    profile = profiling.rolling_profile(route)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Continuous profiling is off (set ASTA_PROFILE_HZ)")
+    return profile
+
+@app.get("/debug/profiles/{profile_id}", tags=["System"])
+def stored_profile(profile_id: str, x_asta_profile: Optional[str] = Header(None)):
+    """A per-request profile captured via the x-asta-profile header (id from x-profile-id)."""
+    _require_profile_token(x_asta_profile)
+    path = profiling.request_profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=path.name)
+
 # --- 3. MISSING ENDPOINT (Fixes 404 Error) ---
+TRENDING_TAGS = [
+    "East Legon",
+    "Cantonments",
+    "Airport Residential",
+    "Osu",
+    "Labone",
+    "Spintex",
+    "Swimming Pool",
+    "Gated Community"
+]
+
 @app.get("/api/trends", tags=["Phase 2: Intelligence"])
 def get_market_trends():
     """Returns trending search tags for the frontend search bar."""
-    return {
-        "trending_tags": [
-            "East Legon",
-            "Cantonments",
-            "Airport Residential",
-            "Osu",
-            "Labone",
-            "Spintex",
-            "Swimming Pool",
-            "Gated Community"
-        ]
-    }
\ No newline at end of file
+    return {"trending_tags": TRENDING_TAGS}
+
+# --- 4. STARTUP WARM-UP ---
+WARMUP_DELAY_SECS = float(os.getenv("ASTA_WARMUP_DELAY", "1.0"))
+
+def _warm_up():
+    """Builds the lazy clients and fills the caches the first requests would otherwise pay for."""
+    from api import utils
+    from api.routers.listings import _snapshot, get_search_indexes
+    time.sleep(WARMUP_DELAY_SECS)  # let uvicorn bind the port and serve health checks first
+    steps = [
+        ("supabase", utils.get_supabase),
+        ("gemini", utils.get_genai_client),
+        ("twilio", utils.get_twilio_client),
+        ("embeddings", lambda: utils.query_embedding_cache.warm(TRENDING_TAGS, utils._embed_remote)),
+        ("search indexes", get_search_indexes),
+        ("listing snapshot", lambda: _snapshot.refresh(utils.supabase, wait=True) if utils.supabase else None),
+    ]
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            log.info(f"🔥 Warmed {name} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            log.warning(f"⚠️ Warm-up of {name} failed: {e}")
+
+@app.on_event("startup")
+def start_warm_up():
+    """Runs the warm-up in the background so startup (and the port bind) is not held up."""
+    threading.Thread(target=_warm_up, name="asta-warmup", daemon=True).start()
+
+@app.on_event("startup")
+def start_continuous_profiling():
+    profiling.start_continuous(app)
+
+@app.on_event("startup")
+def start_change_feed():
+    """Realtime / LISTEN consumer that invalidates the listing caches within a second of a write."""
+    change_feed.start_feed()
\ No newline at end of file
@@ -0,0 +1,227 @@
+# api/profiling.py
+"""
+On-demand and continuous sampling profiles for the API (sampler: utils/profiler.py).
+
+Three ways in, all gated by ASTA_PROFILE_TOKEN (unset = everything off, and
+the middleware returns straight to the app):
+
+  * per request - send `x-asta-profile: <token>` with any request. The request
+    is sampled at ASTA_PROFILE_REQUEST_HZ - only the event loop while it runs
+    this request's task and the threadpool thread running its (sync) endpoint,
+    so concurrent requests stay out of it - the speedscope file is stored under
+    data/.profiles/requests/<trace id>.speedscope.json and the response carries
+    `x-profile-id`; fetch it from GET /debug/profiles/{profile_id};
+  * whole process - GET /debug/profile?seconds=5 samples every thread for a
+    few seconds and returns the speedscope JSON;
+  * continuous - ASTA_PROFILE_HZ=5 (say) keeps a low-rate sampler running and
+    folds stacks into a rolling ASTA_PROFILE_WINDOW-second profile per route;
+    GET /debug/profile/rolling?route=/forecast/pulse.
+
+Samples are attributed to a route by finding the route's endpoint function
+in the stack, so this works for sync endpoints (threadpool) and async ones
+(event loop) alike; stacks without one are grouped by thread name.
+"""
+
+import asyncio
+import contextvars
+import functools
+import hmac
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from api import tracing
+from utils.profiler import PROFILE_DIR, Profile, Sampler
+
+PROFILE_TOKEN = os.getenv("ASTA_PROFILE_TOKEN")
+PROFILE_HEADER = "x-asta-profile"
+REQUEST_HZ = float(os.getenv("ASTA_PROFILE_REQUEST_HZ", "200"))
+CONTINUOUS_HZ = float(os.getenv("ASTA_PROFILE_HZ", "0"))     # 0 = no continuous sampling
+ROLLING_WINDOW = float(os.getenv("ASTA_PROFILE_WINDOW", "600"))
+ROLLING_BUCKET = 60.0
+MAX_ADHOC_SECONDS = 60
+KEEP_REQUEST_PROFILES = 50
+REQUEST_PROFILE_DIR = PROFILE_DIR / "requests"
+
+# Threadpool threads currently running a sync endpoint for the profiled request (see _marks_thread).
+_request_threads: contextvars.ContextVar[Optional[set]] = contextvars.ContextVar("asta_profile_threads", default=None)
+
+
+def authorized(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token or "", PROFILE_TOKEN)
+
+
+# --- ROUTE ATTRIBUTION ---
+
+class RouteGrouper:
+    """Maps a sampled stack to the route whose endpoint function is on it."""
+
+    def __init__(self, app):
+        self.app = app
+        self._endpoints: Optional[Dict[object, str]] = None
+
+    def endpoints(self) -> Dict[object, str]:
+        if self._endpoints is None:  # built lazily: routers are all registered by the first sample
+            self._endpoints = {route.endpoint.__code__: route.path for route in self.app.routes
+                               if hasattr(getattr(route, "endpoint", None), "__code__")}
+        return self._endpoints
+
+    def __call__(self, thread_name: str, codes: List[object]) -> str:
+        endpoints = self.endpoints()
+        for code in codes:
+            route = endpoints.get(code)
+            if route is not None:
+                return route
+        return f"thread:{thread_name}"
+
+
+# --- CONTINUOUS (ROLLING) PROFILE ---
+
+class RollingProfile:
+    """Per-minute profiles; `snapshot()` merges the ones inside the window."""
+
+    def __init__(self, window: float = ROLLING_WINDOW, bucket: float = ROLLING_BUCKET):
+        self.window = window
+        self.bucket = bucket
+        self._buckets: deque = deque()   # (bucket start, Profile)
+        self._lock = threading.Lock()
+
+    def add(self, group: str, stack, weight: float):
+        now = time.time()
+        with self._lock:
+            if not self._buckets or now - self._buckets[-1][0] >= self.bucket:
+                self._buckets.append((now, Profile("rolling")))
+            while self._buckets and now - self._buckets[0][0] > self.window:
+                self._buckets.popleft()
+            self._buckets[-1][1].add(group, stack, weight)
+
+    def snapshot(self) -> Profile:
+        merged = Profile(f"rolling {int(self.window)}s")
+        with self._lock:
+            cutoff = time.time() - self.window
+            for started, profile in self._buckets:
+                if started >= cutoff - self.bucket:
+                    merged.merge(profile)
+        return merged
+
+
+_rolling: Optional[RollingProfile] = None
+_continuous: Optional[Sampler] = None
+
+
+def start_continuous(app) -> Optional[RollingProfile]:
+    """Starts the low-rate background sampler if ASTA_PROFILE_HZ > 0 (idempotent)."""
+    global _rolling, _continuous
+    if CONTINUOUS_HZ <= 0 or _continuous is not None:
+        return _rolling
+    _rolling = RollingProfile()
+    _continuous = Sampler(hz=CONTINUOUS_HZ, sink=_rolling, group=RouteGrouper(app)).start()
+    tracing.setup_logging().info(f"🔬 Continuous profiling at {CONTINUOUS_HZ:g} Hz "
+                                 f"({int(ROLLING_WINDOW)}s rolling window)")
+    return _rolling
+
+
+def rolling_profile(route: Optional[str] = None) -> Optional[dict]:
+    if _rolling is None:
+        return None
+    profile = _rolling.snapshot()
+    groups = [g for g in profile.groups() if route is None or g == route]
+    return profile.to_speedscope(groups)
+
+
+def profile_process(app, seconds: float) -> dict:
+    """Samples every thread for `seconds` (blocking - call from the threadpool)."""
+    seconds = min(max(seconds, 0.1), MAX_ADHOC_SECONDS)
+    sampler = Sampler(hz=REQUEST_HZ, group=RouteGrouper(app), name=f"process {seconds:g}s").start()
+    time.sleep(seconds)
+    return sampler.stop().to_speedscope()
+
+
+# --- PER-REQUEST PROFILES ---
+
+def request_profile_path(profile_id: str) -> Optional[Path]:
+    path = REQUEST_PROFILE_DIR / f"{Path(profile_id).name}.speedscope.json"
+    return path if path.exists() else None
+
+
+def _marks_thread(endpoint):
+    """Sync endpoint wrapper: registers the threadpool thread running it with the profiled request, if any."""
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        threads = _request_threads.get()
+        if threads is None:
+            return endpoint(*args, **kwargs)
+        ident = threading.get_ident()
+        threads.add(ident)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            threads.discard(ident)
+    wrapper._asta_marks_thread = True
+    return wrapper
+
+
+def mark_sync_endpoints(app):
+    """Wraps every sync route's call (FastAPI runs it in the threadpool) with _marks_thread; idempotent."""
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        call = getattr(dependant, "call", None)
+        if call is None or asyncio.iscoroutinefunction(call) or getattr(call, "_asta_marks_thread", False):
+            continue
+        dependant.call = _marks_thread(call)
+
+
+def _store(profile: Profile, profile_id: str):
+    profile.save(REQUEST_PROFILE_DIR / f"{profile_id}.speedscope.json")
+    stored = sorted(REQUEST_PROFILE_DIR.glob("*.speedscope.json"), key=lambda p: p.stat().st_mtime)
+    for old in stored[:-KEEP_REQUEST_PROFILES]:
+        old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._marked = False
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILE_TOKEN or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = next((v.decode() for k, v in scope["headers"] if k == PROFILE_HEADER.encode()), None)
+        # Debug endpoints (profiles, /debug/slow) use the header for auth - they are not themselves profiled
+        if token is None or scope["path"].startswith("/debug/") or not authorized(token):
+            return await self.app(scope, receive, send)
+
+        if not self._marked:   # routers are all registered by the first profiled request
+            mark_sync_endpoints(scope["app"])
+            self._marked = True
+
+        trace = tracing.current_trace()
+        profile_id = trace.id if trace else f"{os.getpid():x}-{time.time_ns():x}"
+        loop, task, loop_thread = asyncio.get_running_loop(), asyncio.current_task(), threading.get_ident()
+        threads: set = set()
+
+        def ours(ident: int) -> bool:
+            if ident == loop_thread:   # shared with every async request: only while it runs ours
+                return asyncio.current_task(loop) is task
+            return ident in threads
+
+        sampler = Sampler(hz=REQUEST_HZ, group=RouteGrouper(scope["app"]), accept=ours,
+                          name=f"{scope['method']} {scope['path']}").start()
+        threads_token = _request_threads.set(threads)
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            _request_threads.reset(threads_token)
+            profile = sampler.stop()
+            await run_in_threadpool(_store, profile, profile_id)
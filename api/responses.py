@@ -0,0 +1,346 @@
+# api/responses.py
+"""
+Fast JSON responses for the big list endpoints: orjson, pre-serialized cache entries, gzip/brotli.
+
+FastAPI turns a returned dict into a response by walking it with
+`jsonable_encoder` and then `json.dumps` - for the GeoJSON of a few thousand
+listings that is most of the request's CPU, and the result went out
+uncompressed. This module gives three layers:
+
+  * `ORJSONResponse` - the app's default response class (orjson instead of
+    stdlib json), and `json_response(payload)` which endpoints return directly
+    so FastAPI skips `jsonable_encoder` altogether (Supabase rows are plain
+    JSON already);
+  * `CachedJSON` - a TTL'd query result kept as serialized bytes together with
+    its gzip (and brotli) encodings and an ETag, so a cache hit costs a dict
+    lookup: no serialization, no compression, and a 304 for If-None-Match.
+    Rebuilds are single-flight (utils/singleflight.py), and for `stale`
+    seconds past the TTL the old entry keeps being served while one
+    background refresh runs. `CachedJSONMap` is the per-key variant whose
+    documents are dropped by change-feed tags (storage/change_feed.py);
+  * `CompressionMiddleware` - br (if the `brotli` package is installed) or
+    gzip for compressible responses of at least ASTA_COMPRESS_MIN_BYTES,
+    streaming responses included; pre-encoded responses pass through.
+
+    _geojson = CachedJSON("geojson", ttl=60)
+
+    @router.get("/properties/geojson")
+    def geojson(request: Request):
+        return _geojson.respond(request, build_geojson)
+
+See scripts/benchmark_json_responses.py for the numbers on 10k properties.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from utils.singleflight import AsyncSingleFlight, SingleFlight
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback keeps the API working without the wheel
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; every client we serve accepts gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("ASTA_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5   # ~gzip-6 speed with noticeably smaller output for JSON
+COMPRESSIBLE_TYPES = ("application/json", "application/geo+json", "application/x-ndjson", "text/")
+
+
+# --- SERIALIZATION ---
+
+def _default(obj):
+    """orjson fallback for the odd non-JSON value (numpy scalars from pandas, Decimals, ...)."""
+    if hasattr(obj, "item"):
+        return obj.item()
+    return jsonable_encoder(obj)
+
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(payload: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serializes `payload` as-is - return this from an endpoint to bypass jsonable_encoder."""
+    return Response(dumps(payload), status_code=status_code, headers=headers, media_type="application/json")
+
+
+# --- ENCODING ---
+
+def accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """The best encoding we can produce for an Accept-Encoding header ('br', 'gzip' or None)."""
+    offered = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def encode(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# --- PRE-SERIALIZED CACHE ---
+
+class CachedJSON:
+    """
+    One cached JSON document: payload bytes + compressed variants, rebuilt when
+    older than `ttl`; within `stale` more seconds the old entry is still served
+    and the rebuild happens in the background.
+    """
+
+    def __init__(self, name: str, ttl: float = 60.0, stale: float = 0.0, max_age: Optional[float] = None):
+        self.name = name
+        self.ttl = ttl
+        self.stale = stale
+        self.max_age = ttl if max_age is None else max_age   # what clients may cache; ttl can grow later
+        self._entry: Optional[dict] = None
+        self._generation = 0
+        self._flight = SingleFlight()
+        self._aflight = AsyncSingleFlight()
+
+    @staticmethod
+    def build_entry(payload: Any) -> dict:
+        body = dumps(payload)
+        entry = {"identity": body, "etag": f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"',
+                 "built_at": time.time(), "payload": payload}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            entry["gzip"] = encode(body, "gzip")
+            if brotli is not None:
+                entry["br"] = encode(body, "br")
+        return entry
+
+    def state(self):
+        """(entry, 'fresh' | 'stale' | 'expired' | 'missing') from one read of the entry."""
+        entry = self._entry
+        if entry is None:
+            return None, "missing"
+        age = time.time() - entry["built_at"]
+        return entry, "fresh" if age < self.ttl else "stale" if age < self.ttl + self.stale else "expired"
+
+    def _rebuild(self, compute: Callable[[], Any]) -> dict:
+        generation = self._generation
+        entry = self.build_entry(compute())
+        if generation == self._generation:   # invalidated mid-build: serve it to the waiters, don't keep it
+            self._entry = entry
+        return entry
+
+    def get_entry(self, compute: Callable[[], Any]) -> dict:
+        """Blocking variant for sync routes; concurrent misses share one `compute()`."""
+        entry, state = self.state()
+        if state == "fresh":
+            return entry
+        if state == "stale":
+            self._flight.refresh(self.name, self._rebuild, compute)
+            return entry
+        return self._flight.do(self.name, self._rebuild, compute)
+
+    async def aget_entry(self, compute: Callable[[], Any]) -> dict:
+        """Async variant: `compute` (blocking) runs once in the threadpool; waiters hold no threads."""
+        entry, state = self.state()
+        if state == "fresh":
+            return entry
+        if state == "stale":
+            self._aflight.refresh(self.name, run_in_threadpool, self._rebuild, compute)
+            return entry
+        return await self._aflight.do(self.name, run_in_threadpool, self._rebuild, compute)
+
+    def invalidate(self):
+        self._generation += 1
+        self._entry = None
+
+    def respond(self, request, compute: Callable[[], Any]) -> Response:
+        return self.response_for(request, self.get_entry(compute))
+
+    def response_for(self, request, entry: dict) -> Response:
+        headers = {"ETag": entry["etag"], "Cache-Control": f"public, max-age={int(self.max_age)}",
+                   "Vary": "Accept-Encoding"}
+        if request is not None and request.headers.get("if-none-match") == entry["etag"]:
+            return Response(status_code=304, headers=headers)
+        encoding = accepted_encoding(request.headers.get("accept-encoding", "")) if request is not None else None
+        if encoding and encoding in entry:
+            # Pre-encoded: CompressionMiddleware sees Content-Encoding and leaves it alone
+            return Response(entry[encoding], media_type="application/json",
+                            headers={**headers, "Content-Encoding": encoding})
+        return Response(entry["identity"], media_type="application/json", headers=headers)
+
+
+class CachedJSONMap:
+    """
+    Parameterized CachedJSON (one document per key), each tagged with the
+    invalidation keys it depends on (storage/change_feed.py), so a change drops
+    only the documents it touches. Least recently built keys go first past `max_keys`.
+    """
+
+    def __init__(self, name: str, ttl: float = 60.0, stale: float = 0.0, max_keys: int = 512):
+        self.name = name
+        self.ttl = ttl
+        self.stale = stale
+        self.max_keys = max_keys
+        self.max_age = ttl
+        self._docs: Dict[Any, CachedJSON] = {}
+        self._tags: Dict[Any, frozenset] = {}
+        self._building: Dict[CachedJSON, set] = {}   # doc -> change keys invalidated while it builds
+        self._lock = threading.Lock()
+
+    def _doc(self, key) -> CachedJSON:
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is None:
+                while len(self._docs) >= self.max_keys:
+                    oldest = next(iter(self._docs))
+                    self._docs.pop(oldest)
+                    self._tags.pop(oldest, None)
+                doc = self._docs[key] = CachedJSON(f"{self.name}:{key}", self.ttl, self.stale, self.max_age)
+            doc.ttl = self.ttl
+            return doc
+
+    def get_entry(self, key, compute: Callable[[], Any],
+                  tags: Callable[[Any], Iterable[str]] = lambda payload: ()):
+        """(document, entry) for `key`; `tags(payload)` names the change keys the document depends on."""
+        doc = self._doc(key)
+
+        def build():
+            changed = set()
+            with self._lock:
+                self._building[doc] = changed
+            try:
+                payload = compute()
+            finally:
+                with self._lock:
+                    self._building.pop(doc, None)
+            deps = frozenset(tags(payload))
+            with self._lock:
+                current = self._docs.get(key) is doc
+                if changed & deps:   # invalidated mid-build: serve it to the waiters, don't keep it
+                    doc.invalidate()
+                    if current:
+                        self._docs.pop(key)
+                        self._tags.pop(key, None)
+                elif current:
+                    self._tags[key] = deps
+            return payload
+        return doc, doc.get_entry(build)
+
+    def respond(self, request, key, compute: Callable[[], Any],
+                tags: Callable[[Any], Iterable[str]] = lambda payload: ()) -> Response:
+        doc, entry = self.get_entry(key, compute, tags)
+        return doc.response_for(request, entry)
+
+    def invalidate_tags(self, changed: Iterable[str]) -> int:
+        changed = set(changed)
+        with self._lock:
+            for pending in self._building.values():   # tags unknown until the build returns
+                pending |= changed
+            hit = [key for key, tags in self._tags.items() if tags & changed]
+            for key in hit:
+                self._docs.pop(key, None)
+                self._tags.pop(key, None)
+        return len(hit)
+
+    def invalidate(self):
+        with self._lock:
+            self._docs.clear()
+            self._tags.clear()
+
+
+# --- COMPRESSION MIDDLEWARE ---
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.flush = self._c.process, self._c.flush
+            self.finish = self._c.finish
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)   # gzip container
+            self.compress = self._c.compress
+            self.flush = lambda: self._c.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self._c.flush
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = accepted_encoding(accept)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def send_compressed(message):
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    state["passthrough"] = True
+                    return await send(message)
+                state["start"] = message   # held until we know the body size
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                return await send(message)
+
+            body, more = message.get("body", b""), message.get("more_body", False)
+            start = state["start"]
+            if start is not None:   # first body message decides
+                state["start"] = None
+                if not more and len(body) < self.minimum_size:
+                    state["passthrough"] = True
+                    await send(start)
+                    return await send(message)
+                headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+                headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                if not more:   # whole body in one message: compress in one go, keep Content-Length
+                    data = encode(body, encoding)
+                    await send({**start, "headers": [*headers, (b"content-length", str(len(data)).encode())]})
+                    return await send({"type": "http.response.body", "body": data})
+                state["compressor"] = _Compressor(encoding)
+                await send({**start, "headers": headers})
+            compressor = state["compressor"]
+            if more:   # streaming: flush per chunk so rows reach the client as they are produced
+                data = compressor.compress(body) + compressor.flush()
+            else:
+                data = compressor.compress(body) + compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 import json
-from api.utils import supabase, client
+from api.utils import supabase, generate_text
 
 router = APIRouter(prefix="/agent", tags=["Phase 1: Agent & Demo"])
 
@@ -21,7 +21,6 @@ def chat_with_data(request: ChatRequest):
         User Question: "{request.query}"
         Answer based ONLY on the data provided. Be professional.
         """
-        model_response = client.models.generate_content(model="gemini-2.0-flash", contents=prompt)
-        return {"reply": model_response.text}
+        return {"reply": generate_text(prompt, "gemini-2.0-flash")}
     except Exception as e:
         return {"reply": f"System Error: {str(e)}"}
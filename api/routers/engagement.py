@@ -1,6 +1,10 @@
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
+import logging
 from api.utils import supabase
+from storage.listing_history import DEFAULT_HISTORY_PATH, ListingHistory, price_insight
+
+log = logging.getLogger("asta.api")
 
 router = APIRouter(prefix="/engagement", tags=["Phase 2: Trust & Reach"])
 
@@ -37,20 +41,29 @@ def submit_contextual_feedback(data: FeedbackRequest, request: Request):
 
         return {"status": "recorded"}
     except Exception as e:
-        print(f"Feedback Error: {e}")
+        log.error(f"Feedback Error: {e}")
         return {"status": "error"}
 
-# --- 2. PRICE TRUTH TICKER (Mock - Phase 2.3) ---
+# --- 2. PRICE TRUTH TICKER (Real - storage/listing_history.py) ---
+_history = None
+
+def get_listing_history():
+    """Read-only handle on the crawler's price-history store (None until a crawl has written it)."""
+    global _history
+    if _history is None and DEFAULT_HISTORY_PATH.exists():
+        _history = ListingHistory(DEFAULT_HISTORY_PATH, readonly=True)
+    return _history
+
 @router.get("/price-history/{property_id}")
 def get_price_history(property_id: str):
-    # This remains mocked until we have historical data accumulation
+    """Price points recorded by change detection on every crawl (one point per price change)."""
+    history = get_listing_history()
+    points = history.price_history(property_id) if history else []
+    snapshot = history.snapshot(property_id) if history and points else None
     return {
-        "history": [
-            {"date": "2023-12-01", "price": 350000},
-            {"date": "2024-01-15", "price": 320000},
-            {"date": "2024-02-01", "price": 295000}
-        ],
-        "insight": "📉 Price dropped by 15% in 3 months."
+        "history": points,
+        "status": snapshot["status"] if snapshot else None,
+        "insight": price_insight(points)
     }
 
 # --- 3. DIASPORA WATCHLIST (REAL) ---
@@ -78,7 +91,7 @@ def subscribe_to_neighborhood(data: WatchlistRequest):
 
         return {"status": "subscribed", "message": f"We will alert you when {data.neighborhood} moves."}
     except Exception as e:
-        print(f"Watchlist Error: {e}")
+        log.error(f"Watchlist Error: {e}")
         return {"status": "error", "detail": "Could not subscribe"}
 
 # --- 4. EMAIL TEST FIRE (New Feature) ---
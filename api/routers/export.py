@@ -0,0 +1,59 @@
+import hmac
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from api.utils import supabase
+from storage.exporter import FORMATS, ExportError, export_chunks
+
+log = logging.getLogger("asta.api")
+
+router = APIRouter(prefix="/export", tags=["Data Export"])
+
+# Bulk exports read with the service-role key, so they are for analysts only (unset = disabled)
+EXPORT_TOKEN = os.getenv("ASTA_EXPORT_TOKEN")
+
+def _logged(chunks, dataset: str, fmt: str):
+    started, sent = time.perf_counter(), 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        log.info(f"📤 Export {dataset}.{fmt}: {sent / 1e6:.1f} MB in {time.perf_counter() - started:.1f}s")
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: str = "csv",
+    fields: Optional[str] = None,
+    listing_type: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    bedrooms: Optional[int] = None,
+    location: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: Optional[int] = None,
+    x_asta_export: Optional[str] = Header(None),
+):
+    """
+    Streams a whole dataset (listings, market, insights) as CSV, NDJSON or Parquet,
+    page by page: constant memory, first bytes right away, no row limit.
+    """
+    if not EXPORT_TOKEN or not hmac.compare_digest(x_asta_export or "", EXPORT_TOKEN):
+        raise HTTPException(403, "Export is disabled or the x-asta-export token is wrong")
+    if not supabase: raise HTTPException(503, "Database unavailable.")
+    filters = {"listing_type": listing_type, "min_price": min_price, "max_price": max_price,
+               "bedrooms": bedrooms, "location": location, "since": since}
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        chunks = export_chunks(supabase, dataset, format, columns, filters, limit)
+    except ExportError as e:
+        raise HTTPException(400, str(e))
+    media_type, extension = FORMATS[format]
+    filename = f"asta_{dataset}_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}.{extension}"
+    return StreamingResponse(_logged(chunks, dataset, format), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
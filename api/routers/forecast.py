@@ -1,12 +1,25 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from api.utils import supabase
-import pandas as pd
-import numpy as np
+from api.responses import CachedJSON, json_response
+from storage.change_feed import bus
 
 router = APIRouter(prefix="/forecast", tags=["Phase 2: Predictive Pulse"])
 
+# Stale for up to an hour while one background rebuild runs - a cold cache never stampedes Supabase
+_pulse_cache = CachedJSON("market_pulse", ttl=300, stale=3600)
+bus.subscribe(lambda event: _pulse_cache.invalidate(), tables=["properties", "news_articles"], name="market pulse")
+
 @router.get("/pulse")
-async def get_market_pulse():
+async def get_market_pulse(request: Request):
+    # Supabase + pandas are blocking: one build in the threadpool, concurrent callers await it
+    entry = await _pulse_cache.aget_entry(compute_market_pulse)
+    if "top_hotspots" not in entry["payload"]:
+        _pulse_cache.invalidate()  # "insufficient data" is not worth caching
+        return json_response(entry["payload"])
+    return _pulse_cache.response_for(request, entry)
+
+def compute_market_pulse():
+    import pandas as pd  # deferred: only this endpoint needs it, not every cold start
     # 1. Fetch live data
     properties = supabase.table("properties").select("*").execute().data
     news = supabase.table("news_articles").select("*").execute().data
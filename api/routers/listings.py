@@ -1,11 +1,24 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
 from typing import List, Optional
+import os
+import time
 import uuid
 import json
+import base64
+import logging
+import threading
+from datetime import datetime
 from api.utils import (
     extract_gps_from_file, reverse_geocode, generate_property_insights, 
-    supabase, compress_image, upload_image_to_supabase
+    supabase, compress_image, upload_image_to_supabase, embed_query
 )
+from storage.vector_index import VectorIndex, DEFAULT_INDEX_DIR, refresh_from_supabase, hydrate_hits
+from storage.hybrid_search import BM25Index, HybridSearch, refresh_lexical_from_supabase
+from storage.listing_snapshot import SnapshotReader
+from storage.change_feed import Debounced, bus, cells_for_radius, publish_change
+from api.responses import CachedJSON, CachedJSONMap
+
+log = logging.getLogger("asta.api")
 
 router = APIRouter(tags=["Phase 1: Listings & Data"])
 
@@ -53,39 +66,185 @@ async def create_lazy_listing(
     
     try:
         supabase.table("properties").insert(new_prop).execute()
+        publish_change("properties", "INSERT", new_prop)   # this worker at once; the feed tells the rest
         return {"status": "success", "id": prop_id, "insights": insights}
     except Exception as e:
         return {"status": "error", "detail": str(e)}
 
+# Serialized + pre-compressed once per TTL, rebuilt single-flight (stale copies are served meanwhile);
+# property changes invalidate them (section 7), and with a live change feed the TTLs stretch to an hour
+_unified_cache = CachedJSONMap("properties_unified", ttl=30, stale=120)   # per page + filter combination
+_geojson_cache = CachedJSON("properties_geojson", ttl=60, stale=600)
+_tags_cache = CachedJSON("trending_tags", ttl=300, stale=3600)
+_stats_cache = CachedJSON("area_price_stats", ttl=300, stale=3600)
+_nearby_cache = CachedJSONMap("nearby", ttl=60, stale=300)   # per query, dropped by grid cell
+
+# Memory-mapped listings shared by every worker (storage/listing_snapshot.py); None until first built
+_snapshot = SnapshotReader()
+GEO_FIELDS = ["id", "title", "price", "currency", "latitude", "longitude", "roi_score", "vibe"]
+
+def listing_snapshot():
+    """The live snapshot, kicking off a background rebuild when it is older than ASTA_SNAPSHOT_TTL."""
+    return _snapshot.refresh(supabase) if supabase else _snapshot.get()
+
 # --- 2. UNIFIED TABLE (DASHBOARD) ---
+# Columns a client may ask for with fields=; embeddings and insight blobs are never served here.
+# id and created_at are always included - the keyset cursor is built from them.
+UNIFIED_FIELDS = {
+    "id", "title", "description", "price", "currency", "listing_type", "location", "latitude", "longitude",
+    "image_urls", "agent_id", "created_at", "roi_score", "trust_bullets", "vibe", "bedrooms", "status", "source",
+}
+DEFAULT_UNIFIED_FIELDS = ["id", "title", "description", "price", "currency", "listing_type", "location", "latitude",
+                          "longitude", "image_urls", "agent_id", "created_at", "roi_score", "trust_bullets", "vibe"]
+UNIFIED_MAX_LIMIT = 500
+COUNT_TTL = 300
+_count_cache = {}   # filters -> (estimate, computed_at); cleared by property changes
+
+def encode_cursor(row) -> str:
+    return base64.urlsafe_b64encode(json.dumps([row["created_at"], str(row["id"])]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """(created_at, id), re-serialized from a parsed timestamp and UUID / integer -
+    both go into a quoted PostgREST or_() filter, so nothing else may get through."""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        created_at = datetime.fromisoformat(str(created_at).replace("Z", "+00:00")).isoformat()
+        row_id = str(row_id)
+        row_id = str(int(row_id)) if row_id.isdigit() else str(uuid.UUID(row_id))
+        return created_at, row_id
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor.")
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return DEFAULT_UNIFIED_FIELDS
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(wanted) - UNIFIED_FIELDS)
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(sorted(UNIFIED_FIELDS))}")
+    return list(dict.fromkeys(["id", "created_at", *wanted]))
+
+def _apply_filters(query, filters):
+    if filters.get("listing_type"): query = query.eq("listing_type", filters["listing_type"])
+    if filters.get("min_price") is not None: query = query.gte("price", filters["min_price"])
+    if filters.get("max_price") is not None: query = query.lte("price", filters["max_price"])
+    if filters.get("bedrooms") is not None: query = query.gte("bedrooms", filters["bedrooms"])
+    if filters.get("location"): query = query.ilike("location", f"%{filters['location']}%")
+    return query
+
+def _load_unified(fields, filters, cursor, limit):
+    """One keyset page, newest first: an index range scan on (created_at, id) at any depth, no OFFSET."""
+    query = _apply_filters(supabase.table("properties").select(",".join(fields)), filters)
+    if cursor:
+        created_at, row_id = cursor
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")')
+    return query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute().data
+
+def estimate_total(filters) -> Optional[int]:
+    """
+    Matching rows, cached per filter combination: counted on the shared snapshot
+    when it covers the filters, else PostgREST's planner estimate - never count=exact.
+    """
+    key = tuple(sorted(filters.items()))
+    hit = _count_cache.get(key)
+    if hit and time.time() - hit[1] < COUNT_TTL:
+        return hit[0]
+    snap = listing_snapshot()
+    if snap is not None and filters.get("bedrooms") is None:
+        total = int(snap.mask(filters).sum())
+    else:
+        try:
+            query = supabase.table("properties").select("id", count="estimated", head=True)
+            total = _apply_filters(query, filters).execute().count
+        except Exception as e:
+            log.warning(f"⚠️ Count estimate failed: {e}")
+            return hit[0] if hit else None
+    if len(_count_cache) >= 1024: _count_cache.clear()   # arbitrary price ranges: keep it bounded
+    _count_cache[key] = (total, time.time())
+    return total
+
 @router.get("/properties/unified")
-def get_unified_properties():
+def get_unified_properties(
+    request: Request,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    listing_type: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    bedrooms: Optional[int] = None,
+    location: Optional[str] = None,
+):
+    """
+    Newest listings, one keyset page at a time. The body is the row list as
+    before; the next page's cursor is in X-Next-Cursor (and a Link rel="next")
+    and the total-count estimate in X-Total-Estimate.
+    """
+    limit = max(1, min(limit, UNIFIED_MAX_LIMIT))
+    columns = _parse_fields(fields)
+    after = decode_cursor(cursor) if cursor else None
+    filters = {k: v for k, v in {"listing_type": listing_type.upper().strip() if listing_type else None,
+                                 "min_price": min_price, "max_price": max_price, "bedrooms": bedrooms,
+                                 "location": location.strip() if location else None}.items() if v is not None}
+    key = (tuple(columns), tuple(sorted(filters.items())), after, limit)
     try:
-        response = supabase.table("properties").select("*").order("created_at", desc=True).limit(100).execute()
-        return response.data
+        doc, entry = _unified_cache.get_entry(key, lambda: _load_unified(columns, filters, after, limit))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    response = doc.response_for(request, entry)
+    rows = entry["payload"]
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1])
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    total = estimate_total(filters)
+    if total is not None:
+        response.headers["X-Total-Estimate"] = str(total)
+    return response
 
 # --- 3. GEOJSON (MAP) ---
+def build_properties_geojson(rows) -> dict:
+    features = []
+    for prop in rows:
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(prop["longitude"]), float(prop["latitude"])]},
+            "properties": prop
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+def _load_geojson():
+    snap = listing_snapshot()
+    if snap is not None:
+        return build_properties_geojson(snap.records(snap.mask({"has_coords": True}).nonzero()[0], GEO_FIELDS))
+    response = supabase.table("properties").select("id, title, price, currency, latitude, longitude, roi_score, vibe").neq("latitude", None).execute()
+    return build_properties_geojson(response.data)
+
 @router.get("/properties/geojson")
-def get_properties_geojson():
+def get_properties_geojson(request: Request):
     try:
-        response = supabase.table("properties").select("id, title, price, currency, latitude, longitude, roi_score, vibe").neq("latitude", None).execute()
-        features = []
-        for prop in response.data:
-            features.append({
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [float(prop["longitude"]), float(prop["latitude"])]},
-                "properties": prop
-            })
-        return {"type": "FeatureCollection", "features": features}
+        return _geojson_cache.respond(request, _load_geojson)
     except:
         return {"type": "FeatureCollection", "features": []}
 
 # --- 4. SMART SEARCH ---
 @router.get("/listings/search")
-def smart_radius_search(lat: float, lon: float, radius_km: int = 5):
+def smart_radius_search(request: Request, lat: float, lon: float, radius_km: int = 5):
+    key = (round(lat, 4), round(lon, 4), radius_km)   # ~10 m: nearby taps share an entry
+    return _nearby_cache.respond(request, key, lambda: _radius_search(lat, lon, radius_km),
+                                 tags=lambda payload: _radius_tags(lat, lon, payload["radius_used"]))
+
+def _radius_tags(lat, lon, radius_km):
+    return {"properties"} if radius_km > 50 else {f"properties:cell:{c}" for c in cells_for_radius(lat, lon, radius_km)}
+
+def _radius_search(lat: float, lon: float, radius_km: int):
     curr_rad, max_rad, results = radius_km, 50, []
+    snap = listing_snapshot()
+    if snap is not None:
+        while not results and curr_rad <= max_rad:
+            results = snap.nearby(lat, lon, curr_rad)
+            if not results: curr_rad += 10
+        return {"results": results, "radius_used": curr_rad}
     while len(results) == 0 and curr_rad <= max_rad:
         try:
             res = supabase.rpc("nearby_properties", {"lat": lat, "long": lon, "radius_km": curr_rad}).execute()
@@ -95,22 +254,175 @@ def smart_radius_search(lat: float, lon: float, radius_km: int = 5):
     return {"results": results or [], "radius_used": curr_rad}
 
 # --- 5. TRENDING TAGS ---
+def _load_trending_tags():
+    snap = listing_snapshot()
+    if snap is not None:
+        locations, vibes = snap.counts("location", area=True), snap.counts("vibe")
+        return _tags_payload(locations, vibes)
+    data = supabase.table("properties").select("vibe, location").execute().data
+    locations, vibes = {}, {}
+    for item in data:
+        loc = item.get('location', 'Accra').split(',')[0].strip()
+        vibe = item.get('vibe', 'Standard')
+        if loc: locations[loc] = locations.get(loc, 0) + 1
+        if vibe: vibes[vibe] = vibes.get(vibe, 0) + 1
+    return _tags_payload(locations, vibes)
+
+def _tags_payload(locations, vibes):
+    top_locs = sorted(locations, key=locations.get, reverse=True)[:5]
+    top_vibes = sorted(vibes, key=vibes.get, reverse=True)[:5]
+    return {
+        "locations": top_locs, 
+        "vibes": top_vibes, 
+        "chips": [f"📍 {l}" for l in top_locs] + [f"✨ {v}" for v in top_vibes]
+    }
+
 @router.get("/listings/tags")
-def get_trending_tags():
+def get_trending_tags(request: Request):
     try:
-        data = supabase.table("properties").select("vibe, location").execute().data
-        locations, vibes = {}, {}
-        for item in data:
-            loc = item.get('location', 'Accra').split(',')[0].strip()
-            vibe = item.get('vibe', 'Standard')
-            if loc: locations[loc] = locations.get(loc, 0) + 1
-            if vibe: vibes[vibe] = vibes.get(vibe, 0) + 1
-        top_locs = sorted(locations, key=locations.get, reverse=True)[:5]
-        top_vibes = sorted(vibes, key=vibes.get, reverse=True)[:5]
-        return {
-            "locations": top_locs, 
-            "vibes": top_vibes, 
-            "chips": [f"📍 {l}" for l in top_locs] + [f"✨ {v}" for v in top_vibes]
-        }
+        return _tags_cache.respond(request, _load_trending_tags)
     except:
         return {"chips": ["📍 East Legon", "✨ Luxury"]}
+
+@router.get("/properties/stats")
+def get_area_price_stats(request: Request):
+    """Listing count and median / mean price per area, aggregated from the shared snapshot."""
+    snap = listing_snapshot()
+    if snap is None:
+        raise HTTPException(503, "Listing snapshot not built yet.")
+    return _stats_cache.respond(request, lambda: {"snapshot": snap.version, "areas": snap.price_stats("location")})
+
+
+# --- 6. SEMANTIC & HYBRID SEARCH (LOCAL INDEXES) ---
+SEARCH_REFRESH_SECS = int(os.getenv("VECTOR_INDEX_REFRESH_SECS", "300"))
+_search_state = {"vectors": None, "lexical": None, "refreshed_at": 0.0, "refreshing": False}
+_search_lock = threading.Lock()
+
+def _refresh_search_indexes():
+    try:
+        added = refresh_from_supabase(_search_state["vectors"], supabase)
+        if added: _search_state["vectors"].save(DEFAULT_INDEX_DIR)
+        refresh_lexical_from_supabase(_search_state["lexical"], supabase)
+    except Exception as e:
+        log.warning(f"⚠️ Search index refresh error: {e}")
+    finally:
+        _search_state["refreshed_at"] = time.time()
+        _search_state["refreshing"] = False
+
+def get_search_indexes() -> HybridSearch:
+    """
+    Maps the on-disk vector index once; the BM25 index and any rows past the
+    updated_at watermarks are filled in the background (first use included), so
+    no request waits on a Supabase scan - until the first build lands, search
+    answers from what is on disk.
+    """
+    with _search_lock:
+        if _search_state["vectors"] is None:
+            if (DEFAULT_INDEX_DIR / "meta.json").exists():
+                _search_state["vectors"] = VectorIndex.load(DEFAULT_INDEX_DIR)
+            else:
+                _search_state["vectors"] = VectorIndex()
+            _search_state["lexical"] = BM25Index()
+        stale = time.time() - _search_state["refreshed_at"] > SEARCH_REFRESH_SECS
+        if stale and not _search_state["refreshing"] and supabase:
+            _search_state["refreshing"] = True
+            threading.Thread(target=_refresh_search_indexes, daemon=True).start()
+        return HybridSearch(_search_state["lexical"], _search_state["vectors"])
+
+@router.get("/semantic")
+def semantic_search(
+    q: str,
+    k: int = 10,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    bedrooms: Optional[int] = None,
+    listing_type: Optional[str] = None
+):
+    """In-process vector search with structured pre-filters (replaces the search_listings RPC)."""
+    vector = embed_query(q)
+    if vector is None: raise HTTPException(503, "Embedding service unavailable.")
+    filters = {"min_price": min_price, "max_price": max_price, "bedrooms": bedrooms, "listing_type": listing_type}
+    hits = get_search_indexes().vectors.search(vector, k=min(k, 50), filters=filters)
+    return {"query": q, "results": hydrate_hits(supabase, hits) if supabase else []}
+
+@router.get("/hybrid")
+def hybrid_search(
+    q: str,
+    k: int = 10,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    bedrooms: Optional[int] = None,
+    listing_type: Optional[str] = None
+):
+    """BM25 keyword matches fused with vector similarity (RRF). Falls back to keywords only if embedding fails."""
+    filters = {"min_price": min_price, "max_price": max_price, "bedrooms": bedrooms, "listing_type": listing_type}
+    ranked = get_search_indexes().search(q, query_vector=embed_query(q), k=min(k, 50), filters=filters)
+    hits = [(r["id"], r["score"]) for r in ranked]
+    results = hydrate_hits(supabase, hits) if supabase else []
+    ranks = {r["id"]: r for r in ranked}
+    for item in results:
+        match = ranks.get(f"{item['source_table']}:{item['id']}", {})
+        item["rrf_score"] = item.pop("similarity")
+        item["lexical_rank"], item["vector_rank"] = match.get("lexical_rank"), match.get("vector_rank")
+    return {"query": q, "results": results}
+
+
+# --- 7. CHANGE FEED INVALIDATION (storage/change_feed.py) ---
+CDC_LIVE_TTL = float(os.getenv("ASTA_CDC_LIVE_TTL", "3600"))
+_table_caches = [_unified_cache, _geojson_cache, _tags_cache, _stats_cache]
+_base_ttls = [(cache, cache.ttl) for cache in [*_table_caches, _nearby_cache]]
+_pending = {"keys": set(), "since": 0.0}
+_pending_lock = threading.Lock()
+
+def _use_live_ttls(live: bool):
+    """With an external feed every change invalidates, so the TTL is only a backstop."""
+    for cache, ttl in _base_ttls:
+        cache.ttl = max(ttl, CDC_LIVE_TTL) if live else ttl
+
+def _invalidate_properties(keys):
+    for cache in _table_caches:
+        cache.invalidate()
+    _count_cache.clear()
+    _nearby_cache.invalidate_tags(keys)
+
+def _settle_property_changes():
+    """Swaps in a snapshot that includes the changes, then drops what was built from the old one."""
+    with _pending_lock:
+        keys, since = _pending["keys"], _pending["since"]
+        _pending["keys"], _pending["since"] = set(), 0.0
+    if supabase and since and _snapshot.get() is not None:
+        _snapshot.refresh(supabase, wait=True, newer_than=since)
+    _invalidate_properties(keys)
+
+_settle_properties = Debounced(_settle_property_changes, delay=0.5, name="properties")
+
+def _on_property_change(event):
+    keys = event.keys()
+    with _pending_lock:
+        _pending["keys"] |= keys
+        _pending["since"] = max(_pending["since"], time.time())
+    _invalidate_properties(keys)   # Supabase-backed builds are fresh at once; snapshot ones after the swap
+    _settle_properties()
+
+def _refresh_search_after_change():
+    while _search_state["refreshing"]:
+        time.sleep(0.1)
+    with _search_lock:
+        if _search_state["vectors"] is None or not supabase:
+            return
+        _search_state["refreshing"] = True
+    _refresh_search_indexes()   # incremental: pulls rows past the updated_at watermarks
+
+_refresh_search_soon = Debounced(_refresh_search_after_change, delay=1.0, name="search indexes")
+
+def _on_market_listing_change(event):
+    if event.op == "DELETE" and event.id is not None and _search_state["vectors"] is not None:
+        doc_id = f"{event.table}:{event.id}"
+        _search_state["vectors"].remove([doc_id])
+        _search_state["lexical"].remove([doc_id])
+        return
+    _refresh_search_soon()
+
+bus.subscribe(_on_property_change, tables=["properties"], name="listings caches")
+bus.subscribe(_on_market_listing_change, tables=["market_listings"], name="search indexes")
+bus.on_live(_use_live_ttls)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from api.utils import client # Gemini Client
+from starlette.concurrency import run_in_threadpool
+from api.utils import generate_text # Gemini, single-flight
 
 router = APIRouter(prefix="/seo", tags=["Phase 2: SEO & Intelligence"])
 
@@ -32,7 +33,7 @@ async def optimize_listing_seo(data: SEORequest):
     """
     
     try:
-        resp = client.models.generate_content(model="gemini-2.0-flash", contents=prompt)
-        return {"status": "success", "seo_data": resp.text}
+        seo_data = await run_in_threadpool(generate_text, prompt, "gemini-2.0-flash")
+        return {"status": "success", "seo_data": seo_data}
     except Exception as e:
         return {"status": "error", "detail": str(e)}
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Form, Response, BackgroundTasks
-from twilio.twiml.messaging_response import MessagingResponse
 from api.utils import (
     client, supabase, get_best_model, 
     save_image_from_url, format_phone_to_e164, 
     normalize_ghpostgps, enrich_listing_description, send_whatsapp_message
 )
 from datetime import datetime, timezone, timedelta
-import re
+from utils.normalizer import parse_price as parse_listing_price
+from storage.change_feed import publish_change
+import logging
+
+log = logging.getLogger("asta.api")
 
 router = APIRouter()
 
@@ -25,7 +28,7 @@ def get_session(phone: str):
         supabase.table("whatsapp_sessions").insert(new_session).execute()
         return new_session
     except Exception as e:
-        print(f"Session Error: {e}")
+        log.error(f"Session Error: {e}")
         return {"phone_number": phone, "current_step": "IDLE", "draft_data": {}}
 
 def update_session(phone: str, step: str, data: dict):
@@ -39,18 +42,16 @@ def reset_session(phone: str):
     }).eq("phone_number", phone).execute()
 
 def parse_price(price_str: str):
-    """Clean 'GHS 2,500' -> 2500"""
-    if not price_str: return 0
-    clean = re.sub(r"[^0-9.]", "", price_str)
-    try: return float(clean)
-    except: return 0
+    """Clean 'GHS 2,500' -> (2500.0, 'GHS'); '$1,200/month' -> (1200.0, 'USD')"""
+    price = parse_listing_price(price_str or None)
+    return price.amount or 0, price.currency or "GHS"
 
 # --- PUBLISHER (UPDATED FOR NEW DB SCHEMA) ---
 def final_publish_task(phone: str, draft: dict):
-    print(f"⚙️ Publishing for {phone}")
+    log.info(f"⚙️ Publishing for {phone}")
     try:
         enriched_desc = enrich_listing_description(draft)
-        clean_price = parse_price(draft.get("price"))
+        clean_price, currency = parse_price(draft.get("price"))
         
         # New 'properties' table schema
         property_data = {
@@ -58,7 +59,7 @@ def final_publish_task(phone: str, draft: dict):
             "description": draft.get("details"),
             "description_enriched": enriched_desc,
             "price": clean_price,
-            "currency": "GHS",
+            "currency": currency,
             "type": draft.get("type", "sale").lower(),
             "status": "active",
             
@@ -80,6 +81,7 @@ def final_publish_task(phone: str, draft: dict):
         
         if res.data:
             new_id = res.data[0]['id']
+            publish_change("properties", "INSERT", res.data[0])
             # 2. Insert Image
             try:
                 supabase.table("property_images").insert({
@@ -88,7 +90,7 @@ def final_publish_task(phone: str, draft: dict):
                     "is_hero": True
                 }).execute()
             except Exception as img_e:
-                print(f"Gallery Insert Error: {img_e}")
+                log.error(f"Gallery Insert Error: {img_e}")
             
             # 3. Capture Email (if provided earlier in flow, or we ask now)
             # (Email capture logic is in the next step of the flow)
@@ -103,7 +105,7 @@ def final_publish_task(phone: str, draft: dict):
         send_whatsapp_message(phone, msg)
 
     except Exception as e:
-        print(f"Publish Error: {e}")
+        log.error(f"Publish Error: {e}")
         send_whatsapp_message(phone, f"😓 System Error during publish: {str(e)}")
 
 # --- WEBHOOK ---
@@ -117,7 +119,8 @@ async def whatsapp_webhook(
     Latitude: float = Form(None),
     Longitude: float = Form(None)
 ):
-    print(f"📩 Incoming from {From}: {Body}")
+    from twilio.twiml.messaging_response import MessagingResponse  # deferred: twilio is slow to import
+    log.info(f"📩 Incoming from {From}: {Body}")
     resp = MessagingResponse()
     msg = resp.message()
     phone = From.replace("whatsapp:", "")
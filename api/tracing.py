@@ -0,0 +1,416 @@
+# api/tracing.py
+"""
+Request tracing for the API: latency histograms, dependency spans, slow-request log, non-blocking logs.
+
+Until now the only signal from production was print() output, with no way to
+tell whether a slow /listings call spent its time in Supabase, Gemini or our
+own code. This module adds:
+
+  * `TracingMiddleware` (pure ASGI) - one trace per request, kept in a
+    contextvar so it follows the request into FastAPI's threadpool. It feeds a
+    latency histogram per (method, route template, status) and tags responses
+    with `x-trace-id`;
+  * dependency spans - `instrument_clients()` wraps `httpx.Client.send`,
+    `httpx.AsyncClient.send` and `requests.Session.send`, which every SDK we
+    use goes through (supabase/postgrest/storage and google-genai on httpx,
+    twilio and resend on requests, Maps via requests.get). Each call becomes
+    a span named after the dependency and operation (`supabase.table:properties`,
+    `supabase.rpc:match_properties`, `gemini.generateContent:gemini-2.0-flash`,
+    `twilio.Messages`, `resend.emails`, `maps.geocode`) with its duration,
+    status and payload sizes in both directions;
+  * `span(kind, name)` for timing our own sections the same way;
+  * `render_metrics()` - Prometheus text format for GET /metrics, which
+    needs `Authorization: Bearer <ASTA_METRICS_TOKEN>` (unset = off);
+  * `slowest(limit)` - the slowest of the last ASTA_TRACE_WINDOW requests with
+    their span breakdown, for GET /debug/slow (x-asta-profile token, like
+    the profiling endpoints: it shows raw paths);
+  * `setup_logging()` - the "asta" logger behind a QueueHandler, so request
+    threads only enqueue records and one listener thread does the writes.
+
+    app.add_middleware(TracingMiddleware)
+    with span("app", "search.rank"):
+        ranked = rank(candidates)
+"""
+
+import atexit
+import bisect
+import contextvars
+import hmac
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TRACE_WINDOW = int(os.getenv("ASTA_TRACE_WINDOW", "1000"))   # recent requests kept for /debug/slow
+MAX_SPANS = 200                                                 # per trace; a runaway loop must not eat memory
+LOG_LEVEL = os.getenv("ASTA_LOG_LEVEL", "INFO")
+METRICS_TOKEN = os.getenv("ASTA_METRICS_TOKEN")                 # bearer token for GET /metrics
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("asta_trace", default=None)
+_trace_ids = itertools.count(1)
+
+
+# --- TRACES & SPANS ---
+
+class Trace:
+    def __init__(self, method: str, path: str):
+        self.id = f"{os.getpid():x}-{next(_trace_ids):x}"
+        self.method = method
+        self.path = path
+        self.route = path
+        self.status = 500
+        self.bytes_out = 0
+        self.at = time.time()
+        self.started = time.perf_counter()
+        self.seconds: Optional[float] = None   # time to the last response byte
+        self.spans: List[dict] = []
+        self.dropped_spans = 0
+
+    def add_span(self, record: dict):
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append(record)
+        else:
+            self.dropped_spans += 1
+
+    def summary(self) -> dict:
+        by_kind: Dict[str, float] = {}
+        for s in self.spans:
+            by_kind[s["kind"]] = by_kind.get(s["kind"], 0.0) + s["ms"]
+        total_ms = round((self.seconds or 0.0) * 1000, 2)
+        return {
+            "trace_id": self.id, "at": self.at, "method": self.method, "path": self.path, "route": self.route,
+            "status": self.status, "ms": total_ms, "bytes_out": self.bytes_out,
+            # Spans can overlap (threads, background tasks), so "self" is a floor of 0, not exact
+            "breakdown_ms": {**{k: round(v, 2) for k, v in by_kind.items()},
+                             "self": round(max(total_ms - sum(by_kind.values()), 0.0), 2)},
+            "spans": list(self.spans), "dropped_spans": self.dropped_spans,
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs):
+    """
+    Times a block as a span of the current request (and in the dependency
+    metrics). The yielded dict may be updated with `bytes_out` / `bytes_in` /
+    `status`. Also usable as a decorator.
+    """
+    trace = _current.get()
+    record = {"kind": kind, "name": name, **attrs}
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = e.__class__.__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        record["ms"] = round(seconds * 1000, 2)
+        if trace is not None:
+            record["start_ms"] = round((started - trace.started) * 1000, 2)
+            trace.add_span(record)
+        METRICS.observe_span(kind, name, seconds, record)
+
+
+# --- METRICS ---
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str, out: List[str]):
+        cumulative = 0
+        for le, n in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            cumulative += n
+            out.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**kv) -> str:
+    return ",".join(f'{k}="{_label(v)}"' for k, v in kv.items())
+
+
+class Metrics:
+    def __init__(self, window: int = TRACE_WINDOW):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, int], Histogram] = {}
+        self.response_bytes: Dict[str, int] = {}
+        self.spans: Dict[Tuple[str, str], Histogram] = {}
+        self.span_errors: Dict[Tuple[str, str], int] = {}
+        self.span_bytes: Dict[Tuple[str, str], int] = {}   # (dependency, direction) -> bytes
+        self.in_flight = 0
+        self.recent: deque = deque(maxlen=window)
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def observe_request(self, trace: Trace):
+        with self._lock:
+            self.in_flight -= 1
+            key = (trace.method, trace.route, trace.status)
+            self.requests.setdefault(key, Histogram()).observe(trace.seconds)
+            self.response_bytes[trace.route] = self.response_bytes.get(trace.route, 0) + trace.bytes_out
+            self.recent.append(trace)
+
+    def observe_span(self, kind: str, name: str, seconds: float, record: dict):
+        key = (kind, name)
+        with self._lock:
+            self.spans.setdefault(key, Histogram()).observe(seconds)
+            if record.get("error") or record.get("status", 0) >= 500:
+                self.span_errors[key] = self.span_errors.get(key, 0) + 1
+            for direction in ("bytes_out", "bytes_in"):
+                if record.get(direction):
+                    k = (kind, direction[len("bytes_"):])
+                    self.span_bytes[k] = self.span_bytes.get(k, 0) + record[direction]
+
+    def slowest(self, limit: int = 20, min_ms: float = 0.0) -> List[dict]:
+        with self._lock:
+            traces = list(self.recent)
+        traces.sort(key=lambda t: t.seconds or 0.0, reverse=True)
+        return [t.summary() for t in traces[:limit] if (t.seconds or 0.0) * 1000 >= min_ms]
+
+    def render(self) -> str:
+        out: List[str] = []
+        with self._lock:
+            out += ["# HELP asta_http_request_duration_seconds Time to the last response byte, by route template.",
+                    "# TYPE asta_http_request_duration_seconds histogram"]
+            for (method, route, status), h in sorted(self.requests.items()):
+                h.render("asta_http_request_duration_seconds", _labels(method=method, route=route, status=status), out)
+            out += ["# HELP asta_http_response_bytes_total Response body bytes sent, by route template.",
+                    "# TYPE asta_http_response_bytes_total counter"]
+            out += [f"asta_http_response_bytes_total{{{_labels(route=r)}}} {n}"
+                    for r, n in sorted(self.response_bytes.items())]
+            out += ["# HELP asta_http_requests_in_flight Requests currently being served.",
+                    "# TYPE asta_http_requests_in_flight gauge", f"asta_http_requests_in_flight {self.in_flight}"]
+            out += ["# HELP asta_span_duration_seconds Outbound dependency calls and traced sections.",
+                    "# TYPE asta_span_duration_seconds histogram"]
+            for (kind, name), h in sorted(self.spans.items()):
+                h.render("asta_span_duration_seconds", _labels(kind=kind, name=name), out)
+            out += ["# HELP asta_span_errors_total Spans that raised or got a 5xx.",
+                    "# TYPE asta_span_errors_total counter"]
+            out += [f"asta_span_errors_total{{{_labels(kind=k, name=n)}}} {c}"
+                    for (k, n), c in sorted(self.span_errors.items())]
+            out += ["# HELP asta_span_bytes_total Payload bytes per dependency (out = request, in = response).",
+                    "# TYPE asta_span_bytes_total counter"]
+            out += [f"asta_span_bytes_total{{{_labels(kind=k, direction=d)}}} {n}"
+                    for (k, d), n in sorted(self.span_bytes.items())]
+        return "\n".join(out) + "\n"
+
+
+METRICS = Metrics()
+
+
+def metrics_authorized(authorization: Optional[str]) -> bool:
+    """`Authorization: Bearer <ASTA_METRICS_TOKEN>` - what Prometheus sends with `bearer_token`."""
+    scheme, _, token = (authorization or "").partition(" ")
+    return bool(METRICS_TOKEN) and scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), METRICS_TOKEN)
+
+
+def render_metrics() -> str:
+    return METRICS.render()
+
+
+def slowest(limit: int = 20, min_ms: float = 0.0) -> List[dict]:
+    return METRICS.slowest(limit, min_ms)
+
+
+# --- ASGI MIDDLEWARE ---
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = Trace(scope["method"], scope["path"])
+        token = _current.set(trace)
+        METRICS.request_started()
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-trace-id", trace.id.encode())]
+            elif message["type"] == "http.response.body":
+                trace.bytes_out += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    trace.seconds = time.perf_counter() - trace.started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            _current.reset(token)
+            if trace.seconds is None:   # failed before the body finished
+                trace.seconds = time.perf_counter() - trace.started
+            route = scope.get("route")
+            # Label by template (/listings/{id}), never the raw path, to keep metric cardinality bounded
+            trace.route = getattr(route, "path_format", None) or getattr(route, "path", None) or "<unmatched>"
+            METRICS.observe_request(trace)
+
+
+# --- DEPENDENCY SPANS (HTTP CLIENT INSTRUMENTATION) ---
+
+SUPABASE_HOST = urlsplit(os.getenv("SUPABASE_URL") or "").hostname
+_SDK_ID = re.compile(r"^([A-Z]{2}[0-9a-fA-F]{32}|[0-9a-fA-F-]{16,}|\d+)$")  # Twilio SIDs, UUIDs, numeric ids
+_API_VERSION = re.compile(r"^(\d{4}-\d{2}-\d{2}|v\d+(beta)?)$")                 # /2010-04-01/, /v1/
+_STORAGE_VERBS = {"public", "sign", "list", "info", "authenticated", "move", "copy", "upload"}
+
+
+def classify(url) -> Tuple[str, str]:
+    """(dependency, operation) for an outbound URL; operations never contain ids."""
+    parts = urlsplit(str(url))
+    host = parts.hostname or ""
+    segs = [s for s in parts.path.split("/") if s]
+    if host == SUPABASE_HOST or host.endswith(".supabase.co"):
+        if segs[:3] == ["rest", "v1", "rpc"] and len(segs) > 3:
+            return "supabase", f"rpc:{segs[3]}"
+        if segs[:2] == ["rest", "v1"] and len(segs) > 2:
+            return "supabase", f"table:{segs[2]}"
+        if segs[:3] == ["storage", "v1", "object"]:
+            rest = segs[3:]
+            while rest and rest[0] in _STORAGE_VERBS:
+                rest = rest[1:]
+            return "supabase", f"storage:{rest[0] if rest else 'object'}"
+        return "supabase", "/".join(segs[:2]) or "root"
+    if host == "generativelanguage.googleapis.com":
+        model, _, method = (segs[-1] if segs else "").partition(":")
+        return "gemini", f"{method}:{model}" if method else model
+    if host == "maps.googleapis.com":
+        return "maps", segs[2] if len(segs) > 2 else "/".join(segs)
+    if host.endswith("twilio.com") or host == "api.resend.com":
+        names = [s.removesuffix(".json") for s in segs]
+        names = [n for n in names if not (_SDK_ID.match(n) or _API_VERSION.match(n) or n == "Accounts")]
+        return ("twilio" if "twilio" in host else "resend"), "/".join(names) or "root"
+    return "http", host or "unknown"
+
+
+def _body_len(body) -> int:
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    return 0   # streamed / generator bodies are not buffered just to count them
+
+
+def _content_length(headers) -> int:
+    try:
+        return int(headers.get("content-length") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _httpx_sizes(request, response, stream: bool) -> Tuple[int, int]:
+    try:
+        out = len(request.content)
+    except Exception:   # httpx.RequestNotRead for streaming uploads
+        out = _content_length(request.headers)
+    return out, (_content_length(response.headers) if stream else len(response.content))
+
+
+_instrumented = False
+_instrument_lock = threading.Lock()
+
+
+def instrument_clients():
+    """Wraps the httpx / requests transports once per process (idempotent)."""
+    global _instrumented
+    with _instrument_lock:
+        if _instrumented:
+            return
+        _instrumented = True
+
+    import httpx
+    import requests
+
+    sync_send, async_send, requests_send = httpx.Client.send, httpx.AsyncClient.send, requests.Session.send
+
+    def httpx_send(self, request, *args, **kwargs):
+        dependency, operation = classify(request.url)
+        with span(dependency, operation, method=request.method) as record:
+            response = sync_send(self, request, *args, **kwargs)
+            record["status"] = response.status_code
+            record["bytes_out"], record["bytes_in"] = _httpx_sizes(request, response, kwargs.get("stream", False))
+            return response
+
+    async def httpx_send_async(self, request, *args, **kwargs):
+        dependency, operation = classify(request.url)
+        with span(dependency, operation, method=request.method) as record:
+            response = await async_send(self, request, *args, **kwargs)
+            record["status"] = response.status_code
+            record["bytes_out"], record["bytes_in"] = _httpx_sizes(request, response, kwargs.get("stream", False))
+            return response
+
+    def session_send(self, request, **kwargs):
+        dependency, operation = classify(request.url)
+        with span(dependency, operation, method=request.method) as record:
+            response = requests_send(self, request, **kwargs)
+            record["status"] = response.status_code
+            record["bytes_out"] = _body_len(request.body)
+            record["bytes_in"] = _content_length(response.headers) if kwargs.get("stream") else len(response.content)
+            return response
+
+    httpx.Client.send = httpx_send
+    httpx.AsyncClient.send = httpx_send_async
+    requests.Session.send = session_send
+
+
+# --- NON-BLOCKING LOGGING ---
+
+class _TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        trace = _current.get()
+        record.trace_id = trace.id if trace else "-"
+        return True
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = LOG_LEVEL) -> logging.Logger:
+    """
+    Sends the "asta" logger hierarchy through a queue: callers pay for an
+    enqueue, a single listener thread formats and writes to stdout.
+    """
+    global _listener
+    logger = logging.getLogger("asta")
+    with _instrument_lock:
+        if _listener is None:
+            records: queue.SimpleQueue = queue.SimpleQueue()
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"))
+            _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+            handler = logging.handlers.QueueHandler(records)
+            handler.addFilter(_TraceIdFilter())
+            logger.addHandler(handler)
+            logger.setLevel(level)
+            logger.propagate = False
+    return logger
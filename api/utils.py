@@ -1,18 +1,16 @@
 import os
 import io
+import logging
 import requests
-import resend
 import re
-import phonenumbers
 import math
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
-from PIL import Image
-from pillow_heif import register_heif_opener
-from google import genai
-from supabase import create_client, Client
-from twilio.rest import Client as TwilioClient
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import Any, Callable, Tuple, Optional, List
+from storage.embedding_cache import EmbeddingCache, normalize_query
+from utils.singleflight import SingleFlight
 
 load_dotenv()
 
@@ -35,23 +33,91 @@ TONE: Professional, warm, and helpful.
 CONTEXT: You are chatting on WhatsApp. Keep it concise.
 """
 
-# Initialize Clients
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL else None
-client = genai.Client(api_key=GOOGLE_API_KEY) if GOOGLE_API_KEY else None
-twilio_client = TwilioClient(TWILIO_SID, TWILIO_TOKEN) if TWILIO_SID else None
+# --- LAZY CLIENTS ---
+# Importing the SDKs and building their clients was ~1s of every cold start and of
+# every script importing api.utils. They are now built once, on first use (or by the
+# startup warm-up in api/main.py), under a lock. `supabase` / `client` / `twilio_client`
+# stay None when unconfigured, so the existing `if not supabase:` guards still work.
 
-if RESEND_API_KEY: resend.api_key = RESEND_API_KEY
-register_heif_opener()
+class LazyClient:
+    """Proxy that builds the real client on first attribute access (thread-safe)."""
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+def _create_supabase():
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+def _create_genai():
+    from google import genai
+    return genai.Client(api_key=GOOGLE_API_KEY)
+
+def _create_twilio():
+    from twilio.rest import Client as TwilioClient
+    return TwilioClient(TWILIO_SID, TWILIO_TOKEN)
+
+supabase = LazyClient(_create_supabase) if SUPABASE_URL else None
+client = LazyClient(_create_genai) if GOOGLE_API_KEY else None
+twilio_client = LazyClient(_create_twilio) if TWILIO_SID else None
+
+def get_supabase():
+    return supabase.get() if supabase else None
+
+def get_genai_client():
+    return client.get() if client else None
+
+def get_twilio_client():
+    return twilio_client.get() if twilio_client else None
+
+@lru_cache(maxsize=None)
+def get_resend():
+    import resend
+    if RESEND_API_KEY: resend.api_key = RESEND_API_KEY
+    return resend
+
+@lru_cache(maxsize=None)
+def get_image_module():
+    """PIL.Image with the HEIC/HEIF opener registered (iPhone uploads)."""
+    from PIL import Image
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    return Image
+
+query_embedding_cache = EmbeddingCache()
+# Identical Gemini calls in flight at the same time (same prompt, same search phrase) share one request
+llm_flight = SingleFlight()
+log = logging.getLogger("asta.api")
 
 def get_best_model(client): return PREFERRED_MODEL
 
+def generate_text(prompt, model: Optional[str] = None) -> str:
+    """Gemini generate_content -> text, coalesced with any identical call already in flight."""
+    model = model or PREFERRED_MODEL
+    key = ("generate", model, prompt if isinstance(prompt, str) else repr(prompt))
+    return llm_flight.do(key, lambda: client.models.generate_content(model=model, contents=prompt).text)
+
 # ==========================================
 # 📸 IMAGE TOOLS (DIAGNOSTIC MODE)
 # ==========================================
 
 def compress_image(image_bytes: bytes, quality: int = 70) -> bytes:
     try:
-        img = Image.open(io.BytesIO(image_bytes))
+        img = get_image_module().open(io.BytesIO(image_bytes))
         if img.mode in ("RGBA", "P"): img = img.convert("RGB")
         output = io.BytesIO()
         img.save(output, format="JPEG", quality=quality, optimize=True)
@@ -77,7 +143,7 @@ def save_image_from_url(image_url: str, phone: str) -> Tuple[Optional[str], Opti
         
         # If 401/403, try without auth (Sometimes Twilio redirects to public S3)
         if response.status_code in [401, 403]:
-             print("⚠️ Auth failed, retrying without auth...")
+             log.warning("⚠️ Auth failed, retrying without auth...")
              response = requests.get(image_url)
 
         if response.status_code != 200:
@@ -103,7 +169,7 @@ def save_image_from_url(image_url: str, phone: str) -> Tuple[Optional[str], Opti
         return public_url, None
 
     except Exception as e:
-        print(f"❌ Critical Error: {str(e)}")
+        log.error(f"❌ Critical Error: {str(e)}")
         # Return the specific error to the user for debugging
         return None, f"Sys Error: {str(e)}"
 
@@ -165,12 +231,29 @@ def enrich_listing_description(draft: dict) -> str:
         "\nDo not use hashtags. Use professional real estate terminology."
     )
     try:
-        model = get_best_model(client)
-        resp = client.models.generate_content(model=model, contents=[prompt])
-        return resp.text.strip()
+        return generate_text(prompt, get_best_model(client)).strip()
     except Exception:
         return f"A lovely {draft.get('type')} property located in {draft.get('location')}."
 
+def _embed_remote(text: str) -> Optional[List[float]]:
+    """Embeds a search phrase with text-embedding-004 (same space as the listing vectors)."""
+    if not client or not text: return None
+    try:
+        from google.genai import types
+        result = client.models.embed_content(
+            model="text-embedding-004",
+            contents=text,
+            config=types.EmbedContentConfig(task_type="RETRIEVAL_QUERY")
+        )
+        return result.embeddings[0].values
+    except Exception as e:
+        log.warning(f"⚠️ Embedding Error: {e}")
+        return None
+
+def embed_query(text: str) -> Optional[List[float]]:
+    """Cached query embedding: repeated search phrases skip the Gemini round-trip."""
+    return llm_flight.do(("embed", normalize_query(text)), query_embedding_cache.get_or_compute, text, _embed_remote)
+
 def generate_property_insights(image_bytes, price, location, listing_type):
     if not client: return {"vibe": "Error", "score": 0}
     try:
@@ -191,6 +274,7 @@ def generate_property_insights(image_bytes, price, location, listing_type):
 # ==========================================
 
 def format_phone_to_e164(phone_input: str, default_region="GH") -> str:
+    import phonenumbers
     try:
         parsed = phonenumbers.parse(phone_input, default_region)
         if phonenumbers.is_valid_number(parsed):
@@ -203,12 +287,12 @@ def send_whatsapp_message(to_number: str, body_text: str):
     try:
         if not to_number.startswith("whatsapp:"): to_number = f"whatsapp:{to_number}"
         twilio_client.messages.create(from_=TWILIO_FROM, body=body_text, to=to_number)
-    except Exception as e: print(f"❌ Twilio Error: {e}")
+    except Exception as e: log.error(f"❌ Twilio Error: {e}")
 
 def send_marketing_email(to_email: str, subject: str, html_content: str):
     if not RESEND_API_KEY: return None
     try:
-        return resend.Emails.send({
+        return get_resend().Emails.send({
             "from": "Asta <updates@asta-insights.com>",
             "to": [to_email], "subject": subject, "html": html_content,
         })
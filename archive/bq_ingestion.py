@@ -27,9 +27,10 @@ def ingest_from_gcs():
         write_disposition=bigquery.WriteDisposition.WRITE_APPEND, 
     )
 
-    # Use a wildcard to ingest all JSONs from all sites at once
-    # This targets: raw/property_listings/[site]/[type]/[file].json
-    uri = f"gs://{BUCKET_NAME}/raw/property_listings/*/*/*.json"
+    # Use a wildcard to ingest all shards from all sites at once
+    # This targets: raw/property_listings/[site]/[type]/[run]-part-NNNNN.ndjson.gz
+    # (gzip NDJSON written by storage/archive_writer.py; BigQuery decompresses on load)
+    uri = f"gs://{BUCKET_NAME}/raw/property_listings/*/*/*.ndjson.gz"
 
     print(f"📥 Starting BigQuery Load Job for: {uri}")
     
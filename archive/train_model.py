@@ -1,11 +1,23 @@
+import sys
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
 import xgboost as xgb
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from storage.data_lake import DataLake
+
+# Default: read/write the Parquet lake (storage/data_lake.py). --csv: the old full-CSV chain.
+USE_CSV = "--csv" in sys.argv
+
 # Load cleaned data
-df = pd.read_csv("ghana_properties_clean.csv")
+if USE_CSV:
+    df = pd.read_csv("ghana_properties_clean.csv")
+else:
+    lake = DataLake()
+    df = lake.read("clean", columns=["id", "price", "bedrooms", "bathrooms", "area_sqm", "latitude", "longitude"])
 
 # Remove extremely small areas (likely data errors)
 df = df[df['area_sqm'] >= 10]  # at least 10 sqm
@@ -47,5 +59,10 @@ df['predicted_price'] = np.expm1(model.predict(X))
 df['price_diff_pct'] = (df['predicted_price'] - df['price']) / df['price']
 
 # Save results
-df.to_csv("ghana_properties_with_predictions.csv", index=False)
-print("\n💾 Predictions saved to 'ghana_properties_with_predictions.csv'")
\ No newline at end of file
+if USE_CSV:
+    df.to_csv("ghana_properties_with_predictions.csv", index=False)
+    print("\n💾 Predictions saved to 'ghana_properties_with_predictions.csv'")
+else:
+    # Rows dropped by the area filter drop out of every later stage (inner join on id)
+    lake.write_stage("with_predictions", df[["id", "predicted_price", "price_diff_pct"]])
+    print("\n💾 Predictions saved to lake stage 'with_predictions'")
\ No newline at end of file
@@ -3,6 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 import os
+import threading
+import time
 import uvicorn
 import re
 
@@ -39,6 +41,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- STARTUP WARM-UP ---
+@app.on_event("startup")
+def warm_up_services():
+    """Builds the Supabase / Gemini / Maps clients in the background, after the port is bound."""
+    if not services:
+        return
+    def _warm():
+        time.sleep(float(os.environ.get("ASTA_WARMUP_DELAY", "1.0")))
+        services.warm_up()
+    threading.Thread(target=_warm, daemon=True).start()
+
 # --- MODELS ---
 class TextRequest(BaseModel):
     text: str
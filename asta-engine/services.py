@@ -1,9 +1,7 @@
 import json
 import os
 import re
-import googlemaps
-import google.generativeai as genai
-from supabase import create_client, Client
+import threading
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -20,22 +18,48 @@ SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANO
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
 GOOGLE_MAPS_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
-# Initialize globals
-supabase = None
-gmaps = None
-
-# 3. SETUP CLIENTS
-try:
-    if not all([SUPABASE_URL, SUPABASE_KEY, GEMINI_KEY, GOOGLE_MAPS_KEY]):
-        print("⚠️ CRITICAL WARNING: Keys are missing. Check .env")
-    else:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        genai.configure(api_key=GEMINI_KEY)
-        gmaps = googlemaps.Client(key=GOOGLE_MAPS_KEY)
-        print("✅ Asta Engine: All Systems Go (Hybrid AI + Maps + DB)")
+if not all([SUPABASE_URL, SUPABASE_KEY, GEMINI_KEY, GOOGLE_MAPS_KEY]):
+    print("⚠️ CRITICAL WARNING: Keys are missing. Check .env")
+
+# 3. LAZY CLIENTS
+# Importing google.generativeai / googlemaps / supabase and building the clients
+# used to happen on import, delaying every Cloud Run cold start. They are now
+# built on first use (or by warm_up() once the server is listening), once.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _client(name: str):
+    if name not in _clients:
+        with _clients_lock:
+            if name not in _clients:
+                if name == "supabase":
+                    from supabase import create_client
+                    _clients[name] = create_client(SUPABASE_URL, SUPABASE_KEY)
+                elif name == "genai":
+                    import google.generativeai as genai
+                    genai.configure(api_key=GEMINI_KEY)
+                    _clients[name] = genai
+                elif name == "gmaps":
+                    import googlemaps
+                    _clients[name] = googlemaps.Client(key=GOOGLE_MAPS_KEY)
+    return _clients[name]
+
+def get_supabase():
+    return _client("supabase")
+
+def get_genai():
+    return _client("genai")
 
-except Exception as e:
-    print(f"❌ Client Setup Error: {e}")
+def get_gmaps():
+    return _client("gmaps")
+
+def warm_up():
+    """Builds every client ahead of the first request; failures surface again on first use."""
+    try:
+        get_supabase(); get_genai(); get_gmaps()
+        print("✅ Asta Engine: All Systems Go (Hybrid AI + Maps + DB)")
+    except Exception as e:
+        print(f"❌ Client Setup Error: {e}")
 
 # --- CORE SERVICE ---
 async def process_text_to_property(raw_text: str) -> dict:
@@ -47,7 +71,7 @@ async def process_text_to_property(raw_text: str) -> dict:
     # 🧠 STEP 1: TRY AI (The "Smart" Way)
     try:
         # Using the alias 'gemini-flash-latest' which is safer for free tiers
-        model = genai.GenerativeModel('gemini-flash-latest')
+        model = get_genai().GenerativeModel('gemini-flash-latest')
         
         prompt = f"""
         You are Asta, an expert Real Estate AI.
@@ -116,7 +140,7 @@ async def process_text_to_property(raw_text: str) -> dict:
     
     try:
         # We append 'Ghana' to constrain results
-        geocode_res = gmaps.geocode(f"{clean_loc}, Accra, Ghana")
+        geocode_res = get_gmaps().geocode(f"{clean_loc}, Accra, Ghana")
         if geocode_res:
             loc_obj = geocode_res[0]['geometry']['location']
             lat = loc_obj['lat']
@@ -150,5 +174,5 @@ async def process_text_to_property(raw_text: str) -> dict:
 async def save_to_db(property_data: dict):
     if not property_data: return None
     print(f"💾 Saving to Vault: {property_data.get('title')}")
-    response = supabase.table('properties').insert(property_data).execute()
+    response = get_supabase().table('properties').insert(property_data).execute()
     return response.data
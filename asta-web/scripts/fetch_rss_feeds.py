@@ -1,12 +1,16 @@
-import feedparser
 import os
-import time
 import re
+import sys
 from datetime import datetime
+from pathlib import Path
 from dateutil import parser
 from bs4 import BeautifulSoup
 from supabase import create_client, Client
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from scrapers.feed_fetcher import FeedFetcher
+from storage.news_writer import NewsWriter
+
 # --- CONFIGURATION ---
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
@@ -85,7 +89,7 @@ def parse_date(date_str):
     except:
         return datetime.utcnow().isoformat()
 
-def run_sentinel():
+def run_sentinel(force=False):
     print(f"\n📡 ASTA RSS SENTINEL INITIALIZED")
     print(f"🎯 Surveillance Scope: {len(RSS_FEEDS)} High-Fidelity Feeds")
     
@@ -93,19 +97,27 @@ def run_sentinel():
         print("❌ CRITICAL: Database connection failed. Check credentials.")
         return
 
-    total_ingested = 0
     total_scanned = 0
-    
-    for feed_url in RSS_FEEDS:
+    candidates = []
+
+    # All due feeds in parallel with timeouts + conditional GETs (scrapers/feed_fetcher.py).
+    # Feed state is saved only after the archive write, so unstored articles are refetched.
+    fetcher = FeedFetcher()
+    results = fetcher.sweep_sync(RSS_FEEDS, force=force, save=False)
+    fetched = [r.url for r in results if r.status == "ok"]
+    unprocessed = set()
+
+    for result in results:
+        feed_url = result.url
         try:
-            print(f"   ↳ Pinging: {feed_url}...")
-            # Set timeout to prevent hanging
-            feed = feedparser.parse(feed_url)
-            
-            if not feed.entries:
+            if result.status == "error":
+                print(f"   ❌ Network Error on {feed_url}: {result.error}")
                 continue
+            if result.status != "ok":
+                continue  # not modified since last sweep, or not due yet
+            print(f"   ↳ {result.title}: {len(result.entries)} items ({result.new_entries} new, {result.seconds:.1f}s)")
 
-            for entry in feed.entries:
+            for entry in result.entries:
                 total_scanned += 1
                 
                 # A. Extraction
@@ -117,7 +129,7 @@ def run_sentinel():
                 summary = clean_html(raw_summary)[:2000] 
                 
                 published_at = parse_date(entry.get('published', entry.get('updated', '')))
-                source_name = feed.feed.get('title', 'Unknown Source')
+                source_name = (result.feed or {}).get('title', 'Unknown Source')
 
                 # B. Signal Detection
                 content_blob = (title + " " + summary).lower()
@@ -126,24 +138,14 @@ def run_sentinel():
                 if not is_relevant:
                     continue 
 
-                # C. Deduplication
-                try:
-                    existing = supabase.table('market_news').select('id', count='exact').eq('url', link).execute()
-                    if existing.count > 0:
-                        continue 
-                except Exception as e:
-                    print(f"      ⚠️ DB Check Error: {e}")
-                    continue
-
-                # D. Categorization
+                # C. Categorization
                 category = "general"
                 if any(s in content_blob for s in REAL_ESTATE_SIGNALS):
                     category = "real_estate"
                 elif any(s in content_blob for s in ECONOMIC_SIGNALS):
                     category = "economy"
 
-                # E. Archive
-                payload = {
+                candidates.append({
                     "title": title,
                     "url": link,
                     "summary": summary,
@@ -152,21 +154,32 @@ def run_sentinel():
                     "category": category,
                     "status": "pending_enrichment",
                     "created_at": datetime.utcnow().isoformat()
-                }
-                
-                try:
-                    supabase.table('market_news').insert(payload).execute()
-                    print(f"      ✅ Archived [{category.upper()}]: {title[:50]}...")
-                    total_ingested += 1
-                except Exception as e:
-                    print(f"      ❌ DB Insert Error: {e}")
+                })
 
         except Exception as e:
-            print(f"   ❌ Network Error on {feed_url}: {e}")
+            print(f"   ❌ Processing Error on {feed_url}: {e}")
+            unprocessed.add(feed_url)
+
+    # D. Deduplication (one lookup per ~200 URLs) + Archive (one upsert per chunk)
+    writer = NewsWriter(supabase, 'market_news')
+    try:
+        writer.warm(payload["url"] for payload in candidates)
+    except Exception as e:
+        print(f"   ⚠️ DB Check Error: {e}")
+        fetcher.save_state(keep=fetched)
+        return
+
+    for payload in candidates:
+        if writer.add(payload):
+            print(f"      ✅ Archived [{payload['category'].upper()}]: {payload['title'][:50]}...")
+    writer.flush()
+    fetcher.save_state(keep=fetched if writer.stats["failed"] else unprocessed)
+    total_ingested = writer.stats["written"]
 
     print(f"\n🏁 MISSION COMPLETE")
     print(f"   - Scanned: {total_scanned} items")
     print(f"   - Archived: {total_ingested} new intelligence assets")
+    print(f"   - Database round-trips: {writer.stats['round_trips']}")
 
 if __name__ == "__main__":
-    run_sentinel()
+    run_sentinel(force="--all" in sys.argv)
@@ -0,0 +1,11 @@
+-- NEWS INGESTION: batched upserts need a unique URL to conflict on
+-- (storage/news_writer.py writes `upsert(..., on_conflict="url", ignore_duplicates=True)`)
+
+-- 1. Drop duplicates left by the old check-then-insert loop (keep the oldest row)
+DELETE FROM public.news_articles a
+USING public.news_articles b
+WHERE a.url = b.url
+  AND (a.created_at, a.id::text) > (b.created_at, b.id::text);
+
+-- 2. Enforce it (market_news already declares `url text NOT NULL UNIQUE`)
+CREATE UNIQUE INDEX IF NOT EXISTS news_articles_url_key ON public.news_articles(url);
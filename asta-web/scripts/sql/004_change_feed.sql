@@ -0,0 +1,46 @@
+-- CHANGE FEED: row changes that invalidate API caches (storage/change_feed.py)
+
+-- 1. Supabase Realtime source (ASTA_CDC_SOURCE=realtime): publish the tables.
+--    REPLICA IDENTITY FULL puts the old row (location, coordinates) into UPDATE/DELETE events,
+--    so the area and grid-cell the row moved out of are invalidated too.
+ALTER TABLE public.properties REPLICA IDENTITY FULL;
+ALTER TABLE public.market_listings REPLICA IDENTITY FULL;
+ALTER PUBLICATION supabase_realtime ADD TABLE public.properties, public.market_listings, public.news_articles;
+
+-- 2. LISTEN/NOTIFY source (ASTA_CDC_SOURCE=notify): a compact JSON payload per row change.
+--    Only the invalidation fields are sent - NOTIFY payloads are capped at 8000 bytes.
+CREATE OR REPLACE FUNCTION public.asta_notify_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    fields text[] := ARRAY['id', 'location', 'location_name', 'location_clean', 'latitude', 'longitude'];
+    new_row jsonb;
+    old_row jsonb;
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT jsonb_object_agg(key, value) INTO new_row FROM jsonb_each(to_jsonb(NEW)) WHERE key = ANY(fields);
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT jsonb_object_agg(key, value) INTO old_row FROM jsonb_each(to_jsonb(OLD)) WHERE key = ANY(fields);
+    END IF;
+    PERFORM pg_notify('asta_changes', jsonb_build_object(
+        'table', TG_TABLE_NAME,
+        'type', TG_OP,
+        'commit_timestamp', now(),
+        'record', new_row,
+        'old_record', old_row
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS asta_change_feed ON public.properties;
+CREATE TRIGGER asta_change_feed AFTER INSERT OR UPDATE OR DELETE ON public.properties
+    FOR EACH ROW EXECUTE FUNCTION public.asta_notify_change();
+
+DROP TRIGGER IF EXISTS asta_change_feed ON public.market_listings;
+CREATE TRIGGER asta_change_feed AFTER INSERT OR UPDATE OR DELETE ON public.market_listings
+    FOR EACH ROW EXECUTE FUNCTION public.asta_notify_change();
+
+DROP TRIGGER IF EXISTS asta_change_feed ON public.news_articles;
+CREATE TRIGGER asta_change_feed AFTER INSERT OR UPDATE OR DELETE ON public.news_articles
+    FOR EACH ROW EXECUTE FUNCTION public.asta_notify_change();
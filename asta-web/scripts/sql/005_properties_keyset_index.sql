@@ -0,0 +1,5 @@
+-- UNIFIED TABLE PAGINATION: /listings/properties/unified pages newest-first with a keyset cursor
+-- (created_at, id) instead of OFFSET, so every page is an index range scan at any depth.
+
+CREATE INDEX IF NOT EXISTS properties_created_at_id_idx
+    ON public.properties (created_at DESC, id DESC);
@@ -10,7 +10,7 @@ from datetime import datetime
 from config.config import config
 
 # Import new components
-from data_sources.news_scrapers.rss_reader import fetch_all_rss_articles
+from data_sources.news_scrapers.rss_reader import USER_AGENT, FeedFetcher, fetch_all_rss_articles
 from storage.supabase_connector import SupabaseConnector
 
 # Configure logging
@@ -28,9 +28,11 @@ async def main():
         logger.info("--- Step 1: Fetching RSS Articles ---")
         # Fetch articles from RSS feeds (using config.RSS_FEEDS)
         # Adjust max_feeds and max_articles_per_feed as needed for testing/production
-        rss_articles = fetch_all_rss_articles(max_feeds=5, max_articles_per_feed=10) # Example: First 5 feeds, 10 articles each
+        fetcher = FeedFetcher(user_agent=USER_AGENT)  # feed state saved after the insert below
+        rss_articles = fetch_all_rss_articles(max_feeds=5, max_articles_per_feed=10, fetcher=fetcher) # Example: First 5 feeds, 10 articles each
 
         if not rss_articles:
+            fetcher.save_state()  # nothing to store, nothing to lose
             logger.warning("⚠️  No RSS articles were fetched. Skipping further processing.")
             logger.info(f"✅ {config.PROJECT_NAME} run completed (no articles). Duration: {datetime.now() - start_time}")
             return "✅ Pipeline completed (no articles)!", 200
@@ -42,6 +44,10 @@ async def main():
         supabase_conn = SupabaseConnector()
         inserted_count = supabase_conn.insert_rss_articles(rss_articles, table_name="ghana_market_insights")
         logger.info(f"💾 Stored {inserted_count} RSS articles in Supabase.")
+        if inserted_count == len(rss_articles):
+            fetcher.save_state()
+        else:
+            logger.warning("⚠️  Not all articles were stored; feed state left as is so they are refetched.")
 
         # --- 3. (Future) Process Articles with LLM (Groq) ---
         # This is where you would call Groq to analyze the 'summary' or full content
@@ -1,46 +1,54 @@
 # data_sources/news_scrapers/rss_reader.py
-import feedparser
-import requests
+import sys
 from datetime import datetime, timezone
-import time
+from pathlib import Path
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 # Import the central config
 from config.config import config
 
+# Shared async feed fetcher from the repo root (timeouts, conditional GETs, per-feed scheduling)
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from scrapers.feed_fetcher import FeedFetcher, FeedResult
+
 # Configure logger for this module
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'ASTA Data Crawler/0.1.0 (https://github.com/akwamin-eng/asta-insights)'
+
 def fetch_rss_articles(feed_url: str, max_articles: int = 10) -> List[Dict[str, Any]]:
     """
-    Fetches articles from a single RSS feed URL.
+    Fetches articles from a single RSS feed URL (always the full feed).
     Returns a list of article dictionaries.
     """
-    articles = []
     logger.info(f"  📡 Fetching RSS feed: {feed_url}")
-    
+    # One-off read: leave the shared feed state (ETags, schedule) to the sweeps
+    result = FeedFetcher(user_agent=USER_AGENT).sweep_sync([feed_url], force=True, save=False)[0]
+    return articles_from_result(result, max_articles)
+
+def articles_from_result(result: FeedResult, max_articles: int = 10) -> List[Dict[str, Any]]:
+    """
+    Turns one fetched feed (scrapers/feed_fetcher.py) into article dictionaries.
+    """
+    articles = []
+    feed_url = result.url
+
     try:
-        # Use requests with a timeout and headers to be respectful
-        headers = {
-            'User-Agent': 'ASTA Data Crawler/0.1.0 (https://github.com/akwamin-eng/asta-insights)'
-        }
-        response = requests.get(feed_url, headers=headers, timeout=15)
-        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-        
-        # Parse the RSS feed content
-        feed = feedparser.parse(response.content)
-        
-        if feed.bozo: # Check for feed parsing errors
-             logger.warning(f"    ⚠️  Potential issue parsing feed {feed_url}: {feed.bozo_exception}")
+        if result.status == "error":
+            logger.error(f"    💥 Network error fetching feed {feed_url}: {result.error}")
+            return articles
+        if result.status != "ok":
+            logger.info(f"    ⏭️  {feed_url}: {result.status.replace('_', ' ')}, nothing new")
+            return articles
 
-        if not feed.entries:
+        if not result.entries:
             logger.info(f"    ℹ️  No entries found in feed: {feed_url}")
             return articles
 
-        logger.info(f"    ✅ Parsed feed '{feed.feed.get('title', 'Unknown Feed')}' with {len(feed.entries)} entries.")
+        logger.info(f"    ✅ Parsed feed '{result.title}' with {len(result.entries)} entries.")
         
         count = 0
-        for entry in feed.entries:
+        for entry in result.entries:
             if count >= max_articles:
                 break
             
@@ -109,17 +117,18 @@ def fetch_rss_articles(feed_url: str, max_articles: int = 10) -> List[Dict[str,
 
         logger.info(f"    📦 Fetched {len(articles)} articles from {feed_url}")
 
-    except requests.exceptions.RequestException as e_req:
-        logger.error(f"    💥 Network error fetching feed {feed_url}: {e_req}")
     except Exception as e:
         logger.error(f"    💥 Unexpected error fetching/parsing feed {feed_url}: {e}")
 
     return articles
 
-def fetch_all_rss_articles(max_feeds: int = None, max_articles_per_feed: int = 10) -> List[Dict[str, Any]]:
+def fetch_all_rss_articles(max_feeds: int = None, max_articles_per_feed: int = 10,
+                           fetcher: Optional[FeedFetcher] = None) -> List[Dict[str, Any]]:
     """
     Fetches articles from all configured RSS feeds.
     Returns a combined list of article dictionaries.
+    With a `fetcher`, its feed state is not saved: call fetcher.save_state()
+    once the articles are stored, so a failed insert refetches them.
     """
     # Use RSS feeds from central config
     all_feeds = config.RSS_FEEDS
@@ -128,16 +137,14 @@ def fetch_all_rss_articles(max_feeds: int = None, max_articles_per_feed: int = 1
     logger.info(f"--- Starting RSS Feed Reader ---")
     logger.info(f"  Total feeds to process: {len(feeds_to_process)}")
 
-    for i, feed_url in enumerate(feeds_to_process):
-        logger.info(f"\n[{i+1}/{len(feeds_to_process)}] Processing Feed: {feed_url}")
-        articles = fetch_rss_articles(feed_url, max_articles=max_articles_per_feed)
-        all_articles.extend(articles)
-        
-        # Optional: Small delay between feeds to be respectful
-        if i < len(feeds_to_process) - 1: # No need to sleep after the last one
-             delay = 1.0 # seconds
-             logger.debug(f"  ⏱️  Sleeping for {delay} seconds before next feed...")
-             time.sleep(delay)
+    # Every due feed is fetched concurrently; unchanged feeds come back as 304s
+    if fetcher is None:
+        results = FeedFetcher(user_agent=USER_AGENT).sweep_sync(feeds_to_process)
+    else:
+        results = fetcher.sweep_sync(feeds_to_process, save=False)
+    for i, result in enumerate(results):
+        logger.info(f"\n[{i+1}/{len(feeds_to_process)}] Processing Feed: {result.url}")
+        all_articles.extend(articles_from_result(result, max_articles=max_articles_per_feed))
 
     logger.info(f"\n--- RSS Feed Reader Completed ---")
     logger.info(f"  Total feeds processed: {len(feeds_to_process)}")
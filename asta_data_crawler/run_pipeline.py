@@ -26,6 +26,10 @@ from storage.supabase_connector import SupabaseConnector
 # Import processing modules
 from processing.llm_tasks.analyze_youtube_insights import analyze_youtube_insights_batch # NEW: Import LLM analysis function
 
+# Shared DAG runner (repo root; pipeline/ is not shadowed by this package's own modules)
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from pipeline.dag import DAG
+
 # Load environment variables
 load_dotenv(dotenv_path=Path('.') / '.env')
 
@@ -44,78 +48,101 @@ def save_youtube_insights_to_gcs(df: pd.DataFrame, timestamp: str):
     # blob.upload_from_string(df.to_json(orient='records'), content_type='application/json')
     print(f"  📦 YouTube insights saved to GCS (placeholder).")
 
-def main():
-    """Main function to run the full pipeline."""
+def merge_insights(video_data_list: List[Dict[str, Any]], analyzed_insights_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merges LLM insights with the rule-based terms of each video."""
+    final_insights_list = []
+    for video_data, llm_insights in zip(video_data_list, analyzed_insights_list):
+        # Combine rule-based terms with LLM-extracted hotspots
+        combined_hotspots = list(set(video_data.get("rule_based_terms", []) + llm_insights.get("hotspots", [])))
+        
+        final_insight = {
+            "video_id": video_data["video_id"],
+            "title": video_data["title"],
+            "hotspots": combined_hotspots,
+            "cost_drivers": llm_insights.get("cost_drivers", []),
+            "infrastructure": llm_insights.get("infrastructure", []),
+            "market_signals": llm_insights.get("market_signals", []),
+            "confidence": llm_insights.get("confidence", "low"),
+            "publish_time": video_data["publish_time"],
+            "insight_source": "youtube_transcript" if video_data["has_transcript"] else "youtube_metadata"
+        }
+        final_insights_list.append(final_insight)
+    return final_insights_list
+
+def main(run_id=None, force=()):
+    """
+    Main function to run the full pipeline as a DAG (pipeline/dag.py).
+    The YouTube branch and the index computation are independent and run
+    concurrently; stage outputs are memoized, so a rerun with the same
+    run_id (default: today) resumes after the last stage that succeeded.
+    """
     start_time = datetime.now(timezone.utc)
     timestamp_str = start_time.strftime("%Y%m%d_%H%M%S")
     print(f"🚀 Starting ASTA Data Pipeline Run ({timestamp_str})...")
 
-    try:
+    def fetch_youtube():
         # --- 1. Fetch YouTube Insights ---
-        print("\n--- Step 1: Fetching YouTube Insights ---")
         df_youtube = fetch_youtube_insights() # This now uses the official API and includes transcripts + translation
-
         if df_youtube.empty:
             print("  ⚠️  No YouTube insights fetched. Skipping further YouTube processing.")
         else:
             print(f"  ✅ Fetched {len(df_youtube)} YouTube videos with metadata/transcripts.")
-            
-            # --- 2. Save YouTube Insights to GCS (Optional Archival) ---
-            print("\n--- Step 2: Saving YouTube Insights to GCS ---")
-            save_youtube_insights_to_gcs(df_youtube, timestamp_str)
-
-            # --- 3. Analyze YouTube Insights with Groq ---
-            print("\n--- Step 3: Analyzing YouTube Insights with Groq ---")
-            # Convert DataFrame rows to list of dictionaries for analysis
-            video_data_list = df_youtube.to_dict(orient='records')
-            
-            # Call the LLM analysis function
-            analyzed_insights_list = analyze_youtube_insights_batch(video_data_list)
-            
-            # Merge LLM insights with rule-based terms
-            final_insights_list = []
-            for video_data, llm_insights in zip(video_data_list, analyzed_insights_list):
-                # Combine rule-based terms with LLM-extracted hotspots
-                combined_hotspots = list(set(video_data.get("rule_based_terms", []) + llm_insights.get("hotspots", [])))
-                
-                final_insight = {
-                    "video_id": video_data["video_id"],
-                    "title": video_data["title"],
-                    "hotspots": combined_hotspots,
-                    "cost_drivers": llm_insights.get("cost_drivers", []),
-                    "infrastructure": llm_insights.get("infrastructure", []),
-                    "market_signals": llm_insights.get("market_signals", []),
-                    "confidence": llm_insights.get("confidence", "low"),
-                    "publish_time": video_data["publish_time"],
-                    "insight_source": "youtube_transcript" if video_data["has_transcript"] else "youtube_metadata"
-                }
-                final_insights_list.append(final_insight)
-
-            # --- 4. Save Analyzed Insights to Supabase ---
-            print("\n--- Step 4: Saving Analyzed Insights to Supabase ---")
-            supabase_conn = SupabaseConnector()
-            inserted_count = supabase_conn.insert_youtube_insights(final_insights_list) # You'll need to implement this method in SupabaseConnector
-            print(f"  ✅ Saved {inserted_count} YouTube insights to Supabase.")
-
+        return df_youtube
+
+    def archive_youtube(youtube):
+        # --- 2. Save YouTube Insights to GCS (Optional Archival) ---
+        if not youtube.empty:
+            save_youtube_insights_to_gcs(youtube, timestamp_str)
+
+    def analyze_youtube(youtube):
+        # --- 3. Analyze YouTube Insights with Groq ---
+        if youtube.empty:
+            return []
+        # Convert DataFrame rows to list of dictionaries for analysis
+        video_data_list = youtube.to_dict(orient='records')
+        return merge_insights(video_data_list, analyze_youtube_insights_batch(video_data_list))
+
+    def save_insights(analyzed):
+        # --- 4. Save Analyzed Insights to Supabase ---
+        if not analyzed:
+            return 0
+        inserted_count = SupabaseConnector().insert_youtube_insights(analyzed) # You'll need to implement this method in SupabaseConnector
+        print(f"  ✅ Saved {inserted_count} YouTube insights to Supabase.")
+        return inserted_count
+
+    def compute_market_index():
         # --- 5. (Existing) Compute Ghana Real Estate Index ---
-        print("\n--- Step 5: Computing Ghana Real Estate Index (BETA) ---")
         from train_and_update import compute_index # Import the compute_index function
         compute_index() # This should now work if historical data exists
 
-        end_time = datetime.now(timezone.utc)
-        duration = end_time - start_time
-        print(f"\n✅ ASTA Data Pipeline Run ({timestamp_str}) completed successfully!")
-        print(f"  Duration: {duration}")
-        if not df_youtube.empty:
-            print(f"  YouTube Insights: Fetched {len(df_youtube)}, Analyzed {len(final_insights_list)}, Saved {inserted_count}")
+    dag = DAG("asta_data_crawler")
+    dag.add("youtube", fetch_youtube)
+    dag.add("archive_youtube", archive_youtube, inputs=["youtube"])
+    dag.add("analyzed", analyze_youtube, inputs=["youtube"])
+    dag.add("saved", save_insights, inputs=["analyzed"])
+    dag.add("index", compute_market_index, cache=False)
 
+    try:
+        results = dag.run(run_id=run_id, force=force)
     except Exception as e:
-        error_time = datetime.now(timezone.utc)
         print(f"\n💥 ASTA Data Pipeline Run ({timestamp_str}) failed: {e}")
         import traceback
         traceback.print_exc()
         return f"❌ Failed: {str(e)}", 500
 
+    failed = [r for r in results.values() if r.status == "failed"]
+    if failed:
+        print(f"\n💥 ASTA Data Pipeline Run ({timestamp_str}) failed: " +
+              "; ".join(f"{r.stage}: {r.error}" for r in failed))
+        return f"❌ Failed: {failed[0].error} (rerun to resume)", 500
+
+    duration = datetime.now(timezone.utc) - start_time
+    print(f"\n✅ ASTA Data Pipeline Run ({timestamp_str}) completed successfully!")
+    print(f"  Duration: {duration}")
+    if results["youtube"].rows:
+        print(f"  YouTube Insights: Fetched {results['youtube'].rows}, Analyzed {results['analyzed'].rows}, "
+              f"Saved {dag.output('saved')}")
+
     return "✅ Pipeline completed!", 200
 
 if __name__ == "__main__":
@@ -1,14 +1,21 @@
 import asyncio
 import json
 import random
-import re
 from datetime import datetime
-from playwright.async_api import async_playwright
 from playwright_stealth import stealth_async
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from utils.normalizer import PRICE_WITH_CURRENCY_RE, BEDS_RE, BATHS_RE
+from scrapers.browser_pool import BrowserPool
 
 START_PAGE = 1
 END_PAGE = 332  # Set to 332 for full dump, or 5 for a quick test
 OUTPUT_FILE = "gpc_master_dump_2025_v2.jsonl"
+CONTEXTS = 2
+PAGES_PER_CONTEXT = 2
+RECYCLE_AFTER = 60  # navigations per context before fresh cookies/memory
 
 async def extract_card_details(card, page_num):
     try:
@@ -41,11 +48,12 @@ async def extract_card_details(card, page_num):
         title_el = card.locator("h2, h3, h4").first
         title = await title_el.inner_text() if await title_el.count() > 0 else "Unknown Title"
         
-        price_match = re.search(r'((?:GH₵|\$)\s?[\d,]+(?:\.\d{2})?)', full_text)
-        price = price_match.group(1) if price_match else "Contact for Price"
+        # Raw price string is kept; ingest_vectors.py normalizes it via utils/normalizer.py
+        price_match = PRICE_WITH_CURRENCY_RE.search(full_text)
+        price = price_match.group(0) if price_match else "Contact for Price"
         
-        beds = re.search(r'(\d+)\s?(?:Bedrooms|Beds)', full_text, re.IGNORECASE)
-        baths = re.search(r'(\d+)\s?(?:Bathrooms|Baths)', full_text, re.IGNORECASE)
+        beds = BEDS_RE.search(full_text)
+        baths = BATHS_RE.search(full_text)
 
         return {
             "url": url,
@@ -61,46 +69,55 @@ async def extract_card_details(card, page_num):
     except Exception:
         return None
 
+async def dump_page(pool, page_num, f):
+    async with pool.lease() as page:
+        await page.goto(f"https://ghanapropertycentre.com/for-sale?page={page_num}", timeout=60000)
+        
+        # Wait for data
+        try:
+            await page.wait_for_selector("a:has-text('More details')", timeout=15000)
+        except:
+            print(f"   ⚠️ Page {page_num}: Timeout (Page load issue)")
+            return 0
+
+        # Find all cards
+        anchors = await page.locator("a:has-text('More details')").all()
+        
+        count = 0
+        for anchor in anchors:
+            card = anchor.locator("xpath=../../..")
+            data = await extract_card_details(card, page_num)
+            if data:
+                f.write(json.dumps(data) + "\n")
+                count += 1
+    return count
+
 async def run_master_dump():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(viewport={'width': 1280, 'height': 800})
-        page = await context.new_page()
-        await stealth_async(page)
+    # Pages are leased from a shared pool (one browser, CONTEXTS x PAGES_PER_CONTEXT tabs)
+    # instead of walking all 332 pages in a single tab.
+    pool = BrowserPool(contexts=CONTEXTS, pages_per_context=PAGES_PER_CONTEXT,
+                       recycle_after=RECYCLE_AFTER, on_new_page=stealth_async)
+    pages = asyncio.Queue()
+    for page_num in range(START_PAGE, END_PAGE + 1):
+        pages.put_nowait(page_num)
 
+    async with pool:
         print(f"🚀 STARTING DUMP to: {OUTPUT_FILE}")
         
         with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            for page_num in range(START_PAGE, END_PAGE + 1):
-                print(f"--- Processing Page {page_num} ---")
-                try:
-                    await page.goto(f"https://ghanapropertycentre.com/for-sale?page={page_num}", timeout=60000)
-                    
-                    # Wait for data
+            async def worker():
+                while not pages.empty():
+                    page_num = pages.get_nowait()
                     try:
-                        await page.wait_for_selector("a:has-text('More details')", timeout=15000)
-                    except:
-                        print("   ⚠️ Timeout (Page load issue)")
-                        continue
+                        count = await dump_page(pool, page_num, f)
+                        print(f"   ✅ Page {page_num}: Saved {count} items.")
+                    except Exception as e:
+                        print(f"   ❌ Error on page {page_num}: {e}")
+                    await asyncio.sleep(random.uniform(0.5, 1.5)) # Polite delay per tab
 
-                    # Find all cards
-                    anchors = await page.locator("a:has-text('More details')").all()
-                    
-                    count = 0
-                    for anchor in anchors:
-                        card = anchor.locator("xpath=../../..")
-                        data = await extract_card_details(card, page_num)
-                        if data:
-                            f.write(json.dumps(data) + "\n")
-                            count += 1
-                    
-                    print(f"   ✅ Saved {count} items.")
-                    await asyncio.sleep(1) # Polite delay
-                except Exception as e:
-                    print(f"   �� Error on page {page_num}: {e}")
+            await asyncio.gather(*(worker() for _ in range(pool.size)))
 
-        await browser.close()
-        print("\n🎉 Dump Complete.")
+        print(f"\n🎉 Dump Complete. ({pool.pages_per_minute():.0f} pages/min)")
 
 if __name__ == "__main__":
     asyncio.run(run_master_dump())
@@ -1,6 +1,5 @@
 import json
 import os
-import re
 import time
 import sys
 import hashlib
@@ -12,6 +11,10 @@ import google.generativeai as genai
 # --- CONFIG ---
 current_script_path = Path(__file__).resolve()
 project_root = current_script_path.parents[2]
+sys.path.append(str(project_root))
+from processing.stream_ingest import StreamingIngestor
+from utils.normalizer import normalize_listing
+from processing.near_dup import NearDupIndex
 env_path = project_root / ".env"
 load_dotenv(dotenv_path=env_path)
 
@@ -28,16 +31,8 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 genai.configure(api_key=GEMINI_KEY)
 
 INPUT_FILE = "gpc_master_dump_2025_v2.jsonl"
-BATCH_SIZE = 10 
-
-def clean_price(price_str):
-    if not price_str: return None, "UNKNOWN"
-    currency = "USD" if "$" in price_str or "USD" in price_str else "GHS"
-    clean_str = re.sub(r'[^\d.]', '', price_str)
-    try:
-        return float(clean_str), currency
-    except:
-        return None, "UNKNOWN"
+BATCH_SIZE = 20
+near_dups = NearDupIndex()
 
 def get_single_embedding(text):
     """
@@ -64,81 +59,74 @@ def get_single_embedding(text):
         # print(f"   ⚠️ Gemini Warning: {e}")
         return None
 
-def process_and_upload():
-    print(f"🚀 Starting Ingestion (Sequential Mode) from {INPUT_FILE}...")
-    
-    if not os.path.exists(INPUT_FILE):
-        print(f"❌ Error: {INPUT_FILE} not found.")
-        return
-
-    seen_urls = set()
-    batch_records = []
-    total_indexed = 0
+def embed_records(records):
+    """
+    Embeds a whole batch in one Gemini call. If the response shape doesn't line up
+    1:1 with the inputs (the old 'batch shape mismatch'), falls back to one-by-one.
+    """
+    texts = [r["content_text"] for r in records]
+    try:
+        result = genai.embed_content(
+            model="models/text-embedding-004",
+            content=texts,
+            task_type="retrieval_document"
+        )
+        vectors = result.get('embedding') or result.get('embeddings')
+        if isinstance(vectors, list) and len(vectors) == len(texts) and all(isinstance(v, list) for v in vectors):
+            time.sleep(0.5)  # Gemini free tier: stay under the request-per-minute cap
+            return vectors
+    except Exception as e:
+        print(f"   ⚠️ Batch embed failed, retrying singly: {str(e)[:80]}")
+    return [get_single_embedding(t) for t in texts]
 
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                raw = json.loads(line)
-            except:
-                continue
+def normalize_record(raw):
+    """Maps a raw GPC dump line onto the gpc_properties schema."""
+    url = raw.get("url")
+    if not url:
+        title_hash = hashlib.md5(raw.get("title", "unknown").encode()).hexdigest()
+        url = f"https://placeholder-gpc.com/{title_hash}"
 
-            # URL & Deduplication
-            url = raw.get("url")
-            if not url:
-                title_hash = hashlib.md5(raw.get("title", "unknown").encode()).hexdigest()
-                url = f"https://placeholder-gpc.com/{title_hash}"
-            
-            if url in seen_urls:
-                continue
-            seen_urls.add(url)
-            
-            # Prepare Record
-            price_val, curr = clean_price(raw.get("price"))
-            context_text = f"Title: {raw.get('title')}\nLocation: {raw.get('location')}\nDetails: {raw.get('raw_text_snippet')}"
-            
-            # --- GENERATE VECTOR IMMEDIATELY (One by One) ---
-            # This prevents batch shape mismatch errors
-            vector = get_single_embedding(context_text)
-            
-            # Only proceed if we got a valid vector
-            if vector:
-                record = {
-                    "url": url,
-                    "title": raw.get("title"),
-                    "price_amount": price_val,
-                    "currency": curr,
-                    "location_clean": raw.get("location"),
-                    "bedrooms": int(raw["bedrooms"]) if raw.get("bedrooms") else None,
-                    "bathrooms": int(raw["bathrooms"]) if raw.get("bathrooms") else None,
-                    "content_text": context_text,
-                    "embedding": vector, # Guaranteed flat list
-                    "scraped_at": raw.get("scraped_at")
-                }
-                batch_records.append(record)
-                
-                # Sleep briefly to avoid hitting Gemini rate limit (60 req/min free tier)
-                time.sleep(0.5) 
+    fields = normalize_listing(raw)
+    context_text = f"Title: {raw.get('title')}\nLocation: {raw.get('location')}\nDetails: {raw.get('raw_text_snippet')}"
+    return {
+        "url": url,
+        "title": raw.get("title"),
+        "price_amount": fields["price_amount"],
+        "currency": fields["currency"] or "UNKNOWN",
+        "location_clean": raw.get("location"),
+        "bedrooms": fields["bedrooms"],
+        "bathrooms": fields["bathrooms"],
+        "content_text": context_text,
+        "scraped_at": raw.get("scraped_at")
+    }
 
-            # --- UPLOAD BATCH ---
-            if len(batch_records) >= BATCH_SIZE:
-                try:
-                    supabase.table("gpc_properties").upsert(batch_records, on_conflict="url").execute()
-                    total_indexed += len(batch_records)
-                    print(f"✅ Indexed {total_indexed} items...")
-                except Exception as e:
-                    print(f"❌ Upload Error: {e}")
-                
-                batch_records = []
+def upsert_records(records):
+    # Register in the cross-source near-dup index so Meqasa/Jiji copies of a GPC house cluster with it
+    near_dups.add(({**r, "id": r["url"], "source": "gpc", "location": r["location_clean"],
+                    "currency": None if r["currency"] == "UNKNOWN" else r["currency"]} for r in records))
+    supabase.table("gpc_properties").upsert(records, on_conflict="url").execute()
 
-    # Final Batch
-    if batch_records:
-        try:
-            supabase.table("gpc_properties").upsert(batch_records, on_conflict="url").execute()
-            print(f"✅ Final batch of {len(batch_records)} uploaded.")
-        except Exception as e:
-            print(f"❌ Final Batch Error: {e}")
+def process_and_upload(restart=False):
+    print(f"🚀 Starting Ingestion (Streaming Mode) from {INPUT_FILE}...")
     
-    print(f"🎉 DONE! Successfully indexed {total_indexed + len(batch_records)} items.")
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ Error: {INPUT_FILE} not found.")
+        return
+
+    # parse -> normalize -> dedup (on-disk, by URL) -> embed (batched) -> upsert (batched)
+    # Checkpoints by byte offset, so a crash resumes where it stopped.
+    ingestor = StreamingIngestor(
+        job="gpc_properties",
+        normalize=normalize_record,
+        key=lambda record: record["url"],
+        embed=embed_records,
+        upsert=upsert_records,
+        embed_batch=BATCH_SIZE,
+        upsert_batch=BATCH_SIZE * 5,
+    )
+    stats = ingestor.run(INPUT_FILE, restart=restart)
+    print(f"🎉 DONE! Successfully indexed {stats['upserted']} items. "
+          f"(duplicates: {stats['duplicates']}, embed failures: {stats['embed_failed']}, bad lines: {stats['bad']})")
 
 if __name__ == "__main__":
-    process_and_upload()
+    process_and_upload(restart="--restart" in sys.argv)
@@ -1,32 +1,25 @@
 # scrape_ghana_listings.py (Updated skeleton for Playwright)
 import asyncio
-from playwright.async_api import async_playwright
+import sys
+from pathlib import Path
 import requests # Keep for potential non-Cloudflare sites or metadata fetching later
 from bs4 import BeautifulSoup # Keep for parsing HTML once obtained via Playwright
 import time
 import re
 
-async def scrape_with_playwright_improved(url, content_loaded_selector, max_retries=2):
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from scrapers.browser_pool import BrowserPool
+
+async def scrape_with_playwright_improved(pool, url, content_loaded_selector, max_retries=2):
     """
-    Scrape using Playwright, waiting for content to load after potential Cloudflare challenge.
-    Includes basic retry logic.
+    Scrape using a page leased from the shared BrowserPool, waiting for content to load
+    after potential Cloudflare challenge. Includes basic retry logic.
+    (Used to launch a fresh Chromium per attempt; the pool keeps one browser warm.)
     """
     for attempt in range(max_retries + 1):
         try:
             print(f"  🌐 Attempt {attempt+1}/{max_retries+1} for {url} with Playwright...")
-            async with async_playwright() as p:
-                # Launch browser with a more realistic context
-                browser = await p.chromium.launch(
-                    headless=True, # Set to False if you need to visually debug the challenge
-                    # Add arguments if stealth is needed later
-                    # args=['--disable-blink-features=AutomationControlled']
-                )
-                context = await browser.new_context(
-                    # Use a common user agent
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                )
-                page = await context.new_page()
-
+            async with pool.lease() as page:
                 print(f"    Navigating to {url}...")
                 await page.goto(url, timeout=30000) # Increased timeout
 
@@ -40,7 +33,6 @@ async def scrape_with_playwright_improved(url, content_loaded_selector, max_retr
                 print("    ✅ Content seems to have loaded. Attempting to get HTML...")
                 content = await page.content()
                 print(f"    📥 Playwright successfully fetched {len(content)} characters after potential challenge/resolution.")
-                await browser.close()
                 return content
 
         except Exception as e:
@@ -50,10 +42,6 @@ async def scrape_with_playwright_improved(url, content_loaded_selector, max_retr
                 await asyncio.sleep(5) # Brief delay before retry
             else:
                 print(f"    ❌ Playwright failed for {url} after {max_retries+1} attempts.")
-                try:
-                    await browser.close() # Ensure browser closes on failure
-                except:
-                    pass # Ignore error if browser wasn't created yet
                 return None
     return None # Should not reach here if loop is correct
 
@@ -240,61 +228,63 @@ def parse_jiji_listings(html):
 async def scrape_all():
     listings = []
 
-    # --- Tonaton ---
-    tonaton_url = "https://tonaton.com/c_real-estate" # Use the corrected URL
-    # Find an element that appears after any potential challenge and listings load on Tonaton.
-    # Based on common layout structures, a main content area often holds the list.
-    # Inspecting the actual page structure is ideal, but `div.l-main` or similar is often used.
-    # The individual items are <a class='product__item'>.
-    tonaton_content_loaded_selector = "div.l-main" # Initial guess for main content area - REPLACE with actual selector found via inspection!
-    print(f"🔍 Starting Tonaton scrape...")
-    html = await scrape_with_playwright_improved(tonaton_url, tonaton_content_loaded_selector)
-    if html:
-        listings.extend(parse_tonaton_listings(html))
-    else:
-        print("  ❌ Playwright failed for Tonaton.")
+    # One warm browser for every site instead of one launch per URL attempt
+    async with BrowserPool(contexts=1, pages_per_context=2) as pool:
+        # --- Tonaton ---
+        tonaton_url = "https://tonaton.com/c_real-estate" # Use the corrected URL
+        # Find an element that appears after any potential challenge and listings load on Tonaton.
+        # Based on common layout structures, a main content area often holds the list.
+        # Inspecting the actual page structure is ideal, but `div.l-main` or similar is often used.
+        # The individual items are <a class='product__item'>.
+        tonaton_content_loaded_selector = "div.l-main" # Initial guess for main content area - REPLACE with actual selector found via inspection!
+        print(f"🔍 Starting Tonaton scrape...")
+        html = await scrape_with_playwright_improved(pool, tonaton_url, tonaton_content_loaded_selector)
+        if html:
+            listings.extend(parse_tonaton_listings(html))
+        else:
+            print("  ❌ Playwright failed for Tonaton.")
 
-    # --- Meqasa (Sale) ---
-    meqasa_sale_url = "https://meqasa.com/properties-for-sale-in-ghana" # Use the corrected URL
-    # Find an element that appears after Cloudflare and listings load on Meqasa (Sale).
-    # Inspect the HTML after the challenge passes and listings appear.
-    # Common names might be 'div.search-results', 'div.mqs-search-results', 'main', etc.
-    meqasa_sale_content_loaded_selector = "div.mqs-search-results" # Initial guess - REPLACE with actual selector found via inspection!
-    print(f"🔍 Starting Meqasa (Sale) scrape...")
-    html = await scrape_with_playwright_improved(meqasa_sale_url, meqasa_sale_content_loaded_selector)
-    if html:
-        listings.extend(parse_meqasa_listings(html)) # Assumes parsing logic handles 'sale' correctly or is generic
-    else:
-        print("  ❌ Playwright failed for Meqasa (Sale).")
+        # --- Meqasa (Sale) ---
+        meqasa_sale_url = "https://meqasa.com/properties-for-sale-in-ghana" # Use the corrected URL
+        # Find an element that appears after Cloudflare and listings load on Meqasa (Sale).
+        # Inspect the HTML after the challenge passes and listings appear.
+        # Common names might be 'div.search-results', 'div.mqs-search-results', 'main', etc.
+        meqasa_sale_content_loaded_selector = "div.mqs-search-results" # Initial guess - REPLACE with actual selector found via inspection!
+        print(f"🔍 Starting Meqasa (Sale) scrape...")
+        html = await scrape_with_playwright_improved(pool, meqasa_sale_url, meqasa_sale_content_loaded_selector)
+        if html:
+            listings.extend(parse_meqasa_listings(html)) # Assumes parsing logic handles 'sale' correctly or is generic
+        else:
+            print("  ❌ Playwright failed for Meqasa (Sale).")
 
-    # --- Meqasa (Rent) ---
-    meqasa_rent_url = "https://meqasa.com/properties-for-rent-in-ghana" # Use the corrected URL
-    # Find an element that appears after Cloudflare and listings load on Meqasa (Rent).
-    # Inspect the HTML after the challenge passes and listings appear.
-    # Often the same container selector works for both rent/sale if they use the same template.
-    meqasa_rent_content_loaded_selector = "div.mqs-search-results" # Initial guess - REPLACE with actual selector found via inspection!
-    print(f"🔍 Starting Meqasa (Rent) scrape...")
-    html = await scrape_with_playwright_improved(meqasa_rent_url, meqasa_rent_content_loaded_selector)
-    if html:
-        listings.extend(parse_meqasa_listings(html)) # Assumes parsing logic handles 'rent' correctly or is generic
-    else:
-        print("  ❌ Playwright failed for Meqasa (Rent).")
+        # --- Meqasa (Rent) ---
+        meqasa_rent_url = "https://meqasa.com/properties-for-rent-in-ghana" # Use the corrected URL
+        # Find an element that appears after Cloudflare and listings load on Meqasa (Rent).
+        # Inspect the HTML after the challenge passes and listings appear.
+        # Often the same container selector works for both rent/sale if they use the same template.
+        meqasa_rent_content_loaded_selector = "div.mqs-search-results" # Initial guess - REPLACE with actual selector found via inspection!
+        print(f"🔍 Starting Meqasa (Rent) scrape...")
+        html = await scrape_with_playwright_improved(pool, meqasa_rent_url, meqasa_rent_content_loaded_selector)
+        if html:
+            listings.extend(parse_meqasa_listings(html)) # Assumes parsing logic handles 'rent' correctly or is generic
+        else:
+            print("  ❌ Playwright failed for Meqasa (Rent).")
 
-    # --- Jiji ---
-    jiji_url = "https://jiji.com.gh/houses-apartments-for-rent" # Use the corrected URL
-    # Find an element that appears after any potential challenge and listings load on Jiji.
-    # Based on common structure, the list container often has a class like 'b-list-advert' or similar.
-    # The individual items are <a class='qa-advert-list-item'>.
-    jiji_content_loaded_selector = "div.b-list-advert" # Selector for the container holding the list of items
-    print(f"🔍 Starting Jiji scrape...")
-    html = await scrape_with_playwright_improved(jiji_url, jiji_content_loaded_selector)
-    if html:
-        listings.extend(parse_jiji_listings(html))
-    else:
-        print("  ❌ Playwright failed for Jiji.")
+        # --- Jiji ---
+        jiji_url = "https://jiji.com.gh/houses-apartments-for-rent" # Use the corrected URL
+        # Find an element that appears after any potential challenge and listings load on Jiji.
+        # Based on common structure, the list container often has a class like 'b-list-advert' or similar.
+        # The individual items are <a class='qa-advert-list-item'>.
+        jiji_content_loaded_selector = "div.b-list-advert" # Selector for the container holding the list of items
+        print(f"🔍 Starting Jiji scrape...")
+        html = await scrape_with_playwright_improved(pool, jiji_url, jiji_content_loaded_selector)
+        if html:
+            listings.extend(parse_jiji_listings(html))
+        else:
+            print("  ❌ Playwright failed for Jiji.")
 
-    print(f"✅ Scraped {len(listings)} listings from sources that bypassed protection (likely Playwright).")
-    return listings
+        print(f"✅ Scraped {len(listings)} listings from sources that bypassed protection (likely Playwright).")
+        return listings
 
 if __name__ == "__main__":
     # Run the scrape
@@ -1,10 +1,17 @@
 import os
+import sys
 import pandas as pd
 import requests
 import time
 from dotenv import load_dotenv
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).parent))
+from storage.data_lake import DataLake
+
+# Default: read/write the Parquet lake (storage/data_lake.py). --csv: the old full-CSV chain.
+USE_CSV = "--csv" in sys.argv
+
 load_dotenv(dotenv_path=Path('.') / '.env')
 API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 
@@ -27,7 +34,11 @@ def get_poi_count(lat, lng, place_type, radius=1500):
         return 0
 
 # Load geocoded data
-df = pd.read_csv("ghana_properties_geocoded_full.csv")
+if USE_CSV:
+    df = pd.read_csv("ghana_properties_geocoded_full.csv")
+else:
+    lake = DataLake()
+    df = lake.read("geocoded_full", columns=["id", "latitude", "longitude"])
 total = len(df)
 print(f"📍 Enriching {total} properties with POIs...")
 
@@ -58,6 +69,10 @@ for idx in df.index:
     
     time.sleep(0.1)  # Respect rate limits
 
-df.to_csv("ghana_properties_poi_enriched.csv", index=False)
 print("\n✅ POI enrichment complete!")
-print("💾 Saved to 'ghana_properties_poi_enriched.csv'")
\ No newline at end of file
+if USE_CSV:
+    df.to_csv("ghana_properties_poi_enriched.csv", index=False)
+    print("💾 Saved to 'ghana_properties_poi_enriched.csv'")
+else:
+    lake.write_stage("poi_enriched", df[["id", "schools_nearby", "hospitals_nearby", "malls_nearby", "transit_nearby"]])
+    print("💾 Saved to lake stage 'poi_enriched'")
\ No newline at end of file
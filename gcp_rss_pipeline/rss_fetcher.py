@@ -1,13 +1,17 @@
 # gcp_rss_pipeline/rss_fetcher.py
-import feedparser
-import requests
 from datetime import datetime
 import json
 import os
-from google.cloud import storage # Make sure google-cloud-storage is in requirements.txt
-import time
+import sys
+from pathlib import Path
 from dotenv import load_dotenv # Optional, for local testing
 
+# Shared async feed fetcher (timeouts, conditional GETs, per-feed scheduling).
+# The Docker image is built from the repo root so scrapers/ is available (see Dockerfile).
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from scrapers.feed_fetcher import FeedFetcher
+from storage.archive_writer import ArchiveWriter, backend_from_uri
+
 # Load environment variables if running locally
 load_dotenv()
 
@@ -26,10 +30,10 @@ RSS_FEEDS = [
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "asta-insights-data-certain-voyager") # Use your bucket name
 GCS_RAW_PREFIX = "raw/rss_articles"
 
-# Initialize GCS Client
-# When running on GCP, credentials are usually picked up automatically (Application Default Credentials - ADC)
-storage_client = storage.Client()
-bucket = storage_client.bucket(GCS_BUCKET_NAME)
+# GCS backend for the shared archive writer (storage/archive_writer.py).
+# When running on GCP, credentials are usually picked up automatically (Application Default Credentials - ADC).
+# Set ASTA_ARCHIVE_URI to a local directory to test offline.
+archive_backend = backend_from_uri(os.getenv("ASTA_ARCHIVE_URI") or f"gs://{GCS_BUCKET_NAME}")
 
 def clean_text(text):
     """Basic text cleaning."""
@@ -38,21 +42,15 @@ def clean_text(text):
     # Remove extra whitespace and newlines, replace with single space
     return ' '.join(text.split())
 
-def fetch_and_store_articles(feed_url):
-    """Fetches articles from a single RSS feed and stores them in GCS."""
-    print(f"Fetching articles from: {feed_url}")
+def store_articles(archive, feed_url, entries):
+    """Queues the entries of one fetched RSS feed on the run's archive (gzip NDJSON shards in GCS)."""
     articles_stored = 0
     try:
-        feed = feedparser.parse(feed_url)
-        # Check for feed parsing errors reported by feedparser
-        if feed.bozo:
-             print(f"Warning: Potential issue parsing feed {feed_url}: {getattr(feed, 'bozo_exception', 'Unknown error')}")
-
-        if not feed.entries:
+        if not entries:
             print(f"Warning: No entries found in feed: {feed_url}")
             return articles_stored # Return count (0)
 
-        for entry in feed.entries:
+        for entry in entries:
             try:
                 # Extract article data
                 # Use 'link' as a fallback unique identifier if 'id' is not present
@@ -61,7 +59,7 @@ def fetch_and_store_articles(feed_url):
                     print(f"Skipping entry in {feed_url} - No 'id' or 'link' found.")
                     continue
 
-                # Sanitize article_id for use in GCS object name (remove problematic characters, limit length)
+                # Shortened id for log lines
                 article_id_safe = article_id.replace('/', '_').replace(':', '_').replace('?', '_').replace('&', '_').replace('#', '_')[:100]
 
                 title = clean_text(entry.get('title', ''))
@@ -109,15 +107,8 @@ def fetch_and_store_articles(feed_url):
                     "fetched_at": datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ') # ISO format UTC timestamp
                 }
 
-                # Define GCS blob name/path with date hierarchy
-                today_str = datetime.utcnow().strftime("%Y/%m/%d")
-                blob_name = f"{GCS_RAW_PREFIX}/{today_str}/{article_id_safe}.json"
-
-                # Upload to GCS
-                blob = bucket.blob(blob_name)
-                # Convert Python dict to JSON string and upload
-                blob.upload_from_string(json.dumps(article_data, indent=2, ensure_ascii=False), content_type='application/json; charset=utf-8')
-                print(f"  Uploaded article: {article_id_safe[:50]}... to gs://{GCS_BUCKET_NAME}/{blob_name}")
+                # One record per line in the run's shards instead of one blob per article
+                archive.write(article_data)
                 articles_stored += 1
 
             except Exception as e_entry:
@@ -134,7 +125,7 @@ def fetch_and_store_articles(feed_url):
 
 
 def main():
-    """Main function to iterate through feeds."""
+    """Main function: fetch all due feeds concurrently, then store their articles."""
     print("--- Starting RSS Feed Fetcher ---")
     total_feeds = len(RSS_FEEDS)
     total_articles_stored = 0
@@ -142,14 +133,21 @@ def main():
         print("Warning: RSS_FEEDS list is empty. No feeds to process.")
         return
 
-    for i, feed_url in enumerate(RSS_FEEDS):
-        print(f"\n[{i+1}/{total_feeds}] Processing Feed: {feed_url}")
-        articles_from_this_feed = fetch_and_store_articles(feed_url)
-        total_articles_stored += articles_from_this_feed
-        # Optional: Small delay between feeds to be respectful
-        if i < total_feeds - 1: # No need to sleep after the last one
-             print(f"  Sleeping for 2 seconds before next feed...")
-             time.sleep(2)
+    fetcher = FeedFetcher()
+    results = fetcher.sweep_sync(RSS_FEEDS, save=False)
+    # All articles of this run -> gs://<bucket>/raw/rss_articles/YYYY/MM/DD/<run>-part-*.ndjson.gz + manifest
+    archive = ArchiveWriter(archive_backend, f"{GCS_RAW_PREFIX}/{datetime.utcnow().strftime('%Y/%m/%d')}")
+    for i, result in enumerate(results):
+        print(f"\n[{i+1}/{total_feeds}] Processing Feed: {result.url} ({result.status})")
+        if result.status == "error":
+            print(f"Failed to fetch or process feed {result.url}: {result.error}")
+            continue
+        if result.status != "ok":
+            continue # 304 Not Modified / not due yet: nothing new to store
+        total_articles_stored += store_articles(archive, result.url, result.entries)
+    manifest = archive.close()
+    # Feed state (ETags, seen entries) only once the shards are up, else the next run refetches
+    fetcher.save_state(keep=[r.url for r in results if r.status == "ok"] if manifest["failed_shards"] else ())
 
     print(f"\n--- RSS Feed Fetcher Completed ---")
     print(f"  Total feeds processed: {total_feeds}")
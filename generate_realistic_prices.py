@@ -1,8 +1,23 @@
+import sys
+from pathlib import Path
 import pandas as pd
 import numpy as np
 
+sys.path.append(str(Path(__file__).parent))
+from storage.data_lake import DataLake
+
+# Default: read/write the Parquet lake (storage/data_lake.py). --csv: the old full-CSV chain.
+USE_CSV = "--csv" in sys.argv
+
 # Load POI-enriched data
-df = pd.read_csv("ghana_properties_poi_enriched.csv")
+if USE_CSV:
+    df = pd.read_csv("ghana_properties_poi_enriched.csv")
+else:
+    lake = DataLake()
+    df = lake.read("poi_enriched", columns=[
+        "id", "address", "area_sqm", "bedrooms", "bathrooms",
+        "schools_nearby", "hospitals_nearby", "malls_nearby", "transit_nearby",
+    ])
 
 def get_location_factor(address):
     if not isinstance(address, str):
@@ -48,5 +63,9 @@ print(f"New price range: {df['price'].min():,.0f} – {df['price'].max():,.0f}")
 print(f"Average price: {df['price'].mean():,.0f}")
 
 # Save
-df.to_csv("ghana_properties_realistic_prices.csv", index=False)
-print("\n💾 Saved to 'ghana_properties_realistic_prices.csv'")
\ No newline at end of file
+if USE_CSV:
+    df.to_csv("ghana_properties_realistic_prices.csv", index=False)
+    print("\n💾 Saved to 'ghana_properties_realistic_prices.csv'")
+else:
+    lake.write_stage("realistic_prices", df[["id", "location_factor", "price_realistic", "price"]])
+    print("\n💾 Saved to lake stage 'realistic_prices'")
\ No newline at end of file
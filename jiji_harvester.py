@@ -1,7 +1,7 @@
 import asyncio
 import json
-import re
 from playwright.async_api import async_playwright
+from utils.normalizer import parse_price
 
 # --- CONFIGURATION ---
 BASE_URL = "https://jiji.com.gh/houses-apartments-for-rent"
@@ -9,9 +9,8 @@ MAX_PAGES = 5
 OUTPUT_FILE = "jiji_dump_raw.json"
 
 def clean_price(price_str):
-    if not price_str: return 0
-    clean = re.sub(r'[^\d]', '', price_str)
-    return int(clean) if clean else 0
+    amount = parse_price(price_str or None).amount
+    return int(amount) if amount else 0
 
 async def scrape_jiji():
     data_dump = []
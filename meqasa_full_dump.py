@@ -2,15 +2,22 @@ import asyncio
 import json
 import os
 import random
+import sys
 from datetime import datetime
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+from storage.listing_history import ListingHistory
 
 # --- CONFIGURATION ---
 BASE_URL = "https://meqasa.com/houses-for-sale-in-ghana?w=1&p="
 START_PAGE = 1
 MAX_PAGES = 551  # Set to 551 for the full dump
 OUTPUT_FILE = "meqasa_master_dump.json"
+# Daily delta (`python meqasa_full_dump.py --delta`): newest listings come first, so once
+# this many pages in a row add nothing beyond OUTPUT_FILE the rest of the catalog is known.
+DELTA = "--delta" in sys.argv
+KNOWN_PAGES_TO_STOP = 2
+HISTORY_SOURCE = "meqasa_full_dump"  # snapshot scope in storage/listing_history.py (IDs: meqasa_<slug>)
 
 # --- SCHEMA ---
 SCHEMA = {
@@ -30,10 +37,12 @@ SCHEMA = {
 
 async def scrape_full_catalog():
     # 1. SETUP STATE
-    # We use a set to track URLs we have already seen.
-    # This automatically filters out the "Featured" properties that repeat on every page.
+    # `seen_urls` tracks URLs seen in THIS run: it filters out the "Featured" properties
+    # that repeat on every page. `master` holds the dump keyed by URL; a listing that is
+    # already in it gets its latest price/details instead of keeping the first ones seen.
     seen_urls = set()
-    master_list = []
+    master = {}
+    run_items = []
     
     # Load existing progress if restarting
     if os.path.exists(OUTPUT_FILE):
@@ -42,9 +51,8 @@ async def scrape_full_catalog():
             with open(OUTPUT_FILE, 'r') as f:
                 existing_data = json.load(f)
                 for item in existing_data:
-                    seen_urls.add(item['url'])
-                    master_list.append(item)
-            print(f"   Loaded {len(master_list)} existing records.")
+                    master[item['url']] = item
+            print(f"   Loaded {len(master)} existing records.")
         except:
             print("   ⚠️ Could not read existing file, starting fresh.")
 
@@ -57,7 +65,10 @@ async def scrape_full_catalog():
         }
     )
 
-    print(f"🚀 Starting Full Scrape: Pages {START_PAGE} to {MAX_PAGES}")
+    print(f"🚀 Starting {'Delta' if DELTA else 'Full'} Scrape: Pages {START_PAGE} to {MAX_PAGES}")
+    known_streak = 0
+    pages_done = 0
+    failed_pages = 0
     
     async with AsyncWebCrawler(config=browser_config) as crawler:
         for page_num in range(START_PAGE, MAX_PAGES + 1):
@@ -90,7 +101,6 @@ async def scrape_full_catalog():
                         if full_url in seen_urls:
                             continue # Skip this duplicate
                         
-                        # Add new item
                         seen_urls.add(full_url)
                         
                         clean_item = {
@@ -107,32 +117,56 @@ async def scrape_full_catalog():
                             "scraped_at": datetime.now().isoformat()
                         }
                         
-                        master_list.append(clean_item)
-                        new_items_count += 1
+                        if full_url not in master:
+                            new_items_count += 1
+                        master[full_url] = clean_item
+                        run_items.append(clean_item)
                     
-                    print(f"✅ Page {page_num}: Found {len(raw_items)} raw -> Added {new_items_count} UNIQUE items. (Total: {len(master_list)})")
+                    print(f"✅ Page {page_num}: Found {len(raw_items)} raw -> Added {new_items_count} NEW items. (Total: {len(master)})")
+                    pages_done = page_num
+
+                    # DELTA STOP: pages of only already-seen listings
+                    known_streak = known_streak + 1 if raw_items and not new_items_count else 0
+                    if DELTA and known_streak >= KNOWN_PAGES_TO_STOP:
+                        print(f"⏹️ {known_streak} pages with nothing new - delta complete.")
+                        break
                     
                     # 3. INCREMENTAL SAVE (Safety Net)
                     if page_num % 5 == 0: # Save every 5 pages
-                        print(f"💾 Checkpoint: Saving {len(master_list)} items to disk...")
+                        print(f"💾 Checkpoint: Saving {len(master)} items to disk...")
                         with open(OUTPUT_FILE, "w") as f:
-                            json.dump(master_list, f, indent=2)
+                            json.dump(list(master.values()), f, indent=2)
                             
                 else:
+                    failed_pages += 1
                     print(f"❌ Page {page_num} failed: {result.error_message}")
             
             except Exception as e:
+                failed_pages += 1
                 print(f"⚠️ Critical Error on Page {page_num}: {e}")
                 # We continue to the next page instead of crashing
                 continue
 
     # Final Save
     print("\n" + "="*50)
-    print(f"🎉 DONE! Scraped {MAX_PAGES} pages.")
-    print(f"📊 Total Unique Properties: {len(master_list)}")
+    print(f"🎉 DONE! Scraped {pages_done} pages ({failed_pages} failed).")
+    print(f"📊 Total Unique Properties: {len(master)}")
     with open(OUTPUT_FILE, "w") as f:
-        json.dump(master_list, f, indent=2)
+        json.dump(list(master.values()), f, indent=2)
     print(f"💾 Final data saved to {OUTPUT_FILE}")
 
+    # 4. CHANGE DETECTION: insert/update events + price history for the listings seen this run.
+    # Only a run that walked every page without a failure may conclude that missing
+    # listings were delisted (a failed page's listings were simply not seen).
+    history = ListingHistory()
+    events = history.apply(run_items, source=HISTORY_SOURCE)
+    delisted = []
+    if not DELTA and pages_done == MAX_PAGES and failed_pages == 0:
+        delisted = history.delist_missing(HISTORY_SOURCE, (item["id"] for item in run_items))
+    updates = [e for e in events if e.kind == "update"]
+    price_moves = sum(1 for e in updates if "price_amount" in e.changes)
+    print(f"🔁 {len(events) - len(updates)} new, {len(updates)} changed ({price_moves} price moves), "
+          f"{len(delisted)} delisted")
+
 if __name__ == "__main__":
     asyncio.run(scrape_full_catalog())
@@ -0,0 +1,215 @@
+# pipeline/dag.py
+"""
+Small DAG runner for the nightly pipelines: memoized stages, parallel branches, resumable runs.
+
+run_pipeline.py used to run scrape -> YouTube -> model -> index strictly in
+sequence, and a failure late in the run meant redoing the scrapes. Here
+stages declare the stages they consume; the runner
+
+  * starts every stage whose inputs are ready on a thread pool (or a process
+    pool for `pool="process"` stages), so wall time is the critical path;
+  * memoizes each output on disk under a key built from the stage name,
+    `version`, its source code and the *content hashes* of its inputs - a
+    stage whose inputs did not change is loaded, not re-run;
+  * keys source stages (no inputs) by `run_id` (default: today's date), so
+    a rerun the same day resumes after the last good stage while tomorrow's
+    run scrapes fresh data;
+  * skips the dependents of a failed stage but finishes independent branches;
+  * appends one line per stage (status, seconds, rows, key) to runs.jsonl.
+
+    dag = DAG("nightly")
+    dag.add("listings", scrape_all)
+    dag.add("youtube", fetch_youtube_insights)
+    dag.add("enriched", lambda listings: run_full_pipeline(scraped_df=listings), inputs=["listings"])
+    results = dag.run()        # {stage: StageResult}
+
+Outputs are pickled to data/.pipeline/cache/<stage>/<key>.pkl (ASTA_PIPELINE_DIR to move it).
+`cache=False` stages always run (their output is still hashed for dependents).
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from contextlib import ExitStack
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence
+
+PIPELINE_DIR = Path(os.getenv("ASTA_PIPELINE_DIR", "data/.pipeline"))
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    inputs: Sequence[str] = ()
+    version: str = "1"
+    cache: bool = True
+    pool: str = "thread"  # thread | process (fn must be a picklable module-level function)
+
+
+class StageResult(NamedTuple):
+    stage: str
+    status: str                # ran | cached | failed | skipped
+    seconds: float = 0.0
+    rows: Optional[int] = None
+    key: Optional[str] = None
+    content_hash: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _code_hash(fn: Callable) -> str:
+    try:
+        source = inspect.getsource(fn)
+    except (OSError, TypeError):
+        source = getattr(fn, "__qualname__", repr(fn))
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def _rows(output: Any) -> Optional[int]:
+    try:
+        return len(output)
+    except TypeError:
+        return None
+
+
+def _call(fn: Callable, kwargs: Dict[str, Any]) -> bytes:
+    """Runs a stage and returns its pickled output (module-level so a process pool can run it)."""
+    return pickle.dumps(fn(**kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class DAG:
+    def __init__(self, name: str, root: Path = PIPELINE_DIR, max_workers: int = 4):
+        self.name = name
+        self.root = Path(root)
+        self.max_workers = max_workers
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, StageResult] = {}
+        self.outputs: Dict[str, Any] = {}
+
+    def add(self, name: str, fn: Callable[..., Any], inputs: Sequence[str] = (), version: str = "1",
+            cache: bool = True, pool: str = "thread") -> Stage:
+        """Registers a stage; `fn` is called with one keyword argument per input stage."""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already defined")
+        missing = [i for i in inputs if i not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s) {missing} - add them first")
+        stage = Stage(name, fn, tuple(inputs), version, cache, pool)
+        self.stages[name] = stage
+        return stage
+
+    # --- MEMOIZATION ---
+
+    def _key(self, stage: Stage, input_hashes: Dict[str, str], run_id: str) -> str:
+        payload = {"dag": self.name, "stage": stage.name, "version": stage.version, "code": _code_hash(stage.fn),
+                   "inputs": input_hashes, "run": None if stage.inputs else run_id}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+    def _cache_path(self, stage: str, key: str) -> Path:
+        return self.root / "cache" / self.name / stage / f"{key}.pkl"
+
+    def _cached(self, stage: Stage, key: str) -> Optional[dict]:
+        meta = self._cache_path(stage.name, key).with_suffix(".json")
+        if stage.cache and meta.exists() and meta.with_suffix(".pkl").exists():
+            return json.loads(meta.read_text())
+        return None
+
+    def _store(self, stage: str, key: str, blob: bytes, rows: Optional[int]) -> str:
+        content_hash = hashlib.sha256(blob).hexdigest()[:24]
+        path = self._cache_path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(blob)
+        tmp.replace(path)
+        path.with_suffix(".json").write_text(json.dumps({"content_hash": content_hash, "rows": rows,
+                                                         "created_at": time.time()}))
+        return content_hash
+
+    def _log(self, run_id: str, result: StageResult):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / "runs.jsonl", "a") as f:
+            f.write(json.dumps({"dag": self.name, "run_id": run_id, "at": datetime.now(timezone.utc).isoformat(),
+                                **result._asdict()}) + "\n")
+
+    # --- EXECUTION ---
+
+    def run(self, run_id: Optional[str] = None, force: Sequence[str] = ()) -> Dict[str, StageResult]:
+        """
+        Runs every stage whose inputs succeeded, as soon as they are ready.
+        `force` re-runs the named stages even if a memoized output exists.
+        """
+        run_id = run_id or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        self.results, self.outputs = results, outputs = {}, {}
+        running = {}  # future -> (stage, key, started)
+        started = time.perf_counter()
+        print(f"🧭 DAG '{self.name}' run {run_id}: {len(self.stages)} stages")
+
+        def finish(result: StageResult):
+            results[result.stage] = result
+            self._log(run_id, result)
+            icon = {"ran": "✅", "cached": "♻️", "failed": "❌", "skipped": "⏭️"}[result.status]
+            rows = f", {result.rows} rows" if result.rows is not None else ""
+            error = f" - {result.error}" if result.error else ""
+            print(f"  {icon} {result.stage}: {result.status} ({result.seconds:.1f}s{rows}){error}")
+
+        with ExitStack() as stack:
+            threads = stack.enter_context(ThreadPoolExecutor(self.max_workers, thread_name_prefix=f"dag-{self.name}"))
+            processes = None
+            if any(s.pool == "process" for s in self.stages.values()):
+                processes = stack.enter_context(ProcessPoolExecutor(self.max_workers))
+            while len(results) < len(self.stages):
+                active = {name for name, _, _ in running.values()}
+                for stage in self.stages.values():
+                    if stage.name in results or stage.name in active or any(i not in results for i in stage.inputs):
+                        continue
+                    failed = [i for i in stage.inputs if results[i].status in ("failed", "skipped")]
+                    if failed:
+                        finish(StageResult(stage.name, "skipped", error=f"input {failed[0]} did not complete"))
+                        continue
+                    key = self._key(stage, {i: results[i].content_hash for i in stage.inputs}, run_id)
+                    meta = None if stage.name in force else self._cached(stage, key)
+                    if meta:
+                        finish(StageResult(stage.name, "cached", 0.0, meta["rows"], key, meta["content_hash"]))
+                        continue
+                    pool = processes if stage.pool == "process" else threads
+                    future = pool.submit(_call, stage.fn, {i: self.output(i) for i in stage.inputs})
+                    running[future] = (stage.name, key, time.perf_counter())
+                if not running:
+                    continue  # this pass only resolved cached / skipped stages
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key, stage_started = running.pop(future)
+                    seconds = time.perf_counter() - stage_started
+                    try:
+                        blob = future.result()
+                    except Exception as e:
+                        finish(StageResult(name, "failed", seconds, key=key, error=f"{e.__class__.__name__}: {e}"))
+                        continue
+                    outputs[name] = pickle.loads(blob)
+                    rows = _rows(outputs[name])
+                    finish(StageResult(name, "ran", seconds, rows, key, self._store(name, key, blob, rows)))
+
+        wall = time.perf_counter() - started
+        work = sum(r.seconds for r in results.values())
+        counts = {}
+        for r in results.values():
+            counts[r.status] = counts.get(r.status, 0) + 1
+        print(f"🏁 DAG '{self.name}': {counts} in {wall:.1f}s wall ({work:.1f}s of stage work)")
+        return results
+
+    def output(self, name: str) -> Any:
+        """A stage's output in the current / last run; cached outputs are unpickled on first use."""
+        if name not in self.outputs:
+            result = self.results.get(name)
+            if result is None or result.status not in ("ran", "cached"):
+                raise KeyError(f"Stage '{name}' has no output in the last run")
+            self.outputs[name] = pickle.loads(self._cache_path(name, result.key).read_bytes())
+        return self.outputs[name]
+
+    @staticmethod
+    def succeeded(results: Dict[str, StageResult]) -> bool:
+        return all(r.status in ("ran", "cached") for r in results.values())
@@ -1,10 +1,17 @@
 import os
+import sys
 import pandas as pd
 import requests
 import time
 from dotenv import load_dotenv
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from storage.data_lake import DataLake
+
+# Default: read/write the Parquet lake (storage/data_lake.py). --csv: the old full-CSV chain.
+USE_CSV = "--csv" in sys.argv
+
 load_dotenv(dotenv_path=Path('.') / '.env')
 API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 
@@ -32,7 +39,11 @@ def geocode_address(address):
         return None, None
 
 # Load data
-df = pd.read_csv("ghana_properties_with_predictions.csv")
+if USE_CSV:
+    df = pd.read_csv("ghana_properties_with_predictions.csv")
+else:
+    lake = DataLake()
+    df = lake.read("with_predictions", columns=["id", "address", "latitude", "longitude"])
 total = len(df)
 success = 0
 
@@ -52,6 +63,10 @@ for idx in df.index:
     
     time.sleep(0.1)  # Stay under quota
 
-df.to_csv("ghana_properties_geocoded_full.csv", index=False)
 print(f"\n✅ Geocoding complete! {success}/{total} succeeded.")
-print("💾 Saved to 'ghana_properties_geocoded_full.csv'")
\ No newline at end of file
+if USE_CSV:
+    df.to_csv("ghana_properties_geocoded_full.csv", index=False)
+    print("💾 Saved to 'ghana_properties_geocoded_full.csv'")
+else:
+    lake.write_stage("geocoded_full", df[["id", "latitude", "longitude"]])
+    print("💾 Saved to lake stage 'geocoded_full'")
\ No newline at end of file
@@ -1,7 +1,17 @@
 # preprocess.py
+import sys
+from pathlib import Path
 import pandas as pd
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from storage.data_lake import DataLake
+
+# Default: read/write the Parquet lake (storage/data_lake.py). --csv: the old full-CSV chain.
+USE_CSV = "--csv" in sys.argv
+# The raw stage is re-imported whenever ghana_properties_raw.csv changed; --reimport forces it.
+REIMPORT = "--reimport" in sys.argv
+
 def parse_size_to_sqm(size_val):
     """Convert size (text or number) to square meters. Assumes input is in sq ft."""
     try:
@@ -30,7 +40,13 @@ def preprocess_data(df):
     return df
 
 # Load and preprocess
-df_raw = pd.read_csv("ghana_properties_raw.csv")
+if USE_CSV:
+    df_raw = pd.read_csv("ghana_properties_raw.csv")
+else:
+    lake = DataLake()
+    if lake.import_csv("ghana_properties_raw.csv", if_changed=not REIMPORT):
+        print("📥 Imported ghana_properties_raw.csv into lake stage 'raw'")
+    df_raw = lake.read("raw", columns=["id", "size", "price"])
 print(f"Starting with {len(df_raw)} properties")
 
 df_clean = preprocess_data(df_raw)
@@ -38,7 +54,11 @@ df_clean = preprocess_data(df_raw)
 print(f"After cleaning: {len(df_clean)} properties")
 if len(df_clean) > 0:
     print(f"Area range: {df_clean['area_sqm'].min():.1f} – {df_clean['area_sqm'].max():.1f} sqm")
-    df_clean.to_csv("ghana_properties_clean.csv", index=False)
-    print("✅ Cleaned data saved to 'ghana_properties_clean.csv'")
+    if USE_CSV:
+        df_clean.to_csv("ghana_properties_clean.csv", index=False)
+        print("✅ Cleaned data saved to 'ghana_properties_clean.csv'")
+    else:
+        lake.write_stage("clean", df_clean[["id", "area_sqm", "price_per_sqm"]])
+        print(f"✅ Cleaned data saved to lake stage 'clean' ({lake.root / 'clean'})")
 else:
     print("❌ No valid properties after cleaning. Check 'size' and 'price' values.")
\ No newline at end of file
@@ -0,0 +1,305 @@
+# processing/near_dup.py
+"""
+Cross-source near-duplicate detection for listings (MinHash + LSH).
+
+The same house shows up on Meqasa, Jiji, GhanaPropertyCentre and WhatsApp
+with different URLs and slightly different titles, so URL / title-md5
+dedup misses it and market averages and the training set double count it.
+
+  1. shingles   word bigrams of the normalized title + description, location
+                words, a bedroom token and a ~5%-wide log-price bucket;
+  2. MinHash    NUM_PERM hash permutations -> signature (numpy, one pass);
+  3. LSH        BANDS bands of ROWS rows; listings sharing any band bucket are
+                candidates, so lookups never scan the whole table;
+  4. confirm    estimated Jaccard >= threshold AND bedrooms agree AND price
+                within `price_tolerance` (same currency) AND within
+                `geo_tolerance_m` when both have coordinates (otherwise the
+                location words must overlap);
+  5. cluster    confirmed matches join the oldest cluster; clusters that a new
+                listing bridges are merged into it. `cluster_id` is the ID of
+                the cluster's first listing.
+
+State lives in SQLite (data/near_dup.sqlite), so every ingest only hashes
+and looks up its new records:
+
+    index = NearDupIndex()
+    clusters = index.add(records)     # {listing id: cluster id}
+    df = drop_near_duplicates(df)     # one row per cluster
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from utils.normalizer import normalize_listing
+
+DEFAULT_DEDUP_PATH = Path(os.getenv("ASTA_NEAR_DUP_INDEX", "data/near_dup.sqlite"))
+NUM_PERM = 128
+BANDS = 32                      # 32 bands x 4 rows: ~50% chance to collide at J=0.42, ~98% at J=0.7
+ROWS = NUM_PERM // BANDS
+MAX_CANDIDATES = 200            # per lookup; generic "3 bedroom house" buckets get large
+_PRIME = np.uint64((1 << 32) + 15)
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 1 << 63, ROWS, dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.integers(0, 1 << 63, BANDS, dtype=np.uint64)
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "for", "in", "at", "of", "and", "with", "to", "on", "is",
+    "sale", "rent", "renting", "selling", "available", "now", "new", "property",
+}
+
+
+def _words(text: Optional[str]) -> List[str]:
+    return [w for w in WORD_RE.findall((text or "").lower()) if w not in STOPWORDS]
+
+
+def _coords(record: Dict[str, Any]):
+    lat = record.get("latitude", record.get("lat"))
+    lng = record.get("longitude", record.get("lng"))
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None, None
+    if math.isnan(lat) or math.isnan(lng) or (lat == 0 and lng == 0):
+        return None, None
+    return lat, lng
+
+
+def listing_features(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized fields used for shingling and confirmation."""
+    if "price_amount" not in record:
+        record = {**record, **normalize_listing(record)}
+    price = record.get("price_amount")
+    try:
+        price = float(price) if price not in (None, "") else None
+    except (TypeError, ValueError):
+        price = None
+    try:
+        beds = float(record.get("bedrooms"))
+        beds = None if math.isnan(beds) else int(beds)
+    except (TypeError, ValueError):
+        beds = None
+    lat, lng = _coords(record)
+    location = record.get("location") or record.get("location_clean") or record.get("address")
+    return {
+        "price": price if price and price > 0 else None,
+        "currency": record.get("currency") or None,
+        "beds": beds,
+        "lat": lat,
+        "lng": lng,
+        "loc": " ".join(sorted(set(_words(location)))),
+        "text": _words(f"{record.get('title') or ''} {(record.get('description') or '')[:1000]}"),
+    }
+
+
+def shingles(features: Dict[str, Any]) -> Set[str]:
+    words = features["text"][:200]
+    out = {f"{a} {b}" for a, b in zip(words, words[1:])} or set(words)
+    out.update(f"loc:{w}" for w in features["loc"].split())
+    if features["beds"] is not None:
+        out.add(f"beds:{features['beds']}")
+    if features["price"]:
+        out.add(f"price:{features['currency']}:{round(math.log(features['price']) * 20)}")
+    return out
+
+
+def minhash(tokens: Iterable[str]) -> np.ndarray:
+    hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64)
+    if not len(hashes):
+        return np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """One 64-bit bucket key per band (multiply-xor hash of its ROWS values, salted by band)."""
+    rows = signature.reshape(BANDS, ROWS).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        keys = (rows * _BAND_MIX).sum(axis=1) ^ _BAND_SALT
+    return keys.view(np.int64).tolist()
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+class NearDupIndex:
+    def __init__(self, path: Optional[Path] = DEFAULT_DEDUP_PATH, threshold: float = 0.5,
+                 strict_threshold: float = 0.8, price_tolerance: float = 0.10,
+                 geo_tolerance_m: float = 300.0):
+        """`path=None` keeps the index in memory (one-off dedup of a DataFrame)."""
+        self.threshold = threshold
+        self.strict_threshold = strict_threshold
+        self.price_tolerance = price_tolerance
+        self.geo_tolerance_m = geo_tolerance_m
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path) if path else ":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                "rid INTEGER PRIMARY KEY, id TEXT UNIQUE, source TEXT, sig BLOB, price REAL, currency TEXT, beds INTEGER, "
+                "lat REAL, lng REAL, loc TEXT, cluster_id TEXT, added REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS listings_cluster ON listings (cluster_id)")
+            # BANDS rows per listing: integer-only and clustered by key keeps this table compact
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key INTEGER, rid INTEGER, PRIMARY KEY (key, rid)) WITHOUT ROWID"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS clusters (cluster_id TEXT PRIMARY KEY, created REAL)")
+            self._db.commit()
+
+    # --- CONFIRMATION ---
+
+    def is_match(self, a: Dict[str, Any], b: Dict[str, Any], similarity: float) -> bool:
+        if similarity < self.threshold:
+            return False
+        if a["beds"] is not None and b["beds"] is not None and a["beds"] != b["beds"]:
+            return False
+        if a["price"] and b["price"]:
+            if a["currency"] and b["currency"] and a["currency"] != b["currency"]:
+                return False
+            if abs(a["price"] - b["price"]) / max(a["price"], b["price"]) > self.price_tolerance:
+                return False
+        elif similarity < self.strict_threshold:
+            return False  # no price to confirm with: ask for near-identical text
+        if a["lat"] is not None and b["lat"] is not None:
+            return haversine_m(a["lat"], a["lng"], b["lat"], b["lng"]) <= self.geo_tolerance_m
+        if a["loc"] and b["loc"]:
+            return bool(set(a["loc"].split()) & set(b["loc"].split()))
+        return True
+
+    # --- INDEXING ---
+
+    def add(self, records: Iterable[Dict[str, Any]], source: Optional[str] = None) -> Dict[str, str]:
+        """Indexes records (re-adding an ID refreshes it) and returns {id: cluster_id}."""
+        out = {}
+        with self._lock:
+            for record in records:
+                lid = record.get("id") or record.get("url")
+                if lid:
+                    out[lid] = self._add_one(str(lid), record, source or record.get("source") or "")
+            self._db.commit()
+        return out
+
+    def _add_one(self, lid: str, record: Dict[str, Any], source: str) -> str:
+        features = listing_features(record)
+        sig = minhash(shingles(features))
+        keys = band_keys(sig)
+        now = time.time()
+
+        existing = self._db.execute("SELECT rid, sig, cluster_id FROM listings WHERE id = ?", (lid,)).fetchone()
+        if existing and existing[1] == sig.tobytes():
+            return existing[2]
+
+        candidates = self._db.execute(
+            "SELECT DISTINCT l.rid, l.sig, l.price, l.currency, l.beds, l.lat, l.lng, l.loc, l.cluster_id "
+            f"FROM buckets b JOIN listings l ON l.rid = b.rid WHERE b.key IN ({','.join('?' * len(keys))}) "
+            "AND b.rid != ? LIMIT ?",
+            (*keys, existing[0] if existing else -1, MAX_CANDIDATES),
+        ).fetchall()
+        matched = set()
+        if candidates:
+            sigs = np.frombuffer(b"".join(c[1] for c in candidates), dtype=np.uint32).reshape(-1, NUM_PERM)
+            similarities = (sigs == sig).mean(axis=1)
+            for (_, _, price, currency, beds, lat, lng, loc, cluster), similarity in zip(candidates, similarities):
+                if similarity < self.threshold:
+                    continue
+                other = {"price": price, "currency": currency, "beds": beds, "lat": lat, "lng": lng, "loc": loc}
+                if self.is_match(features, other, float(similarity)):
+                    matched.add(cluster)
+
+        if existing:
+            matched.add(existing[2])
+            old_keys = band_keys(np.frombuffer(existing[1], dtype=np.uint32))
+            self._db.executemany("DELETE FROM buckets WHERE key = ? AND rid = ?", [(k, existing[0]) for k in old_keys])
+        cluster_id = self._merge(matched) if matched else lid
+        if not matched:
+            self._db.execute("INSERT OR IGNORE INTO clusters (cluster_id, created) VALUES (?, ?)", (lid, now))
+
+        values = (source, sig.tobytes(), features["price"], features["currency"], features["beds"],
+                  features["lat"], features["lng"], features["loc"], cluster_id)
+        if existing:
+            rid = existing[0]
+            self._db.execute(
+                "UPDATE listings SET source = ?, sig = ?, price = ?, currency = ?, beds = ?, lat = ?, lng = ?, "
+                "loc = ?, cluster_id = ? WHERE rid = ?", (*values, rid),
+            )
+        else:
+            rid = self._db.execute(
+                "INSERT INTO listings (source, sig, price, currency, beds, lat, lng, loc, cluster_id, id, added) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (*values, lid, now),
+            ).lastrowid
+        self._db.executemany("INSERT OR IGNORE INTO buckets (key, rid) VALUES (?, ?)", [(k, rid) for k in keys])
+        return cluster_id
+
+    def _merge(self, cluster_ids: Set[str]) -> str:
+        """Keeps the oldest cluster and moves the members of the others into it."""
+        rows = self._db.execute(
+            f"SELECT cluster_id, created FROM clusters WHERE cluster_id IN ({','.join('?' * len(cluster_ids))})",
+            tuple(cluster_ids),
+        ).fetchall()
+        keep = min(rows, key=lambda r: (r[1], r[0]))[0] if rows else min(cluster_ids)
+        absorbed = [c for c in cluster_ids if c != keep]
+        if absorbed:
+            marks = ",".join("?" * len(absorbed))
+            self._db.execute(f"UPDATE listings SET cluster_id = ? WHERE cluster_id IN ({marks})", (keep, *absorbed))
+            self._db.execute(f"DELETE FROM clusters WHERE cluster_id IN ({marks})", absorbed)
+        return keep
+
+    # --- READS ---
+
+    def cluster_of(self, listing_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT cluster_id FROM listings WHERE id = ?", (listing_id,)).fetchone()
+        return row[0] if row else None
+
+    def cluster_members(self, cluster_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, source, price, currency FROM listings WHERE cluster_id = ? ORDER BY added", (cluster_id,)
+            ).fetchall()
+        return [{"id": r[0], "source": r[1], "price": r[2], "currency": r[3]} for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            listings = self._db.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+            clusters = self._db.execute("SELECT COUNT(DISTINCT cluster_id) FROM listings").fetchone()[0]
+        return {"listings": listings, "clusters": clusters, "duplicates": listings - clusters}
+
+
+def assign_clusters(df, index: Optional[NearDupIndex] = None, id_col: str = "id"):
+    """Returns a copy of `df` with a `cluster_id` column (in-memory index unless one is given)."""
+    index = index or NearDupIndex(path=None)
+    df = df.copy()
+    records = df.to_dict("records")
+    for i, record in enumerate(records):
+        value = record.get(id_col)
+        missing = value is None or (isinstance(value, float) and math.isnan(value))
+        record["id"] = f"row:{i}" if missing else str(value)
+    clusters = index.add(records)
+    df["cluster_id"] = [clusters[r["id"]] for r in records]
+    return df
+
+
+def drop_near_duplicates(df, index: Optional[NearDupIndex] = None, id_col: str = "id"):
+    """One row per near-duplicate cluster (the first seen), e.g. before training or averaging."""
+    clustered = assign_clusters(df, index, id_col)
+    deduped = clustered.drop_duplicates("cluster_id")
+    print(f"🧬 Near-dup filter: {len(df)} -> {len(deduped)} listings ({len(df) - len(deduped)} duplicates)")
+    return deduped
@@ -0,0 +1,448 @@
+# processing/stream_ingest.py
+"""
+Streaming ingestion engine for scraper dumps.
+
+    parse -> normalize -> dedup -> embed (batched) -> upsert (batched)
+
+Each stage runs in its own thread with a bounded queue in between, so memory
+stays flat no matter how large the dump is and embedding overlaps with both
+parsing and uploading.
+
+Resumability: after every successful upsert batch the byte offset of the last
+record in that batch is written to a checkpoint file, and the batch's dedup
+keys are committed to an on-disk hash set. A crashed run restarts from that
+offset; anything after it is simply re-read. The checkpoint also records hashes
+of the start and the end of the part already read: a dump appended to in place
+resumes from its offset, while one regenerated under the same name (shorter, or
+different bytes before the offset) starts over, with an empty hash set (dedup
+spans one dump, not the job's history, so changed prices are upserted again). Records whose embedding
+failed hold the checkpoint at their position, so the next run retries them.
+
+Both dump flavours in this repo are supported:
+  * JSON Lines   (gpc_master_dump_2025*.jsonl)
+  * JSON arrays  (meqasa_master_dump.json, meqasa_ready_for_db.json, ...)
+"""
+
+import os
+import json
+import time
+import queue
+import codecs
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+CHECKPOINT_DIR = Path(os.getenv("ASTA_INGEST_STATE_DIR", "data/.ingest_state"))
+_SENTINEL = object()
+
+
+# ==========================================
+# 📄 PARSE
+# ==========================================
+
+def _detect_format(path: Path) -> str:
+    with open(path, "rb") as fh:
+        while True:
+            ch = fh.read(1)
+            if not ch:
+                return "jsonl"
+            if not ch.isspace():
+                return "array" if ch == b"[" else "jsonl"
+
+
+def _iter_jsonl(fh, offset: int) -> Iterator[Tuple[Optional[dict], int]]:
+    fh.seek(offset)
+    for line in fh:
+        offset += len(line)
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), offset
+        except ValueError:
+            yield None, offset
+
+
+def _iter_json_array(fh, offset: int, chunk_size: int = 1 << 16) -> Iterator[Tuple[Optional[dict], int]]:
+    """Incrementally decodes `[{...}, {...}]` without loading the whole file."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    fh.seek(offset)
+    buf, eof = "", False
+    while True:
+        stripped = buf.lstrip(" \t\r\n,[")
+        offset += len(buf) - len(stripped)  # separators are ASCII: chars == bytes
+        buf = stripped
+        if buf.startswith("]"):
+            return
+        try:
+            obj, end = decoder.raw_decode(buf)
+        except ValueError:
+            if eof:
+                return
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                eof = True
+                buf += utf8.decode(b"", final=True)
+            else:
+                buf += utf8.decode(chunk)
+            continue
+        offset += len(buf[:end].encode("utf-8"))
+        buf = buf[end:]
+        yield obj, offset
+
+
+def iter_dump(path, offset: int = 0) -> Iterator[Tuple[Optional[dict], int]]:
+    """
+    Yields (record, end_byte_offset) for a JSONL or JSON-array dump, starting at
+    `offset`. Unparseable JSONL lines yield (None, offset) so checkpoints still advance.
+    """
+    path = Path(path)
+    reader = _iter_json_array if _detect_format(path) == "array" else _iter_jsonl
+    with open(path, "rb") as fh:
+        yield from reader(fh, offset)
+
+
+# ==========================================
+# 🧮 DEDUP (on-disk hash set)
+# ==========================================
+
+def key_hash(key: str) -> int:
+    """64-bit non-zero fingerprint of a dedup key (0 marks an empty slot)."""
+    h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return h or 1
+
+
+class DiskHashSet:
+    """
+    Open-addressing set of 64-bit fingerprints stored in a memory-mapped file.
+    8 bytes per slot, kept at <= 50% load, so a million URLs cost ~16 MB of disk
+    and only the pages touched are resident.
+    """
+
+    def __init__(self, path: Path, capacity: int = 1 << 16):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        if self.path.exists() and self.path.stat().st_size:
+            self._table = np.memmap(self.path, dtype=np.uint64, mode="r+")
+            self.count = int(np.count_nonzero(self._table))
+        else:
+            self._table = self._create(self.path, capacity)
+            self.count = 0
+
+    @staticmethod
+    def _create(path: Path, capacity: int) -> np.memmap:
+        table = np.memmap(path, dtype=np.uint64, mode="w+", shape=(capacity,))
+        table[:] = 0
+        return table
+
+    def _slot(self, table, h: int) -> int:
+        mask = len(table) - 1
+        i = h & mask
+        while True:
+            cur = int(table[i])
+            if cur == 0 or cur == h:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, key: str) -> bool:
+        h = key_hash(key)
+        with self._lock:
+            return int(self._table[self._slot(self._table, h)]) == h
+
+    def add_many(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                h = key_hash(key)
+                i = self._slot(self._table, h)
+                if int(self._table[i]) == 0:
+                    self._table[i] = h
+                    self.count += 1
+                    if self.count * 2 > len(self._table):
+                        self._grow()
+            self._table.flush()
+
+    def clear(self):
+        with self._lock:
+            capacity = len(self._table)
+            del self._table
+            self._table = self._create(self.path, capacity)
+            self.count = 0
+
+    def _grow(self):
+        tmp = self.path.with_suffix(".grow")
+        bigger = self._create(tmp, len(self._table) * 2)
+        for h in self._table[self._table != 0]:
+            bigger[self._slot(bigger, int(h))] = h
+        bigger.flush()
+        del self._table
+        os.replace(tmp, self.path)
+        self._table = np.memmap(self.path, dtype=np.uint64, mode="r+")
+
+
+# ==========================================
+# 💾 CHECKPOINTS
+# ==========================================
+
+def dump_identity(path, offset: int, window: int = 1 << 16) -> Optional[Dict[str, Any]]:
+    """
+    Hashes of the first and the last `window` bytes before `offset` - the part of
+    the dump a checkpoint has consumed. Appending leaves them unchanged; rewriting
+    the dump changes them (or leaves it shorter than `offset`: None).
+    """
+    def digest(fh, start: int, end: int) -> str:
+        fh.seek(start)
+        return hashlib.blake2b(fh.read(end - start), digest_size=16).hexdigest()
+
+    if Path(path).stat().st_size < offset:
+        return None
+    with open(path, "rb") as fh:
+        return {"offset": offset, "head": digest(fh, 0, min(window, offset)),
+                "tail": digest(fh, max(0, offset - window), offset)}
+
+
+class Checkpoint:
+    """
+    Atomic JSON checkpoint: {"offset": int, "upserted": int, "dump": identity, ...}
+    per (job, dump). State whose consumed prefix no longer matches the dump
+    (see dump_identity) is discarded on load (`changed` is then True).
+    """
+
+    def __init__(self, job: str, dump_path, state_dir: Path = CHECKPOINT_DIR):
+        self.stem = f"{job}__{Path(dump_path).name.replace('.', '_')}"
+        self.dump_path = Path(dump_path)
+        self.path = Path(state_dir) / f"{self.stem}.json"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.state = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.changed = bool(self.state) and self.state.get("dump") != dump_identity(self.dump_path, self.offset)
+        if self.changed or not self.state:
+            self.reset()
+
+    @property
+    def offset(self) -> int:
+        return int(self.state.get("offset", 0))
+
+    def advance(self, offset: int, upserted: int):
+        self.state["offset"] = offset
+        self.state["dump"] = dump_identity(self.dump_path, offset)
+        self.state["upserted"] = self.state.get("upserted", 0) + upserted
+        self.state["updated_at"] = time.time()
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state))
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        self.state = {"offset": 0, "upserted": 0, "dump": dump_identity(self.dump_path, 0)}
+        self.path.unlink(missing_ok=True)
+
+
+# ==========================================
+# 🚀 PIPELINE
+# ==========================================
+
+class StreamingIngestor:
+    """
+    Wires the five stages together. Callables:
+        normalize(raw)        -> record dict or None (drop)
+        key(record)           -> dedup key string
+        embed(list[record])   -> list of vectors (None drops that record)
+        upsert(list[record])  -> raises on failure
+    `embed` is optional (records pass through unchanged).
+    """
+
+    def __init__(self, job: str, normalize: Callable[[dict], Optional[dict]],
+                 key: Callable[[dict], str], upsert: Callable[[List[dict]], Any],
+                 embed: Optional[Callable[[List[dict]], List[Optional[list]]]] = None,
+                 embed_batch: int = 32, upsert_batch: int = 100, queue_size: int = 8,
+                 upsert_retries: int = 3, state_dir: Path = CHECKPOINT_DIR):
+        self.job = job
+        self.normalize = normalize
+        self.key = key
+        self.embed = embed
+        self.upsert = upsert
+        self.embed_batch = embed_batch
+        self.upsert_batch = upsert_batch
+        self.queue_size = queue_size
+        self.upsert_retries = upsert_retries
+        self.state_dir = Path(state_dir)
+        self.seen: Optional[DiskHashSet] = None   # per dump; opened by run()
+        self.stats = {"read": 0, "bad": 0, "dropped": 0, "duplicates": 0, "embed_failed": 0, "upserted": 0}
+
+    def run(self, dump_path, restart: bool = False) -> Dict[str, int]:
+        checkpoint = Checkpoint(self.job, dump_path, self.state_dir)
+        self.seen = DiskHashSet(self.state_dir / f"{checkpoint.stem}__seen.u64")
+        if checkpoint.changed:
+            print(f"🔄 {Path(dump_path).name} changed since the last checkpoint; starting it over")
+        if restart or checkpoint.changed:
+            checkpoint.reset()
+            self.seen.clear()
+        start = checkpoint.offset
+        if start:
+            print(f"⏩ Resuming {Path(dump_path).name} from byte {start:,} ({checkpoint.state.get('upserted', 0)} already upserted)")
+
+        parsed_q: queue.Queue = queue.Queue(self.queue_size * self.embed_batch)
+        embed_q: queue.Queue = queue.Queue(self.queue_size)
+        upsert_q: queue.Queue = queue.Queue(self.queue_size)
+        # Keys dispatched but not yet committed to `seen`; shared by dedup and upsert.
+        in_flight, in_flight_lock = set(), threading.Lock()
+        # Start offset of the first record whose embedding failed: the checkpoint never passes it.
+        hold = {"offset": None}
+        errors: List[BaseException] = []
+        stop = threading.Event()
+
+        def put(q, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def take(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            return _SENTINEL
+
+        def guarded(fn):
+            def runner():
+                try:
+                    fn()
+                except BaseException as e:  # surface to the caller, unblock everyone
+                    errors.append(e)
+                    stop.set()
+            return runner
+
+        def live_count(batch) -> int:
+            return sum(1 for record, _, _ in batch if record is not None)
+
+        def parse_stage():
+            for raw, offset in iter_dump(dump_path, start):
+                self.stats["read"] += 1
+                if raw is None:
+                    self.stats["bad"] += 1
+                if not put(parsed_q, (raw, offset)):
+                    return
+            put(parsed_q, _SENTINEL)
+
+        def normalize_dedup_stage():
+            # Dropped rows travel on as (None, None, offset) so checkpoints still advance.
+            batch = []
+            while True:
+                item = take(parsed_q)
+                if item is _SENTINEL:
+                    break
+                raw, offset = item
+                record = self.normalize(raw) if raw is not None else None
+                if record is None:
+                    if raw is not None:
+                        self.stats["dropped"] += 1
+                    batch.append((None, None, offset))
+                else:
+                    key = self.key(record)
+                    with in_flight_lock:
+                        duplicate = key in in_flight or key in self.seen
+                        if not duplicate:
+                            in_flight.add(key)
+                    if duplicate:
+                        self.stats["duplicates"] += 1
+                        batch.append((None, None, offset))
+                    else:
+                        batch.append((record, key, offset))
+                if live_count(batch) >= self.embed_batch:
+                    if not put(embed_q, batch):
+                        return
+                    batch = []
+            if batch:
+                put(embed_q, batch)
+            put(embed_q, _SENTINEL)
+
+        def embed_stage():
+            pending, previous_end = [], start
+            while True:
+                batch = take(embed_q)
+                if batch is _SENTINEL:
+                    break
+                live = [record for record, _, _ in batch if record is not None]
+                vectors = self.embed(live) if self.embed and live else None
+                failed = set()
+                for record, vec in zip(live, vectors or []):
+                    if vec is None:
+                        failed.add(id(record))
+                    record["embedding"] = vec
+                self.stats["embed_failed"] += len(failed)
+                # Failed rows keep their key (released from in_flight, never added to `seen`)
+                # and hold the checkpoint at their start, so the next run re-reads them.
+                for r, _, o in batch:
+                    if r is not None and id(r) in failed and hold["offset"] is None:
+                        hold["offset"] = previous_end
+                    previous_end = o
+                if failed:
+                    batch = [(None, k, o) if r is not None and id(r) in failed else (r, k, o)
+                             for r, k, o in batch]
+                pending.extend(batch)
+                if live_count(pending) >= self.upsert_batch:
+                    if not put(upsert_q, pending):
+                        return
+                    pending = []
+            if pending:
+                put(upsert_q, pending)
+            put(upsert_q, _SENTINEL)
+
+        def upsert_stage():
+            while True:
+                batch = take(upsert_q)
+                if batch is _SENTINEL:
+                    break
+                records = [r for r, _, _ in batch if r is not None]
+                if records:
+                    for attempt in range(1, self.upsert_retries + 1):
+                        try:
+                            self.upsert(records)
+                            break
+                        except Exception as e:
+                            if attempt == self.upsert_retries:
+                                raise
+                            print(f"   ⚠️ Upsert failed (attempt {attempt}): {str(e)[:120]}")
+                            time.sleep(2 ** attempt)
+                # Only now are these keys durable: commit them together with the offset.
+                keys = [k for r, k, _ in batch if r is not None]
+                self.seen.add_many(keys)
+                with in_flight_lock:
+                    in_flight.difference_update(k for _, k, _ in batch if k)
+                offset = batch[-1][2] if hold["offset"] is None else min(batch[-1][2], hold["offset"])
+                checkpoint.advance(offset, len(records))
+                self.stats["upserted"] += len(records)
+                if records:
+                    print(f"   ✅ Upserted {self.stats['upserted']:,} records (byte {offset:,})")
+
+        threads = [threading.Thread(target=guarded(fn), daemon=True, name=f"{self.job}-{fn.__name__}")
+                   for fn in (parse_stage, normalize_dedup_stage, embed_stage, upsert_stage)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+        if hold["offset"] is not None:
+            print(f"⚠️ {self.stats['embed_failed']} records failed to embed; checkpoint held at byte "
+                  f"{hold['offset']:,} so the next run retries them")
+        return self.stats
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Dry run: stream a dump end-to-end without writing anywhere.
+    for dump in sys.argv[1:]:
+        total = bad = 0
+        for record, _ in iter_dump(dump):
+            total += 1
+            bad += record is None
+        print(f"📂 {dump}: {total:,} records ({bad} unparseable)")
@@ -13,6 +13,9 @@ import numpy as np
 from supabase import create_client
 import xgboost as xgb
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from processing.near_dup import drop_near_duplicates
+
 def fetch_supabase_data():
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
@@ -126,7 +129,15 @@ def run_full_pipeline(scraped_df=None):
     else:
         combined_df = supabase_df
 
-    # 4. Prepare features
+    # 4. Drop cross-source near-duplicates (same house on several portals) before training.
+    #    The concat leaves NaN and scraped strings in the numeric columns: coerce them here,
+    #    but impute only after the dedup so a filled-in value never makes two listings match.
+    for col in ['bedrooms', 'bathrooms', 'area_sqm', 'latitude', 'longitude', 'price']:
+        if col in combined_df:
+            combined_df[col] = pd.to_numeric(combined_df[col], errors='coerce')
+    combined_df = drop_near_duplicates(combined_df)
+
+    # 5. Prepare features
     combined_df['area_sqm'] = combined_df['area_sqm'].fillna(combined_df['area_sqm'].median())
     combined_df['bedrooms'] = combined_df['bedrooms'].fillna(2)
     combined_df['bathrooms'] = combined_df['bathrooms'].fillna(1)
@@ -135,29 +146,29 @@ def run_full_pipeline(scraped_df=None):
     X = combined_df[features].fillna(0)
     y = np.log1p(combined_df['price'])
 
-    # 5. Train model
+    # 6. Train model
     model = xgb.XGBRegressor(n_estimators=200, learning_rate=0.1, max_depth=6, random_state=42)
     model.fit(X, y)
 
-    # 6. Predict on Supabase data only
+    # 7. Predict on Supabase data only
     X_supabase = supabase_df[features].fillna(0)
     supabase_df['predicted_price'] = np.expm1(model.predict(X_supabase))
 
-    # 7. Compute price_diff_pct safely
+    # 8. Compute price_diff_pct safely
     supabase_df['price_diff_pct'] = np.where(
         supabase_df['price'] != 0,
         (supabase_df['predicted_price'] - supabase_df['price']) / supabase_df['price'],
         0.0
     )
 
-    # 8. Compute neighborhood score (0–100)
+    # 9. Compute neighborhood score (0–100)
     supabase_df['neighborhood_score'] = (
         np.clip(supabase_df['bedrooms'] / 5, 0, 1) * 30 +
         np.clip(supabase_df['area_sqm'] / 200, 0, 1) * 40 +
         np.clip(supabase_df['price_diff_pct'] + 1, 0, 1) * 30
     ).round(1)
 
-    # 9. Update Supabase
+    # 10. Update Supabase
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     if not url or not key:
@@ -181,9 +192,9 @@ def run_full_pipeline(scraped_df=None):
 
     print(f"✅ Updated {updated} properties in Supabase")
 
-    # 10. Save to historical table for time-series analysis
+    # 11. Save to historical table for time-series analysis
     save_insights_to_history(supabase_df)
 
-    # 11. Return for GCS archival
+    # 12. Return for GCS archival
     return supabase_df
 
@@ -6,12 +6,10 @@ Saves raw and enriched data to Google Cloud Storage (GCS) for AI insights.
 
 import os
 import sys
-import json
 import pandas as pd
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
-from google.cloud import storage
 from supabase import create_client
 
 # Load environment variables
@@ -19,23 +17,24 @@ load_dotenv(dotenv_path=Path('.') / '.env')
 
 # Add current directory to Python path
 sys.path.append(str(Path(__file__).parent))
+from storage.archive_writer import archive_records, backend_from_uri
+from pipeline.dag import DAG
 
 # GCS Configuration
 GCS_BUCKET_NAME = "asta-insights-data-certain-voyager"
 
-def upload_to_gcs(bucket_name, data, destination_blob_name):
-    """Upload JSON-serializable data to GCS as JSON."""
-    try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(destination_blob_name)
-        blob.upload_from_string(
-            json.dumps(data, default=str, ensure_ascii=False, indent=2),
-            content_type="application/json; charset=utf-8"
-        )
-        print(f"✅ Uploaded to gs://{bucket_name}/{destination_blob_name}")
-    except Exception as e:
-        print(f"⚠️ Failed to upload to GCS: {e}")
+def upload_to_gcs(bucket_name, data, prefix, run_id):
+    """
+    Archive JSON-serializable records to GCS as gzip NDJSON shards + manifest
+    (gs://<bucket>/<prefix>/<run_id>-part-*.ndjson.gz). Waits for the manifest and
+    raises if a shard failed, so the archive_* DAG stage fails and reruns on resume
+    instead of being memoized before anything is uploaded.
+    """
+    backend = backend_from_uri(os.getenv("ASTA_ARCHIVE_URI") or f"gs://{bucket_name}")
+    manifest = archive_records(prefix, data, run_id=run_id, backend=backend, wait_for_upload=True)
+    if manifest["failed_shards"]:
+        raise RuntimeError(f"{manifest['failed_shards']}/{len(manifest['shards'])} archive shard(s) "
+                           f"failed to upload to {prefix}")
 
 def compute_index():
     """
@@ -118,7 +117,12 @@ def compute_index():
     except Exception as e:
         print(f"💥 Error computing index: {e}")
 
-def main():
+def main(run_id=None, force=()):
+    """
+    Runs the pipeline as a DAG (pipeline/dag.py): listings and YouTube scrape
+    concurrently, each stage's output is memoized, and a rerun with the same
+    run_id (default: today) resumes after the last stage that succeeded.
+    """
     try:
         print("🚀 Starting real estate intelligence pipeline (local mode)...")
         
@@ -129,53 +133,48 @@ def main():
         
         # Generate timestamp for versioning
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        
-        # === 1. Scrape Ghana Listings ===
-        listings_df = scrape_all()
-        print(f"✅ Scraped {len(listings_df)} Ghana listings")
-        
-        if not listings_df.empty:
-            listings_json = listings_df.to_dict(orient="records")
-            upload_to_gcs(
-                GCS_BUCKET_NAME,
-                listings_json,
-                f"raw/listings_{timestamp}.json"
-            )
-        
-        # === 2. Scrape YouTube Insights ===
-        youtube_df = fetch_youtube_insights()
-        print(f"✅ Fetched {len(youtube_df)} YouTube videos")
-        
-        if not youtube_df.empty:
-            youtube_json = youtube_df.to_dict(orient="records")
-            upload_to_gcs(
-                GCS_BUCKET_NAME,
-                youtube_json,
-                f"raw/youtube_{timestamp}.json"
-            )
-        
-        # === 3. Run Full Pipeline & Get Enriched Data ===
-        enriched_df = run_full_pipeline(scraped_df=listings_df)
-        
-        if enriched_df is not None and not enriched_df.empty:
+
+        def scrape_listings():
+            listings_df = scrape_all()
+            print(f"✅ Scraped {len(listings_df)} Ghana listings")
+            return listings_df
+
+        def scrape_youtube():
+            youtube_df = fetch_youtube_insights()
+            print(f"✅ Fetched {len(youtube_df)} YouTube videos")
+            return youtube_df
+
+        def archive(df, prefix):
+            if df is not None and not df.empty:
+                upload_to_gcs(GCS_BUCKET_NAME, df.to_dict(orient="records"), prefix, timestamp)
+
+        def insights(enriched):
             # Select key insight columns
             insight_cols = [
                 "id", "price", "predicted_price", "price_diff_pct",
                 "neighborhood_score", "latitude", "longitude", "address"
             ]
-            cols_to_save = [c for c in insight_cols if c in enriched_df.columns]
-            insights_df = enriched_df[cols_to_save].copy()
-            
-            insights_json = insights_df.to_dict(orient="records")
-            upload_to_gcs(
-                GCS_BUCKET_NAME,
-                insights_json,
-                f"enriched/insights_{timestamp}.json"
-            )
-        
-        # === 4. Compute Ghana Real Estate Index (BETA) ===
-        compute_index()
-        
+            if enriched is None or enriched.empty:
+                return enriched
+            return enriched[[c for c in insight_cols if c in enriched.columns]].copy()
+
+        dag = DAG("nightly")
+        # === 1 + 2. Scrape Ghana Listings / YouTube Insights (independent: run concurrently) ===
+        dag.add("listings", scrape_listings)
+        dag.add("youtube", scrape_youtube)
+        dag.add("archive_listings", lambda listings: archive(listings, "raw/listings"), inputs=["listings"])
+        dag.add("archive_youtube", lambda youtube: archive(youtube, "raw/youtube"), inputs=["youtube"])
+        # === 3. Run Full Pipeline & Get Enriched Data ===
+        dag.add("enriched", lambda listings: run_full_pipeline(scraped_df=listings), inputs=["listings"])
+        dag.add("insights", insights, inputs=["enriched"])
+        dag.add("archive_insights", lambda insights: archive(insights, "enriched/insights"), inputs=["insights"])
+        # === 4. Compute Ghana Real Estate Index (BETA) - reads the history step 3 wrote ===
+        dag.add("index", lambda enriched: compute_index(), inputs=["enriched"], cache=False)
+
+        results = dag.run(run_id=run_id, force=force)
+        if not DAG.succeeded(results):
+            failed = [r.stage for r in results.values() if r.status == "failed"]
+            raise RuntimeError(f"stage(s) {failed} failed - rerun to resume from there")
         print("✅ Pipeline completed successfully with GCS backup!")
         
     except Exception as e:
@@ -183,4 +182,9 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="ASTA nightly pipeline")
+    parser.add_argument("--run-id", help="Resume this run (default: today's date)")
+    parser.add_argument("--force", nargs="*", default=(), help="Stages to re-run even if memoized")
+    args = parser.parse_args()
+    main(run_id=args.run_id, force=args.force)
\ No newline at end of file
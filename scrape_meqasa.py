@@ -16,7 +16,6 @@ from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 import time
-import re
 from typing import List, Dict, Any
 
 # --- Crawl4AI ---
@@ -34,11 +33,16 @@ load_dotenv(dotenv_path=Path('.') / '.env')
 
 # Add current directory to Python path
 sys.path.append(str(Path(__file__).parent))
+from utils.normalizer import normalize_listing
+from storage.archive_writer import GCSBackend, archive_records, backend_from_uri, drain as drain_archive_uploads
 
 # --- GCS Configuration ---
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "asta-insights-data-certain-voyager")
 storage_client = storage.Client()
-gcs_bucket = storage_client.bucket(GCS_BUCKET_NAME)
+# Raw dumps go out as gzip NDJSON shards on a background upload pool (storage/archive_writer.py);
+# ASTA_ARCHIVE_URI=/some/dir archives locally instead.
+archive_backend = (backend_from_uri(os.environ["ASTA_ARCHIVE_URI"]) if os.getenv("ASTA_ARCHIVE_URI")
+                   else GCSBackend(GCS_BUCKET_NAME, client=storage_client))
 
 # --- Google Cloud Translation API Client ---
 # Uses Application Default Credentials (ADC)
@@ -122,17 +126,14 @@ PROPERTY_SCHEMA_MEQASA = {
 }
 
 def save_raw_data_to_gcs(data: List[Dict[str, Any]], listing_type: str):
-    """Saves raw scraped data to GCS."""
+    """Queues raw scraped data for archival to GCS (gzip NDJSON shards + manifest)."""
     if not data:
         print(f"  📝 Skipping GCS save for {SITE_NAME} ({listing_type}) - No data.")
         return
 
     try:
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        blob_name = f"raw/property_listings/{SITE_NAME}/{listing_type}/{timestamp}.json"
-        blob = gcs_bucket.blob(blob_name)
-        blob.upload_from_string(json.dumps(data, indent=2, ensure_ascii=False), content_type='application/json; charset=utf-8')
-        print(f"  ✅ Raw data saved to GCS: gs://{GCS_BUCKET_NAME}/{blob_name}")
+        # Returns immediately: shards upload in the background while the next crawl runs
+        archive_records(f"raw/property_listings/{SITE_NAME}/{listing_type}", data, backend=archive_backend)
     except Exception as e:
         print(f"  ⚠️ Failed to save raw data for {SITE_NAME} ({listing_type}) to GCS: {e}")
 
@@ -147,17 +148,16 @@ async def scrape_listings_meqasa(url: str, listing_type: str, max_pages: int = 3
     current_page = 1
     next_page_url = url
 
+    # Strategy + run config are page-independent: build them once, not per page
+    extraction_strategy = JsonCssExtractionStrategy(PROPERTY_SCHEMA_MEQASA)
+    config = DEFAULT_CRAWLER_CONFIG.clone(extraction_strategy=extraction_strategy)
+
     # Use a single browser instance for efficiency across pages
     async with AsyncWebCrawler(config=DEFAULT_BROWSER_CONFIG) as crawler:
         while current_page <= max_pages and next_page_url:
             print(f"    📄 Page {current_page}/{max_pages}: {next_page_url[:50]}...")
             
             try:
-                # --- Configure CrawlerRunConfig for this page ---
-                # Use JsonCssExtractionStrategy with the defined schema for Meqasa
-                extraction_strategy = JsonCssExtractionStrategy(PROPERTY_SCHEMA_MEQASA)
-                config = DEFAULT_CRAWLER_CONFIG.clone(extraction_strategy=extraction_strategy)
-                
                 # --- Run the crawl ---
                 result = await crawler.arun(url=next_page_url, config=config)
                 
@@ -173,26 +173,14 @@ async def scrape_listings_meqasa(url: str, listing_type: str, max_pages: int = 3
                                 # Add metadata like page number, scrape time, source
                                 for prop in extracted_data:
                                     # Post-process raw text fields to extract numerical values
-                                    # Price
-                                    price_text = prop.get("price_text", "")
-                                    if price_text:
-                                        # Extract numeric part (remove currency symbols, commas)
-                                        price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-                                        if price_match:
-                                            try:
-                                                prop['price_numeric'] = float(price_match.group(0))
-                                            except ValueError:
-                                                prop['price_numeric'] = None
-                                        else:
-                                            prop['price_numeric'] = None
-                                    # Bedrooms
-                                    bedrooms_text = prop.get("bedrooms_text", "")
-                                    if bedrooms_text and bedrooms_text.isdigit():
-                                        prop['bedrooms'] = int(bedrooms_text)
-                                    # Bathrooms/Shower
-                                    bathrooms_text = prop.get("bathrooms_text", "")
-                                    if bathrooms_text and bathrooms_text.isdigit():
-                                        prop['bathrooms'] = int(bathrooms_text)
+                                    fields = normalize_listing(prop)
+                                    prop['price_numeric'] = fields['price_amount']
+                                    prop['currency'] = fields['currency']
+                                    prop['price_period'] = fields['price_period']
+                                    if fields['bedrooms'] is not None:
+                                        prop['bedrooms'] = fields['bedrooms']
+                                    if fields['bathrooms'] is not None:
+                                        prop['bathrooms'] = fields['bathrooms']
                                     # Garages
                                     garages_text = prop.get("garages_text", "")
                                     if garages_text and garages_text.isdigit():
@@ -269,6 +257,7 @@ async def main():
     save_raw_data_to_gcs(rent_properties, "for_rent")
     
     total_properties = len(sale_properties) + len(rent_properties)
+    drain_archive_uploads()  # wait for the background shard uploads + manifests
     print(f"\n✅ Scraping completed for {SITE_NAME}. Total properties scraped: {total_properties}")
 
 if __name__ == "__main__":
@@ -0,0 +1,273 @@
+# scrapers/browser_pool.py
+"""
+Long-lived Playwright browser shared by the scrapers.
+
+Launching Chromium per URL (beta-testing/scrape_ghana_listings.py) or walking
+pages in one tab (gpc_full_dump.py) leaves runtime dominated by browser
+startup. The pool keeps one browser with N contexts x M pages open:
+
+    async with BrowserPool(contexts=2, pages_per_context=4) as pool:
+        async with pool.lease() as page:
+            await page.goto(url)
+
+  * a context is retired after `recycle_after` navigations (drops cookies,
+    cache and leaked memory) and replaced once its pages are back;
+  * images, fonts, media and analytics hosts are blocked by default;
+  * crashed/closed pages are replaced on lease, a dead browser is relaunched,
+    and `health_check()` probes idle pages (run periodically when
+    `health_interval` is set).
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+DEFAULT_BLOCKED_RESOURCES = ("image", "font", "media")
+DEFAULT_BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "facebook.net",
+    "facebook.com/tr", "hotjar.com", "clarity.ms", "googlesyndication.com", "adservice.google.com",
+)
+
+
+class _PooledContext:
+    def __init__(self, context, index: int):
+        self.context = context
+        self.index = index
+        self.navigations = 0
+        self.leased = 0
+        self.retiring = False
+        self.pages: List[Any] = []
+
+
+class BrowserPool:
+    def __init__(self, contexts: int = 2, pages_per_context: int = 4, recycle_after: int = 100,
+                 headless: bool = True, user_agent: str = DEFAULT_USER_AGENT,
+                 block_resources: Iterable[str] = DEFAULT_BLOCKED_RESOURCES,
+                 block_hosts: Iterable[str] = DEFAULT_BLOCKED_HOSTS,
+                 launch_args: Optional[List[str]] = None,
+                 on_new_page: Optional[Callable[[Any], Awaitable[None]]] = None,
+                 health_interval: Optional[float] = None):
+        self.n_contexts = contexts
+        self.pages_per_context = pages_per_context
+        self.recycle_after = recycle_after
+        self.headless = headless
+        self.user_agent = user_agent
+        self.block_resources = set(block_resources or ())
+        self.block_hosts = tuple(block_hosts or ())
+        self.launch_args = launch_args or ["--disable-blink-features=AutomationControlled", "--no-sandbox"]
+        self.on_new_page = on_new_page
+        self.health_interval = health_interval
+
+        self._playwright = None
+        self._browser = None
+        self._contexts: List[_PooledContext] = []
+        self._idle: "asyncio.Queue" = None
+        self._restart_lock = asyncio.Lock()
+        self._health_task = None
+        self._started_at = None
+        self.stats: Dict[str, int] = {
+            "leases": 0, "navigations": 0, "blocked_requests": 0,
+            "page_replacements": 0, "context_recycles": 0, "browser_restarts": 0,
+        }
+
+    @property
+    def size(self) -> int:
+        return self.n_contexts * self.pages_per_context
+
+    # --- LIFECYCLE ---
+
+    async def start(self):
+        from playwright.async_api import async_playwright
+        self._playwright = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        await self._launch()
+        self._started_at = time.monotonic()
+        if self.health_interval:
+            self._health_task = asyncio.create_task(self._health_loop())
+        print(f"🧭 Browser pool ready: {self.n_contexts} contexts x {self.pages_per_context} pages")
+        return self
+
+    async def close(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._browser:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _launch(self):
+        self._browser = await self._playwright.chromium.launch(headless=self.headless, args=self.launch_args)
+        self._contexts = []
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for i in range(self.n_contexts):
+            self._contexts.append(await self._new_context(i))
+
+    async def _new_context(self, index: int) -> _PooledContext:
+        context = await self._browser.new_context(
+            user_agent=self.user_agent, viewport={"width": 1366, "height": 900},
+        )
+        if self.block_resources or self.block_hosts:
+            await context.route("**/*", self._route)
+        pooled = _PooledContext(context, index)
+        for _ in range(self.pages_per_context):
+            page = await self._new_page(pooled)
+            self._idle.put_nowait((pooled, page))
+        return pooled
+
+    async def _new_page(self, pooled: _PooledContext):
+        page = await pooled.context.new_page()
+        page.on("crash", lambda p: setattr(p, "_asta_crashed", True))
+        if self.on_new_page:
+            await self.on_new_page(page)
+        pooled.pages.append(page)
+        return page
+
+    async def _route(self, route):
+        request = route.request
+        if request.resource_type in self.block_resources or self._blocked_host(request.url):
+            self.stats["blocked_requests"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _blocked_host(self, url: str) -> bool:
+        parsed = urlparse(url)
+        target = f"{parsed.netloc}{parsed.path}"
+        return any(host in target for host in self.block_hosts)
+
+    # --- LEASING ---
+
+    @asynccontextmanager
+    async def lease(self):
+        """Yields a ready page; it goes back to the pool (or is recycled) on exit."""
+        if not self._browser or not self._browser.is_connected():
+            await self._restart_browser()
+        while True:
+            pooled, page = await self._idle.get()
+            if not pooled.retiring and pooled in self._contexts:
+                break  # pages of a retiring context close with it
+        if page.is_closed() or getattr(page, "_asta_crashed", False):
+            page = await self._replace_page(pooled, page)
+        pooled.leased += 1
+        self.stats["leases"] += 1
+        try:
+            yield page
+        finally:
+            pooled.leased -= 1
+            pooled.navigations += 1
+            self.stats["navigations"] += 1
+            await self._release(pooled, page)
+
+    async def _release(self, pooled: _PooledContext, page):
+        if pooled not in self._contexts:
+            return  # browser was relaunched while this page was out
+        if pooled.navigations >= self.recycle_after:
+            pooled.retiring = True
+        if pooled.retiring:
+            if pooled.leased == 0:
+                await self._recycle_context(pooled)
+            return
+        if page.is_closed() or getattr(page, "_asta_crashed", False):
+            page = await self._replace_page(pooled, page)
+        self._idle.put_nowait((pooled, page))
+
+    async def _replace_page(self, pooled: _PooledContext, page):
+        self.stats["page_replacements"] += 1
+        if page in pooled.pages:
+            pooled.pages.remove(page)
+        try:
+            await page.close()
+        except Exception:
+            pass
+        return await self._new_page(pooled)
+
+    async def _recycle_context(self, pooled: _PooledContext):
+        """Closes a retired context and puts a fresh one (with fresh pages) in its slot."""
+        # Idle pages of this context are still queued; drain them first.
+        keep = []
+        while not self._idle.empty():
+            item = self._idle.get_nowait()
+            if item[0] is not pooled:
+                keep.append(item)
+        for item in keep:
+            self._idle.put_nowait(item)
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+        self.stats["context_recycles"] += 1
+        slot = self._contexts.index(pooled)
+        self._contexts[slot] = await self._new_context(pooled.index)
+
+    async def _restart_browser(self):
+        async with self._restart_lock:
+            if self._browser and self._browser.is_connected():
+                return
+            print("♻️ Browser pool: browser disconnected, relaunching...")
+            self.stats["browser_restarts"] += 1
+            await self._launch()
+
+    # --- HEALTH ---
+
+    async def health_check(self, timeout: float = 5.0) -> Dict[str, int]:
+        """Probes every idle page with a trivial evaluate(); replaces the ones that hang or fail."""
+        if not self._browser or not self._browser.is_connected():
+            await self._restart_browser()
+            return {"checked": 0, "replaced": 0}
+        items = []
+        while not self._idle.empty():
+            items.append(self._idle.get_nowait())
+        replaced = 0
+        for pooled, page in items:
+            try:
+                await asyncio.wait_for(page.evaluate("1"), timeout)
+            except Exception:
+                page = await self._replace_page(pooled, page)
+                replaced += 1
+            self._idle.put_nowait((pooled, page))
+        return {"checked": len(items), "replaced": replaced}
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                result = await self.health_check()
+                if result["replaced"]:
+                    print(f"🩺 Browser pool: replaced {result['replaced']} unhealthy page(s)")
+            except Exception as e:
+                print(f"⚠️ Browser pool health check failed: {e}")
+
+    # --- HELPERS ---
+
+    async def fetch_html(self, url: str, wait_for: Optional[str] = None,
+                         timeout_ms: int = 30000) -> str:
+        async with self.lease() as page:
+            await page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+            if wait_for:
+                await page.wait_for_selector(wait_for, timeout=timeout_ms)
+            return await page.content()
+
+    def pages_per_minute(self) -> float:
+        if not self._started_at:
+            return 0.0
+        elapsed = max(time.monotonic() - self._started_at, 1e-6)
+        return self.stats["navigations"] * 60.0 / elapsed
@@ -0,0 +1,540 @@
+# scrapers/crawl_engine.py
+"""
+One concurrent crawler for every listing site in config/sites.yaml.
+
+Replaces the per-site loops (scrape_meqasa.py, meqasa_full_dump.py, the GPC
+and Jiji scrapers) that walked pages one at a time with fixed sleeps:
+
+  * all sites crawl in parallel; pages are fetched over plain HTTP when the
+    site allows it (scrapers/http_fetch.py) and otherwise through one shared
+    browser whose pages are leased from scrapers/browser_pool.py;
+  * `max_pages_in_flight` caps open browser pages overall, and each domain
+    has its own concurrency cap + minimum delay between requests;
+    page_param sites fetch several pages at once within that cap;
+  * every listing comes out in the same record format (LISTING_FIELDS),
+    normalized by utils/normalizer.py, and goes to a pluggable sink
+    (JSONL files under data/crawl/ by default);
+  * with the page cache (scrapers/page_cache.py, on by default) pages whose
+    cards are unchanged since the last run are not re-parsed - their cached
+    cards are emitted as usual; `--delta` also skips sinking them and stops
+    a target once `known_pages_to_stop` pages in a row hold only listing IDs
+    seen before - the daily run only pulls what is new;
+  * emitted records are diffed against their last snapshot in
+    storage/listing_history.py (insert / update events, price history),
+    and a complete crawl of a site delists the listings it no longer shows;
+  * each record gets a `cluster_id` from processing/near_dup.py, shared by
+    the copies of one house listed on several sites.
+
+    python -m scrapers.crawl_engine --sites meqasa jiji --max-pages 20
+    python -m scrapers.crawl_engine --delta
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from scrapers.page_cache import PageCache
+from processing.near_dup import NearDupIndex
+from storage.listing_history import ListingHistory
+from scrapers.site_config import SiteConfig, load_crawler_config, load_sites
+from utils.normalizer import normalize_listing
+
+DEFAULT_OUTPUT_DIR = Path("data/crawl")
+MAX_CONSECUTIVE_FAILURES = 5  # blocked / down: stop walking a target's pages
+
+# Common record format for every site.
+LISTING_FIELDS = (
+    "id", "source", "site", "url", "listing_type", "title", "location", "description",
+    "price_amount", "currency", "price_period", "bedrooms", "bathrooms", "area_sqm",
+    "image_url", "page", "scraped_at", "cluster_id", "raw",
+)
+LOCATION_IN_TITLE_RE = re.compile(r"\b(?:in|at)\s+([A-Z][\w'.-]*(?:\s+[A-Z][\w'.-]*)*)\s*$")
+
+
+class PageResult(NamedTuple):
+    url: str
+    items: List[Dict[str, Any]]
+    html: Optional[str] = None
+    ok: bool = True
+    error: Optional[str] = None
+    unchanged: bool = False                     # served from scrapers/page_cache.py (304 / same body)
+    validators: Optional[Dict[str, str]] = None  # etag / last_modified / body_hash for the page cache
+    next_url: Optional[str] = None              # next_link sites: "" = last page, None = not known yet
+
+
+def listing_id(site: SiteConfig, url: str) -> str:
+    """
+    The site's stable ID when sites.yaml gives an `id_format` - the one its
+    scraper / uploader already uses (meqasa_<slug> in market_listings), so price
+    history and /engagement/price-history/{id} share one key - else site:sha1(url).
+    """
+    if site.id_format:
+        slug = url.split("/")[-1]
+        return site.id_format.format(slug=slug[:-len(".html")] if slug.endswith(".html") else slug)
+    return f"{site.name}:{hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]}"
+
+
+def to_listing_record(site: SiteConfig, raw: Dict[str, Any], listing_type: str,
+                      page_url: str, page: Optional[int]) -> Optional[Dict[str, Any]]:
+    """Maps one extracted card onto LISTING_FIELDS. Cards without a URL are dropped."""
+    href = (raw.get("url") or raw.get("link") or "").strip()
+    if not href:
+        return None
+    url = urljoin(page_url, href)
+    title = (raw.get("title") or "").strip() or None
+    location = (raw.get("location") or "").strip() or None
+    if not location and title:
+        match = LOCATION_IN_TITLE_RE.search(title)
+        location = match.group(1) if match else None
+    fields = normalize_listing(raw)
+    return {
+        "id": listing_id(site, url),
+        "source": site.source,
+        "site": site.name,
+        "url": url,
+        "listing_type": listing_type,
+        "title": title,
+        "location": location,
+        "description": (raw.get("description") or "").strip() or None,
+        **fields,
+        "image_url": raw.get("image_url"),
+        "page": page,
+        "scraped_at": datetime.now(timezone.utc).isoformat(),
+        "cluster_id": None,
+        "raw": raw,
+    }
+
+
+# ==========================================
+# 🚦 POLITENESS
+# ==========================================
+
+class DomainLimiter:
+    """Caps concurrent requests to one domain and spaces their start times."""
+
+    def __init__(self, max_concurrency: int, delay_secs: float, jitter_secs: float = 0.0):
+        self._sem = asyncio.Semaphore(max(1, max_concurrency))
+        self._lock = asyncio.Lock()
+        self._delay = delay_secs
+        self._jitter = jitter_secs
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        await self._sem.acquire()
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self._delay + random.uniform(0, self._jitter)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._sem.release()
+
+
+# ==========================================
+# 🌐 FETCHING
+# ==========================================
+
+class Crawl4AIFetcher:
+    """One shared Crawl4AI browser; each fetch opens its own page in it."""
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self._crawler = None
+        self._configs: Dict[str, Any] = {}
+
+    async def __aenter__(self):
+        from crawl4ai import AsyncWebCrawler, BrowserConfig
+        self._crawler = AsyncWebCrawler(config=BrowserConfig(headless=self.headless, verbose=False))
+        await self._crawler.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._crawler:
+            await self._crawler.__aexit__(*exc)
+            self._crawler = None
+
+    def run_config(self, site: SiteConfig):
+        """Built once per site (strategy + config), not per page."""
+        if site.name not in self._configs:
+            self._configs[site.name] = self._build_run_config(site)
+        return self._configs[site.name]
+
+    def _build_run_config(self, site: SiteConfig):
+        from crawl4ai import CacheMode, CrawlerRunConfig
+        from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+
+        options = {
+            "extraction_strategy": JsonCssExtractionStrategy(site.schema),
+            "cache_mode": CacheMode.BYPASS,
+            "page_timeout": site.page_timeout_ms,
+        }
+        if site.wait_for:
+            options["wait_for"] = f"css:{site.wait_for}"
+        if site.pagination_type == "scroll":
+            from crawl4ai import VirtualScrollConfig
+            options["virtual_scroll_config"] = VirtualScrollConfig(
+                container_selector=site.pagination.get("container", "body"),
+                scroll_count=int(site.pagination.get("scroll_count", 20)),
+                wait_after_scroll=float(site.pagination.get("wait_after_scroll", 1.5)),
+            )
+        return CrawlerRunConfig(**options)
+
+    async def fetch(self, url: str, site: SiteConfig) -> PageResult:
+        result = await self._crawler.arun(url=url, config=self.run_config(site))
+        if not result.success:
+            return PageResult(url, [], None, False, result.error_message)
+        try:
+            items = json.loads(result.extracted_content or "[]")
+        except json.JSONDecodeError as e:
+            return PageResult(url, [], result.html, False, f"bad extraction JSON: {e}")
+        return PageResult(url, items if isinstance(items, list) else [], result.html)
+
+
+class PooledBrowserFetcher:
+    """
+    Leases pages from scrapers/browser_pool.py and runs the site's Crawl4AI
+    schema over the rendered HTML. Scroll sites are scrolled in the leased
+    page and every snapshot is extracted (Jiji swaps cards out of the DOM).
+    """
+
+    def __init__(self, pool=None, **pool_kwargs):
+        from scrapers.browser_pool import BrowserPool
+        self.pool = pool or BrowserPool(**pool_kwargs)
+        self._strategies: Dict[str, Any] = {}
+
+    async def __aenter__(self):
+        await self.pool.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.pool.close()
+
+    def extract(self, site: SiteConfig, url: str, html: str) -> List[Dict[str, Any]]:
+        if site.name not in self._strategies:
+            from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+            self._strategies[site.name] = JsonCssExtractionStrategy(site.schema)
+        return self._strategies[site.name].extract(url, html) or []
+
+    async def fetch(self, url: str, site: SiteConfig) -> PageResult:
+        async with self.pool.lease() as page:
+            response = await page.goto(url, timeout=site.page_timeout_ms, wait_until="domcontentloaded")
+            if response is not None and response.status >= 400:
+                return PageResult(url, [], None, False, f"HTTP {response.status}")
+            if site.wait_for:
+                try:
+                    await page.wait_for_selector(site.wait_for, timeout=site.page_timeout_ms)
+                except Exception:
+                    pass  # empty result pages never render the card selector
+            html = await page.content()
+            items = self.extract(site, url, html)
+            if site.pagination_type == "scroll":
+                for _ in range(int(site.pagination.get("scroll_count", 20))):
+                    await page.mouse.wheel(0, 4000)
+                    await asyncio.sleep(float(site.pagination.get("wait_after_scroll", 1.5)))
+                    html = await page.content()
+                    items.extend(self.extract(site, url, html))
+        return PageResult(url, items, html)
+
+
+def find_next_link(html: Optional[str], selector: str, page_url: str) -> Optional[str]:
+    if not html:
+        return None
+    from bs4 import BeautifulSoup
+    link = BeautifulSoup(html, "html.parser").select_one(selector)
+    return urljoin(page_url, link["href"]) if link and link.get("href") else None
+
+
+# ==========================================
+# 💾 SINKS
+# ==========================================
+
+class JsonlSink:
+    """Appends records to data/crawl/<site>/<run timestamp>.jsonl."""
+
+    def __init__(self, output_dir: Path = DEFAULT_OUTPUT_DIR):
+        self.output_dir = Path(output_dir)
+        self.run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        self.paths: Dict[str, Path] = {}
+
+    def __call__(self, site: SiteConfig, records: List[Dict[str, Any]]):
+        path = self.paths.get(site.name)
+        if path is None:
+            path = self.output_dir / site.name / f"{self.run_id}.jsonl"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.paths[site.name] = path
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# ==========================================
+# 🕷️ ENGINE
+# ==========================================
+
+class CrawlEngine:
+    def __init__(self, sites: List[SiteConfig], fetcher=None,
+                 sink: Optional[Callable[[SiteConfig, List[Dict[str, Any]]], None]] = None,
+                 max_pages_in_flight: int = 6, max_pages: Optional[int] = None,
+                 listing_types: Optional[List[str]] = None, cache: Optional[PageCache] = None,
+                 delta: bool = False, history: Optional[ListingHistory] = None,
+                 near_dups: Optional[NearDupIndex] = None):
+        self.sites = sites
+        self.fetcher = fetcher or PooledBrowserFetcher()
+        self.sink = sink or JsonlSink()
+        self.max_pages = max_pages
+        self.listing_types = listing_types
+        self.cache = cache
+        self.delta = delta and cache is not None
+        self.history = history
+        self.near_dups = near_dups
+        self._in_flight = asyncio.Semaphore(max_pages_in_flight)
+        self._limiters = {
+            site.domain: DomainLimiter(site.max_concurrency, site.delay_secs, site.jitter_secs)
+            for site in sites
+        }
+        self._seen: Dict[str, set] = {site.name: set() for site in sites}
+        self._incomplete: set = set()   # sites whose crawl stopped before the real last page
+        self.stats: Dict[str, Dict[str, Any]] = {
+            site.name: {"pages": 0, "failed_pages": 0, "unchanged_pages": 0, "listings": 0,
+                        "duplicates": 0, "inserted": 0, "updated": 0, "delisted": 0, "seconds": 0.0}
+            for site in sites
+        }
+
+    async def _fetch(self, site: SiteConfig, url: str) -> PageResult:
+        async with self._limiters[site.domain], self._in_flight:
+            try:
+                result = await self.fetcher.fetch(url, site)
+            except Exception as e:
+                result = PageResult(url, [], None, False, str(e))
+        stats = self.stats[site.name]
+        stats["pages"] += 1
+        if site.pagination_type == "next_link" and result.ok and result.html and result.next_url is None:
+            next_url = find_next_link(result.html, site.pagination.get("selector", "a[rel='next']"), result.url)
+            result = result._replace(next_url=next_url or "")
+        if self.cache and result.ok and not result.unchanged:
+            changed = self.cache.store(url, result.items, next_url=result.next_url, **(result.validators or {}))
+            result = result._replace(unchanged=not changed)
+        if result.unchanged:
+            stats["unchanged_pages"] += 1
+        if not result.ok:
+            stats["failed_pages"] += 1
+            print(f"   ⚠️ {site.name}: {url} failed: {str(result.error)[:120]}")
+        return result
+
+    def _emit(self, site: SiteConfig, result: PageResult, listing_type: str,
+              page: Optional[int]) -> Tuple[int, bool]:
+        """
+        Normalizes, de-duplicates (featured cards repeat on every page) and sinks.
+        Returns (count of cards new to this run, whether every ID on the page was
+        seen on an earlier run). In --delta runs the cards of unchanged pages are
+        counted but not re-sunk; full runs emit them from the cache like any page.
+        """
+        seen = self._seen[site.name]
+        records, ids = [], []
+        for raw in result.items:
+            record = to_listing_record(site, raw, listing_type, result.url, page)
+            if not record:
+                continue
+            ids.append(record["id"])
+            if record["id"] in seen:
+                self.stats[site.name]["duplicates"] += 1
+                continue
+            seen.add(record["id"])
+            records.append(record)
+        all_known = False
+        if self.cache and ids:
+            all_known = len(self.cache.known_ids(site.name, ids)) == len(set(ids))
+            self.cache.mark_seen(site.name, ids)
+        if result.unchanged and self.delta:
+            return len(records), True
+        if records and self.near_dups:
+            clusters = self.near_dups.add(records, source=site.name)
+            for record in records:
+                record["cluster_id"] = clusters.get(record["id"])
+        if records:
+            self.sink(site, records)
+            self.stats[site.name]["listings"] += len(records)
+            if self.history:
+                self._count_events(site, self.history.apply(records, source=site.name))
+        return len(records), all_known
+
+    def _count_events(self, site: SiteConfig, events):
+        for event in events:
+            self.stats[site.name][{"insert": "inserted", "update": "updated", "delist": "delisted"}[event.kind]] += 1
+
+    def _complete(self, site: SiteConfig) -> bool:
+        """Whether this run saw the whole site, so missing listings really are gone."""
+        return (not self.delta and not self.max_pages and not self.listing_types
+                and self.stats[site.name]["failed_pages"] == 0 and site.name not in self._incomplete)
+
+    def _known_streak(self, site: SiteConfig, state: Dict[str, Any], all_known: bool) -> bool:
+        """--delta: True once `known_pages_to_stop` pages in a row held nothing new."""
+        if not self.delta:
+            return False
+        state["known"] = state.get("known", 0) + 1 if all_known else 0
+        return state["known"] >= site.known_pages_to_stop
+
+    def _hit_page_limit(self, site: SiteConfig, listing_type: str):
+        """The page cap (pagination.max_pages / --max-pages) cut the crawl short: not a complete run."""
+        print(f"   ⚠️ {site.name} {listing_type}: stopped at the {self._page_limit(site)}-page limit, "
+              f"not at the last page - skipping delisting")
+        self._incomplete.add(site.name)
+
+    def _page_limit(self, site: SiteConfig) -> int:
+        limit = int(site.pagination.get("max_pages", 100))
+        return min(limit, self.max_pages) if self.max_pages else limit
+
+    async def _crawl_paged(self, site: SiteConfig, listing_type: str, base: str):
+        """
+        page_param: up to max_concurrency workers pull page numbers until
+        `empty_pages_to_stop` pages in a row bring no new listings (past the end,
+        sites like Meqasa still show the featured cards seen on every page).
+        """
+        start = int(site.pagination.get("start", 1))
+        last = start + self._page_limit(site) - 1
+        state = {"next": start, "stop_at": last, "empty": 0, "failures": 0, "ended": False}
+
+        async def worker():
+            while state["next"] <= state["stop_at"]:
+                page = state["next"]
+                state["next"] += 1
+                result = await self._fetch(site, site.page_url(base, page))
+                if page > state["stop_at"]:
+                    continue
+                new, all_known = self._emit(site, result, listing_type, page)
+                if result.ok and result.items and self._known_streak(site, state, all_known):
+                    print(f"   ⏹️ {site.name} {listing_type}: nothing new since p{page - site.known_pages_to_stop + 1}, delta done")
+                    state["stop_at"] = min(state["stop_at"], page)
+                if result.ok and new == 0:
+                    # Past the last page: stop scheduling beyond it.
+                    state["empty"] += 1
+                    if state["empty"] >= site.empty_pages_to_stop:
+                        state["stop_at"] = min(state["stop_at"], page)
+                        state["ended"] = True
+                elif result.ok:
+                    state["empty"] = state["failures"] = 0
+                else:
+                    state["failures"] += 1
+                    if state["failures"] >= MAX_CONSECUTIVE_FAILURES:
+                        print(f"   🛑 {site.name}: {state['failures']} failed pages in a row, giving up on {listing_type}")
+                        state["stop_at"] = min(state["stop_at"], page)
+                print(f"   📄 {site.name} {listing_type} p{page}: {len(result.items)} cards, {new} new")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, site.max_concurrency))))
+        if state["stop_at"] == last and not state["ended"]:
+            self._hit_page_limit(site, listing_type)
+
+    async def _crawl_next_link(self, site: SiteConfig, listing_type: str, base: str):
+        url, page, state = base, 1, {}
+        while url and page <= self._page_limit(site):
+            result = await self._fetch(site, url)
+            new, all_known = self._emit(site, result, listing_type, page)
+            print(f"   📄 {site.name} {listing_type} p{page}: {len(result.items)} cards, {new} new")
+            if result.ok and result.items and self._known_streak(site, state, all_known):
+                print(f"   ⏹️ {site.name} {listing_type}: nothing new, delta done")
+                break
+            if result.ok and result.next_url is None:
+                # A 304 for a page cached before next links were stored: where the crawl
+                # would go next is unknown, so the listings past here must not be delisted.
+                print(f"   ⚠️ {site.name} {listing_type} p{page}: unchanged page without a stored next link")
+                self._incomplete.add(site.name)
+            url = result.next_url if result.ok else None
+            page += 1
+        if url and page > self._page_limit(site):
+            self._hit_page_limit(site, listing_type)
+
+    async def _crawl_scroll(self, site: SiteConfig, listing_type: str, base: str):
+        result = await self._fetch(site, base)
+        new, _ = self._emit(site, result, listing_type, None)
+        print(f"   📜 {site.name} {listing_type}: {len(result.items)} cards, {new} new")
+
+    async def crawl_site(self, site: SiteConfig):
+        started = time.perf_counter()
+        crawl = {
+            "page_param": self._crawl_paged,
+            "next_link": self._crawl_next_link,
+            "scroll": self._crawl_scroll,
+        }[site.pagination_type]
+        targets = [(t, url) for t, url in site.targets.items()
+                   if not self.listing_types or t in self.listing_types]
+        await asyncio.gather(*(crawl(site, listing_type, url) for listing_type, url in targets))
+        if self.history and self._complete(site):
+            self._count_events(site, self.history.delist_missing(site.name, self._seen[site.name]))
+        self.stats[site.name]["seconds"] = round(time.perf_counter() - started, 1)
+        print(f"✅ {site.name}: {self.stats[site.name]['listings']} listings from {self.stats[site.name]['pages']} pages")
+
+    async def run(self) -> Dict[str, Dict[str, Any]]:
+        print(f"🚀 Crawling {len(self.sites)} site(s): {', '.join(s.name for s in self.sites)}")
+        async with self.fetcher:
+            await asyncio.gather(*(self.crawl_site(site) for site in self.sites))
+        if self.cache:
+            print(f"   🗃️ Page cache: {self.cache.stats()}")
+        return self.stats
+
+
+async def main(site_names: Optional[List[str]] = None, max_pages: Optional[int] = None,
+               listing_types: Optional[List[str]] = None, output_dir: Path = DEFAULT_OUTPUT_DIR,
+               fetcher_name: str = "auto", use_cache: bool = True, delta: bool = False,
+               track_changes: bool = True, near_dups: bool = True):
+    defaults = load_crawler_config().get("crawler_defaults") or {}
+    cache = PageCache() if use_cache else None
+    history = ListingHistory() if track_changes else None
+    near_dup_index = NearDupIndex() if near_dups else None
+    if fetcher_name == "crawl4ai":
+        fetcher = Crawl4AIFetcher()
+    else:
+        fetcher = PooledBrowserFetcher(**(defaults.get("browser_pool") or {}))
+    if fetcher_name == "auto":
+        from scrapers.http_fetch import HybridFetcher
+        fetcher = HybridFetcher(fetcher, cache=cache)
+    engine = CrawlEngine(
+        load_sites(site_names),
+        fetcher=fetcher,
+        sink=JsonlSink(output_dir),
+        max_pages_in_flight=int(defaults.get("max_pages_in_flight", 6)),
+        max_pages=max_pages,
+        listing_types=listing_types,
+        cache=cache,
+        delta=delta,
+        history=history,
+        near_dups=near_dup_index,
+    )
+    stats = await engine.run()
+    print(json.dumps(stats, indent=2))
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl listing sites defined in config/sites.yaml")
+    parser.add_argument("--sites", nargs="*", help="Source names from listing_sources (default: all)")
+    parser.add_argument("--max-pages", type=int, help="Per-target page cap (overrides sites.yaml)")
+    parser.add_argument("--listing-types", nargs="*", help="e.g. for_sale for_rent")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--fetcher", choices=["auto", "pool", "crawl4ai"], default="auto",
+                        help="auto: HTTP first, pooled browser on challenge/empty (default); "
+                             "pool: always leased Playwright pages; crawl4ai: AsyncWebCrawler per page")
+    parser.add_argument("--delta", action="store_true",
+                        help="Daily mode: stop each target once pages only hold listings seen on earlier runs")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore data/.crawl_state/page_cache.sqlite (re-fetch, re-parse and re-emit everything)")
+    parser.add_argument("--no-history", action="store_true",
+                        help="Skip change detection / price history (storage/listing_history.py)")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Skip cross-source near-duplicate clustering (processing/near_dup.py)")
+    args = parser.parse_args()
+    asyncio.run(main(args.sites, args.max_pages, args.listing_types, args.output_dir, args.fetcher,
+                     use_cache=not args.no_cache, delta=args.delta, track_changes=not args.no_history,
+                     near_dups=not args.no_dedup))
@@ -0,0 +1,228 @@
+# scrapers/feed_fetcher.py
+"""
+Async RSS/Atom fetcher shared by the news pipelines.
+
+The sentinels used to call `feedparser.parse(url)` feed after feed - no
+timeout, so one dead host stalled the run, plus fixed 1-2 s sleeps. Here:
+
+  * all due feeds are fetched concurrently (httpx, bounded by
+    `max_concurrency`) with a connect/read timeout AND a total deadline,
+    so a sweep takes as long as the slowest feed, never longer;
+  * ETag / Last-Modified are persisted per feed and sent back as
+    If-None-Match / If-Modified-Since - an unchanged feed costs a 304;
+  * each feed gets its own polling interval from how often it actually
+    publishes (half the smoothed gap between updates, clamped to
+    MIN_INTERVAL..MAX_INTERVAL); feeds that are not due are skipped;
+  * failing feeds back off exponentially (capped at MAX_BACKOFF).
+
+    fetcher = FeedFetcher()
+    for result in fetcher.sweep_sync(RSS_FEEDS, save=False):
+        for entry in result.entries: ...
+    fetcher.save_state()   # only once the entries are stored
+
+The state (ETags, seen entries) says "already have these", so a job that
+can fail while storing sweeps with save=False and saves afterwards - with
+`keep=` the feeds it could not store, which stay as last saved and come
+back in full on the next sweep.
+
+State: data/.crawl_state/feeds.json (ASTA_FEED_STATE to move it).
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import feedparser
+import httpx
+
+FEED_STATE_PATH = Path(os.getenv("ASTA_FEED_STATE", "data/.crawl_state/feeds.json"))
+USER_AGENT = "ASTA-RSS-Fetcher/1.0 (+https://github.com/akwamin-eng/asta-insights)"
+MIN_INTERVAL = 15 * 60
+DEFAULT_INTERVAL = 60 * 60
+MAX_INTERVAL = 24 * 3600
+MAX_BACKOFF = 24 * 3600
+SEEN_PER_FEED = 300          # entry IDs remembered per feed to tell new items from old
+
+
+class FeedResult(NamedTuple):
+    url: str
+    status: str                        # ok | not_modified | skipped | error
+    feed: Optional[Dict[str, Any]]     # feedparser's `feed` block (title, link, ...)
+    entries: List[Dict[str, Any]]      # every entry in the document (empty unless status == "ok")
+    new_entries: int = 0               # entries not seen on an earlier sweep
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def title(self) -> str:
+        return (self.feed or {}).get("title") or self.url
+
+
+def _publish_gap(entries: List[Dict[str, Any]]) -> Optional[float]:
+    """Median seconds between consecutive entries' publish times (seeds a new feed's interval)."""
+    stamps = sorted(
+        time.mktime(e.get("published_parsed") or e.get("updated_parsed")) for e in entries
+        if e.get("published_parsed") or e.get("updated_parsed")
+    )
+    gaps = sorted(b - a for a, b in zip(stamps, stamps[1:]) if b > a)
+    return gaps[len(gaps) // 2] if gaps else None
+
+
+def _entry_key(entry: Dict[str, Any]) -> str:
+    raw = entry.get("id") or entry.get("link") or entry.get("title") or ""
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class FeedFetcher:
+    def __init__(self, state_path: Optional[Path] = FEED_STATE_PATH, timeout: float = 15.0,
+                 max_concurrency: int = 16, user_agent: str = USER_AGENT):
+        self.state_path = Path(state_path) if state_path else None
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.user_agent = user_agent
+        self.state: Dict[str, Dict[str, Any]] = self._load_state()
+        self._saved = copy.deepcopy(self.state)   # what is on disk
+
+    # --- STATE ---
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if self.state_path and self.state_path.exists():
+            try:
+                return json.loads(self.state_path.read_text())
+            except (OSError, json.JSONDecodeError):
+                pass
+        return {}
+
+    def save_state(self, keep: Iterable[str] = ()):
+        """Writes the state of every feed except those in `keep`, which stay as last saved."""
+        if not self.state_path:
+            return
+        state = dict(self.state)
+        for url in keep:
+            if url in self._saved:
+                state[url] = self._saved[url]
+            else:
+                state.pop(url, None)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=2))
+        tmp.replace(self.state_path)
+        self._saved = copy.deepcopy(state)
+
+    def _feed_state(self, url: str) -> Dict[str, Any]:
+        return self.state.setdefault(url, {
+            "etag": None, "last_modified": None, "interval": DEFAULT_INTERVAL, "next_due": 0.0,
+            "failures": 0, "last_update": None, "avg_gap": None, "seen": [], "last_status": None,
+        })
+
+    def is_due(self, url: str, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self._feed_state(url)["next_due"]
+
+    # --- SCHEDULING ---
+
+    def _schedule_success(self, state: Dict[str, Any], new_entries: int, now: float):
+        state["failures"] = 0
+        if new_entries:
+            if state["last_update"]:
+                gap = now - state["last_update"]
+                state["avg_gap"] = gap if state["avg_gap"] is None else 0.7 * state["avg_gap"] + 0.3 * gap
+            state["last_update"] = now
+            target = state["avg_gap"] / 2 if state["avg_gap"] else state["interval"]
+        else:
+            target = state["interval"] * 1.5  # quiet feed: poll it less often
+        state["interval"] = min(MAX_INTERVAL, max(MIN_INTERVAL, target))
+        state["next_due"] = now + state["interval"]
+
+    def _schedule_failure(self, state: Dict[str, Any], now: float):
+        state["failures"] += 1
+        backoff = min(MAX_BACKOFF, state["interval"] * 2 ** state["failures"])
+        state["next_due"] = now + backoff * random.uniform(0.9, 1.1)
+
+    # --- FETCHING ---
+
+    async def fetch(self, client: httpx.AsyncClient, url: str, conditional: bool = True) -> FeedResult:
+        state = self._feed_state(url)
+        headers = {}
+        if conditional and state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if conditional and state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+        started = time.perf_counter()
+        now = time.time()
+        try:
+            # The client timeout covers each socket operation; wait_for caps slow-drip bodies too.
+            response = await asyncio.wait_for(client.get(url, headers=headers), self.timeout * 2)
+            if response.status_code == 304:
+                self._schedule_success(state, 0, now)
+                state["last_status"] = "not_modified"
+                return FeedResult(url, "not_modified", None, [], seconds=time.perf_counter() - started)
+            response.raise_for_status()
+            parsed = await asyncio.to_thread(feedparser.parse, response.content)
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            self._schedule_failure(state, now)
+            state["last_status"] = f"error: {e.__class__.__name__}"
+            return FeedResult(url, "error", None, [], error=f"{e.__class__.__name__}: {e}",
+                              seconds=time.perf_counter() - started)
+
+        if parsed.bozo and not parsed.entries:
+            self._schedule_failure(state, now)
+            state["last_status"] = "error: unparseable"
+            return FeedResult(url, "error", None, [], error=f"unparseable feed: {parsed.get('bozo_exception')}",
+                              seconds=time.perf_counter() - started)
+
+        state["etag"] = response.headers.get("ETag")
+        state["last_modified"] = response.headers.get("Last-Modified")
+        seen = set(state["seen"])
+        keys = [_entry_key(e) for e in parsed.entries]
+        new_entries = sum(1 for k in keys if k not in seen)
+        if state["avg_gap"] is None:
+            state["avg_gap"] = _publish_gap(parsed.entries)
+        current = set(keys)
+        state["seen"] = (keys + [k for k in state["seen"] if k not in current])[:SEEN_PER_FEED]
+        self._schedule_success(state, new_entries, now)
+        state["last_status"] = "ok"
+        return FeedResult(url, "ok", parsed.feed, list(parsed.entries), new_entries,
+                          seconds=time.perf_counter() - started)
+
+    async def sweep(self, urls: Iterable[str], force: bool = False, save: bool = True) -> List[FeedResult]:
+        """
+        Fetches every due feed concurrently. force=True fetches all of them, without
+        If-None-Match / If-Modified-Since, so every "ok" result carries the full feed.
+        Saves the state after, unless save=False (call save_state() once stored).
+        """
+        urls = list(dict.fromkeys(urls))
+        now = time.time()
+        due = [u for u in urls if force or self.is_due(u, now)]
+        results = {u: FeedResult(u, "skipped", None, []) for u in urls if u not in due}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def one(client, url):
+            async with semaphore:
+                results[url] = await self.fetch(client, url, conditional=not force)
+
+        started = time.perf_counter()
+        async with httpx.AsyncClient(
+            headers={"User-Agent": self.user_agent, "Accept": "application/rss+xml, application/atom+xml, "
+                                                              "application/xml;q=0.9, */*;q=0.8"},
+            timeout=self.timeout, follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_concurrency),
+        ) as client:
+            await asyncio.gather(*(one(client, u) for u in due))
+        if save:
+            self.save_state()
+
+        ordered = [results[u] for u in urls]
+        counts = {}
+        for r in ordered:
+            counts[r.status] = counts.get(r.status, 0) + 1
+        print(f"📡 Feed sweep: {len(due)}/{len(urls)} due, {counts} in {time.perf_counter() - started:.1f}s")
+        return ordered
+
+    def sweep_sync(self, urls: Iterable[str], force: bool = False, save: bool = True) -> List[FeedResult]:
+        return asyncio.run(self.sweep(urls, force=force, save=save))
@@ -0,0 +1,296 @@
+# scrapers/http_fetch.py
+"""
+HTTP fast path for listing pages that are plain server-rendered HTML.
+
+Meqasa and GhanaPropertyCentre serve their cards in the initial HTML, so a
+pooled httpx client (HTTP/2, keep-alive) plus a fast parser does the job of
+a headless browser at a fraction of the CPU and memory. `extract_with_schema`
+runs the same Crawl4AI JsonCss schemas the browser path uses (the
+`listing_sources` schemas in config/sites.yaml, PROPERTY_SCHEMA_MEQASA,
+JIJI_SCHEMA, ...), with selectolax when installed and BeautifulSoup otherwise.
+
+With a `PageCache` (scrapers/page_cache.py) the fetcher sends If-None-Match /
+If-Modified-Since and reuses the stored cards (and, for next_link sites, the
+stored next link) on a 304 or a byte-identical body, skipping the parse.
+
+`HybridFetcher` tries HTTP first and escalates a page to the browser when it
+sees a bot challenge, an HTTP error or no cards. Per-site outcomes are kept in
+data/.crawl_state/fetch_modes.json so sites that always escalate go straight
+to the browser on the next run (with an occasional HTTP re-probe).
+"""
+
+import asyncio
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from scrapers.crawl_engine import PageResult
+from scrapers.page_cache import PageCache, content_hash
+from scrapers.site_config import SiteConfig
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _FastParser
+except ImportError:  # selectolax is optional; BeautifulSoup is already a dependency
+    _FastParser = None
+
+MODE_STATS_PATH = Path("data/.crawl_state/fetch_modes.json")
+DEFAULT_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+WHITESPACE_RE = re.compile(r"\s+")
+CHALLENGE_STATUSES = {403, 429, 503}
+CHALLENGE_RE = re.compile(
+    r"cf-chl|challenge-platform|Just a moment\.\.\.|Attention Required|cf_chl_opt|"
+    r"g-recaptcha|hcaptcha|Checking your browser|DDoS protection by",
+    re.IGNORECASE,
+)
+
+# Once a site has LEARN_AFTER recent HTTP attempts and escalates more often than
+# ESCALATE_RATIO, it goes straight to the browser; every REPROBE_EVERY-th page
+# still tries HTTP in case the site changed back.
+LEARN_AFTER = 10
+ESCALATE_RATIO = 0.5
+REPROBE_EVERY = 25
+
+
+# ==========================================
+# 🧩 SCHEMA EXTRACTION (no browser)
+# ==========================================
+
+def _text(node) -> str:
+    if _FastParser is not None and not hasattr(node, "get_text"):
+        text = node.text(separator=" ") or ""
+    else:
+        text = node.get_text(" ")
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _attr(node, name: str) -> Optional[str]:
+    if _FastParser is not None and not hasattr(node, "get_text"):
+        return node.attributes.get(name)
+    value = node.get(name)
+    return " ".join(value) if isinstance(value, list) else value
+
+
+def _html(node) -> str:
+    if _FastParser is not None and not hasattr(node, "get_text"):
+        return node.html or ""
+    return str(node)
+
+
+def _select(node, selector: str) -> List[Any]:
+    if not selector:
+        return [node]
+    if _FastParser is not None and not hasattr(node, "select"):
+        return node.css(selector)
+    return node.select(selector)
+
+
+def _field_value(node, field: Dict[str, Any]):
+    kind = field.get("type", "text")
+    matches = _select(node, field.get("selector", ""))
+    if kind in ("list", "nested_list"):
+        return [_extract_item(m, field.get("fields", [])) for m in matches]
+    if not matches:
+        return field.get("default")
+    first = matches[0]
+    if kind == "nested":
+        return _extract_item(first, field.get("fields", []))
+    if kind == "attribute":
+        return _attr(first, field.get("attribute", ""))
+    if kind == "html":
+        return _html(first)
+    return _text(first)
+
+
+def _extract_item(node, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+    item = {}
+    for field in fields:
+        value = _field_value(node, field)
+        if value not in (None, "", []):
+            item[field["name"]] = value
+    return item
+
+
+def extract_with_schema(html: str, schema: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Applies a Crawl4AI JsonCssExtractionStrategy schema to raw HTML."""
+    if not html:
+        return []
+    if _FastParser is not None:
+        root = _FastParser(html)
+        bases = root.css(schema["baseSelector"])
+    else:
+        from bs4 import BeautifulSoup
+        try:
+            root = BeautifulSoup(html, "lxml")
+        except Exception:
+            root = BeautifulSoup(html, "html.parser")
+        bases = root.select(schema["baseSelector"])
+    items = [_extract_item(base, schema.get("fields", [])) for base in bases]
+    return [item for item in items if item]
+
+
+def looks_like_challenge(status: int, html: str) -> bool:
+    return status in CHALLENGE_STATUSES or bool(CHALLENGE_RE.search(html[:20000]))
+
+
+# ==========================================
+# ⚡ HTTP FETCHER
+# ==========================================
+
+class HttpFetcher:
+    """Shared async httpx client (HTTP/2 + connection reuse) with schema extraction."""
+
+    def __init__(self, timeout: float = 20.0, max_connections: int = 20, http2: bool = True,
+                 cache: Optional[PageCache] = None):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.http2 = http2
+        self.cache = cache
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self):
+        try:
+            self._client = self._new_client(self.http2)
+        except ImportError:  # h2 not installed
+            self._client = self._new_client(False)
+        return self
+
+    def _new_client(self, http2: bool) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=http2, headers=DEFAULT_HEADERS, follow_redirects=True, timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+        )
+
+    async def __aexit__(self, *exc):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str, site: SiteConfig) -> PageResult:
+        cached = self.cache.get(url) if self.cache else None
+        headers = self.cache.conditional_headers(url) if cached else None
+        try:
+            response = await self._client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            return PageResult(url, [], None, False, f"http: {e.__class__.__name__}: {e}")
+        if response.status_code == 304 and cached:
+            self.cache.touch(url, "not_modified")
+            return PageResult(str(response.url), cached.items, None, unchanged=True, next_url=cached.next_url)
+        html = response.text
+        if looks_like_challenge(response.status_code, html):
+            return PageResult(url, [], html, False, f"challenge (HTTP {response.status_code})")
+        if response.status_code >= 400:
+            return PageResult(url, [], html, False, f"HTTP {response.status_code}")
+        body_hash = content_hash(response.content)
+        if cached and cached.body_hash == body_hash and cached.items:
+            self.cache.touch(url, "same_body")
+            return PageResult(str(response.url), cached.items, html, unchanged=True, next_url=cached.next_url)
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body_hash": body_hash,
+        }
+        return PageResult(str(response.url), extract_with_schema(html, site.schema), html,
+                          validators=validators)
+
+
+# ==========================================
+# 🔀 HTTP FIRST, BROWSER WHEN NEEDED
+# ==========================================
+
+class HybridFetcher:
+    def __init__(self, browser_fetcher, http_fetcher: Optional[HttpFetcher] = None,
+                 stats_path: Optional[Path] = MODE_STATS_PATH, cache: Optional[PageCache] = None):
+        self.browser = browser_fetcher
+        self.http = http_fetcher or HttpFetcher(cache=cache)
+        self.stats_path = Path(stats_path) if stats_path else None
+        self.mode_stats: Dict[str, Dict[str, Any]] = self._load_stats()
+        self._browser_started = False
+        self._browser_lock = asyncio.Lock()
+
+    def _load_stats(self) -> Dict[str, Dict[str, Any]]:
+        if self.stats_path and self.stats_path.exists():
+            try:
+                return json.loads(self.stats_path.read_text())
+            except (OSError, json.JSONDecodeError):
+                pass
+        return {}
+
+    def _save_stats(self):
+        if not self.stats_path:
+            return
+        self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.stats_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.mode_stats, indent=2))
+        tmp.replace(self.stats_path)
+
+    def _site_stats(self, site: SiteConfig) -> Dict[str, Any]:
+        return self.mode_stats.setdefault(site.name, {
+            "mode": "http", "http_ok": 0, "escalated": 0, "browser_direct": 0,
+            "reasons": {}, "recent": [],
+        })
+
+    def mode_for(self, site: SiteConfig) -> str:
+        """'http' or 'browser' for the next page of `site`."""
+        if site.fetch_mode in ("http", "browser"):
+            return site.fetch_mode
+        if site.pagination_type == "scroll":
+            return "browser"  # infinite scroll needs JavaScript
+        stats = self._site_stats(site)
+        recent = stats["recent"]
+        needs_browser = len(recent) >= LEARN_AFTER and sum(recent) / len(recent) > ESCALATE_RATIO
+        stats["mode"] = "browser" if needs_browser else "http"
+        if needs_browser and (stats["browser_direct"] + 1) % REPROBE_EVERY:
+            return "browser"
+        return "http"
+
+    def _record(self, stats: Dict[str, Any], escalated: bool, reason: Optional[str] = None):
+        if escalated:
+            stats["escalated"] += 1
+            stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+        else:
+            stats["http_ok"] += 1
+            if stats["mode"] == "browser":
+                stats["recent"].clear()  # a re-probe worked: trust HTTP again
+        stats["recent"] = (stats["recent"] + [int(escalated)])[-2 * LEARN_AFTER:]
+
+    async def __aenter__(self):
+        await self.http.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.__aexit__(*exc)
+        if self._browser_started:
+            await self.browser.__aexit__(*exc)
+        self._save_stats()
+        for name, stats in self.mode_stats.items():
+            print(f"   📊 {name}: mode={stats['mode']} http_ok={stats['http_ok']} "
+                  f"escalated={stats['escalated']} browser_direct={stats['browser_direct']}")
+
+    async def _browser_fetch(self, url: str, site: SiteConfig) -> PageResult:
+        async with self._browser_lock:
+            if not self._browser_started:
+                await self.browser.__aenter__()  # launched only once a site needs it
+                self._browser_started = True
+        return await self.browser.fetch(url, site)
+
+    async def fetch(self, url: str, site: SiteConfig) -> PageResult:
+        stats = self._site_stats(site)
+        if self.mode_for(site) == "browser":
+            stats["browser_direct"] += 1
+            return await self._browser_fetch(url, site)
+
+        result = await self.http.fetch(url, site)
+        if result.ok and result.items:
+            self._record(stats, escalated=False)
+            return result
+        reason = "empty" if result.ok else (result.error or "error").split(" ")[0].rstrip(":")
+        self._record(stats, escalated=True, reason=reason)
+        return await self._browser_fetch(url, site)
@@ -2,7 +2,6 @@ import os
 import sys
 import json
 import asyncio
-import re
 from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
@@ -12,6 +11,9 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 from google.cloud import storage
 
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.normalizer import normalize_listing
+
 load_dotenv()
 
 # --- GCS Config ---
@@ -41,19 +43,13 @@ JIJI_SCHEMA = {
 }
 
 def parse_jiji_features(prop: Dict[str, Any]):
-    """Extracts beds, baths, and area from the list of raw feature strings."""
-    features = prop.get("raw_features", [])
-    for f in features:
-        text = f.get("text", "").lower()
-        if "bdrm" in text or "bedroom" in text:
-            match = re.search(r'(\d+)', text)
-            if match: prop['bedrooms'] = int(match.group(1))
-        elif "bath" in text:
-            match = re.search(r'(\d+)', text)
-            if match: prop['bathrooms'] = int(match.group(1))
-        elif "sqm" in text:
-            match = re.search(r'(\d+)', text)
-            if match: prop['area_sqm'] = float(match.group(1))
+    """Extracts beds, baths, area (from the raw feature strings) and price via utils/normalizer."""
+    fields = normalize_listing(prop)
+    for key in ("bedrooms", "bathrooms", "area_sqm"):
+        if fields[key] is not None:
+            prop[key] = fields[key]
+    prop["price_value"] = fields["price_amount"]
+    prop["currency"] = fields["currency"]
     
     # Cleanup
     if "raw_features" in prop:
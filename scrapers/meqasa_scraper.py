@@ -2,7 +2,6 @@ import os
 import sys
 import json
 import asyncio
-import re
 from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
@@ -12,6 +11,9 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 from google.cloud import storage
 
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.normalizer import parse_price
+
 load_dotenv()
 
 # --- GCS Config ---
@@ -38,14 +40,8 @@ MEQASA_SCHEMA = {
 
 def clean_price(raw_price: str) -> Dict[str, Any]:
     """Extracts numeric value and currency from strings like 'GH₵14,640,972' or '$300,000'."""
-    if not raw_price: return {"value": None, "currency": None}
-    raw_price = raw_price.replace("Price", "").strip()
-    currency = "USD" if "$" in raw_price else "GHS"
-    nums = re.sub(r'[^\d.]', '', raw_price)
-    try:
-        return {"value": float(nums), "currency": currency}
-    except:
-        return {"value": None, "currency": currency}
+    price = parse_price(raw_price or None)
+    return {"value": price.amount, "currency": price.currency, "period": price.period}
 
 async def scrape_meqasa_page(crawler, url, page_num, listing_type):
     config = CrawlerRunConfig(
@@ -64,6 +60,7 @@ async def scrape_meqasa_page(crawler, url, page_num, listing_type):
         item.update({
             "price_value": price_data["value"],
             "currency": price_data["currency"],
+            "price_period": price_data["period"],
             "page": page_num,
             "listing_type": listing_type,
             "scraped_at": datetime.now(timezone.utc).isoformat(),
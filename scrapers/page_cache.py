@@ -0,0 +1,147 @@
+# scrapers/page_cache.py
+"""
+Per-URL validators and content hashes for listing-page crawls.
+
+Most of the 300-551 index pages of a full dump are unchanged day to day.
+The cache stores, per URL, the ETag / Last-Modified headers, a hash of the
+raw body and a hash of the extracted cards, plus the cards themselves and,
+for next_link sites, the page's next link:
+
+  * HTTP fetches send If-None-Match / If-Modified-Since; a 304 or an
+    identical body reuses the stored cards (and next link) without parsing;
+  * pages whose cards hash the same as last time are marked unchanged,
+    so the engine only sinks the delta;
+  * `seen_listings` remembers every listing ID ever emitted, which lets
+    a delta crawl stop once pages contain nothing new.
+
+SQLite with WAL, one file: data/.crawl_state/page_cache.sqlite.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+DEFAULT_CACHE_PATH = Path(os.getenv("ASTA_PAGE_CACHE", "data/.crawl_state/page_cache.sqlite"))
+
+
+def content_hash(data) -> str:
+    if not isinstance(data, (bytes, str)):
+        data = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class CachedPage(NamedTuple):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body_hash: Optional[str]
+    items_hash: Optional[str]
+    items: List[Dict[str, Any]]
+    fetched_at: float
+    next_url: Optional[str] = None   # "" = no next page; None = not recorded (pre-next_url rows)
+
+
+class PageCache:
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = {"not_modified": 0, "same_body": 0, "same_items": 0, "changed": 0}
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body_hash TEXT, "
+                "items_hash TEXT, items TEXT, fetched_at REAL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+            if "next_url" not in columns:
+                self._db.execute("ALTER TABLE pages ADD COLUMN next_url TEXT")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS seen_listings ("
+                "site TEXT, id TEXT, first_seen REAL, last_seen REAL, PRIMARY KEY (site, id))"
+            )
+            self._db.commit()
+
+    # --- PAGES ---
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, etag, last_modified, body_hash, items_hash, items, fetched_at, next_url "
+                "FROM pages WHERE url = ?", (url,),
+            ).fetchone()
+        if not row:
+            return None
+        return CachedPage(*row[:5], json.loads(row[5] or "[]"), *row[6:])
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        cached = self.get(url)
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def store(self, url: str, items: List[Dict[str, Any]], body_hash: Optional[str] = None,
+              etag: Optional[str] = None, last_modified: Optional[str] = None,
+              next_url: Optional[str] = None) -> bool:
+        """Saves the page; returns True if its cards differ from the stored ones."""
+        items_hash = content_hash(items)
+        previous = self.get(url)
+        changed = previous is None or previous.items_hash != items_hash
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, body_hash, items_hash, items, fetched_at, next_url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body_hash, items_hash,
+                 json.dumps(items, ensure_ascii=False), time.time(), next_url),
+            )
+            self._db.commit()
+        self.hits["changed" if changed else "same_items"] += 1
+        return changed
+
+    def touch(self, url: str, reason: str):
+        """Records a 304 / identical-body revisit."""
+        with self._lock:
+            self._db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        self.hits[reason] += 1
+
+    # --- LISTING IDS ---
+
+    def known_ids(self, site: str, ids: Iterable[str]) -> set:
+        ids = list(ids)
+        if not ids:
+            return set()
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id FROM seen_listings WHERE site = ? AND id IN ({','.join('?' * len(ids))})",
+                (site, *ids),
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def mark_seen(self, site: str, ids: Iterable[str]):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO seen_listings (site, id, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(site, id) DO UPDATE SET last_seen = excluded.last_seen",
+                [(site, i, now, now) for i in ids],
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pages = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            listings = self._db.execute("SELECT COUNT(*) FROM seen_listings").fetchone()[0]
+        return {"pages": pages, "listings": listings, **self.hits}
@@ -29,11 +29,16 @@ load_dotenv(dotenv_path=Path('.') / '.env')
 
 # Add current directory to Python path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from storage.archive_writer import GCSBackend, archive_records, backend_from_uri, drain as drain_archive_uploads
 
 # --- GCS Configuration ---
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "asta-insights-data-certain-voyager")
 storage_client = storage.Client()
-gcs_bucket = storage_client.bucket(GCS_BUCKET_NAME)
+# Raw dumps go out as gzip NDJSON shards on a background upload pool (storage/archive_writer.py);
+# ASTA_ARCHIVE_URI=/some/dir archives locally instead.
+archive_backend = (backend_from_uri(os.environ["ASTA_ARCHIVE_URI"]) if os.getenv("ASTA_ARCHIVE_URI")
+                   else GCSBackend(GCS_BUCKET_NAME, client=storage_client))
 
 # --- Realtor.com Ghana Configuration ---
 SITE_NAME = "realtor.com"
@@ -97,17 +102,14 @@ PROPERTY_SCHEMA_REALTOR_COM = {
 }
 
 def save_raw_data_to_gcs(data: List[Dict[str, Any]], listing_type: str = "realtor_com_gh"):
-    """Saves raw scraped data to GCS."""
+    """Queues raw scraped data for archival to GCS (gzip NDJSON shards + manifest)."""
     if not data:
         print(f"  📝 Skipping GCS save for {SITE_NAME} ({listing_type}) - No data.")
         return
 
     try:
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        blob_name = f"raw/property_listings/{SITE_NAME}/{listing_type}/{timestamp}.json"
-        blob = gcs_bucket.blob(blob_name)
-        blob.upload_from_string(json.dumps(data, indent=2, ensure_ascii=False), content_type='application/json; charset=utf-8')
-        print(f"  ✅ Raw data saved to GCS: gs://{GCS_BUCKET_NAME}/{blob_name}")
+        # Returns immediately: shards upload in the background while the next crawl runs
+        archive_records(f"raw/property_listings/{SITE_NAME}/{listing_type}", data, backend=archive_backend)
     except Exception as e:
         print(f"  ⚠️ Failed to save raw data for {SITE_NAME} ({listing_type}) to GCS: {e}")
 
@@ -221,6 +223,7 @@ async def main():
     realtor_properties = await scrape_realtor_com_gh(BASE_URL, max_pages=7) # Scrape all 7 pages
     save_raw_data_to_gcs(realtor_properties, "realtor_com_gh")
     
+    drain_archive_uploads()  # wait for the background shard uploads + manifests
     print(f"\n✅ One-time scraping completed for {SITE_NAME}. Total properties scraped: {len(realtor_properties)}")
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+# scrapers/site_config.py
+"""
+Loads listing-site definitions from config/sites.yaml (`listing_sources`).
+
+Each site carries its Crawl4AI extraction schema, a pagination strategy and
+politeness limits; `crawler_defaults` fills in anything a site leaves out.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+SITES_PATH = Path(__file__).resolve().parents[1] / "config" / "sites.yaml"
+PAGINATION_TYPES = ("page_param", "next_link", "scroll")
+
+
+@dataclass
+class SiteConfig:
+    name: str
+    source: str
+    domain: str
+    schema: Dict[str, Any]
+    targets: Dict[str, str]                      # listing_type -> base URL
+    pagination: Dict[str, Any]
+    max_concurrency: int = 2
+    delay_secs: float = 2.0
+    jitter_secs: float = 1.0
+    wait_for: Optional[str] = None
+    fetch_mode: str = "auto"                     # auto (HTTP first) | http | browser
+    page_timeout_ms: int = 60000
+    empty_pages_to_stop: int = 1
+    known_pages_to_stop: int = 2                 # --delta: stop after N pages with no new listing IDs
+    id_format: Optional[str] = None              # stable listing ID, e.g. "meqasa_{slug}" (slug = last URL segment)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def pagination_type(self) -> str:
+        return self.pagination.get("type", "page_param")
+
+    def page_url(self, base: str, page: int) -> str:
+        """URL of page `page` for page_param sites ('{base}?w=1&p={page}')."""
+        return self.pagination.get("url", "{base}?page={page}").format(base=base.rstrip("/"), page=page)
+
+
+def _build(name: str, spec: Dict[str, Any], defaults: Dict[str, Any]) -> SiteConfig:
+    for key in ("domain", "schema", "targets"):
+        if not spec.get(key):
+            raise ValueError(f"sites.yaml: listing source '{name}' is missing '{key}'")
+    pagination = spec.get("pagination") or {"type": "page_param"}
+    if pagination.get("type", "page_param") not in PAGINATION_TYPES:
+        raise ValueError(f"sites.yaml: '{name}' has unknown pagination type '{pagination.get('type')}' "
+                         f"(expected one of {', '.join(PAGINATION_TYPES)})")
+    politeness = {**defaults.get("politeness", {}), **(spec.get("politeness") or {})}
+    known = {"source", "domain", "schema", "targets", "pagination", "politeness", "wait_for", "fetch_mode",
+             "empty_pages_to_stop", "known_pages_to_stop", "id_format"}
+    return SiteConfig(
+        name=name,
+        source=spec.get("source", name),
+        domain=spec["domain"],
+        schema=spec["schema"],
+        targets=dict(spec["targets"]),
+        pagination=pagination,
+        max_concurrency=int(politeness.get("max_concurrency", 2)),
+        delay_secs=float(politeness.get("delay_secs", 2.0)),
+        jitter_secs=float(politeness.get("jitter_secs", 1.0)),
+        wait_for=spec.get("wait_for"),
+        fetch_mode=spec.get("fetch_mode", defaults.get("fetch_mode", "auto")),
+        page_timeout_ms=int(defaults.get("page_timeout_ms", 60000)),
+        empty_pages_to_stop=int(spec.get("empty_pages_to_stop", defaults.get("empty_pages_to_stop", 1))),
+        known_pages_to_stop=int(spec.get("known_pages_to_stop", defaults.get("known_pages_to_stop", 2))),
+        id_format=spec.get("id_format"),
+        extra={k: v for k, v in spec.items() if k not in known},
+    )
+
+
+def load_crawler_config(path: Path = SITES_PATH) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    return config
+
+
+def load_sites(names: Optional[List[str]] = None, path: Path = SITES_PATH) -> List[SiteConfig]:
+    """All listing sources, or just `names` (raises ValueError on an unknown name)."""
+    config = load_crawler_config(path)
+    defaults = config.get("crawler_defaults") or {}
+    sources = config.get("listing_sources") or {}
+    if names:
+        unknown = [n for n in names if n not in sources]
+        if unknown:
+            raise ValueError(f"Unknown listing source(s): {', '.join(unknown)}. Known: {', '.join(sources)}")
+        sources = {n: sources[n] for n in names}
+    return [_build(name, spec, defaults) for name, spec in sources.items()]
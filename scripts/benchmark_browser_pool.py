@@ -0,0 +1,128 @@
+"""
+Pages/minute per CPU core for scrapers/browser_pool.py vs. a fresh browser per URL.
+
+Serves synthetic listing pages (20 cards, images, a web font and an analytics
+script each) from a local HTTP server so the numbers measure the browser,
+not the network or the target site.
+
+    python scripts/benchmark_browser_pool.py --pages 200 --contexts 2 --pages-per-context 4
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scrapers.browser_pool import BrowserPool
+
+CARD = """
+<div class="mqs-prop-dt-wrapper">
+  <img src="/img/{page}-{i}.jpg" width="300" height="200">
+  <h2><a href="/listing/{page}-{i}">{beds} bedroom house for sale in East Legon</a></h2>
+  <p class="h3"><span class="h3">Price</span>GH₵{price:,}</p>
+  <ul class="prop-features"><li class="bed"><span>{beds}</span></li></ul>
+</div>"""
+PAGE = """<!doctype html><html><head>
+<link rel="stylesheet" href="/font.css"><script src="/analytics.js"></script>
+</head><body>{cards}</body></html>"""
+PIXEL = bytes.fromhex("ffd8ffe000104a46494600010100000100010000ffd9")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/list"):
+            page = int(self.path.rsplit("=", 1)[-1])
+            cards = "".join(CARD.format(page=page, i=i, beds=1 + i % 5, price=250000 + i * 1000)
+                            for i in range(20))
+            body, kind = PAGE.format(cards=cards).encode(), "text/html; charset=utf-8"
+        elif self.path.startswith("/img"):
+            time.sleep(0.02)  # images are what resource blocking saves
+            body, kind = PIXEL * 200, "image/jpeg"
+        elif self.path == "/analytics.js":
+            time.sleep(0.05)
+            body, kind = b"window.tracked = true;", "application/javascript"
+        else:
+            body, kind = b"body { font-family: sans-serif; }", "text/css"
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def fresh_browser_per_url(base: str, pages: int, concurrency: int) -> float:
+    """What beta-testing/scrape_ghana_listings.py used to do for every URL."""
+    from playwright.async_api import async_playwright
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(n):
+        async with sem, async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            page = await (await browser.new_context()).new_page()
+            await page.goto(f"{base}/list?p={n}")
+            await page.content()
+            await browser.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(pages)))
+    return time.perf_counter() - start
+
+
+async def pooled(base: str, pages: int, contexts: int, per_context: int, block: bool) -> float:
+    options = {} if block else {"block_resources": (), "block_hosts": ()}
+    async with BrowserPool(contexts=contexts, pages_per_context=per_context, recycle_after=50, **options) as pool:
+        queue = asyncio.Queue()
+        for n in range(pages):
+            queue.put_nowait(n)
+
+        async def worker():
+            while not queue.empty():
+                n = queue.get_nowait()
+                await pool.fetch_html(f"{base}/list?p={n}", wait_for="div.mqs-prop-dt-wrapper")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(pool.size)))
+        elapsed = time.perf_counter() - start
+        print(f"   pool stats: {pool.stats}")
+        return elapsed
+
+
+def report(name: str, pages: int, seconds: float, cores: int):
+    per_min = pages * 60 / seconds
+    print(f"⏱️ {name:<28} {seconds:7.1f}s  {per_min:8.0f} pages/min  {per_min / cores:7.0f} pages/min/core")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--contexts", type=int, default=2)
+    parser.add_argument("--pages-per-context", type=int, default=4)
+    parser.add_argument("--fresh-pages", type=int, default=20, help="fresh-browser baseline is slow; sample fewer")
+    args = parser.parse_args()
+
+    base = start_server()
+    cores = os.cpu_count() or 1
+    concurrency = args.contexts * args.pages_per_context
+    print(f"🖥️ {cores} cores, {concurrency} concurrent pages, local server {base}\n")
+
+    report("fresh browser per URL", args.fresh_pages,
+           await fresh_browser_per_url(base, args.fresh_pages, concurrency), cores)
+    report("pool, no blocking", args.pages,
+           await pooled(base, args.pages, args.contexts, args.pages_per_context, block=False), cores)
+    report("pool, resource blocking", args.pages,
+           await pooled(base, args.pages, args.contexts, args.pages_per_context, block=True), cores)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""
+End-to-end cost of the data/ modelling chain: full-CSV hand-offs vs the Parquet lake (storage/data_lake.py).
+
+Both chains run the same vectorized transforms on the same synthetic rows -
+clean -> with_predictions -> geocoded_full -> poi_enriched -> realistic_prices,
+with deterministic stand-ins for the model and the Maps API calls - so the
+difference is purely how each stage reads its input and persists its output.
+Ends with an aggregate query (median price by bedrooms) over the last stage.
+
+    python scripts/benchmark_data_lake.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from storage.data_lake import DataLake
+
+CITIES = ["East Legon, Accra", "Osu, Accra", "Cantonments, Accra", "Dansoman, Accra", "Kumasi",
+          "Takoradi", "Tema", "Ashaiman", "Cape Coast", "Tamale", "Ho", "Koforidua"]
+POI_COLUMNS = ["schools_nearby", "hospitals_nearby", "malls_nearby", "transit_nearby"]
+
+
+def make_raw(rows: int, seed: int = 7) -> pd.DataFrame:
+    rnd = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": [str(uuid.UUID(int=int(i), version=4)) for i in rnd.integers(0, 2 ** 62, rows)],
+        "price": rnd.integers(300, 250_000, rows).astype(float),
+        "bedrooms": rnd.integers(1, 7, rows).astype(float),
+        "bathrooms": rnd.integers(1, 6, rows).astype(float),
+        "latitude": 5.6 + rnd.normal(0, 0.1, rows),
+        "longitude": -0.2 + rnd.normal(0, 0.1, rows),
+        "address": [f"{n}, Random Street, {c}" for n, c in zip(rnd.integers(1, 200, rows), rnd.choice(CITIES, rows))],
+        "zip_code": "",
+        "size": np.where(rnd.random(rows) < 0.05, np.nan, rnd.uniform(50, 4000, rows)),
+        "title": rnd.choice(["Modern Apartment", "Family House", "Sea View Villa", "Townhouse"], rows),
+    })
+
+
+# --- SHARED STAGE TRANSFORMS (what each pipeline script computes) ---
+
+def clean(df):
+    df = df.assign(area_sqm=df["size"] * 0.092903)
+    df = df[df["area_sqm"].notna() & (df["area_sqm"] > 0) & (df["price"] >= 500) & (df["price"] <= 200000)]
+    return df.assign(price_per_sqm=df["price"] / df["area_sqm"])
+
+
+def predict(df):
+    df = df[df["area_sqm"] >= 10]
+    predicted = 900 * df["area_sqm"] + 4000 * df["bedrooms"].fillna(0) + 2500 * df["bathrooms"].fillna(0)
+    return df.assign(predicted_price=predicted, price_diff_pct=(predicted - df["price"]) / df["price"])
+
+
+def geocode(df):
+    return df.assign(latitude=df["latitude"].round(4), longitude=df["longitude"].round(4))
+
+
+def poi(df):
+    cell = ((df["latitude"] * 100).round() * 7 + (df["longitude"] * 100).round()).astype(int)
+    return df.assign(**{c: (cell * (i + 3)) % (5 + i * 3) for i, c in enumerate(POI_COLUMNS)})
+
+
+def realistic(df):
+    addr = df["address"].str.lower()
+    factor = np.select(
+        [addr.str.contains("legon|osu|cantonments|airport"), addr.str.contains("accra|dansoman"),
+         addr.str.contains("takoradi|kumasi|tema|ashaiman")], [1.8, 1.5, 1.2], 1.0)
+    base = df["area_sqm"] * 800 + df["bedrooms"] * 5000 + df["bathrooms"] * 3000
+    boost = (df["schools_nearby"] * 2000 + df["hospitals_nearby"] * 1500 + df["malls_nearby"] * 3000
+             + df["transit_nearby"] * 1000)
+    price_realistic = base * factor + boost
+    noise = np.random.default_rng(42).uniform(0.9, 1.1, len(df))
+    return df.assign(location_factor=factor, price_realistic=price_realistic,
+                     price=(price_realistic * noise).round().clip(1000, 200000))
+
+
+# Stage -> (transform, columns it needs, columns it adds)
+STAGES = [
+    ("clean", clean, ["size", "price"], ["area_sqm", "price_per_sqm"]),
+    ("with_predictions", predict, ["price", "bedrooms", "bathrooms", "area_sqm"], ["predicted_price", "price_diff_pct"]),
+    ("geocoded_full", geocode, ["latitude", "longitude"], ["latitude", "longitude"]),
+    ("poi_enriched", poi, ["latitude", "longitude"], POI_COLUMNS),
+    ("realistic_prices", realistic, ["address", "area_sqm", "bedrooms", "bathrooms", *POI_COLUMNS],
+     ["location_factor", "price_realistic", "price"]),
+]
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def run_csv_chain(root: Path) -> dict:
+    timings, previous = {}, root / "ghana_properties_raw.csv"
+    for name, fn, _, _ in STAGES:
+        start = time.perf_counter()
+        df = fn(pd.read_csv(previous))
+        previous = root / f"ghana_properties_{name}.csv"
+        df.to_csv(previous, index=False)
+        timings[name] = time.perf_counter() - start
+    start = time.perf_counter()
+    pd.read_csv(previous).groupby("bedrooms")["price"].median()
+    timings["query"] = time.perf_counter() - start
+    return timings
+
+
+def run_lake_chain(root: Path) -> dict:
+    lake = DataLake(root / "lake")
+    timings = {}
+    start = time.perf_counter()
+    lake.import_csv(root / "ghana_properties_raw.csv")
+    timings["import"] = time.perf_counter() - start
+    parent = "raw"
+    for name, fn, needs, adds in STAGES:
+        start = time.perf_counter()
+        df = fn(lake.read(parent, columns=needs))
+        lake.write_stage(name, df[["id", *adds]])
+        timings[name] = time.perf_counter() - start
+        parent = name
+    start = time.perf_counter()
+    lake.sql(f"SELECT bedrooms, median(price) FROM {parent} GROUP BY 1").df()
+    timings["query"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        start = time.perf_counter()
+        make_raw(args.rows).to_csv(tmp / "ghana_properties_raw.csv", index=False)
+        print(f"🧪 {args.rows:,} synthetic rows in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(tmp / 'ghana_properties_raw.csv') / 1e6:.0f} MB raw CSV)")
+
+        csv_t = run_csv_chain(tmp)
+        csv_mb = sum(os.path.getsize(p) for p in tmp.glob("ghana_properties_*.csv")
+                     if p.name != "ghana_properties_raw.csv") / 1e6
+        lake_t = run_lake_chain(tmp)
+        raw_mb = dir_size(tmp / "lake" / "raw") / 1e6
+        lake_mb = dir_size(tmp / "lake") / 1e6 - raw_mb
+
+    print(f"{'stage':<18}{'csv':>9}{'lake':>9}")
+    for name in ["import", *[s[0] for s in STAGES], "query"]:
+        print(f"{name:<18}{csv_t.get(name, 0):>8.2f}s{lake_t.get(name, 0):>8.2f}s")
+    csv_total, lake_total = sum(csv_t.values()), sum(lake_t.values())
+    print(f"⏱️ end-to-end: csv {csv_total:.1f}s, lake {lake_total:.1f}s ({csv_total / lake_total:.1f}x)")
+    print(f"💾 stage outputs: csv {csv_mb:.0f} MB, lake {lake_mb:.0f} MB (+ {raw_mb:.0f} MB raw stage)")
+
+
+if __name__ == "__main__":
+    main()
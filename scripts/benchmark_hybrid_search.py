@@ -0,0 +1,104 @@
+"""
+Latency harness for storage/hybrid_search.py (target: p95 < 20 ms at 100k listings).
+
+Generates synthetic Ghana listings, builds the BM25 + IVF indexes, then times
+lexical-only, vector-only and fused queries with and without filters.
+
+    python scripts/benchmark_hybrid_search.py --rows 100000
+"""
+
+import argparse
+import time
+import numpy as np
+
+from storage.hybrid_search import BM25Index, HybridSearch
+from storage.vector_index import VectorIndex
+
+LOCATIONS = [
+    "East Legon", "Cantonments", "Airport Residential", "Osu", "Labone", "Spintex",
+    "Tema", "Kasoa", "Oyibi", "Adenta", "Dzorwulu", "Trasacco", "Achimota", "Madina",
+]
+KINDS = ["house", "apartment", "townhouse", "duplex", "studio", "villa"]
+FEATURES = ["swimming pool", "gated community", "boys quarters", "fully furnished",
+            "backup generator", "water tank", "garden", "security", "gym", "balcony"]
+QUERIES = ["4 bedroom Spintex", "swimming pool East Legon", "gated community",
+           "furnished apartment Osu", "3 bed townhouse Tema", "villa with garden Trasacco"]
+FILTERS = [None, {"listing_type": "RENT"}, {"min_price": 5000, "max_price": 500000, "bedrooms": 3}]
+
+
+def synthetic_listings(rows: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(rows):
+        beds = int(rng.integers(1, 7))
+        loc = LOCATIONS[rng.integers(len(LOCATIONS))]
+        kind = KINDS[rng.integers(len(KINDS))]
+        feats = ", ".join(rng.choice(FEATURES, size=3, replace=False))
+        records.append({
+            "id": f"syn:{i}",
+            "title": f"{beds} bedroom {kind} for {'rent' if i % 3 else 'sale'} in {loc}",
+            "location": f"{loc}, Accra",
+            "description": f"Lovely {kind} with {feats}.",
+            "price": float(rng.lognormal(11, 1.2)),
+            "bedrooms": beds,
+            "listing_type": "RENT" if i % 3 else "SALE",
+        })
+    return records
+
+
+def percentile_ms(fn, repeats: int):
+    latencies = []
+    for r in range(repeats):
+        start = time.perf_counter()
+        fn(r)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    records = synthetic_listings(args.rows)
+    start = time.perf_counter()
+    lexical = BM25Index()
+    lexical.add(records)
+    print(f"📚 BM25 index: {len(lexical):,} listings in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(args.rows, args.dim)).astype(np.float32)
+    start = time.perf_counter()
+    vector_index = VectorIndex(dim=args.dim)
+    vector_index.build([r["id"] for r in records], vectors,
+                       {k: [r[k] for r in records] for k in ("price", "bedrooms", "listing_type")})
+    print(f"🧠 IVF index:  {len(vector_index):,} vectors in {time.perf_counter() - start:.1f}s")
+
+    engine = HybridSearch(lexical, vector_index)
+    query_vectors = rng.normal(size=(len(QUERIES), args.dim)).astype(np.float32)
+
+    def lexical_only(r):
+        lexical.search(QUERIES[r % len(QUERIES)], k=10, filters=FILTERS[r % len(FILTERS)])
+
+    def vector_only(r):
+        vector_index.search(query_vectors[r % len(QUERIES)], k=10, filters=FILTERS[r % len(FILTERS)])
+
+    def fused(r):
+        engine.search(QUERIES[r % len(QUERIES)], query_vector=query_vectors[r % len(QUERIES)],
+                      k=10, filters=FILTERS[r % len(FILTERS)])
+
+    print()
+    for name, fn in (("BM25", lexical_only), ("Vector", vector_only), ("Hybrid RRF", fused)):
+        p50, p95 = percentile_ms(fn, args.repeats)
+        verdict = "✅" if p95 < 20 else "⚠️"
+        print(f"{verdict} {name:<11} p50 {p50:6.2f} ms   p95 {p95:6.2f} ms")
+
+    print("\n🔎 Sample: '4 bedroom Spintex'")
+    for hit in lexical.search("4 bedroom Spintex", k=3):
+        print(f"   {hit[0]}  {hit[1]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Serialization time and bytes-on-wire for the list endpoints (api/responses.py).
+
+Builds the /properties/geojson and /properties/unified payloads for N synthetic
+Supabase rows and times each response path FastAPI could take:
+
+  default   jsonable_encoder + stdlib json (FastAPI's JSONResponse)
+  orjson    jsonable_encoder + orjson (ORJSONResponse, the app default now)
+  direct    orjson straight from the rows (json_response - no jsonable_encoder)
+  cached    CachedJSON hit: pre-serialized, pre-compressed bytes
+
+then the size of each body as sent (identity / gzip / brotli when installed).
+
+    python scripts/benchmark_json_responses.py --rows 10000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api.responses import CachedJSON, ORJSONResponse, brotli, encode, json_response
+from api.routers.listings import build_properties_geojson
+
+LOCATIONS = ["East Legon", "Osu", "Cantonments", "Airport Residential", "Spintex", "Tema", "Kumasi", "Dansoman"]
+VIBES = ["Modern", "Luxury", "Family", "Standard", "Serviced"]
+
+
+def make_rows(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for _ in range(n):
+        loc = rnd.choice(LOCATIONS)
+        rows.append({
+            "id": str(uuid.UUID(int=rnd.getrandbits(128), version=4)),
+            "title": f"{rnd.randint(1, 6)} Bedroom {rnd.choice(['Apartment', 'House', 'Townhouse'])} in {loc}",
+            "price": float(rnd.randint(800, 950_000)),
+            "currency": rnd.choice(["GHS", "USD"]),
+            "latitude": round(5.6 + rnd.gauss(0, 0.05), 6),
+            "longitude": round(-0.18 + rnd.gauss(0, 0.05), 6),
+            "roi_score": round(rnd.uniform(3, 9.5), 1),
+            "vibe": rnd.choice(VIBES),
+            "location": f"{loc}, Accra",
+            "description": f"Spacious listing in {loc} with parking, backup power and 24h security.",
+            "created_at": (start + timedelta(minutes=rnd.randint(0, 500_000))).isoformat(),
+        })
+    return rows
+
+
+def best_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return min(times) if repeat < 5 else statistics.median(times)
+
+
+def bench(name: str, payload, repeat: int):
+    paths = {
+        "default": lambda: JSONResponse(jsonable_encoder(payload)).body,
+        "orjson": lambda: ORJSONResponse(jsonable_encoder(payload)).body,
+        "direct": lambda: json_response(payload).body,
+    }
+    cache = CachedJSON(name, ttl=3600)
+    built = time.perf_counter()
+    cache.get_entry(lambda: payload)
+    build_ms = (time.perf_counter() - built) * 1000
+    paths["cached"] = lambda: cache.get_entry(lambda: payload)["identity"]
+
+    print(f"\n📦 {name}")
+    baseline = None
+    for label, fn in paths.items():
+        ms = best_ms(fn, repeat)
+        baseline = baseline or ms
+        speedup = f"{baseline / ms:.1f}x" if ms >= 0.01 else "dict lookup"
+        print(f"   {label:<8}{ms:>9.3f} ms  ({speedup})")
+    print(f"   (cache entry build incl. compression: {build_ms:.1f} ms once per TTL)")
+
+    body = json_response(payload).body
+    sizes = {"identity": (len(body), 0.0)}
+    for encoding in ["gzip", *(["br"] if brotli is not None else [])]:
+        started = time.perf_counter()
+        sizes[encoding] = (len(encode(body, encoding)), (time.perf_counter() - started) * 1000)
+    for encoding, (size, ms) in sizes.items():
+        extra = f", {ms:.1f} ms to encode" if ms else ""
+        print(f"   wire {encoding:<9}{size / 1e6:>7.2f} MB ({size / len(body):.0%}{extra})")
+    if brotli is None:
+        print("   (pip install brotli to compare br)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    geo_cols = ["id", "title", "price", "currency", "latitude", "longitude", "roi_score", "vibe"]
+    print(f"🧪 {args.rows:,} synthetic properties")
+    bench("properties/geojson", build_properties_geojson([{c: r[c] for c in geo_cols} for r in rows]), args.repeat)
+    bench("properties/unified", rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Throughput, recall and precision of processing/near_dup.py on synthetic listings.
+
+Generates N distinct listings, then re-lists a sample of them "on another
+portal" (reworded title, extra description words, price within a few percent)
+and checks that every copy lands in its original's cluster.
+
+    python scripts/benchmark_near_dup.py --listings 200000 --copies 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from processing.near_dup import NearDupIndex
+
+AREAS = ["East Legon", "Cantonments", "Airport Residential", "Osu", "Spintex", "Tema Community 25",
+         "Adenta", "Madina", "Dzorwulu", "Roman Ridge", "Trasacco", "Kasoa", "Labone", "Achimota"]
+KINDS = ["house", "apartment", "townhouse", "villa", "duplex", "bungalow"]
+VOCAB = [f"feature{i}" for i in range(5000)]
+
+
+def make_listing(rnd: random.Random, i: int) -> dict:
+    beds = rnd.randint(1, 6)
+    area = f"{rnd.choice(AREAS)} {rnd.randint(1, 40)}"
+    return {
+        "id": f"src_a:{i}",
+        "source": "src_a",
+        "title": f"{beds} bedroom {rnd.choice(KINDS)} for sale at {area}",
+        "description": " ".join(rnd.choices(VOCAB, k=30)),
+        "price_amount": rnd.randint(40, 2000) * 1000,
+        "currency": "USD",
+        "bedrooms": beds,
+        "location": area,
+    }
+
+
+def make_copy(rnd: random.Random, original: dict) -> dict:
+    words = original["description"].split()
+    return {
+        **original,
+        "id": original["id"].replace("src_a", "src_b"),
+        "source": "src_b",
+        "title": f"Executive {original['title']}",
+        "description": " ".join(words + rnd.choices(VOCAB, k=3)),
+        "price_amount": round(original["price_amount"] * rnd.uniform(0.95, 1.05)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=50000)
+    parser.add_argument("--copies", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    listings = [make_listing(rnd, i) for i in range(args.listings)]
+    copies = [make_copy(rnd, o) for o in rnd.sample(listings, args.copies)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NearDupIndex(Path(tmp) / "near_dup.sqlite")
+        start = time.perf_counter()
+        for i in range(0, len(listings), args.batch):
+            index.add(listings[i:i + args.batch])
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        clusters = index.add(copies)
+        incremental = time.perf_counter() - start
+
+        found = sum(clusters[c["id"]] == index.cluster_of(c["id"].replace("src_b", "src_a")) for c in copies)
+        stats = index.stats()
+        false_merges = stats["duplicates"] - found
+        size_mb = os.path.getsize(Path(tmp) / "near_dup.sqlite") / 1e6
+
+    print(f"⏱️ index {args.listings:,} listings: {build:.1f}s ({args.listings / build:,.0f}/s), {size_mb:.0f} MB")
+    print(f"⏱️ incremental ingest of {args.copies:,} copies: {incremental:.2f}s ({args.copies / incremental:,.0f}/s)")
+    print(f"🎯 recall {found}/{args.copies} ({found / args.copies:.1%}), false merges {false_merges}")
+
+
+if __name__ == "__main__":
+    main()
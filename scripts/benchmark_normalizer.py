@@ -0,0 +1,62 @@
+"""
+Checks utils/normalizer.py against the golden cases (tests/check_normalizer.py),
+then times the scalar and vectorised paths on a scraper dump.
+
+    python scripts/benchmark_normalizer.py --dump data/gpc_master_dump_2025_v2.jsonl
+
+Exits non-zero if either path disagrees with data/golden/normalizer_cases.json.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from tests.check_normalizer import FRAME_FIELDS, GOLDEN_PATH, _clean, check_golden, check_non_finite
+from utils.normalizer import normalize_frame, normalize_listing
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--golden", default=str(GOLDEN_PATH))
+    parser.add_argument("--dump", default="data/gpc_master_dump_2025_v2.jsonl")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if check_golden(args.golden) + check_non_finite():
+        sys.exit(1)
+
+    records = [json.loads(line) for line in open(args.dump, encoding="utf-8") if line.strip()]
+    rows = [{k: r.get(k) for k in ("price", "title", "bedrooms", "bathrooms")} for r in records]
+    df = pd.DataFrame(rows)
+    print(f"\n📦 {len(rows):,} records from {args.dump}")
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        scalar = [normalize_listing(r) for r in rows]
+    scalar_s = (time.perf_counter() - start) / args.repeats
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        frame = normalize_frame(df, beds_col="bedrooms", baths_col="bathrooms")
+    frame_s = (time.perf_counter() - start) / args.repeats
+
+    mismatches = sum(
+        1 for s, (_, row) in zip(scalar, frame.iterrows())
+        if any(s[f] != _clean(row[f]) for f in FRAME_FIELDS)
+    )
+    priced = sum(1 for s in scalar if s["price_amount"] is not None)
+
+    print(f"🐍 Scalar     {scalar_s * 1000:8.1f} ms  ({len(rows) / scalar_s:,.0f} rows/s)")
+    print(f"🐼 Vectorised {frame_s * 1000:8.1f} ms  ({len(rows) / frame_s:,.0f} rows/s)")
+    print(f"💰 Priced: {priced:,}/{len(rows):,}   Scalar vs vectorised mismatches: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Recall-vs-latency benchmark for storage/vector_index.py.
+
+Builds an IVF index over synthetic clustered 768-d embeddings (or the saved
+index with --use-saved) and compares it against brute-force cosine search.
+
+    python scripts/benchmark_vector_index.py --rows 100000 --queries 200
+"""
+
+import argparse
+import time
+import numpy as np
+
+from storage.vector_index import VectorIndex, DEFAULT_INDEX_DIR, EMBEDDING_DIM
+
+
+def synthetic_corpus(rows: int, dim: int, clusters: int = 200, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=rows)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(rows, dim)).astype(np.float32)
+    attrs = {
+        "price": rng.lognormal(mean=12, sigma=1, size=rows),
+        "bedrooms": rng.integers(1, 7, size=rows),
+        "listing_type": rng.choice(["SALE", "RENT"], size=rows),
+    }
+    queries = centers[rng.integers(0, clusters, size=200)] + 0.6 * rng.normal(size=(200, dim)).astype(np.float32)
+    return [f"syn:{i}" for i in range(rows)], vectors, attrs, queries
+
+
+def timed(fn, queries, **kwargs):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q, **kwargs))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def recall(approx, exact):
+    hits = [len({i for i, _ in a} & {i for i, _ in e}) / max(1, len(e)) for a, e in zip(approx, exact)]
+    return float(np.mean(hits))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--use-saved", action="store_true", help="Benchmark the index in data/vector_index")
+    args = parser.parse_args()
+
+    if args.use_saved:
+        index = VectorIndex.load(DEFAULT_INDEX_DIR)
+        rng = np.random.default_rng(0)
+        queries = np.asarray(index.vectors[rng.choice(len(index.vectors), args.queries)])
+    else:
+        print(f"🧪 Building IVF index over {args.rows:,} synthetic {EMBEDDING_DIM}-d vectors...")
+        ids, vectors, attrs, queries = synthetic_corpus(args.rows, EMBEDDING_DIM)
+        start = time.perf_counter()
+        index = VectorIndex()
+        index.build(ids, vectors, attrs)
+        print(f"   Built in {time.perf_counter() - start:.1f}s ({len(index.centroids)} lists)")
+    queries = queries[:args.queries]
+
+    exact, bf_p50, bf_p95 = timed(index.brute_force, queries, k=args.k)
+    print(f"\n📏 Brute force      p50 {bf_p50:7.2f} ms   p95 {bf_p95:7.2f} ms")
+    for n_probe in (1, 4, 8, 16, 32):
+        approx, p50, p95 = timed(index.search, queries, k=args.k, n_probe=n_probe)
+        print(f"⚡ IVF n_probe={n_probe:<3} p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   recall@{args.k} {recall(approx, exact):.3f}")
+
+    filters = {"max_price": 200000, "bedrooms": 3, "listing_type": "RENT"}
+    exact_f, _, _ = timed(index.brute_force, queries, k=args.k, filters=filters)
+    approx_f, p50, p95 = timed(index.search, queries, k=args.k, filters=filters)
+    print(f"🔎 Filtered search  p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   recall@{args.k} {recall(approx_f, exact_f):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import os
-import feedparser
+import sys
+from pathlib import Path
 from supabase import create_client, Client
 from dateutil import parser
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from scrapers.feed_fetcher import FeedFetcher
+
 url = os.environ.get("SUPABASE_URL")
 key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
 
@@ -18,13 +22,20 @@ feeds = [
     {"name": "GhanaWeb Business", "url": "https://cdn.ghanaweb.com/feed/news/business.xml"}
 ]
 
-for source in feeds:
-    print(f"📡 Checking {source['name']}...")
+# All feeds at once, with timeouts and If-None-Match / If-Modified-Since;
+# a feed's state is saved only once its articles are upserted.
+fetcher = FeedFetcher()
+results = fetcher.sweep_sync([source['url'] for source in feeds], save=False)
+unsaved = []
+
+for source, result in zip(feeds, results):
+    print(f"📡 Checking {source['name']}... {result.status}")
     try:
-        feed = feedparser.parse(source['url'])
-        
+        if result.status == "error":
+            raise RuntimeError(result.error)
+
         articles_batch = []
-        for entry in feed.entries[:5]:
+        for entry in result.entries[:5]:
             text_to_search = (entry.title + " " + entry.get("description", "")).lower()
             keywords = ["housing", "rent", "cement", "construction", "real estate", "land", "infrastructure", "accra"]
             
@@ -45,5 +56,8 @@ for source in feeds:
             
     except Exception as e:
         print(f"   ⚠️ Failed to fetch {source['name']}: {e}")
+        if result.status == "ok":
+            unsaved.append(result.url)
 
+fetcher.save_state(keep=unsaved)
 print("✅ RSS Ingestion Complete.")
@@ -1,6 +1,8 @@
 import os
+import sys
 import time
 import json
+from pathlib import Path
 from dotenv import load_dotenv
 from supabase import create_client
 from google import genai
@@ -9,6 +11,9 @@ from google.genai import types
 # Import our new scraper
 from web_scrapers.news_scraper import get_real_estate_news
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from storage.news_writer import NewsWriter
+
 load_dotenv()
 
 # Initialize Supabase
@@ -52,16 +57,17 @@ def main():
     articles = get_real_estate_news()
     print(f"📥 Found {len(articles)} recent articles.")
     
-    new_signals = 0
+    # Known URLs in one lookup per ~200 articles instead of one query each
+    writer = NewsWriter(supabase, "news_articles")
+    try:
+        writer.warm(article['url'] for article in articles)
+    except Exception as e:
+        print(f"   ⚠️ Could not load known articles: {e}")
     
     for article in articles:
-        # Check if already processed (Idempotency)
-        try:
-            res = supabase.table("news_articles").select("id").eq("url", article['url']).execute()
-            if len(res.data) > 0:
-                continue
-        except:
-            pass
+        # Check if already processed (Idempotency) - before paying for the AI call
+        if writer.known(article['url']):
+            continue
             
         print(f"🧠 Analyzing: {article['title'][:40]}...")
         
@@ -69,8 +75,8 @@ def main():
         analysis = analyze_news_signal(article['title'], article['source'])
         
         if analysis:
-            # 3. Store in Supabase
-            payload = {
+            # 3. Queue for Supabase (written in chunks below)
+            writer.add({
                 "title": article['title'],
                 "url": article['url'],
                 "source": article['source'],
@@ -79,22 +85,16 @@ def main():
                 "summary": analysis.get("summary", ""),
                 "related_locations": analysis.get("related_locations", []),
                 "created_at": "now()"
-            }
+            })
             
-            try:
-                supabase.table("news_articles").insert(payload).execute()
-                new_signals += 1
-                
-                # OPTIONAL: Update the Location's Sentiment Score directly?
-                # For now, we just store the news. The aggregation script can use this later.
-                
-            except Exception as e:
-                print(f"   ❌ Storage Error: {e}")
+            # OPTIONAL: Update the Location's Sentiment Score directly?
+            # For now, we just store the news. The aggregation script can use this later.
         
         # Respect Rate Limits
         time.sleep(1)
 
-    print(f"✅ Market Signals Updated: {new_signals} new insights logged.")
+    writer.flush()
+    print(f"✅ Market Signals Updated: {writer.stats['written']} new insights logged.")
 
 if __name__ == "__main__":
     main()
@@ -15,6 +15,8 @@ def update_neighborhood_insights():
     # We use a single, powerful SQL query via Supabase RPC or a raw call 
     # to calculate stats from unique listings.
     # Note: Using .rpc() requires a saved Postgres function 'calculate_market_insights'.
+    # Near-duplicates (the same house on several portals) share metadata->>'cluster_id'
+    # (processing/near_dup.py); only one row per cluster is counted.
     
     sql_query = """
     INSERT INTO public.market_insights (
@@ -26,6 +28,12 @@ def update_neighborhood_insights():
         sentiment_score, 
         last_updated
     )
+    WITH unique_listings AS (
+        SELECT DISTINCT ON (COALESCE(metadata->>'cluster_id', id::text)) *
+        FROM public.market_listings
+        WHERE location IS NOT NULL
+        ORDER BY COALESCE(metadata->>'cluster_id', id::text), id
+    )
     SELECT 
         location,
         AVG(CASE WHEN title ILIKE '%sale%' OR title ILIKE '%buy%' THEN price END) as avg_sale,
@@ -34,8 +42,7 @@ def update_neighborhood_insights():
         AVG((insight_cache->>'roi_score')::numeric) as avg_roi,
         AVG((insight_cache->>'sentiment_score')::numeric) as avg_sentiment,
         NOW()
-    FROM public.market_listings
-    WHERE location IS NOT NULL
+    FROM unique_listings
     GROUP BY location
     ON CONFLICT (location) DO UPDATE SET
         avg_price_sale = EXCLUDED.avg_price_sale,
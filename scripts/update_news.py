@@ -1,9 +1,14 @@
 import os
+import sys
 import feedparser
+from pathlib import Path
 from dateutil import parser
 from dotenv import load_dotenv
 from supabase import create_client
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from storage.news_writer import NewsWriter
+
 if os.path.exists(".env"):
     load_dotenv()
 
@@ -16,29 +21,30 @@ RSS_URL = "https://news.google.com/rss/search?q=Ghana+Real+Estate+OR+Accra+Housi
 def run():
     print("📰 Fetching Real Estate News...")
     feed = feedparser.parse(RSS_URL)
-    new_count = 0
-    for entry in feed.entries[:10]:
+    entries = feed.entries[:10]
+    writer = NewsWriter(supabase, "news_articles")
+    writer.warm(entry.link for entry in entries)
+    for entry in entries:
         try:
-            existing = supabase.table("news_articles").select("id").eq("url", entry.link).execute()
-            if existing.data: continue
+            if writer.known(entry.link): continue
 
             title_text = entry.title + " " + entry.description
             locations = []
             for loc in ["Osu", "Legon", "Cantonments", "Spintex", "Airport"]:
                 if loc in title_text: locations.append(loc)
 
-            supabase.table("news_articles").insert({
+            writer.add({
                 "title": entry.title,
                 "url": entry.link,
                 "source": entry.source.get('title', 'Google News'),
                 "published_at": parser.parse(entry.published).isoformat(),
                 "related_locations": locations,
                 "summary": entry.description
-            }).execute()
-            new_count += 1
+            })
         except Exception as e:
             print(f"   ⚠️ Skipping item: {e}")
-    print(f"✅ News update complete. Added {new_count} articles.")
+    writer.flush()
+    print(f"✅ News update complete. Added {writer.stats['written']} articles.")
 
 if __name__ == "__main__":
     run()
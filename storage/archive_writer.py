@@ -0,0 +1,242 @@
+# storage/archive_writer.py
+"""
+Batched raw-data archival: gzip NDJSON shards, uploaded in parallel, one manifest per run.
+
+The scrapers, run_pipeline.py and the RSS job used to upload pretty-printed
+JSON - one blob per article, per site/type run or per DataFrame - each upload
+blocking the caller. `ArchiveWriter` instead:
+
+  * buffers records as NDJSON and seals a shard when it reaches
+    `max_shard_bytes` (uncompressed) or is older than `max_shard_age`
+    seconds (checked on write);
+  * gzips and uploads sealed shards on a shared thread pool, so the caller
+    keeps scraping while earlier shards are in flight; GCS uploads are
+    resumable above 8 MB and create-only (`if_generation_match=0`), which
+    makes retries safe;
+  * writes `<prefix>/<run_id>.manifest.json` after the last shard, listing
+    every shard with its record count, sizes and md5.
+
+    with ArchiveWriter(backend_from_uri(), "raw/property_listings/meqasa.com/for_sale") as archive:
+        archive.write_many(rows)
+    # -> raw/property_listings/meqasa.com/for_sale/20250101_120000-part-00000.ndjson.gz
+
+BigQuery loads the shards directly (NEWLINE_DELIMITED_JSON reads .gz), see
+archive/bq_ingestion.py.
+
+Backends: `gs://bucket` (default, GCS_BUCKET_NAME) or a local directory
+(`file:///tmp/archive` or a plain path) for offline runs - set ASTA_ARCHIVE_URI.
+"""
+
+import atexit
+import functools
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_ARCHIVE_URI = os.getenv(
+    "ASTA_ARCHIVE_URI", f"gs://{os.getenv('GCS_BUCKET_NAME', 'asta-insights-data-certain-voyager')}")
+MAX_SHARD_BYTES = 32 * 1024 * 1024
+MAX_SHARD_AGE = 60.0
+UPLOAD_WORKERS = 8
+UPLOAD_ATTEMPTS = 3
+RESUMABLE_CHUNK = 8 * 1024 * 1024   # multiple of 256 KB; larger payloads go through a resumable session
+
+
+# --- BACKENDS ---
+
+class LocalBackend:
+    """Writes objects under a directory - the offline / test stand-in for a bucket."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def upload(self, name: str, data: bytes, content_type: str):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    def url(self, name: str) -> str:
+        return str(self.root / name)
+
+
+class GCSBackend:
+    def __init__(self, bucket_name: str, client=None):
+        from google.cloud import storage
+        self.bucket_name = bucket_name
+        self.bucket = (client or storage.Client()).bucket(bucket_name)
+
+    def upload(self, name: str, data: bytes, content_type: str):
+        from google.api_core.exceptions import PreconditionFailed
+        blob = self.bucket.blob(name, chunk_size=RESUMABLE_CHUNK if len(data) > RESUMABLE_CHUNK else None)
+        try:
+            # Create-only makes the upload idempotent, so the client library retries it on 5xx/timeouts
+            blob.upload_from_string(data, content_type=content_type, if_generation_match=0)
+        except PreconditionFailed:
+            pass  # an earlier attempt already landed
+
+    def url(self, name: str) -> str:
+        return f"gs://{self.bucket_name}/{name}"
+
+
+@functools.lru_cache(maxsize=None)
+def backend_from_uri(uri: Optional[str] = None):
+    uri = uri or DEFAULT_ARCHIVE_URI
+    if uri.startswith("gs://"):
+        return GCSBackend(uri[len("gs://"):].strip("/"))
+    return LocalBackend(uri[len("file://"):] if uri.startswith("file://") else uri)
+
+
+# --- UPLOAD POOL ---
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending: List[Future] = []   # manifests still being written (close(wait=False))
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="archive")
+        return _pool
+
+
+def drain() -> List[Dict[str, Any]]:
+    """Blocks until every background archive run has uploaded its shards and manifest."""
+    with _pool_lock:
+        futures = list(_pending)
+        _pending.clear()
+    return [f.result() for f in futures]
+
+
+atexit.register(drain)
+
+
+class ArchiveWriter:
+    def __init__(self, backend=None, prefix: str = "raw", run_id: Optional[str] = None,
+                 max_shard_bytes: int = MAX_SHARD_BYTES, max_shard_age: float = MAX_SHARD_AGE):
+        self.backend = backend or backend_from_uri()
+        self.prefix = prefix.strip("/")
+        self.run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        self.max_shard_bytes = max_shard_bytes
+        self.max_shard_age = max_shard_age
+        self._lines: List[bytes] = []
+        self._bytes = 0
+        self._opened = time.monotonic()
+        self._shards: List[Future] = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.records = 0
+        self.closed = False
+
+    # --- WRITING ---
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            self._lines.append(line)
+            self._bytes += len(line)
+            self.records += 1
+            if self._bytes >= self.max_shard_bytes or time.monotonic() - self._opened >= self.max_shard_age:
+                self._seal()
+
+    def write_many(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.write(record)
+
+    def _seal(self):
+        if not self._lines:
+            return
+        name = f"{self.prefix}/{self.run_id}-part-{len(self._shards):05d}.ndjson.gz"
+        lines, self._lines, self._bytes = self._lines, [], 0
+        self._opened = time.monotonic()
+        self._shards.append(_executor().submit(self._upload_shard, name, lines))
+
+    def _upload_shard(self, name: str, lines: List[bytes]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        raw = b"".join(lines)
+        data = gzip.compress(raw, compresslevel=6)  # zlib releases the GIL: shards compress in parallel
+        shard = {"name": name, "records": len(lines), "raw_bytes": len(raw), "bytes": len(data),
+                 "md5": hashlib.md5(data).hexdigest()}
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            try:
+                self.backend.upload(name, data, "application/gzip")
+                return {**shard, "seconds": round(time.perf_counter() - started, 3)}
+            except Exception as e:
+                if attempt == UPLOAD_ATTEMPTS:
+                    return {**shard, "error": f"{e.__class__.__name__}: {e}"}
+                time.sleep(2 ** attempt)
+
+    # --- CLOSING ---
+
+    def close(self, wait_for_upload: bool = True):
+        """
+        Seals the last shard and writes the manifest once all shards are up.
+        Returns the manifest dict, or (wait_for_upload=False) a Future of it -
+        `drain()` waits for those.
+        """
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("ArchiveWriter is already closed")
+            self.closed = True
+            self._seal()
+        if wait_for_upload:
+            return self._finish()
+        future = _executor().submit(self._finish)
+        with _pool_lock:
+            _pending.append(future)
+        return future
+
+    def _finish(self) -> Dict[str, Any]:
+        # Shards were submitted before this task, so on the FIFO pool they are already running
+        wait(self._shards)
+        shards = [f.result() for f in self._shards]
+        failed = [s for s in shards if "error" in s]
+        manifest = {
+            "run_id": self.run_id,
+            "prefix": self.prefix,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "format": "ndjson.gz",
+            "records": self.records,
+            "raw_bytes": sum(s["raw_bytes"] for s in shards),
+            "bytes": sum(s["bytes"] for s in shards),
+            "shards": shards,
+            "failed_shards": len(failed),
+            "seconds": round(time.perf_counter() - self._started, 3),
+        }
+        manifest_name = f"{self.prefix}/{self.run_id}.manifest.json"
+        try:
+            self.backend.upload(manifest_name, json.dumps(manifest, indent=2).encode("utf-8"),
+                                "application/json; charset=utf-8")
+        except Exception as e:
+            print(f"  ⚠️ Failed to write archive manifest {manifest_name}: {e}")
+        for s in failed:
+            print(f"  ⚠️ Archive shard failed: {s['name']} ({s['error']})")
+        print(f"  ✅ Archived {self.records} records in {len(shards) - len(failed)}/{len(shards)} shards "
+              f"({manifest['raw_bytes'] / 1e6:.1f} MB -> {manifest['bytes'] / 1e6:.1f} MB gz) to "
+              f"{self.backend.url(self.prefix)}/{self.run_id}-*")
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self.closed:
+            self.close()
+
+
+def archive_records(prefix: str, records: Iterable[Dict[str, Any]], run_id: Optional[str] = None,
+                    backend=None, wait_for_upload: bool = False):
+    """One-shot helper: archives `records` under `prefix`; by default uploads in the background."""
+    writer = ArchiveWriter(backend, prefix, run_id=run_id)
+    writer.write_many(records)
+    return writer.close(wait_for_upload=wait_for_upload)
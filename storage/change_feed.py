@@ -0,0 +1,411 @@
+# storage/change_feed.py
+"""
+Change-data-capture feed: row changes in Supabase fan out as invalidation events.
+
+Listings land in `properties` / `market_listings` from many writers (the API,
+the WhatsApp publisher, asta-engine, the batch uploaders) and news in
+`news_articles`. Rather than every cache guessing with a TTL, one consumer per
+process listens for the changes and publishes a `ChangeEvent` on the
+in-process `bus`; caches and indexes subscribe to the tables they derive from.
+
+Sources (ASTA_CDC_SOURCE, default "auto"):
+  realtime  Supabase Realtime postgres_changes over a websocket (SUPABASE_URL +
+            SUPABASE_SERVICE_ROLE_KEY, tables in the supabase_realtime publication)
+  notify    Postgres LISTEN on ASTA_CDC_CHANNEL via psycopg (ASTA_CDC_DSN);
+            the trigger is in asta-web/scripts/sql/004_change_feed.sql
+  local     no external feed: only writes made by this process (publish_change)
+            are seen, and TTLs stay short
+"auto" picks notify if ASTA_CDC_DSN is set, realtime if Supabase is configured, else local.
+
+Each event carries invalidation keys at three grains, so a subscriber can drop
+exactly what a write touched:
+    properties                    the table
+    properties:id:<id>            the row
+    properties:area:east legon    the area (first part of the location)
+    properties:cell:112:-4        the ASTA_CDC_CELL_DEG grid cell of the coordinates
+
+    bus.subscribe(lambda e: cache.invalidate(), tables=["properties"], name="geojson")
+    publish_change("properties", "INSERT", new_prop)     # in-process writers
+    start_feed(bus)                                      # once, at app startup
+
+`LocalFeed` is the stand-in for tests: it takes Realtime-shaped payloads and
+publishes them through the same parsing path.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import psycopg
+except ImportError:  # LISTEN/NOTIFY source is optional; Supabase Realtime needs no extra driver
+    psycopg = None
+
+log = logging.getLogger("asta.cdc")
+
+CDC_SOURCE = os.getenv("ASTA_CDC_SOURCE", "auto")
+CDC_DSN = os.getenv("ASTA_CDC_DSN")
+CDC_CHANNEL = os.getenv("ASTA_CDC_CHANNEL", "asta_changes")
+CDC_TABLES = ["properties", "market_listings", "news_articles"]
+CELL_DEG = float(os.getenv("ASTA_CDC_CELL_DEG", "0.05"))   # ~5.5 km at Accra's latitude
+MAX_BACKOFF = 60.0
+
+LOCATION_FIELDS = ("location", "location_name", "location_clean")
+
+
+# --- GRID CELLS ---
+
+def cell_of(lat, lon, size: float = CELL_DEG) -> Optional[str]:
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(lat) or math.isnan(lon):
+        return None
+    return f"{math.floor(lat / size)}:{math.floor(lon / size)}"
+
+
+def cells_for_bbox(min_lon: float, min_lat: float, max_lon: float, max_lat: float,
+                   size: float = CELL_DEG) -> Set[str]:
+    """Every grid cell a bounding box touches."""
+    rows = range(math.floor(min_lat / size), math.floor(max_lat / size) + 1)
+    cols = range(math.floor(min_lon / size), math.floor(max_lon / size) + 1)
+    return {f"{r}:{c}" for r in rows for c in cols}
+
+
+def cells_for_radius(lat: float, lon: float, radius_km: float, size: float = CELL_DEG) -> Set[str]:
+    dlat = radius_km / 111.0
+    dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+    return cells_for_bbox(lon - dlon, lat - dlat, lon + dlon, lat + dlat, size)
+
+
+# --- EVENTS ---
+
+@dataclass
+class ChangeEvent:
+    table: str
+    op: str                                   # INSERT | UPDATE | DELETE
+    record: Dict[str, Any] = field(default_factory=dict)
+    old_record: Dict[str, Any] = field(default_factory=dict)
+    committed_at: Optional[float] = None      # epoch seconds, when the source reports it
+    source: str = "local"
+
+    @property
+    def id(self) -> Optional[str]:
+        value = self.record.get("id", self.old_record.get("id"))
+        return None if value is None else str(value)
+
+    def areas(self) -> Set[str]:
+        found = set()
+        for row in (self.record, self.old_record):
+            for name in LOCATION_FIELDS:
+                area = str(row.get(name) or "").split(",")[0].strip().lower()
+                if area:
+                    found.add(area)
+        return found
+
+    def cells(self) -> Set[str]:
+        found = {cell_of(row.get("latitude"), row.get("longitude")) for row in (self.record, self.old_record)}
+        return {c for c in found if c}
+
+    def keys(self) -> Set[str]:
+        keys = {self.table}
+        if self.id is not None:
+            keys.add(f"{self.table}:id:{self.id}")
+        keys.update(f"{self.table}:area:{a}" for a in self.areas())
+        keys.update(f"{self.table}:cell:{c}" for c in self.cells())
+        return keys
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any], source: str) -> "ChangeEvent":
+        """Realtime postgres_changes payload ({'data': {...}}) or a NOTIFY payload (the same, flat)."""
+        data = payload.get("data", payload)
+        committed = None
+        if data.get("commit_timestamp"):
+            try:
+                committed = datetime.fromisoformat(str(data["commit_timestamp"]).replace("Z", "+00:00")).timestamp()
+            except ValueError:
+                pass
+        return cls(table=data.get("table", ""), op=str(data.get("type") or data.get("eventType") or "").upper(),
+                   record=data.get("record") or {}, old_record=data.get("old_record") or {},
+                   committed_at=committed, source=source)
+
+
+# --- IN-PROCESS BUS ---
+
+Subscriber = Tuple[Optional[frozenset], Callable[[ChangeEvent], None], str]
+
+
+class ChangeBus:
+    """
+    Publish/subscribe within the process. Callbacks run on the publishing thread
+    (the feed's), so they should only invalidate or schedule work - see `Debounced`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscriber] = []
+        self._live_hooks: List[Callable[[bool], None]] = []
+        self.live = False            # an external feed is connected
+        self.source = "local"
+        self.stats = Counter()
+        self.last_event_at: Optional[float] = None
+        self.last_lag: Optional[float] = None
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None], tables: Optional[Iterable[str]] = None,
+                  name: Optional[str] = None) -> Callable[[], None]:
+        """Registers `callback` for changes to `tables` (all if None); returns an unsubscribe function."""
+        sub = (frozenset(tables) if tables else None, callback, name or getattr(callback, "__name__", "subscriber"))
+        with self._lock:
+            self._subscribers.append(sub)
+
+        def unsubscribe():
+            with self._lock:
+                if sub in self._subscribers:
+                    self._subscribers.remove(sub)
+        return unsubscribe
+
+    def publish(self, event: ChangeEvent) -> int:
+        """Delivers `event` to every matching subscriber; returns how many got it."""
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s[0] is None or event.table in s[0]]
+        self.stats[f"{event.table}:{event.op}"] += 1
+        self.last_event_at = time.time()
+        if event.committed_at:
+            self.last_lag = self.last_event_at - event.committed_at
+        for _, callback, name in subscribers:
+            try:
+                callback(event)
+            except Exception as e:   # one broken subscriber must not starve the others
+                self.stats["errors"] += 1
+                log.warning(f"⚠️ Change subscriber {name} failed on {event.table}:{event.op}: {e}")
+        return len(subscribers)
+
+    def on_live(self, hook: Callable[[bool], None]):
+        """Calls `hook(live)` now and whenever an external feed connects or drops."""
+        with self._lock:
+            self._live_hooks.append(hook)
+        hook(self.live)
+
+    def set_live(self, live: bool, source: str = "local"):
+        if live == self.live:
+            return
+        self.live, self.source = live, source if live else "local"
+        log.info(f"{'📡' if live else '🔌'} Change feed {source} {'connected' if live else 'disconnected'}")
+        with self._lock:
+            hooks = list(self._live_hooks)
+        for hook in hooks:
+            hook(live)
+
+    def status(self) -> Dict[str, Any]:
+        return {"live": self.live, "source": self.source, "events": dict(self.stats),
+                "subscribers": [s[2] for s in self._subscribers],
+                "last_event_at": self.last_event_at, "last_lag_seconds": self.last_lag}
+
+
+bus = ChangeBus()
+
+
+def publish_change(table: str, op: str, record: Optional[Dict[str, Any]] = None,
+                   old_record: Optional[Dict[str, Any]] = None, target: ChangeBus = bus) -> int:
+    """For writers in this process: invalidate local caches now rather than waiting for the feed."""
+    return target.publish(ChangeEvent(table, op.upper(), record or {}, old_record or {}, time.time(), "local"))
+
+
+class Debounced:
+    """
+    Trailing-edge debounce for expensive reactions (index refreshes, snapshot
+    rebuilds): a burst of events within `delay` runs `fn` once, and events that
+    arrive while it runs schedule exactly one more run.
+    """
+
+    def __init__(self, fn: Callable[[], Any], delay: float = 0.5, name: str = "debounced"):
+        self.fn = fn
+        self.delay = delay
+        self.name = name
+        self.runs = 0
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._running = False
+        self._again = False
+
+    def __call__(self, *_):
+        with self._lock:
+            if self._running:
+                self._again = True
+                return
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self._fire)
+                self._timer.name = f"cdc-{self.name}"
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            self._timer, self._running = None, True
+        try:
+            self.fn()
+            self.runs += 1
+        except Exception as e:
+            log.warning(f"⚠️ {self.name} after change failed: {e}")
+        finally:
+            with self._lock:
+                self._running, again, self._again = False, self._again, False
+            if again:
+                self()
+
+
+# --- SOURCES ---
+
+class LocalFeed:
+    """Stand-in for tests and offline runs: `emit()` takes the same payloads Realtime delivers."""
+
+    name = "local"
+
+    def __init__(self, target: ChangeBus = bus, live: bool = True):
+        self.bus = target
+        self.live = live
+
+    def start(self) -> "LocalFeed":
+        self.bus.set_live(self.live, self.name)
+        return self
+
+    def stop(self):
+        self.bus.set_live(False, self.name)
+
+    def emit(self, table: str, op: str, record: Optional[Dict[str, Any]] = None,
+             old_record: Optional[Dict[str, Any]] = None) -> ChangeEvent:
+        payload = {"data": {"table": table, "type": op.upper(), "record": record or {},
+                            "old_record": old_record or {}, "commit_timestamp": datetime.now().astimezone().isoformat()}}
+        event = ChangeEvent.from_payload(payload, self.name)
+        self.bus.publish(event)
+        return event
+
+
+class _ThreadedFeed:
+    name = "feed"
+
+    def __init__(self, target: ChangeBus = bus, tables: Iterable[str] = CDC_TABLES):
+        self.bus = target
+        self.tables = list(tables)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._supervise, name=f"asta-cdc-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _supervise(self):
+        """Runs the source until stopped, reconnecting with exponential backoff."""
+        backoff = 1.0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self._run()
+            except Exception as e:
+                log.warning(f"⚠️ Change feed {self.name} error: {e}")
+            finally:
+                self.bus.set_live(False, self.name)
+            if time.monotonic() - started > MAX_BACKOFF:
+                backoff = 1.0   # it was up for a while: reconnect quickly
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _deliver(self, payload: Dict[str, Any]):
+        event = ChangeEvent.from_payload(payload, self.name)
+        if event.table in self.tables:
+            self.bus.publish(event)
+
+
+class RealtimeFeed(_ThreadedFeed):
+    """Supabase Realtime postgres_changes, on its own event loop in a daemon thread."""
+
+    name = "realtime"
+
+    def __init__(self, url: str, key: str, target: ChangeBus = bus, tables: Iterable[str] = CDC_TABLES):
+        super().__init__(target, tables)
+        self.url = f"{url.rstrip('/')}/realtime/v1"
+        self.key = key
+
+    def _run(self):
+        import asyncio
+        asyncio.run(self._listen())
+
+    async def _listen(self):
+        import asyncio
+        from realtime import AsyncRealtimeClient   # ships with supabase; imported here to keep startup lean
+
+        client = AsyncRealtimeClient(self.url, token=self.key, auto_reconnect=False)
+        await client.connect()
+        try:
+            channel = client.channel("asta-cdc")
+            for table in self.tables:
+                channel.on_postgres_changes("*", callback=self._deliver, table=table, schema="public")
+
+            def on_state(state, error):
+                if getattr(state, "value", state) == "SUBSCRIBED":
+                    self.bus.set_live(True, self.name)
+                elif error is not None or getattr(state, "value", state) in ("CHANNEL_ERROR", "TIMED_OUT", "CLOSED"):
+                    self.bus.set_live(False, self.name)
+                    log.warning(f"⚠️ Realtime channel {getattr(state, 'value', state)}: {error}")
+
+            await channel.subscribe(on_state)
+            while not self._stop.is_set() and client.is_connected:
+                await asyncio.sleep(1.0)
+        finally:
+            await client.close()
+
+
+class PgNotifyFeed(_ThreadedFeed):
+    """Postgres LISTEN on a channel fed by the change-feed trigger (JSON payloads)."""
+
+    name = "notify"
+
+    def __init__(self, dsn: str, channel: str = CDC_CHANNEL, target: ChangeBus = bus,
+                 tables: Iterable[str] = CDC_TABLES):
+        super().__init__(target, tables)
+        self.dsn = dsn
+        self.channel = channel
+
+    def _run(self):
+        if psycopg is None:
+            self._stop.set()
+            raise RuntimeError("psycopg is not installed (pip install 'psycopg[binary]')")
+        with psycopg.connect(self.dsn, autocommit=True) as conn:
+            conn.execute(f'LISTEN "{self.channel}"')
+            self.bus.set_live(True, self.name)
+            while not self._stop.is_set():
+                for notify in conn.notifies(timeout=1.0):
+                    try:
+                        self._deliver(json.loads(notify.payload))
+                    except ValueError:
+                        log.warning(f"⚠️ Unparseable change notification: {notify.payload[:200]}")
+
+
+def start_feed(target: ChangeBus = bus, source: str = CDC_SOURCE):
+    """Starts the configured external feed (see module docstring); returns it, or None for local-only."""
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if source == "auto":
+        source = "notify" if CDC_DSN else "realtime" if url and key else "local"
+    if source == "notify" and CDC_DSN:
+        return PgNotifyFeed(CDC_DSN, target=target).start()
+    if source == "realtime" and url and key:
+        return RealtimeFeed(url, key, target=target).start()
+    if source != "local":
+        log.warning(f"⚠️ Change feed {source} is not configured; caches fall back to their TTLs")
+    return None
@@ -0,0 +1,236 @@
+# storage/data_lake.py
+"""
+Local columnar store for the offline modelling pipeline (data/ghana_properties_*.csv).
+
+Every step of the CSV chain re-read and re-wrote the whole table:
+raw -> clean -> with_predictions -> geocoded_full -> poi_enriched ->
+realistic_prices, ~8 full copies of the same rows. Here each stage is a
+directory of Parquet parts holding only `id` + the columns that stage adds
+or overwrites, with typed schemas (STAGE_SCHEMAS):
+
+    data/lake/raw/part-00000.parquet ...            all source columns
+    data/lake/clean/part-00000.parquet ...          id, area_sqm, price_per_sqm
+    data/lake/poi_enriched/part-00000.parquet ...   id, schools_nearby, ...
+
+A stage's full view is its lineage joined on `id` (inner, so rows a stage
+dropped stay dropped) with the newest stage winning for overwritten columns
+(realistic_prices.price shadows raw.price). DuckDB builds that join and only
+reads the columns a query needs:
+
+    lake = DataLake()
+    df = lake.read("poi_enriched", columns=["id", "address", "area_sqm"])
+    lake.write_stage("realistic_prices", df[["id", "location_factor", "price_realistic", "price"]])
+    lake.sql("SELECT bedrooms, median(price) FROM realistic_prices GROUP BY 1").df()
+
+    python -m storage.data_lake --import data/ghana_properties_raw.csv
+    python -m storage.data_lake --query "SELECT count(*) FROM clean"
+    python -m storage.data_lake --export realistic_prices out.csv
+
+Location: data/lake (ASTA_DATA_LAKE to move it). Needs duckdb + pyarrow.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_LAKE_DIR = Path(os.getenv("ASTA_DATA_LAKE", Path(__file__).resolve().parents[1] / "data" / "lake"))
+PART_ROWS = 250_000
+
+# Stage -> the stage it builds on (the order the data/ scripts actually run in)
+STAGE_PARENTS: Dict[str, Optional[str]] = {
+    "raw": None,
+    "clean": "raw",                       # processing/data_cleaning/preprocessor.py
+    "with_predictions": "clean",          # archive/train_model.py
+    "geocoded_full": "with_predictions",  # processing/data_cleaning/geocoder.py
+    "poi_enriched": "geocoded_full",      # enrich_with_poi.py
+    "realistic_prices": "poi_enriched",   # generate_realistic_prices.py
+}
+
+STAGE_SCHEMAS: Dict[str, Dict[str, pa.DataType]] = {
+    "raw": {"price": pa.float64(), "bedrooms": pa.float32(), "bathrooms": pa.float32(),
+            "latitude": pa.float64(), "longitude": pa.float64(), "address": pa.string(),
+            "zip_code": pa.string(), "size": pa.float64(), "title": pa.string()},
+    "clean": {"area_sqm": pa.float64(), "price_per_sqm": pa.float64()},
+    "with_predictions": {"predicted_price": pa.float64(), "price_diff_pct": pa.float64()},
+    "geocoded_full": {"latitude": pa.float64(), "longitude": pa.float64()},
+    "poi_enriched": {"schools_nearby": pa.int16(), "hospitals_nearby": pa.int16(),
+                     "malls_nearby": pa.int16(), "transit_nearby": pa.int16()},
+    "realistic_prices": {"location_factor": pa.float32(), "price_realistic": pa.float64(), "price": pa.float64()},
+}
+
+
+class DataLake:
+    def __init__(self, root: Path = DATA_LAKE_DIR, part_rows: int = PART_ROWS):
+        self.root = Path(root)
+        self.part_rows = part_rows
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # --- METADATA ---
+
+    def _meta_path(self, stage: str) -> Path:
+        return self.root / stage / "_stage.json"
+
+    def meta(self, stage: str) -> Optional[dict]:
+        path = self._meta_path(stage)
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def has(self, stage: str) -> bool:
+        return self.meta(stage) is not None
+
+    def stages(self) -> List[str]:
+        return sorted(p.parent.name for p in self.root.glob("*/_stage.json"))
+
+    def lineage(self, stage: str) -> List[str]:
+        """['raw', 'clean', ..., stage] - root first."""
+        chain = []
+        while stage:
+            meta = self.meta(stage)
+            if meta is None:
+                raise FileNotFoundError(f"Stage '{stage}' is not in the lake ({self.root})")
+            chain.append(stage)
+            stage = meta["parent"]
+        return chain[::-1]
+
+    # --- WRITES ---
+
+    def write_stage(self, stage: str, df: pd.DataFrame, parent: Optional[str] = "auto",
+                    source: Optional[dict] = None) -> dict:
+        """
+        Materializes `df` (id + the columns this stage adds / overwrites) as the
+        stage's Parquet parts, replacing any previous version atomically.
+        `source` (e.g. the imported CSV's path/size/mtime) is kept in _stage.json.
+        """
+        if "id" not in df.columns:
+            raise ValueError(f"Stage '{stage}' must include the 'id' column")
+        parent = STAGE_PARENTS.get(stage) if parent == "auto" else parent
+        if parent and not self.has(parent):
+            raise FileNotFoundError(f"Parent stage '{parent}' of '{stage}' is not in the lake")
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        table = table.cast(self._schema(stage, table.schema))
+
+        tmp = self.root / f".{stage}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for i, start in enumerate(range(0, max(table.num_rows, 1), self.part_rows)):
+            pq.write_table(table.slice(start, self.part_rows), tmp / f"part-{i:05d}.parquet", compression="zstd")
+        meta = {"stage": stage, "parent": parent, "columns": [c for c in table.column_names if c != "id"],
+                "rows": table.num_rows, "written_at": time.time()}
+        if source:
+            meta["source"] = source
+        (tmp / "_stage.json").write_text(json.dumps(meta, indent=2))
+
+        final = self.root / stage
+        old = self.root / f".{stage}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        if final.exists():
+            final.rename(old)
+        tmp.rename(final)
+        shutil.rmtree(old, ignore_errors=True)
+        return meta
+
+    def _schema(self, stage: str, inferred: pa.Schema) -> pa.Schema:
+        declared = STAGE_SCHEMAS.get(stage, {})  # `id` keeps its source type (UUID strings today)
+        fields = []
+        for field in inferred:
+            dtype = declared.get(field.name, field.type)
+            if pa.types.is_null(dtype):
+                dtype = pa.string()
+            fields.append(pa.field(field.name, dtype))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _file_source(path) -> dict:
+        st = Path(path).stat()
+        return {"path": str(Path(path).resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def import_csv(self, path, stage: str = "raw", if_changed: bool = False) -> Optional[dict]:
+        """
+        Imports a CSV as `stage`, recording its size and mtime. With `if_changed`
+        the import is skipped (returns None) while the stage already holds this
+        exact file, so a regenerated CSV is picked up and an unchanged one is free.
+        """
+        source = self._file_source(path)
+        if if_changed and (self.meta(stage) or {}).get("source") == source:
+            return None
+        return self.write_stage(stage, pd.read_csv(path), source=source)
+
+    # --- READS ---
+
+    def view_sql(self, stage: str, columns: Optional[Iterable[str]] = None) -> str:
+        """
+        SELECT that rebuilds `stage` from its lineage. Every stage is joined (each
+        may have dropped rows) but Parquet projection means only `id` plus the
+        wanted columns are actually read.
+        """
+        chain = self.lineage(stage)
+        owner: Dict[str, str] = {}
+        for s in chain:  # later stages overwrite earlier ones
+            for c in self.meta(s)["columns"]:
+                owner[c] = s
+        wanted = list(columns) if columns is not None else ["id", *owner]
+        unknown = [c for c in wanted if c != "id" and c not in owner]
+        if unknown:
+            raise KeyError(f"Columns {unknown} are not in stage '{stage}'")
+        select = ", ".join(f"t{chain.index(owner[c])}.\"{c}\"" if c != "id" else "t0.id" for c in wanted)
+        joins = "".join(
+            f" JOIN read_parquet('{self.root / s}/*.parquet') t{i} ON t{i}.id = t0.id"
+            for i, s in enumerate(chain) if i
+        )
+        return f"SELECT {select} FROM read_parquet('{self.root / chain[0]}/*.parquet') t0{joins}"
+
+    def connect(self) -> duckdb.DuckDBPyConnection:
+        """DuckDB connection with one view per stage in the lake (`SELECT ... FROM poi_enriched`)."""
+        con = duckdb.connect()
+        for stage in self.stages():
+            con.execute(f'CREATE VIEW "{stage}" AS {self.view_sql(stage)}')
+        return con
+
+    def sql(self, query: str):
+        return self.connect().sql(query)
+
+    def read(self, stage: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """The stage as a DataFrame in `id` order (row order is stable across runs)."""
+        columns = list(columns) if columns is not None else None
+        if columns is not None and "id" not in columns:
+            columns = ["id", *columns]
+        with duckdb.connect() as con:
+            return con.sql(f"{self.view_sql(stage, columns)} ORDER BY t0.id").df()
+
+    def export_csv(self, stage: str, path):
+        with duckdb.connect() as con:
+            con.sql(self.view_sql(stage)).write_csv(str(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet + DuckDB store for the data/ modelling pipeline")
+    parser.add_argument("--import", dest="import_csv", type=Path, help="CSV to load as the 'raw' stage")
+    parser.add_argument("--query", help="SQL over the stage views, e.g. \"SELECT count(*) FROM clean\"")
+    parser.add_argument("--export", nargs=2, metavar=("STAGE", "CSV"), help="Write a stage's full view as CSV")
+    args = parser.parse_args()
+
+    lake = DataLake()
+    if args.import_csv:
+        meta = lake.import_csv(args.import_csv)
+        print(f"✅ Imported {meta['rows']} rows into {lake.root / 'raw'}")
+    if args.query:
+        print(lake.sql(args.query).df().to_string(index=False))
+    if args.export:
+        lake.export_csv(*args.export)
+        print(f"💾 Exported '{args.export[0]}' to {args.export[1]}")
+    if not (args.import_csv or args.query or args.export):
+        for stage in lake.stages():
+            meta = lake.meta(stage)
+            print(f"🗄️ {stage:<18} {meta['rows']:>9} rows  +{meta['columns']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# storage/embedding_cache.py
+"""
+LRU cache for query embeddings, persisted to SQLite so it survives restarts.
+
+Search-bar traffic is dominated by a handful of phrases ("East Legon",
+"Swimming Pool", ...). Caching their vectors means popular searches skip the
+text-embedding-004 round-trip and only pay for the vector lookup.
+"""
+
+import os
+import re
+import time
+import atexit
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = Path(os.getenv("ASTA_EMBEDDING_CACHE", "data/embedding_cache.sqlite"))
+TOUCH_FLUSH_SECS = 30.0  # hits update last_used in batches, at most this long after the hit
+TOUCH_BATCH = 256
+
+
+def normalize_query(text: str) -> str:
+    """'  East  Legon!! ' -> 'east legon' so trivial variants share one entry."""
+    text = re.sub(r"[^\w\s]", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingCache:
+    """Thread-safe in-memory LRU with write-through SQLite persistence."""
+
+    def __init__(self, path: Optional[Path] = DEFAULT_CACHE_PATH, capacity: int = 5000,
+                 model: str = "text-embedding-004"):
+        self.capacity = capacity
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._mem: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._touched: dict = {}   # query -> last hit time, not yet written to SQLite
+        self._touched_since = 0.0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT, query TEXT, vector BLOB, last_used REAL, PRIMARY KEY (model, query))"
+            )
+            self._db.commit()
+            self._warm_from_disk()
+            atexit.register(self.flush)
+
+    def _warm_from_disk(self):
+        rows = self._db.execute(
+            "SELECT query, vector FROM embeddings WHERE model = ? ORDER BY last_used DESC LIMIT ?",
+            (self.model, self.capacity),
+        ).fetchall()
+        for query, blob in reversed(rows):
+            self._mem[query] = np.frombuffer(blob, dtype=np.float32)
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = normalize_query(text)
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._mem.move_to_end(key)
+            self.hits += 1
+            if self._db:
+                if not self._touched:
+                    self._touched_since = time.time()
+                self._touched[key] = time.time()
+                if len(self._touched) >= TOUCH_BATCH or time.time() - self._touched_since > TOUCH_FLUSH_SECS:
+                    self._flush_touched()
+                    self._db.commit()
+        return vec.tolist()
+
+    def _flush_touched(self):
+        """Writes the batched hit times, so _warm_from_disk keeps the recently used entries. Caller holds _lock."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND query = ?",
+                [(ts, self.model, k) for k, ts in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def flush(self):
+        """Persists pending hit times now (also run at interpreter exit)."""
+        with self._lock:
+            if self._db:
+                self._flush_touched()
+                self._db.commit()
+
+    def put(self, text: str, vector: Iterable[float]):
+        key = normalize_query(text)
+        vec = np.asarray(list(vector), dtype=np.float32)
+        with self._lock:
+            self._mem[key] = vec
+            self._mem.move_to_end(key)
+            evicted = []
+            while len(self._mem) > self.capacity:
+                evicted.append(self._mem.popitem(last=False)[0])
+            if self._db:
+                self._touched.pop(key, None)
+                self._flush_touched()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (model, query, vector, last_used) VALUES (?, ?, ?, ?)",
+                    (self.model, key, vec.tobytes(), time.time()),
+                )
+                if evicted:
+                    self._db.executemany(
+                        "DELETE FROM embeddings WHERE model = ? AND query = ?",
+                        [(self.model, k) for k in evicted],
+                    )
+                self._db.commit()
+
+    def get_or_compute(self, text: str, compute: Callable[[str], Optional[List[float]]]) -> Optional[List[float]]:
+        """Returns the cached vector, or embeds via `compute` and stores the result."""
+        if not normalize_query(text):
+            return None
+        cached = self.get(text)
+        if cached is not None:
+            return cached
+        vector = compute(text)
+        if vector is not None:
+            self.put(text, vector)
+        return vector
+
+    def warm(self, phrases: Iterable[str], compute: Callable[[str], Optional[List[float]]]) -> int:
+        """Precomputes embeddings for known-hot phrases (e.g. the trending tags)."""
+        warmed = 0
+        for phrase in phrases:
+            if self.get_or_compute(phrase, compute) is not None:
+                warmed += 1
+        return warmed
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._mem),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
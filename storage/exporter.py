@@ -0,0 +1,321 @@
+# storage/exporter.py
+"""
+Streaming bulk export of listings and insights as CSV, NDJSON or Parquet.
+
+The old route for analysts was storage/supabase_fetch.py (or archive/fetch_*):
+one `select("*")` into a DataFrame. That holds the whole table in memory and
+is silently cut off at PostgREST's max-rows. Here rows are read page by page
+with a keyset on `id`, so every request is a short index range scan and none
+is truncated. Each page is encoded and handed on before the next one is read,
+so memory stays at one page however many rows are exported.
+
+    chunks = export_chunks(supabase, "listings", fmt="csv", fields=["id", "price"], filters={"min_price": 1e5})
+    for chunk in chunks: out.write(chunk)       # bytes; the CSV header comes before any query
+
+    python -m storage.exporter listings --format parquet -o listings.parquet
+    python -m storage.exporter insights --format ndjson --since 2025-01-01 > insights.ndjson
+
+The API serves the same generator as GET /export/{dataset} (api/routers/export.py).
+Parquet needs pyarrow (imported on the first Parquet export, not at API startup);
+one row group is written per page, with the column types declared in DATASETS
+(like STAGE_SCHEMAS in storage/data_lake.py) rather than guessed from a page.
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+FIRST_PAGE = 100     # small first read: the first rows reach the client while the big pages follow
+PAGE_SIZE = 1000     # at or below PostgREST's default max-rows, so a page is never truncated
+
+# Exportable datasets. "fields" is the whitelist (never embeddings or contact details);
+# "filters" maps the shared filter names onto each table's columns; "types" are the
+# Parquet column types (PARQUET_TYPES) - columns not listed, nested JSON included, are strings.
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "listings": {
+        "table": "properties",
+        "fields": ["id", "title", "description", "price", "currency", "listing_type", "location", "latitude",
+                   "longitude", "roi_score", "vibe", "bedrooms", "status", "source", "image_urls", "created_at"],
+        "default": ["id", "title", "price", "currency", "listing_type", "location", "latitude", "longitude",
+                    "roi_score", "vibe", "created_at"],
+        "filters": {"listing_type": "listing_type", "price": "price", "bedrooms": "bedrooms",
+                    "location": "location", "since": "created_at"},
+        "types": {"price": "float64", "latitude": "float64", "longitude": "float64", "roi_score": "float64",
+                  "bedrooms": "int32", "created_at": "timestamp"},
+    },
+    "market": {
+        "table": "market_listings",
+        "fields": ["id", "title", "location", "price", "currency", "bedrooms", "url", "source",
+                   "listing_type:metadata->>type", "updated_at"],
+        "default": ["id", "title", "location", "price", "currency", "bedrooms", "url", "updated_at"],
+        "filters": {"listing_type": "metadata->>type", "price": "price", "bedrooms": "bedrooms",
+                    "location": "location", "since": "updated_at"},
+        "types": {"price": "float64", "bedrooms": "int32", "updated_at": "timestamp"},
+    },
+    "insights": {
+        "table": "market_listings",
+        "fields": ["id", "title", "location", "price", "currency", "url", "insight_cache", "updated_at"],
+        "default": ["id", "title", "location", "price", "currency", "insight_cache", "updated_at"],
+        "filters": {"listing_type": "metadata->>type", "price": "price", "bedrooms": "bedrooms",
+                    "location": "location", "since": "updated_at"},
+        "where": lambda query: query.not_.is_("insight_cache", "null"),
+        "types": {"price": "float64", "updated_at": "timestamp"},
+    },
+}
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class ExportError(ValueError):
+    """Bad dataset / format / fields - the API turns it into a 400."""
+
+
+def _column(field: str) -> str:
+    """Output column name: 'listing_type:metadata->>type' -> 'listing_type'."""
+    return field.split(":", 1)[0]
+
+
+def resolve_fields(dataset: str, fields: Optional[List[str]] = None) -> List[str]:
+    """Validated select list for `dataset` (defaults if empty); names may be given with or without alias."""
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}'. Available: {', '.join(DATASETS)}")
+    spec = DATASETS[dataset]
+    if not fields:
+        return list(spec["default"])
+    by_name = {_column(f): f for f in spec["fields"]}
+    unknown = [f for f in fields if f not in by_name]
+    if unknown:
+        raise ExportError(f"Unknown fields for {dataset}: {', '.join(unknown)}. Allowed: {', '.join(by_name)}")
+    return list(dict.fromkeys(by_name[f] for f in fields))
+
+
+# --- READING ---
+
+def iter_pages(supabase, dataset: str, fields: List[str], filters: Optional[Dict[str, Any]] = None,
+               limit: Optional[int] = None, page_size: int = PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Pages of rows in `id` order, each read with `id > last id` (no OFFSET, no max-rows truncation)."""
+    spec, filters = DATASETS[dataset], filters or {}
+    columns = spec["filters"]
+    select = ",".join(dict.fromkeys(["id", *fields]))
+    last_id, sent, size = None, 0, min(FIRST_PAGE, page_size)
+    while limit is None or sent < limit:
+        if limit is not None:
+            size = min(size, limit - sent)
+        query = supabase.table(spec["table"]).select(select)
+        if spec.get("where"):
+            query = spec["where"](query)
+        if filters.get("listing_type"): query = query.ilike(columns["listing_type"], str(filters["listing_type"]))
+        if filters.get("min_price") is not None: query = query.gte(columns["price"], filters["min_price"])
+        if filters.get("max_price") is not None: query = query.lte(columns["price"], filters["max_price"])
+        if filters.get("bedrooms") is not None: query = query.gte(columns["bedrooms"], filters["bedrooms"])
+        if filters.get("location"): query = query.ilike(columns["location"], f"%{filters['location']}%")
+        if filters.get("since"): query = query.gte(columns["since"], filters["since"])
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(size).execute().data or []
+        if not rows:
+            return
+        last_id, sent = rows[-1]["id"], sent + len(rows)
+        if "id" not in [_column(f) for f in fields]:
+            rows = [{k: v for k, v in row.items() if k != "id"} for row in rows]
+        yield rows
+        if len(rows) < size:
+            return
+        size = page_size
+
+
+# --- ENCODING ---
+
+def _scalar(value):
+    """Nested JSON (insight_cache, image_urls) becomes a JSON string in flat formats."""
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+
+
+def _csv_chunks(pages, columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+    for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_scalar(row.get(c)) for c in columns] for row in rows])
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_line(record: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, default=str) + b"\n"
+    return json.dumps(record, default=str, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _ndjson_chunks(pages, columns: List[str]) -> Iterator[bytes]:
+    for rows in pages:
+        yield b"".join(_ndjson_line({c: row.get(c) for c in columns}) for row in rows)
+
+
+class _Sink:
+    """Write-only file for ParquetWriter whose bytes are drained after every row group."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.buffer = bytes(self.buffer), bytearray()
+        return data
+
+
+def _pyarrow():
+    """(pyarrow, pyarrow.parquet), or None - optional, and ~300 ms to import, so only on demand."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:  # Parquet export is optional; CSV and NDJSON need nothing extra
+        return None
+    return pyarrow, pyarrow.parquet
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _as_timestamp(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _as_string(value) -> Optional[str]:
+    return None if value is None else str(_scalar(value))
+
+
+# Parquet type name -> (pyarrow type factory, coercion). A value that does not fit its
+# column becomes null instead of failing the stream half-way through a 200 response.
+PARQUET_TYPES = {
+    "float64": (lambda pa: pa.float64(), _as_float),
+    "int32": (lambda pa: pa.int32(), _as_int),
+    "timestamp": (lambda pa: pa.timestamp("us", tz="UTC"), _as_timestamp),
+    "string": (lambda pa: pa.string(), _as_string),
+}
+
+
+def _parquet_chunks(pages, columns: List[str], types: Dict[str, str]) -> Iterator[bytes]:
+    pa, pq = _pyarrow()
+    kinds = [PARQUET_TYPES[types.get(c, "string")] for c in columns]
+    schema = pa.schema([(c, make(pa)) for c, (make, _) in zip(columns, kinds)])
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    for rows in pages:
+        arrays = {c: [coerce(row.get(c)) for row in rows] for c, (_, coerce) in zip(columns, kinds)}
+        writer.write_table(pa.Table.from_pydict(arrays, schema=schema))
+        yield sink.drain()
+    writer.close()   # no rows: still a valid (empty) file
+    yield sink.drain()
+
+
+def export_chunks(supabase, dataset: str, fmt: str = "csv", fields: Optional[List[str]] = None,
+                  filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> Iterator[bytes]:
+    """Validates up front (raises ExportError), then returns a lazy generator of encoded bytes."""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}'. Available: {', '.join(FORMATS)}")
+    if fmt == "parquet" and _pyarrow() is None:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)")
+    select = resolve_fields(dataset, fields)
+    columns = [_column(f) for f in select]
+    pages = iter_pages(supabase, dataset, select, filters, limit)
+    if fmt == "parquet":
+        return _parquet_chunks(pages, columns, DATASETS[dataset].get("types", {}))
+    return {"csv": _csv_chunks, "ndjson": _ndjson_chunks}[fmt](pages, columns)
+
+
+# ==========================================
+# 🚀 CLI
+# ==========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a listings / insights export to a file or stdout.")
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("-o", "--output", type=Path, help="File to write (default: stdout)")
+    parser.add_argument("--fields", help="Comma-separated columns (default: the dataset's standard set)")
+    parser.add_argument("--listing-type")
+    parser.add_argument("--min-price", type=float)
+    parser.add_argument("--max-price", type=float)
+    parser.add_argument("--bedrooms", type=int, help="Minimum bedrooms")
+    parser.add_argument("--location", help="Location contains")
+    parser.add_argument("--since", help="Created / updated on or after (ISO date)")
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    from api.utils import get_supabase
+    supabase = get_supabase()
+    if supabase is None:
+        sys.exit("❌ Supabase is not configured")
+    filters = {"listing_type": args.listing_type, "min_price": args.min_price, "max_price": args.max_price,
+               "bedrooms": args.bedrooms, "location": args.location, "since": args.since}
+    fields = [f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else None
+    try:
+        chunks = export_chunks(supabase, args.dataset, args.format, fields, filters, args.limit)
+    except ExportError as e:
+        sys.exit(f"❌ {e}")
+
+    started, written = time.perf_counter(), 0
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print(f"✅ Exported {args.dataset} ({args.format}, {written / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
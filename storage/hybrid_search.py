@@ -0,0 +1,246 @@
+# storage/hybrid_search.py
+"""
+Hybrid lexical + vector search over listings.
+
+A BM25 inverted index over title / location / description answers exact
+queries ("4 bedroom Spintex") that pure vector similarity smears out. Its
+ranking is fused with the ANN ranking from storage/vector_index.py using
+reciprocal rank fusion (RRF), and both sides honour the same structured
+filters (price range, bedrooms, listing type).
+
+The index is updated incrementally: `add()` replaces a listing in place and
+posting lists are re-packed into NumPy arrays lazily on the next query.
+"""
+
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from storage.vector_index import VectorIndex, structured_mask, _as_float, _as_int
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+# Title and location matter more than the free-text blurb.
+FIELD_WEIGHTS = {"title": 2, "location": 2, "description": 1}
+
+STOPWORDS = {
+    "a", "an", "and", "at", "for", "in", "is", "of", "on", "or", "the", "to", "with",
+    "ghana", "property",
+}
+SYNONYMS = {
+    "bed": "bedroom", "beds": "bedroom", "bd": "bedroom", "br": "bedroom", "bdr": "bedroom",
+    "bedrooms": "bedroom", "bath": "bathroom", "baths": "bathroom", "apt": "apartment",
+    "flat": "apartment", "flats": "apartment", "pool": "swimming",
+}
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Tables to index, aliased onto the document fields (PostgREST `alias:column`).
+LEXICAL_SOURCES = {
+    "market_listings": {
+        "select": "id, title, location, description:content, price, bedrooms, listing_type:metadata->>type, updated_at",
+        "watermark": "updated_at",
+    },
+    "gpc_properties": {
+        "select": "id:url, title, location:location_clean, description:content_text, price:price_amount, bedrooms, scraped_at",
+        "watermark": "scraped_at",
+    },
+}
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for tok in TOKEN_RE.findall((text or "").lower()):
+        tok = SYNONYMS.get(tok, tok)
+        if tok in STOPWORDS:
+            continue
+        if len(tok) > 4 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+class BM25Index:
+    """In-memory BM25 inverted index with structured attribute columns."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._doc_terms: List[Dict[str, int]] = []
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.price = np.zeros(0, dtype=np.float32)
+        self.bedrooms = np.zeros(0, dtype=np.int16)
+        self.ltype = np.zeros(0, dtype=np.int8)
+        self.alive = np.zeros(0, dtype=bool)
+        self.listing_types: List[str] = []
+        self.watermarks: Dict[str, str] = {}
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._packed: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dirty: set = set()
+        self._total_len = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    # --- UPDATES ---
+
+    def add(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Adds or replaces listings. Records need 'id'; other fields are optional."""
+        records = [r for r in records if r.get("id") is not None]
+        if not records:
+            return 0
+        with self._lock:
+            self.remove(r["id"] for r in records)
+            start = len(self.ids)
+            lengths, prices, beds, types = [], [], [], []
+            for offset, rec in enumerate(records):
+                row = start + offset
+                terms: Dict[str, int] = defaultdict(int)
+                for field, weight in FIELD_WEIGHTS.items():
+                    for tok in tokenize(str(rec.get(field) or "")):
+                        terms[tok] += weight
+                for tok, tf in terms.items():
+                    self._postings[tok][row] = tf
+                    self._dirty.add(tok)
+                self.ids.append(str(rec["id"]))
+                self._row_of[str(rec["id"])] = row
+                self._doc_terms.append(dict(terms))
+                lengths.append(sum(terms.values()))
+                prices.append(_as_float(rec.get("price")))
+                beds.append(_as_int(rec.get("bedrooms")))
+                types.append(self._type_code(rec.get("listing_type")))
+            self._total_len += sum(lengths)
+            self.doc_len = np.concatenate([self.doc_len, np.array(lengths, np.float32)])
+            self.price = np.concatenate([self.price, np.array(prices, np.float32)])
+            self.bedrooms = np.concatenate([self.bedrooms, np.array(beds, np.int16)])
+            self.ltype = np.concatenate([self.ltype, np.array(types, np.int8)])
+            self.alive = np.concatenate([self.alive, np.ones(len(records), dtype=bool)])
+        return len(records)
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for rid in ids:
+                row = self._row_of.pop(str(rid), None)
+                if row is None:
+                    continue
+                self.alive[row] = False
+                self._total_len -= float(self.doc_len[row])
+                for tok in self._doc_terms[row]:
+                    self._postings[tok].pop(row, None)
+                    self._dirty.add(tok)
+                self._doc_terms[row] = {}
+
+    def _type_code(self, value) -> int:
+        if not value:
+            return -1
+        value = str(value).upper()
+        if value not in self.listing_types:
+            self.listing_types.append(value)
+        return self.listing_types.index(value)
+
+    def _posting(self, tok: str) -> Tuple[np.ndarray, np.ndarray]:
+        if tok in self._dirty or tok not in self._packed:
+            plist = self._postings.get(tok, {})
+            self._packed[tok] = (
+                np.fromiter(plist.keys(), dtype=np.int64, count=len(plist)),
+                np.fromiter(plist.values(), dtype=np.float32, count=len(plist)),
+            )
+            self._dirty.discard(tok)
+        return self._packed[tok]
+
+    # --- QUERIES ---
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        return structured_mask(self, filters)
+
+    def search(self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Returns [(id, bm25_score)] best first."""
+        tokens = tokenize(query)
+        with self._lock:
+            n_docs = len(self)
+            if not tokens or not n_docs:
+                return []
+            mask = self.filter_mask(filters)
+            avgdl = self._total_len / n_docs
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / max(avgdl, 1e-6))
+            scores = np.zeros(len(self.ids), dtype=np.float32)
+            for tok in set(tokens):
+                rows, tf = self._posting(tok)
+                if not len(rows):
+                    continue
+                idf = np.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                scores[rows] += idf * tf * (BM25_K1 + 1) / (tf + norm[rows])
+            scores[~mask] = 0
+            matched = np.flatnonzero(scores)
+            if not len(matched):
+                return []
+            k = min(k, len(matched))
+            top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[i], float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(*rankings: List[Tuple[str, float]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuses ranked lists by sum(1 / (k + rank)); robust to incomparable score scales."""
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+
+
+class HybridSearch:
+    """BM25 + ANN fused with RRF. Either side may be missing (e.g. no embedding)."""
+
+    def __init__(self, lexical: Optional[BM25Index] = None, vectors: Optional[VectorIndex] = None):
+        self.lexical = lexical or BM25Index()
+        self.vectors = vectors
+
+    def search(self, query: str, query_vector=None, k: int = 10,
+               filters: Optional[Dict[str, Any]] = None, depth: int = 50) -> List[Dict[str, Any]]:
+        lexical_hits = self.lexical.search(query, k=depth, filters=filters)
+        vector_hits = []
+        if query_vector is not None and self.vectors is not None and len(self.vectors):
+            vector_hits = self.vectors.search(query_vector, k=depth, filters=filters)
+        lex_rank = {doc_id: rank for rank, (doc_id, _) in enumerate(lexical_hits, start=1)}
+        vec_rank = {doc_id: rank for rank, (doc_id, _) in enumerate(vector_hits, start=1)}
+        return [
+            {"id": doc_id, "score": round(score, 6),
+             "lexical_rank": lex_rank.get(doc_id), "vector_rank": vec_rank.get(doc_id)}
+            for doc_id, score in reciprocal_rank_fusion(lexical_hits, vector_hits)[:k]
+        ]
+
+
+# ==========================================
+# 🔄 SUPABASE SYNC
+# ==========================================
+
+def refresh_lexical_from_supabase(index: BM25Index, supabase, page_size: int = 1000) -> int:
+    """Indexes rows changed since the last watermark (everything on first run)."""
+    total = 0
+    for table, source in LEXICAL_SOURCES.items():
+        watermark = index.watermarks.get(table)
+        offset = 0
+        while True:
+            query = supabase.table(table).select(source["select"])
+            if watermark:
+                query = query.gt(source["watermark"], watermark)
+            try:
+                rows = query.order(source["watermark"]).range(offset, offset + page_size - 1).execute().data
+            except Exception as e:
+                print(f"⚠️ Lexical index refresh failed for {table}: {e}")
+                break
+            if not rows:
+                break
+            total += index.add([{**row, "id": f"{table}:{row['id']}"} for row in rows])
+            if rows[-1].get(source["watermark"]):
+                index.watermarks[table] = rows[-1][source["watermark"]]
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    return total
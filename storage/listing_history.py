@@ -0,0 +1,302 @@
+# storage/listing_history.py
+"""
+Change detection and price history for scraped listings.
+
+Every dump used to overwrite (or blindly append to) the previous one, so a
+price cut was invisible. `ListingHistory` keeps the last snapshot of every
+listing, keyed by the stable ID the scraper already generates
+(`meqasa_<slug>`, `jiji_<slug>` - scrapers/crawl_engine.py uses the same via
+sites.yaml `id_format`, `<site>:<sha1>` for sites without one), and
+diffs each new record against it:
+
+    history = ListingHistory()
+    events = history.apply(records, source="meqasa")     # insert / update
+    events += history.delist_missing("meqasa", seen_ids)  # after a full crawl
+
+  * `snapshots`  one row per (source, listing): last tracked fields (TRACKED_FIELDS)
+                 + status. Each writer diffs and delists only its own source, so the
+                 engine ("meqasa") and meqasa_full_dump.py, which see the same IDs with
+                 differently formatted fields, never flip each other's snapshots;
+  * `events`     append-only insert / update / delist log;
+  * `prices`     (id, day) -> price, WITHOUT ROWID so each listing's points
+                 are stored contiguously under the primary key - that is the
+                 per-property index `/engagement/price-history/{id}` reads.
+                 Shared by every source; a point is written only when the price
+                 differs from the listing's latest one, so an unchanged listing
+                 costs one row no matter how many crawls (or writers) see it.
+
+    python -m storage.listing_history --ingest meqasa_master_dump.json --source meqasa --complete
+    python -m storage.listing_history --show meqasa_some-listing-slug
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.normalizer import normalize_listing
+
+DEFAULT_HISTORY_PATH = Path(os.getenv("ASTA_LISTING_HISTORY", "data/listing_history.sqlite"))
+TRACKED_FIELDS = ("price_amount", "currency", "price_period", "title", "location",
+                  "bedrooms", "bathrooms", "area_sqm", "listing_type", "url")
+
+
+class ChangeEvent(NamedTuple):
+    kind: str                       # insert | update | delist
+    id: str
+    source: str
+    changes: Dict[str, List[Any]]   # field -> [before, after]
+    at: float
+
+
+def tracked_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields a change is detected on. Raw dump rows ('price': 'GH₵ 350,000') are normalized first."""
+    if "price_amount" not in record:
+        record = {**record, **normalize_listing(record)}
+    return {f: record.get(f) for f in TRACKED_FIELDS}
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).date().isoformat()
+
+
+class ListingHistory:
+    def __init__(self, path: Path = DEFAULT_HISTORY_PATH, readonly: bool = False):
+        self.path = Path(path)
+        if readonly:
+            self._db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._create()
+        self._lock = threading.Lock()
+
+    def _create(self):
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "source TEXT, id TEXT, fields TEXT, status TEXT, first_seen REAL, last_seen REAL, "
+            "PRIMARY KEY (source, id))"
+        )
+        key = [row[1] for row in sorted(self._db.execute("PRAGMA table_info(snapshots)"), key=lambda r: r[5]) if row[5]]
+        if key == ["id"]:  # files written before snapshots were scoped by source
+            self._db.execute("ALTER TABLE snapshots RENAME TO snapshots_by_id")
+            self._db.execute("DROP INDEX IF EXISTS snapshots_source")
+            self._db.execute(
+                "CREATE TABLE snapshots ("
+                "source TEXT, id TEXT, fields TEXT, status TEXT, first_seen REAL, last_seen REAL, "
+                "PRIMARY KEY (source, id))"
+            )
+            self._db.execute("INSERT INTO snapshots SELECT source, id, fields, status, first_seen, last_seen "
+                             "FROM snapshots_by_id")
+            self._db.execute("DROP TABLE snapshots_by_id")
+        self._db.execute("CREATE INDEX IF NOT EXISTS snapshots_source ON snapshots (source, status)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS snapshots_id ON snapshots (id)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "at REAL, kind TEXT, id TEXT, source TEXT, changes TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS prices ("
+            "id TEXT, day TEXT, price REAL, currency TEXT, PRIMARY KEY (id, day)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    # --- DIFFING ---
+
+    def apply(self, records: Iterable[Dict[str, Any]], source: Optional[str] = None,
+              at: Optional[float] = None) -> List[ChangeEvent]:
+        """Diffs records against their source's last snapshot; returns the insert/update events."""
+        at = at or time.time()
+        records = [r for r in records if r.get("id")]
+        if not records:
+            return []
+        events, snapshot_rows, price_rows = [], [], []
+        with self._lock:
+            scoped = [(source or r.get("site") or r.get("source") or "", r) for r in records]
+            previous = {}
+            for src in {s for s, _ in scoped}:
+                previous.update(self._snapshots(src, [r["id"] for s, r in scoped if s == src]))
+            prices = self._last_prices([r["id"] for r in records])
+            for src, record in scoped:
+                lid = record["id"]
+                fields = tracked_fields(record)
+                before = previous.get((src, lid))
+                if before is None:
+                    events.append(ChangeEvent("insert", lid, src, {f: [None, v] for f, v in fields.items()}, at))
+                    first_seen = at
+                else:
+                    old_fields, status, first_seen = before
+                    changes = {f: [old_fields.get(f), v] for f, v in fields.items() if old_fields.get(f) != v}
+                    if status != "active":
+                        changes["status"] = [status, "active"]
+                    if changes:
+                        events.append(ChangeEvent("update", lid, src, changes, at))
+                snapshot_rows.append((src, lid, json.dumps(fields, ensure_ascii=False), "active", first_seen, at))
+                price = (float(fields["price_amount"]), fields["currency"]) if fields["price_amount"] is not None else None
+                if price is not None and prices.get(lid) != price:
+                    price_rows.append((lid, _day(at), *price))
+                    prices[lid] = price
+                previous[(src, lid)] = (fields, "active", first_seen)  # same ID twice in one batch
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO snapshots (source, id, fields, status, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?)", snapshot_rows,
+            )
+            self._db.executemany("INSERT OR REPLACE INTO prices (id, day, price, currency) VALUES (?, ?, ?, ?)",
+                                 price_rows)
+            self._log(events)
+            self._db.commit()
+        return events
+
+    def delist_missing(self, source: str, seen_ids: Iterable[str], at: Optional[float] = None) -> List[ChangeEvent]:
+        """
+        Marks active listings of `source` that a COMPLETE crawl did not see as delisted.
+        Never call this after a partial (--delta, --max-pages, failed) crawl.
+        """
+        at = at or time.time()
+        seen = set(seen_ids)
+        with self._lock:
+            active = [r[0] for r in self._db.execute(
+                "SELECT id FROM snapshots WHERE source = ? AND status = 'active'", (source,))]
+            gone = [lid for lid in active if lid not in seen]
+            events = [ChangeEvent("delist", lid, source, {"status": ["active", "delisted"]}, at) for lid in gone]
+            self._db.executemany("UPDATE snapshots SET status = 'delisted', last_seen = ? WHERE source = ? AND id = ?",
+                                 [(at, source, lid) for lid in gone])
+            self._log(events)
+            self._db.commit()
+        return events
+
+    def _snapshots(self, source: str, ids: List[str]) -> Dict[tuple, tuple]:
+        out = {}
+        for i in range(0, len(ids), 500):  # SQLite caps bound parameters
+            chunk = ids[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT id, fields, status, first_seen FROM snapshots "
+                f"WHERE source = ? AND id IN ({','.join('?' * len(chunk))})",
+                (source, *chunk),
+            ).fetchall()
+            out.update({(source, r[0]): (json.loads(r[1]), r[2], r[3]) for r in rows})
+        return out
+
+    def _last_prices(self, ids: List[str]) -> Dict[str, tuple]:
+        """id -> (price, currency) of its latest price point, whichever source wrote it."""
+        out = {}
+        ids = list(dict.fromkeys(ids))
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT id, price, currency FROM prices p WHERE id IN ({','.join('?' * len(chunk))}) "
+                f"AND day = (SELECT MAX(day) FROM prices WHERE id = p.id)",
+                chunk,
+            ).fetchall()
+            out.update({r[0]: (r[1], r[2]) for r in rows})
+        return out
+
+    def _log(self, events: List[ChangeEvent]):
+        self._db.executemany(
+            "INSERT INTO events (at, kind, id, source, changes) VALUES (?, ?, ?, ?, ?)",
+            [(e.at, e.kind, e.id, e.source, json.dumps(e.changes, ensure_ascii=False, default=str)) for e in events],
+        )
+
+    # --- READS ---
+
+    def price_history(self, listing_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT day, price, currency FROM prices WHERE id = ? ORDER BY day", (listing_id,)
+            ).fetchall()
+        return [{"date": day, "price": price, "currency": currency} for day, price, currency in rows]
+
+    def snapshot(self, listing_id: str) -> Optional[Dict[str, Any]]:
+        """The listing's latest snapshot across sources - active while any source still lists it."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT source, fields, status, first_seen, last_seen FROM snapshots WHERE id = ? "
+                "ORDER BY status = 'active' DESC, last_seen DESC LIMIT 1", (listing_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"id": listing_id, "source": row[0], **json.loads(row[1]), "status": row[2],
+                "first_seen": _day(row[3]), "last_seen": _day(row[4])}
+
+    def events(self, since: float = 0.0, kind: Optional[str] = None, limit: int = 1000) -> List[ChangeEvent]:
+        query, params = "SELECT kind, id, source, changes, at FROM events WHERE at >= ?", [since]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY at LIMIT ?", (*params, limit)).fetchall()
+        return [ChangeEvent(k, i, s, json.loads(c), a) for k, i, s, c, a in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count = lambda sql: self._db.execute(sql).fetchone()[0]
+            return {
+                "listings": count("SELECT COUNT(DISTINCT id) FROM snapshots"),
+                "active": count("SELECT COUNT(DISTINCT id) FROM snapshots WHERE status = 'active'"),
+                "price_points": count("SELECT COUNT(*) FROM prices"),
+                "events": count("SELECT COUNT(*) FROM events"),
+            }
+
+
+def price_insight(history: List[Dict[str, Any]]) -> str:
+    """'📉 Price dropped by 15% in 3 months.' style one-liner for the ticker."""
+    if len(history) < 2:
+        return "No price changes recorded yet."
+    first, last = history[0], history[-1]
+    if not first["price"] or first["currency"] != last["currency"]:
+        return f"Price updated {len(history) - 1} time(s) since {first['date']}."
+    change = (last["price"] - first["price"]) / first["price"] * 100
+    days = (datetime.fromisoformat(last["date"]) - datetime.fromisoformat(first["date"])).days
+    span = f"{round(days / 30)} months" if days >= 60 else f"{days} days"
+    if round(change) == 0:
+        return f"↔️ Price unchanged over {span}."
+    direction = "📉 Price dropped" if change < 0 else "📈 Price rose"
+    return f"{direction} by {abs(round(change))}% in {span}."
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Listing snapshots, change events and price history")
+    parser.add_argument("--ingest", type=Path, help="JSON / JSONL dump to diff against the last snapshot")
+    parser.add_argument("--source", help="Source name the dump covers (default: each record's site/source)")
+    parser.add_argument("--complete", action="store_true",
+                        help="The dump is a full crawl of --source: delist listings it does not contain")
+    parser.add_argument("--show", help="Print snapshot + price history of one listing ID")
+    args = parser.parse_args()
+
+    history = ListingHistory()
+    if args.ingest:
+        from processing.stream_ingest import iter_dump
+        if args.complete and not args.source:
+            parser.error("--complete needs --source")
+        records, seen, counts = [], set(), {"insert": 0, "update": 0, "delist": 0}
+        for record, _ in iter_dump(args.ingest):
+            if not record:
+                continue
+            records.append(record)
+            seen.add(record.get("id"))
+            if len(records) >= 1000:
+                for e in history.apply(records, source=args.source):
+                    counts[e.kind] += 1
+                records = []
+        for e in history.apply(records, source=args.source):
+            counts[e.kind] += 1
+        if args.complete:
+            counts["delist"] = len(history.delist_missing(args.source, seen))
+        print(f"📊 {args.ingest}: {counts['insert']} new, {counts['update']} changed, {counts['delist']} delisted")
+    if args.show:
+        print(json.dumps({"snapshot": history.snapshot(args.show),
+                          "prices": history.price_history(args.show)}, indent=2, ensure_ascii=False))
+    print(f"🗄️ {history.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+# storage/listing_snapshot.py
+"""
+Shared, memory-mapped snapshot of the active `properties` table for multi-worker APIs.
+
+With `uvicorn --workers N` (or WEB_CONCURRENCY=N) every worker would hold its
+own copy of the listings and refetch them from Supabase. Instead one process
+materializes the table into column files under ASTA_SNAPSHOT_DIR and every
+worker maps them read-only: the pages live once in the OS page cache, however
+many workers read them, and per-worker memory stays flat.
+
+Layout (one immutable directory per version; CURRENT names the live one):
+    CURRENT                      version name, swapped atomically (os.replace)
+    <version>/meta.json          row count, built_at, dim, vocabularies
+    <version>/latitude.npy       float64 [N]     NaN = no coordinates
+    <version>/longitude.npy      float64 [N]
+    <version>/price.npy          float64 [N]     NaN = unknown
+    <version>/roi_score.npy      float64 [N]
+    <version>/created_at.npy     float64 [N]     epoch seconds, NaN = unknown
+    <version>/listing_type.npy   int16   [N]     code into meta["vocab"][...], -1 = none
+    <version>/currency.npy, vibe.npy, location.npy   (same)
+    <version>/id.offsets.npy     int64   [N+1]   Arrow-style string column:
+    <version>/id.data.npy        uint8   [bytes] utf-8 values back to back
+    <version>/title.offsets.npy, title.data.npy
+    <version>/embedding.npy      float32 [N, D]  L2-normalised, zero row = none
+
+    snap = SnapshotReader().get()              # remaps by itself when CURRENT changes
+    rows = snap.nearby(5.6037, -0.1870, radius_km=5)
+    refresh_if_stale(supabase)                 # only the worker holding the lock rebuilds
+
+    python -m storage.listing_snapshot           # build once (cron / release phase)
+    python -m storage.listing_snapshot --watch   # keep refreshing every ASTA_SNAPSHOT_TTL
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every worker may rebuild
+    fcntl = None
+
+from utils.singleflight import SingleFlight
+
+log = logging.getLogger("asta.snapshot")
+
+SNAPSHOT_DIR = Path(os.getenv("ASTA_SNAPSHOT_DIR", "data/snapshot"))
+SNAPSHOT_TTL = float(os.getenv("ASTA_SNAPSHOT_TTL", "300"))
+CHECK_INTERVAL = 2.0     # seconds between stat()s of CURRENT per reader
+RETRY_INTERVAL = 30.0    # seconds between background rebuild attempts per reader
+KEEP_VERSIONS = 3        # older versions are deleted; mapped files stay valid until unmapped
+PAGE_SIZE = 1000
+EARTH_RADIUS_KM = 6371.0
+
+SOURCE_TABLE = "properties"
+SELECT = "id, title, price, currency, listing_type, location, latitude, longitude, roi_score, vibe, created_at"
+EMBEDDING_COLUMN = "embedding"
+
+FLOAT_COLUMNS = ["latitude", "longitude", "price", "roi_score", "created_at"]
+CATEGORY_COLUMNS = ["listing_type", "currency", "vibe", "location"]
+STRING_COLUMNS = ["id", "title"]
+FIELDS = STRING_COLUMNS + FLOAT_COLUMNS + CATEGORY_COLUMNS
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _as_epoch(value) -> float:
+    if not value:
+        return float("nan")
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return float("nan")
+
+
+def _parse_embedding(raw) -> Optional[List[float]]:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings."""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return None
+    return raw if isinstance(raw, list) and raw else None
+
+
+def area_of(location: Optional[str]) -> str:
+    """'East Legon, Accra' -> 'East Legon' (the grouping the tags and pulse use)."""
+    return (location or "").split(",")[0].strip()
+
+
+# ==========================================
+# ✍️ WRITER
+# ==========================================
+
+def _save_strings(path: Path, name: str, values: List[str]):
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded]) if encoded else []
+    np.save(path / f"{name}.offsets.npy", offsets)
+    np.save(path / f"{name}.data.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+
+def write_snapshot(rows: List[Dict[str, Any]], root: Path = SNAPSHOT_DIR, built_at: Optional[float] = None) -> Path:
+    """
+    Writes `rows` as a new version directory and points CURRENT at it. The
+    version is complete on disk before the swap, so readers never see a partial one.
+    `built_at` should be when the rows were read (changes after it are not in them).
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    now = time.time_ns()   # names sort by build time, which is what _prune relies on
+    version = f"v{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now // 10**9))}.{now % 10**9:09d}-{os.getpid()}"
+    tmp = root / f".{version}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+
+    n = len(rows)
+    for col in FLOAT_COLUMNS:
+        parse = _as_epoch if col == "created_at" else _as_float
+        np.save(tmp / f"{col}.npy", np.array([parse(r.get(col)) for r in rows], dtype=np.float64))
+    vocab: Dict[str, List[str]] = {}
+    for col in CATEGORY_COLUMNS:
+        values = [str(r[col]).strip() if r.get(col) not in (None, "") else None for r in rows]
+        if col == "listing_type":
+            values = [v.upper() if v else v for v in values]
+        vocab[col] = sorted({v for v in values if v})
+        code_of = {v: i for i, v in enumerate(vocab[col])}
+        np.save(tmp / f"{col}.npy", np.array([code_of.get(v, -1) for v in values], dtype=np.int16))
+    for col in STRING_COLUMNS:
+        _save_strings(tmp, col, [str(r.get(col) or "") for r in rows])
+
+    vectors = [_parse_embedding(r.get(EMBEDDING_COLUMN)) for r in rows]
+    dim = next((len(v) for v in vectors if v), 0)
+    matrix = np.zeros((n, dim), dtype=np.float32)
+    for i, vec in enumerate(vectors):
+        if vec and len(vec) == dim:
+            matrix[i] = vec
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True) if dim else np.ones((n, 1), np.float32)
+    norms[norms == 0] = 1.0
+    np.save(tmp / "embedding.npy", matrix / norms)
+
+    meta = {"version": version, "rows": n, "dim": dim, "built_at": built_at or time.time(), "vocab": vocab}
+    (tmp / "meta.json").write_text(json.dumps(meta))
+    tmp.rename(root / version)
+
+    pointer = root / f".CURRENT.{os.getpid()}"
+    pointer.write_text(version)
+    os.replace(pointer, root / "CURRENT")   # the atomic swap
+    _prune(root, keep=version)
+    return root / version
+
+
+def _prune(root: Path, keep: str):
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and p.name.startswith("v"))
+    for old in versions[:-KEEP_VERSIONS]:
+        if old.name != keep:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def fetch_rows(supabase, page_size: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+    """Pages through the listings table; retries without embeddings if that column is missing."""
+    select = f"{SELECT}, {EMBEDDING_COLUMN}"
+    rows, offset = [], 0
+    while True:
+        try:
+            page = supabase.table(SOURCE_TABLE).select(select).order("id") \
+                .range(offset, offset + page_size - 1).execute().data
+        except Exception as e:
+            if select == SELECT or offset:
+                raise
+            log.warning(f"⚠️ Snapshot without embeddings ({SOURCE_TABLE}.{EMBEDDING_COLUMN}: {e})")
+            select = SELECT
+            continue
+        rows.extend(page or [])
+        if not page or len(page) < page_size:
+            return rows
+        offset += page_size
+
+
+@contextmanager
+def _exclusive(root: Path, wait: bool = False):
+    """Cross-process lock on root/.lock; unless `wait`, yields False if another process holds it."""
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".lock", "w") as handle:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def snapshot_built_at(root: Path = SNAPSHOT_DIR) -> float:
+    """When the live version was built (0 if there is none)."""
+    try:
+        version = (Path(root) / "CURRENT").read_text().strip()
+        return json.loads((Path(root) / version / "meta.json").read_text())["built_at"]
+    except (OSError, ValueError, KeyError):
+        return 0.0
+
+
+def _is_stale(root: Path, ttl: float, newer_than: float) -> bool:
+    built_at = snapshot_built_at(root)
+    return time.time() - built_at >= ttl or built_at < newer_than
+
+
+def refresh_if_stale(supabase, root: Path = SNAPSHOT_DIR, ttl: float = SNAPSHOT_TTL,
+                     newer_than: float = 0.0, wait: bool = False) -> bool:
+    """
+    Rebuilds the snapshot if older than `ttl` or built before `newer_than` (a
+    change's timestamp); of N workers calling this at once only one rebuilds.
+    With `wait` the others block until it is done instead of returning at once.
+    """
+    root = Path(root)
+    if supabase is None or not _is_stale(root, ttl, newer_than):
+        return False
+    with _exclusive(root, wait) as owner:
+        # re-check: the lock holder may have just swapped in a fresh version
+        if not owner or not _is_stale(root, ttl, newer_than):
+            return False
+        started, read_at = time.perf_counter(), time.time()
+        rows = fetch_rows(supabase)
+        path = write_snapshot(rows, root, built_at=read_at)
+        log.info(f"📸 Listing snapshot {path.name}: {len(rows):,} rows in {time.perf_counter() - started:.2f}s")
+        return True
+
+
+# ==========================================
+# 📖 READER
+# ==========================================
+
+class ListingSnapshot:
+    """One immutable version, every column memory-mapped read-only."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        meta = json.loads((self.path / "meta.json").read_text())
+        self.version = meta["version"]
+        self.built_at = meta["built_at"]
+        self.dim = meta["dim"]
+        self.vocab: Dict[str, List[str]] = meta["vocab"]
+        self.n = meta["rows"]
+        self.columns: Dict[str, np.ndarray] = {}
+        for col in FLOAT_COLUMNS + CATEGORY_COLUMNS + ["embedding"]:
+            self.columns[col] = self._map(f"{col}.npy")
+        self._strings = {col: (self._map(f"{col}.offsets.npy"), self._map(f"{col}.data.npy"))
+                         for col in STRING_COLUMNS}
+
+    def _map(self, name: str) -> np.ndarray:
+        return np.load(self.path / name, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.n
+
+    # --- VALUES ---
+
+    def string(self, col: str, row: int) -> str:
+        offsets, data = self._strings[col]
+        return bytes(data[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def category(self, col: str, row: int) -> Optional[str]:
+        code = int(self.columns[col][row])
+        return self.vocab[col][code] if code >= 0 else None
+
+    def value(self, col: str, row: int):
+        if col in self._strings:
+            return self.string(col, row)
+        if col in CATEGORY_COLUMNS:
+            return self.category(col, row)
+        value = float(self.columns[col][row])
+        if math.isnan(value):
+            return None
+        if col == "created_at":
+            return datetime.fromtimestamp(value, tz=timezone.utc).isoformat()
+        return value
+
+    def records(self, rows: Iterable[int], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        fields = fields or FIELDS
+        return [{f: self.value(f, int(i)) for f in fields} for i in rows]
+
+    # --- FILTERS ---
+
+    def code(self, col: str, value: Optional[str]) -> int:
+        if not value:
+            return -1
+        wanted = value.upper() if col == "listing_type" else value
+        return self.vocab[col].index(wanted) if wanted in self.vocab[col] else -2
+
+    def mask(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Row mask for min_price / max_price / listing_type / vibe / area /
+        location (case-insensitive substring) / bbox (min_lon, min_lat,
+        max_lon, max_lat) / has_coords.
+        """
+        mask = np.ones(self.n, dtype=bool)
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        c = self.columns
+        if filters.get("min_price") is not None:
+            mask &= c["price"] >= float(filters["min_price"])
+        if filters.get("max_price") is not None:
+            mask &= c["price"] <= float(filters["max_price"])
+        for col in ("listing_type", "vibe"):
+            if filters.get(col):
+                mask &= c[col] == self.code(col, filters[col])
+        if filters.get("area"):
+            wanted = str(filters["area"]).strip().lower()
+            codes = [i for i, loc in enumerate(self.vocab["location"]) if area_of(loc).lower() == wanted]
+            mask &= np.isin(c["location"], codes)
+        if filters.get("location"):
+            wanted = str(filters["location"]).strip().lower()
+            codes = [i for i, loc in enumerate(self.vocab["location"]) if wanted in loc.lower()]
+            mask &= np.isin(c["location"], codes)
+        if filters.get("bbox"):
+            min_lon, min_lat, max_lon, max_lat = filters["bbox"]
+            mask &= (c["longitude"] >= min_lon) & (c["longitude"] <= max_lon) \
+                & (c["latitude"] >= min_lat) & (c["latitude"] <= max_lat)
+        if filters.get("has_coords"):
+            mask &= ~np.isnan(c["latitude"]) & ~np.isnan(c["longitude"])
+        return mask
+
+    # --- QUERIES ---
+
+    def nearby(self, lat: float, lon: float, radius_km: float, limit: int = 100,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Listings within `radius_km` (haversine), nearest first, with distance_km."""
+        deg = radius_km / 111.0
+        box = (lon - deg / max(math.cos(math.radians(lat)), 0.01), lat - deg,
+               lon + deg / max(math.cos(math.radians(lat)), 0.01), lat + deg)
+        rows = np.flatnonzero(self.mask({**(filters or {}), "bbox": box}))   # cheap prefilter
+        if not len(rows):
+            return []
+        lat1, lon1 = np.radians(lat), np.radians(lon)
+        lat2, lon2 = np.radians(self.columns["latitude"][rows]), np.radians(self.columns["longitude"][rows])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        inside = dist <= radius_km
+        rows, dist = rows[inside], dist[inside]
+        order = np.argsort(dist, kind="stable")[:limit]
+        return [{**rec, "distance_km": round(float(d), 3)}
+                for rec, d in zip(self.records(rows[order]), dist[order])]
+
+    def search(self, vector, k: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Exact cosine search over the mapped embeddings: [(id, similarity)] best first."""
+        if not self.dim:
+            return []
+        q = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if len(q) != self.dim:
+            return []
+        q = q / (np.linalg.norm(q) or 1.0)
+        emb = self.columns["embedding"]
+        rows = np.flatnonzero(self.mask(filters))
+        if not len(rows):
+            return []
+        scores = emb[rows] @ q
+        keep = scores != 0   # zero rows = listings without an embedding
+        rows, scores = rows[keep], scores[keep]
+        k = min(k, len(rows))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.string("id", int(rows[i])), float(scores[i])) for i in top]
+
+    def counts(self, col: str, mask: Optional[np.ndarray] = None, area: bool = False) -> Dict[str, int]:
+        """Row counts per category value (per area for `location` with area=True)."""
+        codes = self.columns[col] if mask is None else self.columns[col][mask]
+        tally = np.bincount(codes[codes >= 0].astype(np.int64), minlength=len(self.vocab[col]))
+        out: Dict[str, int] = {}
+        for code, count in enumerate(tally):
+            if count:
+                name = self.vocab[col][code]
+                name = area_of(name) if area else name
+                if name:
+                    out[name] = out.get(name, 0) + int(count)
+        return out
+
+    def price_stats(self, by: str = "location", area: bool = True) -> Dict[str, Dict[str, float]]:
+        """Count / median / mean price per category value, from the mapped columns."""
+        price = np.asarray(self.columns["price"])
+        codes = np.asarray(self.columns[by])
+        groups: Dict[str, List[int]] = {}
+        for code, name in enumerate(self.vocab[by]):
+            groups.setdefault(area_of(name) if area else name, []).append(code)
+        stats = {}
+        for name, codes_for in groups.items():
+            values = price[np.isin(codes, codes_for) & ~np.isnan(price)]
+            if name and len(values):
+                stats[name] = {"count": int(len(values)), "median": float(np.median(values)),
+                               "mean": float(values.mean())}
+        return stats
+
+
+class SnapshotReader:
+    """
+    Process-wide handle on the live snapshot. `get()` stats CURRENT at most every
+    CHECK_INTERVAL seconds and remaps when another process swapped it.
+    """
+
+    def __init__(self, root: Path = SNAPSHOT_DIR):
+        self.root = Path(root)
+        self._snapshot: Optional[ListingSnapshot] = None
+        self._checked = 0.0
+        self._attempted = 0.0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self) -> Optional[ListingSnapshot]:
+        now = time.monotonic()
+        if now - self._checked < CHECK_INTERVAL:
+            return self._snapshot
+        with self._lock:
+            if now - self._checked < CHECK_INTERVAL:
+                return self._snapshot
+            self._checked = now
+            try:
+                version = (self.root / "CURRENT").read_text().strip()
+            except OSError:
+                return self._snapshot
+            if self._snapshot is None or self._snapshot.version != version:
+                try:
+                    self._snapshot = ListingSnapshot(self.root / version)
+                except (OSError, ValueError, KeyError) as e:   # pruned under us: keep the old one
+                    log.warning(f"⚠️ Could not map snapshot {version}: {e}")
+            return self._snapshot
+
+    def refresh(self, supabase, ttl: float = SNAPSHOT_TTL, wait: bool = False,
+                newer_than: float = 0.0) -> Optional[ListingSnapshot]:
+        """Rebuilds if stale (in the background unless `wait`), then returns the live snapshot."""
+        if wait:
+            # own key: joining a background rebuild that started before `newer_than` could miss the change
+            self._flight.do(("snapshot", newer_than), refresh_if_stale, supabase, self.root, ttl, newer_than, True)
+            self._checked = 0.0
+        elif time.monotonic() - self._attempted >= RETRY_INTERVAL and _is_stale(self.root, ttl, newer_than):
+            self._attempted = time.monotonic()   # a failing Supabase is not retried on every request
+            self._flight.refresh("snapshot", refresh_if_stale, supabase, self.root, ttl, newer_than)
+        return self.get()
+
+
+# ==========================================
+# 🚀 CLI
+# ==========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize the listings snapshot shared by API workers.")
+    parser.add_argument("--dir", type=Path, default=SNAPSHOT_DIR)
+    parser.add_argument("--watch", action="store_true", help="Keep refreshing every ASTA_SNAPSHOT_TTL seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from api.utils import get_supabase
+    supabase = get_supabase()
+    if supabase is None:
+        sys.exit("❌ Supabase is not configured")
+    while True:
+        refresh_if_stale(supabase, args.dir, ttl=0 if not args.watch else SNAPSHOT_TTL)
+        if not args.watch:
+            break
+        time.sleep(max(SNAPSHOT_TTL / 4, 5))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# storage/news_writer.py
+"""
+Batched, deduplicated inserts for the news tables (market_news, news_articles).
+
+The sentinels used to ask Supabase "does this URL exist?" and then insert,
+one article at a time - two round-trips per entry, 60+ feeds per sweep.
+`NewsWriter` turns that into O(chunks):
+
+  * `warm()` loads the known URLs once - either the candidates of this sweep
+    (`.in_("url", chunk)`, a few hundred per request) or the whole column,
+    paged 1000 rows at a time;
+  * `known()` / `add()` dedup locally against that set (and against rows
+    already queued this run), so nothing is enriched or sent twice;
+  * `flush()` writes the queue as `upsert(chunk, on_conflict="url",
+    ignore_duplicates=True)` - a row that slipped in concurrently is simply
+    skipped by Postgres instead of failing the batch.
+
+    writer = NewsWriter(supabase, "market_news")
+    writer.warm([e.link for e in entries])
+    for entry in entries:
+        writer.add({"url": entry.link, "title": entry.title, ...})
+    writer.flush()
+    print(writer.stats)   # round_trips, skipped, written, failed
+
+The table needs a UNIQUE constraint on `url` for on_conflict to apply
+(asta-web/scripts/sql/002_market_matrix_upgrade.sql, 003_news_articles_url_unique.sql).
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+WARM_PAGE = 1000      # PostgREST's default max-rows
+IN_CHUNK = 200        # URLs per `in.(...)` filter - keeps the GET under URL-length limits
+WRITE_CHUNK = 500
+
+
+class NewsWriter:
+    def __init__(self, client, table: str, key: str = "url", chunk_size: int = WRITE_CHUNK):
+        self.client = client
+        self.table = table
+        self.key = key
+        self.chunk_size = chunk_size
+        self.known_urls: set = set()
+        self.pending: List[Dict[str, Any]] = []
+        self.stats = {"round_trips": 0, "skipped": 0, "written": 0, "failed": 0}
+
+    # --- KNOWN URLS ---
+
+    def warm(self, candidates: Optional[Iterable[str]] = None) -> int:
+        """
+        Loads known URLs from the table. With `candidates`, only those are looked
+        up (cheap on a large table); without, the whole column is paged in.
+        """
+        before = len(self.known_urls)
+        if candidates is not None:
+            todo = [u for u in dict.fromkeys(candidates) if u and u not in self.known_urls]
+            for i in range(0, len(todo), IN_CHUNK):
+                res = self.client.table(self.table).select(self.key).in_(self.key, todo[i:i + IN_CHUNK]).execute()
+                self.stats["round_trips"] += 1
+                self.known_urls.update(row[self.key] for row in res.data or [])
+        else:
+            start = 0
+            while True:
+                res = self.client.table(self.table).select(self.key).range(start, start + WARM_PAGE - 1).execute()
+                self.stats["round_trips"] += 1
+                rows = res.data or []
+                self.known_urls.update(row[self.key] for row in rows)
+                if len(rows) < WARM_PAGE:
+                    break
+                start += WARM_PAGE
+        return len(self.known_urls) - before
+
+    def known(self, url: str) -> bool:
+        return url in self.known_urls
+
+    # --- WRITES ---
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        """Queues a row; returns False (and drops it) if its URL is already stored or queued."""
+        url = row.get(self.key)
+        if not url or url in self.known_urls:
+            self.stats["skipped"] += 1
+            return False
+        self.known_urls.add(url)
+        self.pending.append(row)
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+        return True
+
+    def flush(self) -> int:
+        """Writes queued rows, one upsert per chunk; returns how many rows were sent successfully."""
+        written = 0
+        rows, self.pending = self.pending, []
+        for i in range(0, len(rows), self.chunk_size):
+            chunk = rows[i:i + self.chunk_size]
+            try:
+                self.client.table(self.table).upsert(chunk, on_conflict=self.key, ignore_duplicates=True).execute()
+                written += len(chunk)
+            except Exception as e:
+                print(f"   ❌ {self.table} batch write failed ({len(chunk)} rows): {e}")
+                self.stats["failed"] += len(chunk)
+                self.known_urls.difference_update(r[self.key] for r in chunk)  # retry them next sweep
+            self.stats["round_trips"] += 1
+        self.stats["written"] += written
+        return written
@@ -0,0 +1,455 @@
+# storage/vector_index.py
+"""
+In-process approximate nearest-neighbour (ANN) index for semantic listing search.
+
+Replaces the network round-trip to the `search_listings` RPC with an IVF
+(inverted file) index over a float32 embedding matrix that lives on disk and is
+memory-mapped on load. Structured attributes (price, bedrooms, listing type) are
+stored next to the vectors so queries can be pre-filtered before scoring.
+
+Layout of an index directory:
+    vectors.npy    float32 [N, D]  L2-normalised embeddings (mmap'd on load)
+    lists.npy      int32   [N]     IVF list assignment per row
+    centroids.npy  float32 [L, D]  coarse quantizer
+    price.npy      float32 [N]     NaN = unknown
+    bedrooms.npy   int16   [N]     -1  = unknown
+    ltype.npy      int8    [N]     code into meta["listing_types"]
+    meta.json      ids, per-table updated_at watermarks, listing type vocab,
+                   how many rows the centroids were trained on
+"""
+
+import os
+import json
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = Path(os.getenv("ASTA_VECTOR_INDEX_DIR", "data/vector_index"))
+EMBEDDING_DIM = 768  # text-embedding-004
+RETRAIN_FRACTION = 0.25  # save() retrains the centroids once rows added since training exceed this share
+
+# Tables that carry Gemini embeddings. "select" aliases each table's columns onto
+# the index fields (PostgREST `alias:column` syntax); "watermark" drives refreshes;
+# "key" + "display" are used to hydrate search hits into listing cards.
+INDEX_SOURCES = {
+    "market_listings": {
+        "select": "id, price, bedrooms, listing_type:metadata->>type, updated_at, embedding",
+        "watermark": "updated_at",
+        "key": "id",
+        "display": "id, title, location, price, currency, bedrooms, url",
+    },
+    "gpc_properties": {
+        "select": "id:url, price:price_amount, bedrooms, scraped_at, embedding",
+        "watermark": "scraped_at",
+        "key": "url",
+        "display": "id:url, title, location:location_clean, price:price_amount, currency, bedrooms, url",
+    },
+}
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _parse_embedding(raw) -> Optional[List[float]]:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings."""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return None
+    return raw if isinstance(raw, list) and raw else None
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _as_int(value) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return -1
+
+
+def _kmeans(vectors: np.ndarray, n_lists: int, iters: int = 10, seed: int = 42) -> np.ndarray:
+    """Spherical k-means (cosine) used to train the coarse quantizer."""
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > n_lists * 256:
+        sample = vectors[rng.choice(len(vectors), n_lists * 256, replace=False)]
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def structured_mask(store, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """
+    Boolean row mask for min_price / max_price / bedrooms / listing_type over any
+    store exposing alive / price / bedrooms / ltype arrays and a listing_types vocab.
+    """
+    mask = store.alive.copy()
+    if not filters:
+        return mask
+    if filters.get("min_price") is not None:
+        mask &= store.price >= float(filters["min_price"])
+    if filters.get("max_price") is not None:
+        mask &= store.price <= float(filters["max_price"])
+    if filters.get("bedrooms") is not None:
+        mask &= store.bedrooms >= int(filters["bedrooms"])
+    if filters.get("listing_type"):
+        wanted = str(filters["listing_type"]).upper()
+        code = store.listing_types.index(wanted) if wanted in store.listing_types else -2
+        mask &= store.ltype == code
+    return mask
+
+
+class VectorIndex:
+    """
+    IVF index with structured pre-filtering.
+
+    Rows loaded from disk stay memory-mapped; rows added by `upsert` live in a
+    small in-memory tail until the next `save()` compacts everything.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, n_probe: int = 8):
+        self.dim = dim
+        self.n_probe = n_probe
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.tail = np.zeros((0, dim), dtype=np.float32)
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.price = np.zeros(0, dtype=np.float32)
+        self.bedrooms = np.zeros(0, dtype=np.int16)
+        self.ltype = np.zeros(0, dtype=np.int8)
+        self.alive = np.zeros(0, dtype=bool)
+        self.ids: List[str] = []
+        self.listing_types: List[str] = []
+        self.watermarks: Dict[str, str] = {}
+        self.trained_on = 0
+        self._row_of: Dict[str, int] = {}
+        self._list_order = np.zeros(0, dtype=np.int64)
+        self._list_offsets = np.zeros(1, dtype=np.int64)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    # --- BUILD ---
+
+    def build(self, ids: List[str], vectors, attrs: Optional[Dict[str, Iterable]] = None,
+              n_lists: Optional[int] = None):
+        """(Re)builds the index from scratch, training the coarse quantizer."""
+        attrs = attrs or {}
+        vectors = _normalize(vectors)
+        n = len(ids)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(n)))
+        n_lists = max(1, min(n_lists, n))
+        with self._lock:
+            self.centroids = _kmeans(vectors, n_lists) if n else np.zeros((0, self.dim), np.float32)
+            self.trained_on = n
+            self.vectors = vectors
+            self.tail = np.zeros((0, self.dim), dtype=np.float32)
+            self.lists = self._assign(vectors)
+            self.price = np.array([_as_float(v) for v in attrs.get("price", [None] * n)], dtype=np.float32)
+            self.bedrooms = np.array([_as_int(v) for v in attrs.get("bedrooms", [None] * n)], dtype=np.int16)
+            self.listing_types = []
+            self.ltype = np.array([self._type_code(v) for v in attrs.get("listing_type", [None] * n)], dtype=np.int8)
+            self.alive = np.ones(n, dtype=bool)
+            self.ids = [str(i) for i in ids]
+            self._row_of = {rid: row for row, rid in enumerate(self.ids)}
+            self._rebuild_lists()
+
+    def upsert(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Adds or replaces rows. Each record needs 'id' and 'embedding'; 'price',
+        'bedrooms' and 'listing_type' are optional. Replaced rows are tombstoned.
+        """
+        latest = {}
+        for r in records:
+            vec = _parse_embedding(r.get("embedding"))
+            if r.get("id") is not None and vec and len(vec) == self.dim:
+                latest[str(r["id"])] = {**r, "embedding": vec}
+        rows = list(latest.values())
+        if not rows:
+            return 0
+        if not len(self.centroids):
+            self.build([r["id"] for r in rows], [r["embedding"] for r in rows],
+                       {k: [r.get(k) for r in rows] for k in ("price", "bedrooms", "listing_type")})
+            return len(rows)
+
+        new_vecs = _normalize([r["embedding"] for r in rows])
+        with self._lock:
+            start = len(self.ids)
+            for r in rows:
+                old = self._row_of.get(str(r["id"]))
+                if old is not None:
+                    self.alive[old] = False
+            self.tail = np.concatenate([self.tail, new_vecs])
+            self.lists = np.concatenate([self.lists, self._assign(new_vecs)])
+            self.price = np.concatenate([self.price, np.array([_as_float(r.get("price")) for r in rows], np.float32)])
+            self.bedrooms = np.concatenate([self.bedrooms, np.array([_as_int(r.get("bedrooms")) for r in rows], np.int16)])
+            self.ltype = np.concatenate([self.ltype, np.array([self._type_code(r.get("listing_type")) for r in rows], np.int8)])
+            self.alive = np.concatenate([self.alive, np.ones(len(rows), dtype=bool)])
+            for offset, r in enumerate(rows):
+                self.ids.append(str(r["id"]))
+                self._row_of[str(r["id"])] = start + offset
+            self._rebuild_lists()
+        return len(rows)
+
+    def needs_retrain(self) -> bool:
+        """True once the rows assigned to centroids they were not trained on are a large share."""
+        return len(self) > 0 and len(self) - self.trained_on > RETRAIN_FRACTION * max(self.trained_on, 1)
+
+    def retrain(self):
+        """Retrains the coarse quantizer on every live row and reassigns the lists (tombstones are kept)."""
+        with self._lock:
+            keep = np.flatnonzero(self.alive)
+            if not len(keep):
+                return
+            n_lists = max(1, min(int(np.sqrt(len(keep))), len(keep)))
+            sample = keep
+            if len(keep) > n_lists * 256:   # _kmeans samples this many anyway; don't page in the rest
+                sample = np.sort(np.random.default_rng(42).choice(keep, n_lists * 256, replace=False))
+            self.centroids = _kmeans(self._gather(sample), n_lists)
+            base = [self._assign(self.vectors[i:i + 65536]) for i in range(0, len(self.vectors), 65536)]
+            self.lists = np.concatenate([*base, self._assign(self.tail)])
+            self.trained_on = len(keep)
+            self._rebuild_lists()
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for rid in ids:
+                row = self._row_of.pop(str(rid), None)
+                if row is not None:
+                    self.alive[row] = False
+
+    # --- SEARCH ---
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        return structured_mask(self, filters)
+
+    def search(self, query, k: int = 10, filters: Optional[Dict[str, Any]] = None,
+               n_probe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Returns [(id, cosine_similarity)] best first."""
+        if not len(self.ids):
+            return []
+        q = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            mask = self.filter_mask(filters)
+            allowed = int(mask.sum())
+            if allowed == 0:
+                return []
+            # Highly selective filters: exact scan of the survivors is cheaper than probing.
+            if allowed <= max(k * 50, 2048):
+                candidates = np.flatnonzero(mask)
+            else:
+                probe = min(n_probe or self.n_probe, len(self.centroids))
+                top_lists = np.argpartition(-(self.centroids @ q), probe - 1)[:probe]
+                candidates = np.concatenate([
+                    self._list_order[self._list_offsets[c]:self._list_offsets[c + 1]] for c in top_lists
+                ])
+                candidates = candidates[mask[candidates]]
+            return self._top_k(candidates, q, k)
+
+    def brute_force(self, query, k: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Exact cosine search; the ground truth for recall benchmarks."""
+        if not len(self.ids):
+            return []
+        q = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            return self._top_k(np.flatnonzero(self.filter_mask(filters)), q, k)
+
+    def _top_k(self, candidates: np.ndarray, q: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        if not len(candidates):
+            return []
+        scores = self._gather(candidates) @ q
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[candidates[i]], float(scores[i])) for i in top]
+
+    # --- INTERNALS ---
+
+    def _gather(self, rows: np.ndarray) -> np.ndarray:
+        """Fetches embedding rows from the mapped base matrix or the in-memory tail."""
+        base_n = len(self.vectors)
+        if not len(self.tail):
+            return self.vectors[rows]
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        in_base = rows < base_n
+        out[in_base] = self.vectors[rows[in_base]]
+        out[~in_base] = self.tail[rows[~in_base] - base_n]
+        return out
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if not len(vectors):
+            return np.zeros(0, dtype=np.int32)
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _rebuild_lists(self):
+        """CSR-style row order grouped by IVF list, so probing is a slice."""
+        self._list_order = np.argsort(self.lists, kind="stable")
+        counts = np.bincount(self.lists, minlength=len(self.centroids))
+        self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def _type_code(self, value) -> int:
+        if not value:
+            return -1
+        value = str(value).upper()
+        if value not in self.listing_types:
+            self.listing_types.append(value)
+        return self.listing_types.index(value)
+
+    # --- PERSISTENCE ---
+
+    def save(self, index_dir: Path = DEFAULT_INDEX_DIR):
+        """
+        Compacts tombstones and writes the index; the directory swap is atomic.
+        Centroids trained on a much smaller table are retrained first, so recall holds as it grows.
+        """
+        if self.needs_retrain():
+            self.retrain()
+        index_dir = Path(index_dir)
+        tmp_dir = index_dir.with_name(index_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        with self._lock:
+            keep = np.flatnonzero(self.alive)
+            np.save(tmp_dir / "vectors.npy", self._gather(keep))
+            np.save(tmp_dir / "lists.npy", self.lists[keep])
+            np.save(tmp_dir / "centroids.npy", self.centroids)
+            np.save(tmp_dir / "price.npy", self.price[keep])
+            np.save(tmp_dir / "bedrooms.npy", self.bedrooms[keep])
+            np.save(tmp_dir / "ltype.npy", self.ltype[keep])
+            meta = {
+                "dim": self.dim,
+                "ids": [self.ids[i] for i in keep],
+                "listing_types": self.listing_types,
+                "watermarks": self.watermarks,
+                "trained_on": min(self.trained_on, len(keep)),
+            }
+            (tmp_dir / "meta.json").write_text(json.dumps(meta))
+        old_dir = index_dir.with_name(index_dir.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if index_dir.exists():
+            index_dir.rename(old_dir)
+        tmp_dir.rename(index_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, index_dir: Path = DEFAULT_INDEX_DIR, n_probe: int = 8) -> "VectorIndex":
+        """Maps the vector matrix read-only; only metadata is read into RAM."""
+        index_dir = Path(index_dir)
+        meta = json.loads((index_dir / "meta.json").read_text())
+        index = cls(dim=meta["dim"], n_probe=n_probe)
+        index.vectors = np.load(index_dir / "vectors.npy", mmap_mode="r")
+        index.lists = np.load(index_dir / "lists.npy")
+        index.centroids = np.load(index_dir / "centroids.npy")
+        index.price = np.load(index_dir / "price.npy")
+        index.bedrooms = np.load(index_dir / "bedrooms.npy")
+        index.ltype = np.load(index_dir / "ltype.npy")
+        index.ids = meta["ids"]
+        index.listing_types = meta["listing_types"]
+        index.watermarks = meta.get("watermarks", {})
+        index.trained_on = meta.get("trained_on", len(index.ids))
+        index.alive = np.ones(len(index.ids), dtype=bool)
+        index._row_of = {rid: row for row, rid in enumerate(index.ids)}
+        index._rebuild_lists()
+        return index
+
+
+# ==========================================
+# 🔄 SUPABASE SYNC
+# ==========================================
+
+def refresh_from_supabase(index: VectorIndex, supabase, page_size: int = 500) -> int:
+    """
+    Pulls rows changed since the last watermark from every INDEX_SOURCES table
+    and upserts them. A fresh index pulls everything and trains on all of it at once.
+    """
+    total = 0
+    first_load: Optional[List[Dict[str, Any]]] = [] if not len(index.centroids) else None
+    for table, source in INDEX_SOURCES.items():
+        watermark = index.watermarks.get(table)
+        offset = 0
+        while True:
+            query = supabase.table(table).select(source["select"]).not_.is_("embedding", "null")
+            if watermark:
+                query = query.gt(source["watermark"], watermark)
+            try:
+                rows = query.order(source["watermark"]).range(offset, offset + page_size - 1).execute().data
+            except Exception as e:
+                print(f"⚠️ Vector index refresh failed for {table}: {e}")
+                break
+            if not rows:
+                break
+            records = [{**row, "id": f"{table}:{row['id']}"} for row in rows]
+            if first_load is not None:
+                first_load.extend(records)
+            else:
+                total += index.upsert(records)
+            latest = rows[-1].get(source["watermark"])
+            if latest:
+                index.watermarks[table] = latest
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    if first_load:
+        total += index.upsert(first_load)
+    return total
+
+
+def hydrate_hits(supabase, hits: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+    """Turns [("table:key", score)] into listing dicts, one `in_` query per table."""
+    by_table: Dict[str, List[str]] = {}
+    for hit_id, _ in hits:
+        table, _, key = hit_id.partition(":")
+        by_table.setdefault(table, []).append(key)
+    rows: Dict[str, Dict[str, Any]] = {}
+    for table, keys in by_table.items():
+        source = INDEX_SOURCES.get(table)
+        if not source:
+            continue
+        try:
+            data = supabase.table(table).select(source["display"]).in_(source["key"], keys).execute().data
+        except Exception as e:
+            print(f"⚠️ Hydration failed for {table}: {e}")
+            continue
+        for row in data:
+            rows[f"{table}:{row['id']}"] = row
+    return [
+        {**rows[hit_id], "source_table": hit_id.partition(":")[0], "similarity": round(score, 4)}
+        for hit_id, score in hits if hit_id in rows
+    ]
+
+
+if __name__ == "__main__":
+    from supabase import create_client
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    sb = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+    idx = VectorIndex.load() if (DEFAULT_INDEX_DIR / "meta.json").exists() else VectorIndex()
+    print(f"🧠 Refreshing vector index ({len(idx)} rows on disk)...")
+    added = refresh_from_supabase(idx, sb)
+    idx.save()
+    print(f"✅ Upserted {added} rows. Index now holds {len(idx)} listings.")
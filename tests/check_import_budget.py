@@ -0,0 +1,76 @@
+"""
+Import-time budget for the API entry points (run in CI or before a deploy).
+
+Imports each entry point in a fresh interpreter under `python -X importtime`
+and fails (exit 1) if
+  * the cumulative import time exceeds its budget, or
+  * a deferred heavy SDK (Supabase, Gemini, Twilio, Pillow-HEIF, pandas, ...)
+    got imported at module load again - those belong behind the lazy
+    accessors in api/utils.py / asta-engine/services.py.
+
+    python tests/check_import_budget.py
+    ASTA_IMPORT_BUDGET_MS=1500 python tests/check_import_budget.py --runs 5
+
+The time is the best of --runs, to keep a noisy machine from failing the check.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_MS = float(os.getenv("ASTA_IMPORT_BUDGET_MS", "1200"))
+
+# (label, working directory, module to import, budget in ms)
+TARGETS = [
+    ("api.main", ROOT, "api.main", BUDGET_MS),
+    ("asta-engine/main", ROOT / "asta-engine", "main", BUDGET_MS),
+]
+
+DEFERRED = ["supabase", "google.genai", "google.generativeai", "googlemaps", "twilio", "resend",
+            "pillow_heif", "PIL", "phonenumbers", "pandas", "pyarrow"]
+
+
+def measure(cwd: Path, module: str):
+    """(total ms, {module: cumulative ms}) for importing `module` in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd,
+                          capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    modules, total = {}, 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        ms = int(cumulative) / 1000
+        modules[name.strip()] = ms
+        if not name.startswith("  "):   # top-level entries add up to the whole import
+            total += ms
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per target")
+    args = parser.parse_args()
+
+    failures = 0
+    for label, cwd, module, budget in TARGETS:
+        runs = [measure(cwd, module) for _ in range(args.runs)]
+        total, modules = min(runs, key=lambda r: r[0])
+        eager = [m for m in DEFERRED if m in modules]
+        ok = total <= budget and not eager
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {label}: {total:.0f} ms (budget {budget:.0f} ms)")
+        if eager:
+            print(f"   ❌ imported at load time, should be deferred: {', '.join(eager)}")
+        for name, ms in sorted(modules.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"   {ms:8.1f} ms  {name.strip()}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
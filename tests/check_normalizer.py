@@ -0,0 +1,112 @@
+"""
+Golden-case check for utils/normalizer.py (run in CI or before touching a pattern).
+
+Runs every case in data/golden/normalizer_cases.json through the scalar path
+(`normalize_listing`) and, for cases that only use price/title/bedrooms/bathrooms,
+through the vectorised path (`normalize_frame`), then checks that NaN / inf
+(what a concatenated pandas frame holds for a missing value) parse as missing
+on both paths, and exits 1 on any mismatch.
+
+    python tests/check_normalizer.py
+    python tests/check_normalizer.py --golden path/to/cases.json
+
+scripts/benchmark_normalizer.py runs the same check before timing.
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from utils.normalizer import normalize_frame, normalize_listing
+
+GOLDEN_PATH = ROOT / "data" / "golden" / "normalizer_cases.json"
+FRAME_INPUTS = ("price", "title", "bedrooms", "bathrooms")
+FRAME_FIELDS = ("price_amount", "currency", "price_period", "bedrooms", "bathrooms")
+
+
+def _clean(value):
+    """NaN / pd.NA / numpy scalars -> plain Python so values compare equal."""
+    import pandas as pd
+
+    if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def check_golden(path=GOLDEN_PATH) -> int:
+    """Prints each mismatch and returns how many there were."""
+    import pandas as pd
+
+    cases = json.loads(Path(path).read_text(encoding="utf-8"))
+    failures = 0
+    for case in cases:
+        got = normalize_listing(case["input"])
+        if got != case["expected"]:
+            failures += 1
+            print(f"❌ scalar {case['input']}\n   expected {case['expected']}\n   got      {got}")
+
+    # The frame path only sees price/title/bedrooms/bathrooms columns.
+    frame_cases = [c for c in cases if not (set(c["input"]) - set(FRAME_INPUTS))]
+    df = pd.DataFrame([{k: c["input"].get(k) for k in FRAME_INPUTS} for c in frame_cases])
+    out = normalize_frame(df, beds_col="bedrooms", baths_col="bathrooms")
+    for case, (_, row) in zip(frame_cases, out.iterrows()):
+        got = {f: _clean(row[f]) for f in FRAME_FIELDS}
+        expected = {f: case["expected"][f] for f in FRAME_FIELDS}
+        if got != expected:
+            failures += 1
+            print(f"❌ frame  {case['input']}\n   expected {expected}\n   got      {got}")
+
+    print(f"{'✅' if not failures else '❌'} Golden cases: {len(cases)} scalar, "
+          f"{len(frame_cases)} vectorised, {failures} mismatches")
+    return failures
+
+
+def check_non_finite() -> int:
+    """NaN / inf in numeric fields are missing values, not errors (both paths)."""
+    import pandas as pd
+
+    failures = 0
+    row = {"price": math.nan, "bedrooms": math.nan, "bathrooms": math.inf, "area": math.nan,
+           "title": "2 bedroom house for rent"}
+    expected = {"price_amount": None, "currency": None, "price_period": None,
+                "bedrooms": 2, "bathrooms": None, "area_sqm": None}
+    try:
+        got = normalize_listing(row)
+    except (TypeError, ValueError, OverflowError) as e:
+        got = f"{e.__class__.__name__}: {e}"
+    if got != expected:
+        failures += 1
+        print(f"❌ scalar {row}\n   expected {expected}\n   got      {got}")
+
+    # A float column padded with NaN (Supabase rows + scraped rows): 3.0 stays 3, NaN falls back to the title.
+    df = pd.DataFrame({"price": [None, None], "title": ["2 bed flat", "studio"],
+                       "bedrooms": [3.0, math.nan], "bathrooms": [math.inf, 1.0]})
+    out = normalize_frame(df, beds_col="bedrooms", baths_col="bathrooms")
+    for (_, source), (_, result) in zip(df.iterrows(), out.iterrows()):
+        scalar = normalize_listing(source.to_dict())
+        got = {f: _clean(result[f]) for f in ("bedrooms", "bathrooms")}
+        expected = {f: scalar[f] for f in ("bedrooms", "bathrooms")}
+        if got != expected:
+            failures += 1
+            print(f"❌ frame  {source.to_dict()}\n   expected {expected}\n   got      {got}")
+
+    print(f"{'✅' if not failures else '❌'} Non-finite inputs: {failures} mismatches")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--golden", default=str(GOLDEN_PATH))
+    args = parser.parse_args()
+    failures = check_golden(args.golden) + check_non_finite()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
-import json
 import os
-import math
+import sys
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from fastembed import TextEmbedding
+from processing.stream_ingest import StreamingIngestor
+from processing.near_dup import NearDupIndex
 
 # --- CONFIGURATION ---
 load_dotenv()
@@ -22,64 +23,59 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 # Initialize FastEmbed (Lighter, Faster, No PyTorch needed)
 print("🧠 Loading AI Model (all-MiniLM-L6-v2)...")
 model = TextEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+near_dups = NearDupIndex()
 
-def run_upload():
-    print(f"📂 Loading data from {INPUT_FILE}...")
-    try:
-        with open(INPUT_FILE, 'r') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"❌ Error: {INPUT_FILE} not found.")
-        return
+def to_row(item):
+    # 1. Get the text for embedding
+    text_content = item.get('_text_to_embed', '')
+    if not text_content:
+        text_content = f"{item['metadata']['title']} in {item['metadata']['location']}"
+
+    # 2. Map to Table Schema
+    return {
+        "id": item['id'],
+        "source": item['metadata']['source'],
+        "title": item['metadata']['title'],
+        "price": item['metadata']['price'],
+        "currency": item['metadata']['currency'],
+        "location": item['metadata']['location'],
+        "url": item['metadata']['url'],
+        "bedrooms": item['metadata']['beds'],
+        "content": text_content,
+        "metadata": item['metadata']
+    }
 
-    print(f"🚀 Preparing to upload {len(data)} records to 'market_listings'...")
+def embed_rows(rows):
+    # 3. Generate Vectors for the whole batch in one model call
+    return [vec.tolist() for vec in model.embed([r["content"] for r in rows])]
 
-    batch_buffer = []
-    
-    for i, item in enumerate(data):
-        # 1. Get the text for embedding
-        text_content = item.get('_text_to_embed', '')
-        if not text_content:
-            text_content = f"{item['metadata']['title']} in {item['metadata']['location']}"
+def upsert_rows(rows):
+    # 4. Tag cross-source near-duplicates (same house on Jiji / GPC / WhatsApp), then
+    #    upsert to prevent duplicates. market_insights averages one row per cluster_id.
+    clusters = near_dups.add({**r, "price_amount": r["price"] or None,
+                              "currency": None if r["currency"] == "N/A" else r["currency"]} for r in rows)
+    for r in rows:
+        r["metadata"] = {**r["metadata"], "cluster_id": clusters.get(r["id"])}
+    supabase.table("market_listings").upsert(rows).execute()
 
-        # 2. Generate Vector
-        # model.embed returns a generator, convert to list -> first item -> list of floats
-        embedding = list(model.embed([text_content]))[0].tolist()
-        
-        # 3. Map to Table Schema
-        record = {
-            "id": item['id'],
-            "source": item['metadata']['source'],
-            "title": item['metadata']['title'],
-            "price": item['metadata']['price'],
-            "currency": item['metadata']['currency'],
-            "location": item['metadata']['location'],
-            "url": item['metadata']['url'],
-            "bedrooms": item['metadata']['beds'],
-            "content": text_content,
-            "embedding": embedding,
-            "metadata": item['metadata']
-        }
-        
-        batch_buffer.append(record)
-        
-        # 4. Upload Batch
-        if len(batch_buffer) >= BATCH_SIZE:
-            try:
-                # Upsert to prevent duplicates
-                supabase.table("market_listings").upsert(batch_buffer).execute()
-                print(f"   ✅ Batch {math.ceil((i+1)/BATCH_SIZE)}: Uploaded {len(batch_buffer)} items.")
-            except Exception as e:
-                print(f"   ❌ Error on batch: {str(e)[:150]}...")
-            
-            batch_buffer = [] 
+def run_upload(restart=False):
+    if not os.path.exists(INPUT_FILE):
+        print(f"❌ Error: {INPUT_FILE} not found.")
+        return
 
-    # Final Batch
-    if batch_buffer:
-        supabase.table("market_listings").upsert(batch_buffer).execute()
-        print(f"   ✅ Final Batch: Uploaded {len(batch_buffer)} items.")
+    print(f"🚀 Streaming {INPUT_FILE} into 'market_listings'...")
+    ingestor = StreamingIngestor(
+        job="market_listings_meqasa",
+        normalize=to_row,
+        key=lambda row: row["id"],
+        embed=embed_rows,
+        upsert=upsert_rows,
+        embed_batch=BATCH_SIZE,
+        upsert_batch=BATCH_SIZE,
+    )
+    stats = ingestor.run(INPUT_FILE, restart=restart)
 
-    print("\n🎉 DONE! Meqasa data is live in the Vector Database.")
+    print(f"\n🎉 DONE! {stats['upserted']} Meqasa records are live in the Vector Database.")
 
 if __name__ == "__main__":
-    run_upload()
+    run_upload(restart="--restart" in sys.argv)
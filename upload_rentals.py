@@ -1,10 +1,10 @@
 import json
 import os
-import re
 import math
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from fastembed import TextEmbedding
+from utils.normalizer import parse_price, parse_count
 
 load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -16,10 +16,8 @@ print("🧠 Loading AI Model...")
 model = TextEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
 
 def clean_price(price_str):
-    if not price_str: return 0, "GHS"
-    currency = "USD" if "$" in price_str or "USD" in price_str else "GHS"
-    clean = re.sub(r'[^\d]', '', price_str)
-    return (int(clean), currency) if clean else (0, currency)
+    price = parse_price(price_str)
+    return (int(price.amount), price.currency) if price.amount else (0, price.currency or "GHS")
 
 def run():
     if not os.path.exists(INPUT_FILE):
@@ -47,7 +45,7 @@ def run():
             "currency": currency,
             "location": item['location'],
             "url": item['url'],
-            "bedrooms": int(item['beds']) if str(item['beds']).isdigit() else 0,
+            "bedrooms": parse_count(item.get('beds')) or 0,
             "content": text_content,
             "embedding": embedding,
             "metadata": {**item, "type": "Rent"}
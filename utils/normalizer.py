@@ -0,0 +1,283 @@
+# utils/normalizer.py
+"""
+One place to turn scraped listing text into numbers.
+
+Every scraper and ingester used to carry its own `clean_price` / bedroom regex,
+each with slightly different bugs (e.g. stripping the decimal point so
+"GH₵1,250,000.00" became 125,000,000). This module owns the patterns:
+
+    parse_price("GH₵ 4,500 / month")  -> ParsedPrice(4500.0, "GHS", "month")
+    parse_count("3 bdrm")             -> 3
+    normalize_listing(raw_dict)       -> canonical price/bed/bath/area fields
+    normalize_frame(df)               -> same thing, vectorised with pandas str.extract
+
+The scalar and vectorised paths share the same compiled regexes, so they agree
+row-for-row (see data/golden/normalizer_cases.json).
+"""
+
+import math
+import re
+from typing import Any, Dict, NamedTuple, Optional
+
+# --- CURRENCY ---
+# Longest tokens first so "GH₵" wins over "₵" and "US$" over "$".
+_CURRENCY_TOKENS = r"US\$|USD|\$|GH\s?₵|GH\s?¢|GHS|GH[Cc]|₵|¢"
+_CURRENCY_CODES = {"$": "USD", "US$": "USD", "USD": "USD"}
+_AMOUNT = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+
+# Amount with an explicit currency before or after it ("$250,000", "5,000 GHS", "2000 cedis").
+PRICE_WITH_CURRENCY_RE = re.compile(
+    rf"(?P<cur>{_CURRENCY_TOKENS})\s*-?\s*(?P<amt>{_AMOUNT})"
+    rf"|(?P<amt2>{_AMOUNT})\s*(?P<cur2>USD|GHS|GH[Cc]|cedis?)\b",
+    re.IGNORECASE,
+)
+# Bare amount, only trusted when the field is known to be a price field.
+BARE_AMOUNT_RE = re.compile(rf"(?P<amt>{_AMOUNT})")
+
+NO_PRICE_RE = re.compile(r"request|contact|negotiable|call\s+for", re.IGNORECASE)
+
+# --- RENT PERIOD ---
+# "pm" only counts straight after a price ("GH₵ 2,000 p.m.", "3,500pm"), never after a
+# time of day ("2pm viewing", "12:30 pm"): a currency-tagged amount or one of 3+ digits.
+_PRICE_BEFORE = rf"(?:(?:{_CURRENCY_TOKENS})\s*(?:{_AMOUNT})|(?<![\d:.])(?:\d{{1,3}}(?:,\d{{3}})+|\d{{3,}}))"
+PERIOD_RE = re.compile(
+    rf"(?P<month>/\s*(?:month|mo|mth)\b|per\s+month|monthly|{_PRICE_BEFORE}\s*p\.?\s?m\b|a\s+month)"
+    r"|(?P<year>/\s*(?:year|yr|annum)\b|per\s+(?:year|annum)|yearly|annually|p\.?\s?a\b)"
+    r"|(?P<day>/\s*(?:day|night)\b|per\s+(?:day|night)|nightly|daily)",
+    re.IGNORECASE,
+)
+
+# --- ROOMS & AREA ---
+BEDS_RE = re.compile(r"(\d+)\s*-?\s*(?:bed(?:room)?s?|bdrms?|bdr|bd|br)\b", re.IGNORECASE)
+BATHS_RE = re.compile(r"(\d+)\s*-?\s*(?:bath(?:room)?s?|showers?)\b", re.IGNORECASE)
+AREA_RE = re.compile(
+    r"(?P<amt>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>sqm|sq\.?\s?m|m²|m2|square\s+met(?:er|re)s?"
+    r"|sq\.?\s?ft|sqft|ft²|square\s+f(?:ee|oo)t)",
+    re.IGNORECASE,
+)
+DIGITS_RE = re.compile(r"^\s*(\d+)\s*$")
+
+SQFT_TO_SQM = 0.092903
+
+
+class ParsedPrice(NamedTuple):
+    amount: Optional[float]
+    currency: Optional[str]
+    period: Optional[str]  # "month" / "year" / "day" / None (outright or unknown)
+
+
+def currency_code(token: Optional[str]) -> Optional[str]:
+    """'GH₵' / 'GHc' / '¢' / 'cedis' -> 'GHS'; '$' / 'USD' -> 'USD'."""
+    if not token:
+        return None
+    token = re.sub(r"\s", "", token)
+    return _CURRENCY_CODES.get(token.upper(), "GHS")
+
+
+def _to_float(amount: Optional[str]) -> Optional[float]:
+    if not amount:
+        return None
+    try:
+        return float(amount.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def detect_period(text: Optional[str]) -> Optional[str]:
+    match = PERIOD_RE.search(text or "")
+    return match.lastgroup if match else None
+
+
+def parse_price(text: Any, require_currency: bool = False,
+                default_currency: str = "GHS") -> ParsedPrice:
+    """
+    Parses a price string. With `require_currency` (free text like a description
+    snippet) only amounts tagged with a currency count, so "4 bedroom ... $250,000"
+    yields 250000 rather than 4.
+    """
+    if text is None:
+        return ParsedPrice(None, None, None)
+    if isinstance(text, (int, float)):
+        if not math.isfinite(text):   # NaN from a pandas row = missing
+            return ParsedPrice(None, None, None)
+        return ParsedPrice(float(text), default_currency, None)
+    text = str(text)
+    if NO_PRICE_RE.search(text) and not PRICE_WITH_CURRENCY_RE.search(text):
+        return ParsedPrice(None, None, None)
+
+    match = PRICE_WITH_CURRENCY_RE.search(text)
+    if match:
+        amount = _to_float(match.group("amt") or match.group("amt2"))
+        currency = currency_code(match.group("cur") or match.group("cur2"))
+    elif not require_currency and (bare := BARE_AMOUNT_RE.search(text)):
+        amount, currency = _to_float(bare.group("amt")), default_currency
+    else:
+        return ParsedPrice(None, None, None)
+    return ParsedPrice(amount, currency if amount is not None else None, detect_period(text))
+
+
+def parse_count(text: Any, pattern: re.Pattern = BEDS_RE) -> Optional[int]:
+    """Bedroom/bathroom count from '3', '3 bdrm', '4 Bedrooms'. None if absent."""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return int(text) if math.isfinite(text) else None
+    text = str(text)
+    match = DIGITS_RE.match(text) or pattern.search(text)
+    return int(match.group(1)) if match else None
+
+
+def parse_area_sqm(text: Any) -> Optional[float]:
+    """'450 sqm' -> 450.0; '1,200 sq ft' -> 111.48. Bare numbers are taken as sqm."""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text) if math.isfinite(text) else None
+    match = AREA_RE.search(str(text))
+    if not match:
+        digits = DIGITS_RE.match(str(text))
+        return float(digits.group(1)) if digits else None
+    amount = _to_float(match.group("amt"))
+    if amount is not None and "f" in match.group("unit").lower():
+        amount = round(amount * SQFT_TO_SQM, 2)
+    return amount
+
+
+# ==========================================
+# 🧾 RECORD-LEVEL NORMALIZATION
+# ==========================================
+
+# Raw field names used by the different scrapers, in priority order.
+PRICE_FIELDS = ("price_text", "price_raw", "price")
+BED_FIELDS = ("bedrooms_text", "bedrooms", "beds", "bed")
+BATH_FIELDS = ("bathrooms_text", "bathrooms", "showers", "shower")
+AREA_FIELDS = ("area", "area_sqm", "size")
+TEXT_FIELDS = ("title", "description", "description_snippet", "raw_text_snippet")
+
+
+def _first(raw: Dict[str, Any], fields) -> Any:
+    for field in fields:
+        value = raw.get(field)
+        if value not in (None, "", "0"):
+            return value
+    return None
+
+
+def normalize_listing(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Canonical numeric fields for any scraper's raw record:
+    price_amount, currency, price_period, bedrooms, bathrooms, area_sqm.
+    Falls back to title/description text when the dedicated field is empty.
+    """
+    free_text = " ".join(str(raw[f]) for f in TEXT_FIELDS if raw.get(f))
+
+    price = parse_price(_first(raw, PRICE_FIELDS))
+    if price.amount is None:
+        price = parse_price(free_text, require_currency=True)
+
+    features = " ".join(str(f.get("text", "")) for f in raw.get("raw_features") or [] if isinstance(f, dict))
+
+    bedrooms = parse_count(_first(raw, BED_FIELDS))
+    if not bedrooms:
+        bedrooms = parse_count(features) or parse_count(free_text)
+    bathrooms = parse_count(_first(raw, BATH_FIELDS), BATHS_RE)
+    if not bathrooms:
+        bathrooms = parse_count(features, BATHS_RE) or parse_count(free_text, BATHS_RE)
+    area = parse_area_sqm(_first(raw, AREA_FIELDS))
+    if area is None and features:
+        area = parse_area_sqm(features)
+
+    return {
+        "price_amount": price.amount,
+        "currency": price.currency,
+        "price_period": price.period,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "area_sqm": area,
+    }
+
+
+# ==========================================
+# 🐼 VECTORISED PATH (pandas)
+# ==========================================
+
+def _extract(series, pattern: re.Pattern):
+    """
+    `series.str.extract(pattern)` evaluated once per distinct value. Scraped
+    dumps repeat the same price/title strings heavily (the 6,957-row GPC dump
+    has ~760 distinct prices and ~170 titles), so this is where the speed-up is.
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series)
+    extracted = pd.Series(uniques, dtype="string").str.extract(pattern)
+    if (codes < 0).any():
+        extracted.loc[len(extracted)] = pd.NA  # codes of -1 (missing) land here
+        codes = codes.copy()
+        codes[codes < 0] = len(extracted) - 1
+    return extracted.iloc[codes].set_axis(series.index)
+
+
+def normalize_frame(df, price_col: str = "price", title_col: str = "title",
+                    beds_col: Optional[str] = None, baths_col: Optional[str] = None):
+    """
+    Adds price_amount / currency / price_period / bedrooms / bathrooms columns to a
+    copy of `df` using pandas `str.extract` with the module's compiled patterns.
+    Matches `normalize_listing` for the same inputs.
+    """
+    import numpy as np
+    import pandas as pd
+
+    out = df.copy()
+    price = out[price_col].astype("string")
+    price = price.where(~price.str.strip().isin(["", "0"]))  # same "empty" rule as _first()
+    title = out[title_col].astype("string") if title_col in out else pd.Series(pd.NA, index=out.index, dtype="string")
+
+    def extract_price(series: "pd.Series", allow_bare: bool):
+        tagged = _extract(series, PRICE_WITH_CURRENCY_RE)
+        amount = tagged["amt"].fillna(tagged["amt2"])
+        token = tagged["cur"].fillna(tagged["cur2"])
+        currency = token.str.replace(r"\s", "", regex=True).str.upper().map(
+            lambda t: _CURRENCY_CODES.get(t, "GHS") if isinstance(t, str) else None)
+        if allow_bare:
+            no_price = series.str.contains(NO_PRICE_RE, na=False) & amount.isna()
+            bare = _extract(series, BARE_AMOUNT_RE)["amt"].where(~no_price)
+            currency = currency.where(amount.notna(), np.where(bare.notna(), "GHS", None))
+            amount = amount.fillna(bare)
+        amount = pd.to_numeric(amount.str.replace(",", "", regex=False), errors="coerce")
+        return amount, currency.where(amount.notna(), None)
+
+    amount, currency = extract_price(price, allow_bare=True)
+    from_title = amount.isna()
+    # Only the rows without a usable price field pay for the title scan.
+    title_amount, title_currency = extract_price(title[from_title], allow_bare=False)
+    out["price_amount"] = amount.fillna(title_amount)
+    out["currency"] = currency.where(~from_title, title_currency.reindex(out.index))
+
+    periods = _extract(price.where(~from_title, title), PERIOD_RE)
+    period = np.select(
+        [periods["month"].notna(), periods["year"].notna(), periods["day"].notna()],
+        ["month", "year", "day"], default="",
+    )
+    out["price_period"] = pd.Series(period, index=out.index).replace("", None)
+    out.loc[out["price_amount"].isna(), "price_period"] = None
+
+    def extract_count(col: Optional[str], pattern: re.Pattern):
+        counts = pd.Series(np.nan, index=out.index)
+        if col and col in out and pd.api.types.is_numeric_dtype(out[col]):
+            # NaN-padded ints (a concatenated frame): truncate like int() in parse_count
+            values = out[col].astype("float64")
+            counts = np.trunc(values.where(np.isfinite(values)))
+        elif col and col in out:
+            raw = out[col].astype("string")
+            counts = pd.to_numeric(_extract(raw, DIGITS_RE)[0], errors="coerce")
+            rest = counts.isna() & raw.notna()
+            counts = counts.fillna(pd.to_numeric(_extract(raw[rest], pattern)[0], errors="coerce"))
+        counts = counts.where(counts > 0)
+        missing = counts.isna()
+        counts = counts.fillna(pd.to_numeric(_extract(title[missing], pattern)[0], errors="coerce"))
+        return counts.astype("Int64")
+
+    out["bedrooms"] = extract_count(beds_col, BEDS_RE)
+    out["bathrooms"] = extract_count(baths_col, BATHS_RE)
+    return out
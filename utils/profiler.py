@@ -0,0 +1,237 @@
+# utils/profiler.py
+"""
+Sampling profiler (stdlib only) that writes speedscope flamegraphs - for the API and the batch scripts.
+
+A background thread wakes `hz` times a second, reads every thread's Python
+stack via `sys._current_frames()` and adds it to a profile, weighted by the
+wall time since the previous sample. Nothing is hooked into the profiled code,
+so there is no cost while no sampler is running, and a running one costs one
+stack walk per thread per tick. Because samples are wall-clock, time spent
+waiting on Supabase / Gemini shows up under the frame that made the call.
+Idle threads (pool workers waiting for jobs, an event loop in select()) are
+dropped unless `include_idle=True`.
+
+    with Sampler(hz=200) as sampler:
+        run_full_pipeline()
+    sampler.profile.save("pipeline.speedscope.json")   # open at https://www.speedscope.app
+
+    python -m utils.profiler scripts/update_news.py
+    python -m utils.profiler --hz 50 -o report.speedscope.json scripts/market_report.py --days 7
+
+Profiles are grouped (one speedscope profile per group) by thread name unless
+a `group(thread_name, codes)` callable says otherwise - api/profiling.py
+groups by route. CLI output goes to data/.profiles (ASTA_PROFILE_DIR).
+"""
+
+import argparse
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_HZ = 100
+PROFILE_DIR = Path(os.getenv("ASTA_PROFILE_DIR", "data/.profiles"))
+MAX_DEPTH = 256
+
+# Leaf frames of a thread that is parked, not working: (file basename, function)
+IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("queue.py", "get"),
+    ("selectors.py", "select"), ("thread.py", "_worker"), ("handlers.py", "dequeue"),
+}
+
+FrameKey = Tuple[str, str, int]   # (function, file, first line)
+_frame_keys: Dict[object, FrameKey] = {}
+
+
+def _key(code) -> FrameKey:
+    key = _frame_keys.get(code)
+    if key is None:
+        if len(_frame_keys) > 50_000:   # exec()'d code can mint endless code objects
+            _frame_keys.clear()
+        key = _frame_keys[code] = (getattr(code, "co_qualname", code.co_name), code.co_filename,
+                                   code.co_firstlineno)
+    return key
+
+
+def _codes(frame) -> List[object]:
+    """Code objects of a stack, root first."""
+    codes = []
+    while frame is not None and len(codes) < MAX_DEPTH:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    return codes
+
+
+def _is_idle(codes: Sequence[object]) -> bool:
+    leaf = codes[-1]
+    return (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES
+
+
+# --- PROFILE (aggregated stacks) ---
+
+class Profile:
+    def __init__(self, name: str = "profile"):
+        self.name = name
+        self.weights: Counter = Counter()   # (group, stack of FrameKeys) -> seconds
+        self.samples = 0
+        self.started = time.time()
+
+    def add(self, group: str, stack: Tuple[FrameKey, ...], weight: float):
+        self.weights[(group, stack)] += weight
+        self.samples += 1
+
+    def merge(self, other: "Profile") -> "Profile":
+        self.weights.update(other.weights)
+        self.samples += other.samples
+        return self
+
+    def groups(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for (group, _), w in self.weights.items():
+            totals[group] = totals.get(group, 0.0) + w
+        return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+    def to_speedscope(self, groups: Optional[Sequence[str]] = None) -> dict:
+        """speedscope file format, one "sampled" profile per group (heaviest first)."""
+        frames: Dict[FrameKey, int] = {}
+        profiles = []
+        for group in (groups if groups is not None else self.groups()):
+            samples, weights = [], []
+            for (g, stack), w in self.weights.items():
+                if g == group:
+                    samples.append([frames.setdefault(k, len(frames)) for k in stack])
+                    weights.append(round(w, 6))
+            profiles.append({"type": "sampled", "name": group, "unit": "seconds", "startValue": 0,
+                             "endValue": round(sum(weights), 6), "samples": samples, "weights": weights})
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "asta utils.profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": n, "file": f, "line": line} for n, f, line in frames]},
+            "profiles": profiles,
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg folded stacks ("group;a;b;c <ms>") for flamegraph.pl / inferno."""
+        lines = []
+        for (group, stack), w in self.weights.items():
+            lines.append(";".join([group, *(f"{n} ({os.path.basename(f)}:{line})" for n, f, line in stack)])
+                         + f" {max(int(w * 1000), 1)}")
+        return "\n".join(sorted(lines)) + "\n"
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        if path.suffix == ".folded":
+            tmp.write_text(self.collapsed())
+        else:
+            tmp.write_text(json.dumps(self.to_speedscope(), separators=(",", ":")))
+        tmp.replace(path)
+        return path
+
+
+# --- SAMPLER ---
+
+class Sampler:
+    def __init__(self, hz: float = DEFAULT_HZ, sink=None, group: Optional[Callable[[str, List[object]], str]] = None,
+                 include_idle: bool = False, name: str = "profile", accept: Optional[Callable[[int], bool]] = None):
+        self.interval = 1.0 / hz
+        self.accept = accept   # thread ident -> keep this thread's sample? (None = every thread)
+        self.profile = Profile(name)
+        self.sink = sink if sink is not None else self.profile   # anything with add(group, stack, weight)
+        self.group = group
+        self.include_idle = include_idle
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Sampler":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="asta-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.profile
+
+    def _run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            # Weight by real elapsed time: a CPU-bound thread holding the GIL delays our wake-ups
+            self.sample(now - last, skip=own)
+            last = now
+
+    def sample(self, weight: float, skip: Optional[int] = None):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            thread_name = names.get(ident, str(ident))
+            if ident == skip or thread_name == "asta-profiler":   # ourselves, or another sampler
+                continue
+            if self.accept is not None and not self.accept(ident):
+                continue
+            codes = _codes(frame)
+            if not codes or (not self.include_idle and _is_idle(codes)):
+                continue
+            group = self.group(thread_name, codes) if self.group else thread_name
+            if group is not None:
+                self.sink.add(group, tuple(_key(c) for c in codes), weight)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# --- CLI: profile a script ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Python script under the sampling profiler",
+                                     usage="python -m utils.profiler [options] script.py [script args...]")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="Output file (.speedscope.json, or .folded for flamegraph.pl); default data/.profiles/")
+    parser.add_argument("--hz", type=float, default=DEFAULT_HZ, help="Samples per second (default 100)")
+    parser.add_argument("--idle", action="store_true", help="Keep samples of threads parked in waits")
+    parser.add_argument("-m", dest="module", action="store_true", help="Treat target as a module name (like python -m)")
+    parser.add_argument("target")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    stem = args.target if args.module else Path(args.target).stem
+    output = args.output or PROFILE_DIR / f"{stem}-{datetime.now():%Y%m%d_%H%M%S}.speedscope.json"
+    sys.argv = [args.target, *args.args]
+    if not args.module:
+        sys.path.insert(0, str(Path(args.target).resolve().parent))
+
+    sampler = Sampler(hz=args.hz, include_idle=args.idle, name=stem).start()
+    started = time.perf_counter()
+    try:
+        if args.module:
+            runpy.run_module(args.target, run_name="__main__", alter_sys=True)
+        else:
+            runpy.run_path(args.target, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"⚠️ {args.target} exited with {e.code}")
+    finally:
+        profile = sampler.stop()
+        path = profile.save(output)
+        print(f"🔥 Profiled {args.target}: {profile.samples} samples over {time.perf_counter() - started:.1f}s "
+              f"-> {path} (open at https://www.speedscope.app)")
+
+
+if __name__ == "__main__":
+    main()
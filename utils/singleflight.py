@@ -0,0 +1,121 @@
+# utils/singleflight.py
+"""
+Request coalescing: concurrent calls for the same key share one in-flight computation.
+
+When a cached aggregate (pulse, GeoJSON, trending tags) expires, every request
+that arrives before it is rebuilt would otherwise run the same full-table
+Supabase queries. With single-flight the first caller (the leader) runs the
+function and everyone else waits for - and gets - its result or exception.
+
+    flight = SingleFlight()                       # threads (sync routes, threadpool)
+    rows = flight.do("geojson", load_geojson)
+    flight.refresh("geojson", load_geojson)       # background, no-op if already running
+
+    aflight = AsyncSingleFlight()                 # one event loop (async routes)
+    pulse = await aflight.do("pulse", build_pulse_async)
+
+Nothing is cached here: once the call finishes its key is free again. Pair it
+with a cache for stale-while-revalidate (api/responses.py CachedJSON).
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+log = logging.getLogger("asta.singleflight")
+
+
+class SingleFlight:
+    """Thread-safe single-flight group."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.stats = {"calls": 0, "shared": 0, "refreshes": 0}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self.stats["calls"] += 1
+            else:
+                self.stats["shared"] += 1
+        if not leader:
+            return call.result()
+        try:
+            result = fn(*args, **kwargs)
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def refresh(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> bool:
+        """Runs `fn` for `key` on a background thread unless a call for it is already in flight."""
+        with self._lock:
+            if key in self._calls:
+                return False
+            self.stats["refreshes"] += 1
+
+        def _run():
+            try:
+                self.do(key, fn, *args, **kwargs)
+            except Exception as e:   # the caller keeps serving its stale value
+                log.warning(f"⚠️ Background refresh of {key!r} failed: {e}")
+
+        threading.Thread(target=_run, name=f"refresh-{key}", daemon=True).start()
+        return True
+
+
+class AsyncSingleFlight:
+    """Single-flight group for coroutines on one event loop."""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "shared": 0, "refreshes": 0}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def _start(self, key: Hashable, background: bool, fn: Callable[..., Awaitable[Any]], *args,
+               **kwargs) -> asyncio.Task:
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        self._tasks[key] = task
+        self.stats["calls"] += 1
+
+        def _done(t, key=key):
+            if self._tasks.get(key) is t:
+                del self._tasks[key]
+            error = None if t.cancelled() else t.exception()   # also marks the exception as retrieved
+            if background and error is not None:
+                log.warning(f"⚠️ Background refresh of {key!r} failed: {error}")
+
+        task.add_done_callback(_done)
+        return task
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._start(key, False, fn, *args, **kwargs)
+        else:
+            self.stats["shared"] += 1
+        # shield: a waiter that disconnects must not cancel the work the others are waiting for
+        return await asyncio.shield(task)
+
+    def refresh(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> bool:
+        """Starts `fn` in the background unless `key` is already in flight (call from the loop)."""
+        if key in self._tasks:
+            return False
+        self.stats["refreshes"] += 1
+        self._start(key, True, fn, *args, **kwargs)
+        return True